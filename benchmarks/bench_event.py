@@ -0,0 +1,81 @@
+"""
+事件驱动回测热循环的性能测试
+
+目标是单核每秒回放至少100万根K线。分别测量只记录权益的空策略和带移动止损的策略。
+
+用法:
+    python -m benchmarks.bench_event --rows 2600000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_dedup import timed
+from benchmarks.bench_backtest import make_ohlcv
+from src.backtest.event import EventEngine, Strategy, ORDER_STOP
+
+# 热循环的目标吞吐量(根/秒)
+TARGET_BARS_PER_SECOND = 1000000
+
+
+class HoldStrategy(Strategy):
+    """第一根K线买入后一直持有，只测量引擎本身的开销"""
+
+    def on_bar(self, timestamp, open_, high, low, close, volume):
+        if self.engine.position.size == 0 and not self.engine._pending:
+            self.engine.buy(1.0)
+
+
+class TrailingStopStrategy(Strategy):
+    """突破前高做多，用移动止损离场"""
+
+    def __init__(self, trail=0.02):
+        self.trail = trail
+        self.stop = None
+        self.high = 0.0
+
+    def on_bar(self, timestamp, open_, high, low, close, volume):
+        if self.stop is None:
+            if close > self.high:
+                self.engine.buy(1.0)
+                self.stop = self.engine.sell(1.0, ORDER_STOP, close * (1 - self.trail))
+            self.high = max(self.high * 0.9999, high)
+        elif self.stop.status != 'pending':
+            self.stop = None
+        elif close * (1 - self.trail) > self.stop.price:
+            self.stop.price = close * (1 - self.trail)
+
+
+def replay(data, strategy):
+    return EventEngine(strategy, fee_rate=0.0005, slippage=0.0002).run(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="事件驱动回测热循环性能测试")
+    parser.add_argument('--rows', type=int, default=2600000, help="K线数量")
+    parser.add_argument('--repeat', type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    data = make_ohlcv(args.rows)
+    data['high'] = data['close'] * 1.001
+    data['low'] = data['close'] * 0.999
+    data['volume'] = np.ones(args.rows)
+
+    passed = True
+    for name, factory in (('空策略', HoldStrategy), ('移动止损', TrailingStopStrategy)):
+        elapsed, result = timed(lambda: replay(data, factory()), repeat=args.repeat)
+        speed = args.rows / elapsed
+        print(f"{name}: {elapsed:.3f}s，{speed / 1e6:.2f}M 根/秒，成交 {len(result.fills)} 次")
+        passed &= speed >= TARGET_BARS_PER_SECOND
+
+    print(f"目标 {TARGET_BARS_PER_SECOND / 1e6:.0f}M 根/秒: {'达到' if passed else '未达到'}")
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
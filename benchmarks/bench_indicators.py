@@ -0,0 +1,100 @@
+"""
+技术指标批量计算的性能对比
+
+对比逐个参数调用pandas rolling/ewm的写法与共享中间结果的 compute_indicators。
+
+用法:
+    python -m benchmarks.bench_indicators --rows 1000000
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_dedup import timed
+from src.indicator.indicators import compute_indicators
+
+# 多组参数：典型的参数扫描规模
+INDICATORS = {
+    'sma': [5, 10, 20, 50, 100, 200],
+    'ema': [5, 10, 20, 50, 100, 200],
+    'rsi': [7, 14, 21],
+    'atr': [7, 14, 21],
+    'bollinger': [[20, 2], [20, 2.5], [50, 2]],
+    'macd': [[12, 26, 9], [5, 35, 5]],
+    'volatility': [20, 50, 100],
+}
+
+
+def make_ohlcv(rows, seed=0):
+    """生成随机K线"""
+    rng = np.random.default_rng(seed)
+    close = np.abs(3000 + np.cumsum(rng.normal(0, 5, rows))) + 100
+    spread = rng.uniform(0, 3, rows)
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(rows, dtype=np.int64) * 60000,
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+    })
+
+
+def naive_pandas(df, indicators):
+    """逐个参数调用pandas rolling/ewm，每次都重新计算涨跌幅、真实波幅和收益率"""
+    close = df['close']
+    result = {}
+    for window in indicators['sma']:
+        result[f"sma_{window}"] = close.rolling(window).mean()
+    for span in indicators['ema']:
+        result[f"ema_{span}"] = close.ewm(span=span, adjust=False, min_periods=span).mean()
+    for window in indicators['rsi']:
+        delta = close.diff()
+        gain = delta.clip(lower=0).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+        loss = (-delta.clip(upper=0)).ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+        result[f"rsi_{window}"] = 100 - 100 / (1 + gain / loss)
+    for window in indicators['atr']:
+        prev_close = close.shift()
+        tr = pd.concat([df['high'] - df['low'], (df['high'] - prev_close).abs(),
+                        (df['low'] - prev_close).abs()], axis=1).max(axis=1)
+        result[f"atr_{window}"] = tr.ewm(alpha=1 / window, adjust=False, min_periods=window).mean()
+    for window, num_std in indicators['bollinger']:
+        mid = close.rolling(window).mean()
+        std = close.rolling(window).std(ddof=0)
+        result[f"bb_upper_{window}_{num_std}"] = mid + num_std * std
+        result[f"bb_lower_{window}_{num_std}"] = mid - num_std * std
+    for fast, slow, signal in indicators['macd']:
+        line = close.ewm(span=fast, adjust=False).mean() - close.ewm(span=slow, adjust=False).mean()
+        result[f"macd_{fast}_{slow}_{signal}"] = line
+        result[f"macd_signal_{fast}_{slow}_{signal}"] = line.ewm(span=signal, adjust=False).mean()
+    for window in indicators['volatility']:
+        result[f"volatility_{window}"] = np.log(close).diff().rolling(window).std()
+    return pd.DataFrame(result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技术指标批量计算性能对比")
+    parser.add_argument('--rows', type=int, default=1000000, help="K线数量")
+    parser.add_argument('--repeat', type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    df = make_ohlcv(args.rows)
+    columns = sum(len(params) for params in INDICATORS.values())
+    print(f"{args.rows} 条K线，{len(INDICATORS)} 种指标共 {columns} 组参数")
+
+    naive_time, naive = timed(naive_pandas, df, INDICATORS, repeat=args.repeat)
+    batch_time, batch = timed(compute_indicators, df, INDICATORS, repeat=args.repeat)
+
+    np.testing.assert_allclose(batch['rsi_14'], naive['rsi_14'], rtol=1e-9, equal_nan=True)
+    np.testing.assert_allclose(batch['sma_200'], naive['sma_200'], rtol=1e-9, equal_nan=True)
+
+    print(f"逐个调用pandas: {naive_time:.3f}s")
+    print(f"批量计算:       {batch_time:.3f}s  ({naive_time / batch_time:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+面板对齐和组合回测的性能测试
+
+把300个交易对约4年的1小时K线(上市时间各不相同)一次对齐为面板，再按截面动量做组合回测；
+另外让一部分交易对在历史中途带着持仓下架，测试之后每次调仓结转持仓的代价。
+
+用法:
+    python -m benchmarks.bench_portfolio --symbols 300 --rows 35000 --delisted 30
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from benchmarks.bench_dedup import timed
+from src.backtest.portfolio import cross_sectional_weights, run_portfolio_backtest
+from src.data.panel import build_panel
+
+HOUR = 3600000
+
+
+def make_frames(symbols, rows, seed=0):
+    """生成多个交易对的随机1小时K线，前1/8的时间内陆续上市"""
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for i in range(symbols):
+        listed = int(rng.integers(0, rows // 8))
+        close = np.abs(100 + np.cumsum(rng.normal(0, 1, rows - listed))) + 1
+        frames[f"S{i}/USDT"] = {
+            'timestamp': 1609459200000 + np.arange(listed, rows, dtype=np.int64) * HOUR,
+            'open': close, 'high': close, 'low': close, 'close': close, 'volume': close,
+        }
+    return frames
+
+
+def momentum_backtest(panel, lookback, rebalance_every):
+    close = panel['close']
+    change = np.full_like(close, np.nan)
+    change[lookback:] = close[lookback:] / close[:-lookback] - 1
+    weights = cross_sectional_weights(np.where(panel.mask, change, np.nan), 'rank')
+    return run_portfolio_backtest(panel, weights, rebalance_every, fee_rate=0.001, slippage=0.0, timeframe='1h')
+
+
+def delisted_backtest(panel, delisted):
+    """等权持有全部交易对并每根K线调仓，前delisted个交易对在历史中途下架后持仓一直结转"""
+    weights = np.full(panel.shape[:2], 1.0 / panel.shape[1])
+    weights[:, :delisted] = np.where(np.arange(len(weights))[:, None] < len(weights) // 2, weights[:, :delisted], 0.0)
+    return run_portfolio_backtest(panel, weights, 1, fee_rate=0.001, slippage=0.0, timeframe='1h')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="面板对齐和组合回测性能测试")
+    parser.add_argument('--symbols', type=int, default=300, help="交易对数量")
+    parser.add_argument('--rows', type=int, default=35000, help="每个交易对的最大K线数量")
+    parser.add_argument('--rebalance', type=int, default=24, help="调仓间隔(K线数)")
+    parser.add_argument('--delisted', type=int, default=30, help="历史中途下架的交易对数量")
+    parser.add_argument('--repeat', type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    frames = make_frames(args.symbols, args.rows)
+    bars = sum(len(frame['timestamp']) for frame in frames.values())
+
+    elapsed, panel = timed(build_panel, frames, fill='ffill', repeat=args.repeat)
+    print(f"{args.symbols} 个交易对共 {bars} 根K线，面板形状 {panel.shape}")
+    print(f"面板对齐耗时: {elapsed:.3f}s")
+
+    elapsed, result = timed(momentum_backtest, panel, 24, args.rebalance, repeat=args.repeat)
+    print(f"截面动量组合回测耗时: {elapsed:.3f}s，成交 {result.stats()['trades']} 笔")
+
+    for name in list(frames)[:args.delisted]:
+        frames[name] = {column: values[:len(values) // 2] for column, values in frames[name].items()}
+    panel = build_panel(frames, fill='ffill')
+    elapsed, result = timed(delisted_backtest, panel, args.delisted, repeat=args.repeat)
+    print(f"{args.delisted} 个交易对下架后逐根调仓耗时: {elapsed:.3f}s，成交 {result.stats()['trades']} 笔")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""
+回测模块
+
+在已保存的K线数据上回测交易策略
+"""
@@ -0,0 +1,138 @@
+"""回测结果缓存模块，按 数据哈希 + 参数 + 代码版本 寻址缓存中间特征和回测结果"""
+
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import tempfile
+
+from src.backtest.vectorized import data_config, logger
+from src.manager import SystemManager
+
+
+def code_version(*funcs):
+    """由函数源代码计算的代码版本，函数实现改变后版本随之改变
+
+    函数带有 version 属性时使用该属性；取不到源代码时(如交互式环境中定义的函数)使用字节码。
+
+    Args:
+        *funcs (callable): 参与计算的函数
+
+    Returns:
+        str: 十六进制版本哈希
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for func in funcs:
+        version = getattr(func, 'version', None)
+        if version is None:
+            try:
+                version = inspect.getsource(func)
+            except (OSError, TypeError):
+                code = getattr(func, '__code__', None)
+                version = code.co_code.hex() + repr(code.co_consts) if code is not None else repr(func)
+        digest.update(f"{getattr(func, '__module__', '')}.{getattr(func, '__qualname__', '')}".encode('utf-8'))
+        digest.update(str(version).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def cache_key(kind, *parts):
+    """缓存键，由结果类型和可JSON序列化的各部分组成
+
+    Args:
+        kind (str): 结果类型，如 'features'、'backtest'
+        *parts: 数据哈希、参数、代码版本等
+
+    Returns:
+        str: 十六进制缓存键
+    """
+    payload = json.dumps([kind, *parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """
+    内容寻址的结果缓存
+
+    每个结果以pickle保存在 {directory}/{key[:2]}/{key}.pkl，先写临时文件再原子替换，多个进程可以同时读写同一目录。
+    键由数据内容、参数和代码版本决定，任何一项改变都会得到新的键，因此缓存不需要失效处理。
+    """
+
+    def __init__(self, directory):
+        self.directory = str(directory)
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pkl")
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def get(self, key, default=None):
+        """读取缓存的结果，未命中时返回default"""
+        try:
+            with open(self._path(key), 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        except (pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"缓存文件 {self._path(key)} 已损坏，重新计算: {e}")
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """保存结果"""
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def memoize(self, key, compute):
+        """命中时返回缓存的结果，否则计算并保存
+
+        Args:
+            key (str): 缓存键
+            compute (callable): 无参数的计算函数
+
+        Returns:
+            object: 结果
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        """删除所有缓存的结果"""
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith('.pkl'):
+                    os.unlink(os.path.join(root, name))
+
+
+def get_result_cache(directory=None):
+    """按配置获取结果缓存
+
+    Args:
+        directory (str, optional): 缓存目录，默认读取配置 walk_forward.cache_dir，未配置时为 OUTPUT_PATH/cache
+
+    Returns:
+        ResultCache: 结果缓存
+    """
+    if directory is None:
+        directory = data_config.get('walk_forward', {}).get('cache_dir') or \
+            os.path.join(str(SystemManager().OUTPUT_PATH), 'cache')
+    return ResultCache(directory)
@@ -0,0 +1,370 @@
+"""事件驱动回测模块，按时间顺序回放已保存的K线，支持止损、移动止损和仓位管理等依赖路径的策略"""
+
+import itertools
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from src.backtest.vectorized import logger, BacktestResult, FILL_COLUMNS, _backtest_config, _periods_per_year
+from src.data.store import open_store, FlatStore
+from src.data.storage import BinaryStorage
+
+# 订单类型
+ORDER_MARKET = 'market'
+ORDER_LIMIT = 'limit'
+ORDER_STOP = 'stop'
+
+# 订单状态
+ORDER_PENDING = 'pending'
+ORDER_FILLED = 'filled'
+ORDER_CANCELLED = 'cancelled'
+
+# 回放时每次从数据中取出的K线数量
+DEFAULT_CHUNK_SIZE = 100000
+
+
+class Order:
+    """订单，size为正表示买入、为负表示卖出，止损单的price可以在挂单期间修改以实现移动止损"""
+
+    __slots__ = ('id', 'size', 'order_type', 'price', 'status', 'created_at', 'filled_at')
+
+    def __init__(self, order_id, size, order_type=ORDER_MARKET, price=None, created_at=None):
+        self.id = order_id
+        self.size = size
+        self.order_type = order_type
+        self.price = price
+        self.status = ORDER_PENDING
+        self.created_at = created_at
+        self.filled_at = None
+
+    def __repr__(self):
+        return f"Order({self.id}, {self.order_type}, size={self.size}, price={self.price}, {self.status})"
+
+
+class Fill:
+    """成交记录"""
+
+    __slots__ = ('order_id', 'timestamp', 'price', 'size', 'fee', 'slippage')
+
+    def __init__(self, order_id, timestamp, price, size, fee, slippage):
+        self.order_id = order_id
+        self.timestamp = timestamp
+        self.price = price
+        self.size = size
+        self.fee = fee
+        self.slippage = slippage
+
+    def __repr__(self):
+        return f"Fill({self.order_id}, size={self.size}, price={self.price})"
+
+
+class Position:
+    """持仓，size为持有数量(负数为空头)，avg_price为开仓均价"""
+
+    __slots__ = ('size', 'avg_price', 'realized_pnl')
+
+    def __init__(self):
+        self.size = 0.0
+        self.avg_price = 0.0
+        self.realized_pnl = 0.0
+
+    def apply(self, size, price):
+        """按成交更新持仓，减仓和反向开仓时结算已实现盈亏"""
+        current = self.size
+        new_size = current + size
+        if current == 0 or (current > 0) == (size > 0):
+            self.avg_price = (self.avg_price * current + price * size) / new_size
+        else:
+            closed = min(abs(size), abs(current))
+            self.realized_pnl += closed * (price - self.avg_price) * (1 if current > 0 else -1)
+            if new_size == 0:
+                self.avg_price = 0.0
+            elif (new_size > 0) != (current > 0):
+                # 反向开仓，剩余部分按成交价开仓
+                self.avg_price = price
+        self.size = new_size
+
+    def __repr__(self):
+        return f"Position(size={self.size}, avg_price={self.avg_price})"
+
+
+class Strategy:
+    """
+    事件驱动策略基类
+
+    on_bar在每根K线收盘时调用，此时下的市价单在下一根K线开盘成交，限价单和止损单从下一根K线开始撮合。
+    """
+
+    def on_start(self, engine):
+        """回测开始前调用"""
+        self.engine = engine
+
+    def on_bar(self, timestamp, open_, high, low, close, volume):
+        """每根K线收盘时调用"""
+        raise NotImplementedError
+
+    def on_fill(self, fill):
+        """订单成交时调用"""
+
+    def on_finish(self):
+        """回测结束后调用"""
+
+
+class EventEngine:
+    """
+    事件驱动回测引擎
+
+    按块取出K线的列表并逐根回放，热循环中只做挂单撮合检查和调用策略，不创建K线对象，也不逐根记录权益。
+    现金和持仓只在成交时变化，成交时把变化后的状态追加到数组中，回放结束后按时间戳向量化地展开为
+    逐根的持仓和权益。只有下单和成交时才创建 __slots__ 对象。
+    """
+
+    def __init__(self, strategy, initial_capital=None, fee_rate=None, slippage=None):
+        """初始化回测引擎
+
+        Args:
+            strategy (Strategy): 策略
+            initial_capital (float, optional): 初始资金，默认读取配置
+            fee_rate (float, optional): 手续费率，默认读取配置
+            slippage (float, optional): 滑点比例，市价单和止损单的成交价向不利方向调整，默认读取配置
+        """
+        config = _backtest_config()
+        self.strategy = strategy
+        self.initial_capital = float(config['initial_capital'] if initial_capital is None else initial_capital)
+        self.fee_rate = float(config['fee_rate'] if fee_rate is None else fee_rate)
+        self.slippage = float(config['slippage'] if slippage is None else slippage)
+
+        self.cash = self.initial_capital
+        self.position = Position()
+        self.orders = []
+        self.fills = []
+        self.timestamp = None
+        self._pending = []
+        self._order_ids = itertools.count(1)
+        self._timestamps = []
+        self._closes = []
+        # 每次成交后的 (时间戳, 现金, 持仓数量)
+        self._state_timestamps = array('q')
+        self._state_cash = array('d')
+        self._state_size = array('d')
+
+    def submit(self, size, order_type=ORDER_MARKET, price=None):
+        """下单
+
+        Args:
+            size (float): 数量，正数买入，负数卖出
+            order_type (str): 'market'、'limit' 或 'stop'
+            price (float, optional): 限价单和止损单的触发价格
+
+        Returns:
+            Order: 订单
+        """
+        if size == 0:
+            raise ValueError("下单数量不能为0")
+        if order_type not in (ORDER_MARKET, ORDER_LIMIT, ORDER_STOP):
+            raise ValueError(f"不支持的订单类型: {order_type}")
+        if order_type != ORDER_MARKET and price is None:
+            raise ValueError(f"{order_type} 订单需要指定价格")
+
+        order = Order(next(self._order_ids), size, order_type, price, self.timestamp)
+        self.orders.append(order)
+        self._pending.append(order)
+        return order
+
+    def buy(self, size, order_type=ORDER_MARKET, price=None):
+        return self.submit(abs(size), order_type, price)
+
+    def sell(self, size, order_type=ORDER_MARKET, price=None):
+        return self.submit(-abs(size), order_type, price)
+
+    def order_target(self, target_size):
+        """下市价单把持仓调整到目标数量，已经是目标数量时返回None"""
+        delta = target_size - self.position.size
+        return self.submit(delta) if delta else None
+
+    def cancel(self, order):
+        """撤销未成交的订单"""
+        if order.status == ORDER_PENDING:
+            order.status = ORDER_CANCELLED
+            # 撮合过程中撤销的订单可能不在挂单列表中，撮合时按状态跳过
+            if order in self._pending:
+                self._pending.remove(order)
+
+    def cancel_all(self):
+        for order in self._pending:
+            order.status = ORDER_CANCELLED
+        self._pending.clear()
+
+    def equity(self, price):
+        """按价格计算当前权益"""
+        return self.cash + self.position.size * price
+
+    def _fill(self, order, timestamp, price, slip):
+        """按成交价结算订单"""
+        size = order.size
+        notional = abs(size) * price
+        fee = notional * self.fee_rate
+        self.cash -= size * price + fee
+        self.position.apply(size, price)
+        order.status = ORDER_FILLED
+        order.filled_at = timestamp
+        self._state_timestamps.append(timestamp)
+        self._state_cash.append(self.cash)
+        self._state_size.append(self.position.size)
+
+        fill = Fill(order.id, timestamp, price, size, fee, abs(size) * slip)
+        self.fills.append(fill)
+        self.strategy.on_fill(fill)
+
+    def _match(self, timestamp, open_, high, low):
+        """在K线内撮合挂单：市价单按开盘价，限价单和止损单在价格触及时按触发价或跳空后的开盘价成交"""
+        slippage = self.slippage
+        # 成交回调中新下的订单从下一根K线开始撮合
+        pending, self._pending = self._pending, []
+        for order in pending:
+            if order.status != ORDER_PENDING:
+                continue
+            buy = order.size > 0
+            order_type = order.order_type
+            if order_type == ORDER_MARKET:
+                base = open_
+            elif order_type == ORDER_LIMIT:
+                if buy and low <= order.price:
+                    base = min(open_, order.price)
+                elif not buy and high >= order.price:
+                    base = max(open_, order.price)
+                else:
+                    self._pending.append(order)
+                    continue
+            elif buy and high >= order.price:
+                base = max(open_, order.price)
+            elif not buy and low <= order.price:
+                base = min(open_, order.price)
+            else:
+                self._pending.append(order)
+                continue
+
+            # 限价单按挂单价成交，不计滑点
+            slip = 0.0 if order_type == ORDER_LIMIT else base * slippage
+            self._fill(order, timestamp, base + slip if buy else base - slip, slip)
+
+    def _replay(self, timestamps, opens, highs, lows, closes, volumes):
+        """回放一块K线，热循环中只做撮合检查和调用策略"""
+        on_bar = self.strategy.on_bar
+        match = self._match
+
+        for timestamp, open_, high, low, close, volume in zip(timestamps, opens, highs, lows, closes, volumes):
+            if self._pending:
+                match(timestamp, open_, high, low)
+            self.timestamp = timestamp
+            on_bar(timestamp, open_, high, low, close, volume)
+
+    def run(self, chunks, timeframe=None):
+        """回放K线并返回回测结果
+
+        Args:
+            chunks (iterable): K线块，每块为含 timestamp/open/high/low/close/volume 的DataFrame或列字典，
+                也可以直接传入一个DataFrame、列字典或内存映射的K线记录
+            timeframe (str, optional): K线周期，用于年化，默认按时间戳间隔推断
+
+        Returns:
+            BacktestResult: 回测结果，positions为每根K线收盘时的持仓数量
+        """
+        if isinstance(chunks, (pd.DataFrame, dict, np.ndarray)):
+            chunks = iter_chunks(chunks)
+
+        self.strategy.on_start(self)
+        for chunk in chunks:
+            columns = [np.asarray(chunk[column])
+                       for column in ('timestamp', 'open', 'high', 'low', 'close', 'volume')]
+            self._timestamps.append(columns[0].astype(np.int64))
+            self._closes.append(columns[4].astype(np.float64))
+            self._replay(*(column.tolist() for column in columns))
+        self.strategy.on_finish()
+        return self.result(timeframe)
+
+    def result(self, timeframe=None):
+        """把成交后的状态展开为逐根K线的持仓和权益，整理为回测结果"""
+        timestamps = np.concatenate(self._timestamps) if self._timestamps else np.empty(0, dtype=np.int64)
+        closes = np.concatenate(self._closes) if self._closes else np.empty(0)
+
+        # 每根K线收盘时的状态为该K线及之前最后一次成交后的状态
+        state_timestamps = np.frombuffer(self._state_timestamps, dtype=np.int64)
+        index = np.searchsorted(state_timestamps, timestamps, side='right') - 1
+        traded = index >= 0
+        cash = np.where(traded, np.r_[np.frombuffer(self._state_cash), 0.0][index], self.initial_capital)
+        positions = np.where(traded, np.r_[np.frombuffer(self._state_size), 0.0][index], 0.0)
+        equity = cash + positions * closes
+        returns = equity / np.r_[self.initial_capital, equity[:-1]] - 1.0 if len(equity) else equity
+
+        fills = pd.DataFrame({
+            'timestamp': [fill.timestamp for fill in self.fills],
+            'price': [fill.price for fill in self.fills],
+            'size': [fill.size for fill in self.fills],
+            'units': [fill.size for fill in self.fills],
+            'notional': [abs(fill.size) * fill.price for fill in self.fills],
+            'fee': [fill.fee for fill in self.fills],
+            'slippage': [fill.slippage for fill in self.fills],
+        }, columns=FILL_COLUMNS)
+
+        return BacktestResult(timestamps, positions, returns, equity, fills, self.initial_capital,
+                              _periods_per_year(timestamps, timeframe))
+
+
+def iter_chunks(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    """把K线数据切成块，DataFrame和内存映射数据的切片都不复制"""
+    length = len(data['timestamp'])
+    for begin in range(0, length, chunk_size):
+        if isinstance(data, pd.DataFrame):
+            yield data.iloc[begin:begin + chunk_size]
+        else:
+            yield {column: data[column][begin:begin + chunk_size]
+                   for column in ('timestamp', 'open', 'high', 'low', 'close', 'volume')}
+
+
+def iter_store_chunks(symbol, timeframe, start=None, end=None, exchange_id=None, data_dir=None,
+                      storage_format=None, layout=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """按块回放已保存的K线
+
+    binary格式的单文件数据通过内存映射按块读取，其他格式读取时间范围内的数据后切块。
+
+    Yields:
+        dict | pd.DataFrame: K线块
+    """
+    store = open_store(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    if isinstance(store, FlatStore) and isinstance(store.storage, BinaryStorage):
+        records = store.memmap().slice(start, end)
+        yield from iter_chunks(records, chunk_size)
+    else:
+        yield from iter_chunks(store.load(start, end), chunk_size)
+
+
+def run_event_backtest(symbol, timeframe, strategy, start=None, end=None, exchange_id=None, data_dir=None,
+                       storage_format=None, layout=None, chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+    """在已保存的K线上运行事件驱动回测
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1m'
+        strategy (Strategy): 策略
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        chunk_size (int): 每次回放的K线数量
+        **kwargs: 传给EventEngine的参数
+
+    Returns:
+        BacktestResult: 回测结果
+    """
+    engine = EventEngine(strategy, **kwargs)
+    chunks = iter_store_chunks(symbol, timeframe, start, end, exchange_id, data_dir, storage_format, layout,
+                               chunk_size)
+    result = engine.run(chunks, timeframe)
+    stats = result.stats()
+    logger.info(f"{symbol} {timeframe} 事件驱动回测完成，共 {len(result.equity)} 条K线，"
+                f"总收益率 {stats['total_return']:.2%}，成交 {stats['trades']} 次")
+    return result
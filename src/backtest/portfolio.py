@@ -0,0 +1,290 @@
+"""组合回测模块，在对齐的多交易对面板上用矩阵运算计算截面权重、调仓、换手成本和组合盈亏"""
+
+import numpy as np
+import pandas as pd
+
+from src.backtest.vectorized import (
+    logger, BacktestResult, _backtest_config, _periods_per_year, EXECUTION_CLOSE, EXECUTION_NEXT_OPEN
+)
+from src.data.panel import load_panel, forward_fill, FILL_FORWARD
+
+# 截面权重的计算方式
+WEIGHT_RANK = 'rank'
+WEIGHT_ZSCORE = 'zscore'
+WEIGHT_EQUAL = 'equal'
+
+PORTFOLIO_FILL_COLUMNS = ['timestamp', 'symbol', 'price', 'size', 'units', 'notional', 'fee', 'slippage']
+
+
+def _normalize_gross(weights, gross):
+    """按行缩放权重，使绝对值之和为gross，全为0的行保持为0"""
+    total = np.abs(weights).sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(total > 0, weights * (gross / total), 0.0)
+
+
+def cross_sectional_weights(scores, method=WEIGHT_RANK, long_short=True, gross=1.0):
+    """由每个时刻各交易对的打分计算截面权重
+
+    NaN打分的交易对权重为0。多空组合在截面内去均值，多头和空头各占一半总敞口；
+    纯多头组合只保留高于截面最低值(rank)或均值(zscore)的部分。
+
+    Args:
+        scores (np.ndarray): 形状为(时间, 交易对)的打分
+        method (str): 'rank' 按截面排名，'zscore' 按截面标准分，'equal' 有打分的交易对等权
+        long_short (bool): 是否多空对冲
+        gross (float): 每行权重绝对值之和
+
+    Returns:
+        np.ndarray: 形状为(时间, 交易对)的目标权重
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    valid = ~np.isnan(scores)
+    count = valid.sum(axis=1, keepdims=True)
+
+    if method == WEIGHT_EQUAL:
+        raw = valid.astype(np.float64)
+        if long_short:
+            raise ValueError("等权方式只支持纯多头组合")
+    elif method == WEIGHT_RANK:
+        # NaN排在最后，有效值的排名为1..count
+        order = np.argsort(np.where(valid, scores, np.inf), axis=1, kind='stable')
+        ranks = np.empty_like(scores)
+        np.put_along_axis(ranks, order, np.arange(1, scores.shape[1] + 1, dtype=np.float64)[None, :], axis=1)
+        with np.errstate(invalid='ignore'):
+            centered = ranks - (count + 1) / 2.0
+        raw = centered if long_short else ranks - 1.0
+    elif method == WEIGHT_ZSCORE:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(valid, scores, 0.0).sum(axis=1, keepdims=True) / count
+            centered = np.where(valid, scores - mean, 0.0)
+            raw = centered / np.sqrt((centered ** 2).sum(axis=1, keepdims=True) / count)
+        raw = raw if long_short else np.maximum(raw, 0.0)
+    else:
+        raise ValueError(f"不支持的权重计算方式: {method}")
+
+    raw = np.where(valid, np.nan_to_num(raw, nan=0.0, posinf=0.0, neginf=0.0), 0.0)
+    return _normalize_gross(raw, gross)
+
+
+class PortfolioResult(BacktestResult):
+    """
+    组合回测结果
+
+    positions为每根K线收盘时的净敞口，weights为各交易对在收盘时随价格漂移后的实际权重。
+    """
+
+    def __init__(self, timestamps, symbols, weights, returns, equity, fills, initial_capital, periods_per_year):
+        super().__init__(timestamps, weights.sum(axis=1), returns, equity, fills, initial_capital, periods_per_year)
+        self.symbols = list(symbols)
+        self.weights = weights
+
+    @property
+    def gross_exposure(self):
+        return np.abs(self.weights).sum(axis=1)
+
+    def weights_frame(self):
+        """逐根K线的实际权重宽表"""
+        return pd.DataFrame(self.weights, index=pd.Index(self.timestamps, name='timestamp'), columns=self.symbols)
+
+
+def rebalance_schedule(length, every=1, offset=0):
+    """调仓决策所在的K线序号
+
+    Args:
+        length (int): K线数量
+        every (int): 每隔多少根K线调仓一次
+        offset (int): 第一次调仓的K线序号
+
+    Returns:
+        np.ndarray: 决策K线的序号
+    """
+    if every < 1:
+        raise ValueError(f"调仓间隔必须是正整数: {every}")
+    return np.arange(offset, length, every, dtype=np.int64)
+
+
+def run_portfolio_backtest(panel, weights, rebalance_every=1, initial_capital=None, fee_rate=None, slippage=None,
+                           execution=None, timeframe=None):
+    """对面板上的目标权重矩阵做组合回测
+
+    weights[t] 是第t根K线收盘时决定的各交易对目标权重(权益的倍数)，只在调仓决策的K线上生效，按成交方式在下一根
+    开盘或当根收盘成交。两次调仓之间持有的数量不变，权重随价格漂移，调仓时的换手按漂移后的权重计算。
+    某个交易对在成交时没有真实K线(面板mask为False)时不交易，保持漂移后的权重，估值使用上一根收盘价。
+
+    每个调仓区间内的权益为 区间起点权益 × (Σ 权重 × 价格/成交价 + 现金比例)，区间之间的衔接用一次cumprod完成，
+    不逐根循环。
+
+    Args:
+        panel (Panel): 含open(下一根开盘成交时)和close字段的面板
+        weights (np.ndarray): 形状为(时间, 交易对)的目标权重，NaN视为0
+        rebalance_every (int): 每隔多少根K线调仓一次
+        initial_capital (float, optional): 初始资金，默认读取配置
+        fee_rate (float, optional): 手续费率，默认读取配置
+        slippage (float, optional): 滑点比例，默认读取配置
+        execution (str, optional): 成交方式 'next_open' 或 'close'，默认读取配置
+        timeframe (str, optional): K线周期，用于年化
+
+    Returns:
+        PortfolioResult: 组合回测结果
+    """
+    config = _backtest_config()
+    initial_capital = float(config['initial_capital'] if initial_capital is None else initial_capital)
+    fee_rate = float(config['fee_rate'] if fee_rate is None else fee_rate)
+    slippage = float(config['slippage'] if slippage is None else slippage)
+    execution = execution or config['execution']
+
+    close = panel['close']
+    length, width = close.shape
+    target = np.nan_to_num(np.asarray(weights, dtype=np.float64), nan=0.0)
+    if target.shape != close.shape:
+        raise ValueError(f"权重形状 {target.shape} 与面板 {close.shape} 不一致")
+
+    # 估值价格：缺失的K线按上一根收盘价估值
+    close_value = forward_fill(close)
+    decisions = rebalance_schedule(length, rebalance_every)
+    if execution == EXECUTION_NEXT_OPEN:
+        decisions = decisions[decisions < length - 1]
+        bars = decisions + 1
+        fill_price = panel['open'][bars]
+        fill_value = np.where(np.isnan(fill_price), close_value[decisions], fill_price)
+    elif execution == EXECUTION_CLOSE:
+        bars = decisions
+        fill_price = close[bars]
+        fill_value = close_value[bars]
+    else:
+        raise ValueError(f"不支持的成交方式: {execution}")
+
+    tradable = panel.mask[bars] & ~np.isnan(fill_price)
+    wanted = target[decisions]
+    held, trade, value, cost_factor = _rebalance(wanted, tradable, fill_value, fee_rate + slippage)
+
+    # 第k次调仓成交后的权益
+    growth = value * cost_factor
+    start_equity = initial_capital * np.cumprod(growth)
+    trade_equity = np.r_[initial_capital, start_equity[:-1]] * value if len(bars) else start_equity
+
+    # 每根K线所属的调仓区间，第一次调仓之前为-1，全部为现金
+    segment = np.searchsorted(bars, np.arange(length), side='right') - 1
+    in_segment = segment >= 0
+    segment = np.maximum(segment, 0)
+    if len(bars):
+        bar_weights = np.where(in_segment[:, None], held[segment], 0.0)
+        ratio = _price_ratio(bar_weights, close_value, fill_value[segment])
+        bar_value = (bar_weights * ratio).sum(axis=1) + 1.0 - bar_weights.sum(axis=1)
+        equity = np.where(in_segment, start_equity[segment] * bar_value, initial_capital)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bar_weights = bar_weights * ratio / bar_value[:, None]
+    else:
+        bar_weights = np.zeros((length, width))
+        equity = np.full(length, initial_capital)
+
+    returns = equity / np.r_[initial_capital, equity[:-1]] - 1.0 if length else equity
+    fills = _portfolio_fills(panel, bars, fill_price, trade, trade_equity, fee_rate, slippage)
+    return PortfolioResult(panel.timestamps, panel.symbols, bar_weights, returns, equity, fills,
+                           initial_capital, _periods_per_year(panel.timestamps, timeframe))
+
+
+def _price_ratio(weights, price, anchor):
+    """持仓交易对的价格相对成交价的比例，未持仓或没有价格的位置为1"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratio = price / anchor
+    return np.where((weights != 0) & ~np.isnan(ratio), ratio, 1.0)
+
+
+def _rebalance(wanted, tradable, fill_value, cost_rate):
+    """计算每次调仓的成交权重和调仓后的权重
+
+    可交易的交易对调到目标权重，与历史无关；不可交易的交易对持有数量不变，权重为上一次的权重乘以价格比例，
+    再除以本次的权益增长倍数和扣除成本后的权益比例。没有结转持仓的调仓直接取目标权重，成交和成本最后整体向量化计算。
+
+    限制：不可交易且仍有持仓的调仓逐行用Python循环结转。权益增长倍数依赖上一行的全部权重，换手成本中又有
+    绝对值，无法写成价格比例的累积乘积，因此交易对带着非0权重下架后，之后每次调仓都要在循环中计算一次，
+    解释器循环次数与这些调仓的次数成正比，每次的代价为 O(交易对)。
+
+    Returns:
+        tuple: (调仓后的权重, 成交的权重变化, 上一区间的权益增长倍数, 扣除换手成本后的权益比例)，
+            前两者形状为(调仓次数, 交易对)
+    """
+    segments, width = wanted.shape
+    held = np.where(tradable, wanted, 0.0)
+    # 上一区间的持仓从上一次成交价到本次成交价的价格比例
+    step = np.ones((segments, width))
+    if segments > 1:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            step[1:] = fill_value[1:] / fill_value[:-1]
+
+    # 不可交易时沿用最近一次可交易时的目标权重是否为0判断是否仍有持仓
+    last_wanted = np.nan_to_num(forward_fill(np.where(tradable, wanted, np.nan)), nan=0.0)
+    carried = ~tradable & (last_wanted != 0)
+    # 首次调仓之前没有持仓，carried[0]恒为False
+    for k in np.flatnonzero(carried.any(axis=1)):
+        previous = held[k - 1]
+        ratio = _price_ratio(previous, step[k], 1.0)
+        value = (previous * ratio).sum() + 1.0 - previous.sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            drifted = previous * ratio / value
+        trade = np.where(tradable[k], wanted[k] - drifted, 0.0)
+        trade[np.abs(trade) < 1e-12] = 0.0
+        cost_factor = 1.0 - np.abs(trade).sum() * cost_rate
+        held[k] = np.where(tradable[k], wanted[k], drifted / cost_factor)
+
+    previous = np.zeros((segments, width))
+    previous[1:] = held[:-1]
+    ratio = _price_ratio(previous, step, 1.0)
+    value = (previous * ratio).sum(axis=1) + 1.0 - previous.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        drifted = previous * ratio / value[:, None]
+    trade = np.where(tradable, wanted - drifted, 0.0)
+    # 浮点误差造成的极小权重变化不视为成交
+    trade[np.abs(trade) < 1e-12] = 0.0
+    cost_factor = 1.0 - np.abs(trade).sum(axis=1) * cost_rate
+    return held, trade, value, cost_factor
+
+
+def _portfolio_fills(panel, bars, fill_price, trade, trade_equity, fee_rate, slippage):
+    """由每次调仓的权重变化生成成交记录"""
+    rows, columns = np.nonzero(trade)
+    size = trade[rows, columns]
+    side = np.sign(size)
+    notional = np.abs(size) * trade_equity[rows]
+    price = fill_price[rows, columns] * (1.0 + side * slippage)
+    return pd.DataFrame({
+        'timestamp': panel.timestamps[bars[rows]],
+        'symbol': pd.Categorical.from_codes(columns, panel.symbols),
+        'price': price,
+        'size': size,
+        'units': side * notional / price,
+        'notional': notional,
+        'fee': notional * fee_rate,
+        'slippage': notional * slippage,
+    }, columns=PORTFOLIO_FILL_COLUMNS)
+
+
+def backtest_portfolio(symbols, timeframe, strategy, rebalance_every=1, start=None, end=None, exchange_id=None,
+                       data_dir=None, storage_format=None, layout=None, **kwargs):
+    """读取多个交易对已保存的K线对齐为面板，并回测组合策略
+
+    Args:
+        symbols (list): 交易对列表
+        timeframe (str): K线周期，如 '1h'
+        strategy (callable): 输入Panel，返回形状为(时间, 交易对)的目标权重
+        rebalance_every (int): 每隔多少根K线调仓一次
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        **kwargs: 传给run_portfolio_backtest的参数
+
+    Returns:
+        PortfolioResult: 组合回测结果
+    """
+    panel = load_panel(symbols, timeframe, start, end, fill=FILL_FORWARD, exchange_id=exchange_id,
+                       data_dir=data_dir, storage_format=storage_format, layout=layout)
+    result = run_portfolio_backtest(panel, strategy(panel), rebalance_every, timeframe=timeframe, **kwargs)
+    stats = result.stats()
+    logger.info(f"{len(panel.symbols)} 个交易对 {timeframe} 组合回测完成，共 {len(panel)} 根K线，"
+                f"总收益率 {stats['total_return']:.2%}，最大回撤 {stats['max_drawdown']:.2%}，成交 {stats['trades']} 笔")
+    return result
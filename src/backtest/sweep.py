@@ -0,0 +1,352 @@
+"""参数扫描模块，K线只加载一次并放入共享内存，由进程池并行回测多组参数，结果流式写入结果表并支持断点续跑"""
+
+import os
+import csv
+import json
+import random
+import itertools
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from src.backtest.vectorized import data_config, logger, run_backtest
+from src.data.store import load_ohlcv, symbol_to_filename
+from src.indicator.indicators import sma
+from src.manager import SystemManager
+
+# 共享内存中保存的列，按列连续存放
+SHARED_COLUMNS = (
+    ('timestamp', np.int64),
+    ('open', np.float64),
+    ('high', np.float64),
+    ('low', np.float64),
+    ('close', np.float64),
+    ('volume', np.float64),
+)
+
+# 结果表中参数的列名
+PARAMS_COLUMN = 'params'
+ERROR_COLUMN = 'error'
+
+# 工作进程中挂载的共享数据和评估函数
+_WORKER = {}
+
+
+class SharedOHLCV:
+    """
+    共享内存中的K线数据
+
+    各列依次连续存放在一块共享内存中，子进程按名称挂载后得到零拷贝的只读视图，不需要序列化传输数据。
+    """
+
+    def __init__(self, shm, length, owner):
+        self.shm = shm
+        self.length = length
+        self.owner = owner
+        self.columns = {}
+        offset = 0
+        for name, dtype in SHARED_COLUMNS:
+            column = np.ndarray(length, dtype=dtype, buffer=shm.buf, offset=offset)
+            if not owner:
+                column.flags.writeable = False
+            self.columns[name] = column
+            offset += length * np.dtype(dtype).itemsize
+
+    @classmethod
+    def create(cls, data):
+        """把K线数据复制到新建的共享内存
+
+        Args:
+            data (pd.DataFrame | dict | OHLCVMemmap): K线数据
+
+        Returns:
+            SharedOHLCV: 共享数据，使用完后需要调用unlink释放
+        """
+        length = len(data['timestamp'])
+        size = sum(length * np.dtype(dtype).itemsize for _, dtype in SHARED_COLUMNS)
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shared = cls(shm, length, owner=True)
+        for name, _ in SHARED_COLUMNS:
+            shared.columns[name][:] = np.asarray(data[name])
+        return shared
+
+    @classmethod
+    def attach(cls, descriptor):
+        """在子进程中按描述挂载共享内存
+
+        Args:
+            descriptor (tuple): (共享内存名称, K线数量)，由descriptor属性得到
+        """
+        name, length = descriptor
+        # 进程池的子进程与创建方共用同一个资源跟踪器，挂载时的重复登记不会导致提前释放
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, length, owner=False)
+
+    @property
+    def descriptor(self):
+        return self.shm.name, self.length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, column):
+        return self.columns[column]
+
+    def close(self):
+        self.columns = {}
+        self.shm.close()
+
+    def unlink(self):
+        """关闭并释放共享内存，只由创建方调用"""
+        self.close()
+        self.shm.unlink()
+
+
+def grid_params(space):
+    """网格参数
+
+    Args:
+        space (dict): {参数名: [取值, ...]}
+
+    Returns:
+        list: 所有组合，每组为 {参数名: 取值}
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_params(space, count, seed=None):
+    """随机参数
+
+    Args:
+        space (dict): {参数名: 取值列表或 (下限, 上限)}，取值列表时随机选择，区间的上下限都是整数时取整数
+        count (int): 参数组数量
+        seed (int, optional): 随机种子
+
+    Returns:
+        list: 参数组列表
+    """
+    rng = random.Random(seed)
+    param_sets = []
+    for _ in range(count):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                params[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) \
+                    else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(values)
+        param_sets.append(params)
+    return param_sets
+
+
+def params_key(params):
+    """参数组的唯一键，用于断点续跑时判断是否已完成"""
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def sma_crossover(data, params):
+    """双均线策略的评估函数，快线在慢线之上做多，否则空仓
+
+    Args:
+        data (SharedOHLCV | dict): K线数据
+        params (dict): {'fast': 快线周期, 'slow': 慢线周期}，其余参数传给run_backtest
+
+    Returns:
+        dict: 回测汇总指标
+    """
+    params = dict(params)
+    fast, slow = sma(data['close'], params.pop('fast')), sma(data['close'], params.pop('slow'))
+    positions = np.where(fast > slow, 1.0, 0.0)
+    return run_backtest(data, positions, **params).stats()
+
+
+def _init_worker(descriptor, evaluate):
+    _WORKER['data'] = SharedOHLCV.attach(descriptor)
+    _WORKER['evaluate'] = evaluate
+
+
+def _evaluate(params):
+    """在工作进程中评估一组参数，异常作为结果的一部分返回"""
+    try:
+        return params, _WORKER['evaluate'](_WORKER['data'], params), None
+    except Exception as e:
+        return params, {}, f"{type(e).__name__}: {e}"
+
+
+class ResultsTable:
+    """
+    参数扫描结果表
+
+    每完成一组参数就追加一行并立即写入文件，文件本身就是断点：重新运行时跳过表中已成功的参数组，
+    出错的参数组会重新评估。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.fieldnames = None
+        self.done = set()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'r', newline='', encoding='utf-8') as f:
+                reader = csv.DictReader(f)
+                self.fieldnames = reader.fieldnames
+                self.done = {row[PARAMS_COLUMN] for row in reader if not row.get(ERROR_COLUMN)}
+        self._file = None
+        self._writer = None
+        self._deferred = []
+
+    def _open(self, fieldnames):
+        new_file = self.fieldnames is None
+        if new_file:
+            self.fieldnames = fieldnames
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, 'a', newline='', encoding='utf-8')
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames, extrasaction='ignore')
+        if new_file:
+            self._writer.writeheader()
+
+    def append(self, params, metrics, error=None):
+        """写入一组参数的结果"""
+        row = {PARAMS_COLUMN: params_key(params), **params, **metrics, ERROR_COLUMN: error or ''}
+        if self._writer is None:
+            if error and self.fieldnames is None:
+                # 出错的结果没有指标列，等第一组成功的结果确定表头后再写入
+                self._deferred.append(row)
+                return
+            self._open(list(row))
+
+        for deferred in self._deferred + [row]:
+            self._writer.writerow(deferred)
+        self._deferred = []
+        self._file.flush()
+        if not error:
+            self.done.add(row[PARAMS_COLUMN])
+
+    def close(self):
+        if self._deferred:
+            self._open(list(self._deferred[0]))
+            self._writer.writerows(self._deferred)
+            self._deferred = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._writer = None
+
+    def load(self):
+        """读取结果表，重新评估过的参数组只保留最后一次结果"""
+        if not os.path.exists(self.path):
+            return pd.DataFrame()
+        results = pd.read_csv(self.path)
+        return results.drop_duplicates(PARAMS_COLUMN, keep='last').reset_index(drop=True)
+
+
+def default_results_path(symbol, timeframe, name):
+    """默认的结果表路径 OUTPUT_PATH/sweeps/{symbol}_{timeframe}_{name}.csv"""
+    filename = f"{symbol_to_filename(symbol)}_{timeframe}_{name}.csv"
+    return os.path.join(str(SystemManager().OUTPUT_PATH), 'sweeps', filename)
+
+
+class SweepRunner:
+    """
+    参数扫描执行器
+
+    数据只放入共享内存一次，进程池的每个工作进程启动时挂载一次，之后只传递参数和汇总指标。
+    同时提交的任务数不超过工作进程数的两倍，结果按完成顺序写入结果表。
+    """
+
+    def __init__(self, evaluate, results_path, max_workers=None):
+        """初始化参数扫描执行器
+
+        Args:
+            evaluate (callable): 评估函数 evaluate(data, params) -> dict，必须是模块级函数以便传给子进程
+            results_path (str): 结果表路径
+            max_workers (int, optional): 进程数，默认读取配置，未配置时为CPU核数
+        """
+        sweep_config = data_config.get('sweep', {})
+        self.evaluate = evaluate
+        self.results_path = results_path
+        self.max_workers = max_workers or sweep_config.get('max_workers') or os.cpu_count() or 1
+
+    def run(self, data, param_sets, progress_callback=None):
+        """并行评估所有参数组
+
+        Args:
+            data (pd.DataFrame | dict | OHLCVMemmap): K线数据
+            param_sets (list): 参数组列表
+            progress_callback (callable, optional): 每完成一组参数调用，参数为 (已完成数, 总数)
+
+        Returns:
+            pd.DataFrame: 结果表，包括之前运行中已完成的参数组
+        """
+        table = ResultsTable(self.results_path)
+        pending = [params for params in param_sets if params_key(params) not in table.done]
+        total = len(param_sets)
+        completed = total - len(pending)
+        if completed:
+            logger.info(f"从断点继续，已完成 {completed}/{total} 组参数")
+        if not pending:
+            return table.load()
+
+        shared = SharedOHLCV.create(data)
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(shared.descriptor, self.evaluate)) as executor:
+                queue = iter(pending)
+                in_flight = set()
+                while True:
+                    for params in itertools.islice(queue, self.max_workers * 2 - len(in_flight)):
+                        in_flight.add(executor.submit(_evaluate, params))
+                    if not in_flight:
+                        break
+
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        params, metrics, error = future.result()
+                        if error:
+                            logger.warning(f"参数 {params} 评估失败: {error}")
+                        table.append(params, metrics, error)
+                        completed += 1
+                        if progress_callback is not None:
+                            progress_callback(completed, total)
+        finally:
+            table.close()
+            shared.unlink()
+
+        logger.info(f"参数扫描完成，共 {total} 组参数，结果保存到 {self.results_path}")
+        return table.load()
+
+
+def run_sweep(symbol, timeframe, param_sets, evaluate=sma_crossover, name='sweep', results_path=None,
+              max_workers=None, start=None, end=None, exchange_id=None, data_dir=None, storage_format=None,
+              layout=None, progress_callback=None):
+    """读取一次已保存的K线，在进程池中扫描参数
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h'
+        param_sets (list): 参数组列表，可由grid_params或random_params生成
+        evaluate (callable): 评估函数 evaluate(data, params) -> dict，默认为双均线策略
+        name (str): 扫描名称，用于默认的结果表文件名
+        results_path (str, optional): 结果表路径，默认为 OUTPUT_PATH/sweeps/{symbol}_{timeframe}_{name}.csv
+        max_workers (int, optional): 进程数
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        progress_callback (callable, optional): 每完成一组参数调用，参数为 (已完成数, 总数)
+
+    Returns:
+        pd.DataFrame: 结果表
+    """
+    if results_path is None:
+        results_path = default_results_path(symbol, timeframe, name)
+
+    data = load_ohlcv(symbol, timeframe, start, end, exchange_id, data_dir=data_dir,
+                      storage_format=storage_format, layout=layout)
+    logger.info(f"{symbol} {timeframe} 共 {len(data)} 条K线，扫描 {len(param_sets)} 组参数")
+    return SweepRunner(evaluate, results_path, max_workers).run(data, param_sets, progress_callback)
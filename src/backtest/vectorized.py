@@ -0,0 +1,252 @@
+"""向量化回测模块，在K线列数组上用NumPy一次计算成交、手续费、滑点、收益、权益曲线和回撤"""
+
+import numpy as np
+import pandas as pd
+
+from src.log import get_logger
+from src.manager import SystemManager, ConfigManager
+from src.data.store import load_ohlcv
+from src.data.funding import load_funding_rates
+from src.data.time_utils import timeframe_to_ms, TIMEFRAME_UNIT_MS
+
+# 读取数据配置
+data_config = ConfigManager(SystemManager()).read_config('data_config.json')
+
+# 获取配置好的logger
+logger = get_logger()
+
+# 成交方式：收盘时按收盘价成交，或在下一根K线开盘时按开盘价成交
+EXECUTION_CLOSE = 'close'
+EXECUTION_NEXT_OPEN = 'next_open'
+
+# 默认回测参数
+DEFAULT_BACKTEST = {
+    'initial_capital': 10000.0,
+    'fee_rate': 0.0005,
+    'slippage': 0.0002,
+    'execution': EXECUTION_NEXT_OPEN,
+}
+
+FILL_COLUMNS = ['timestamp', 'price', 'size', 'units', 'notional', 'fee', 'slippage']
+
+
+def _backtest_config():
+    config = dict(DEFAULT_BACKTEST)
+    config.update(data_config.get('backtest', {}))
+    return config
+
+
+def _periods_per_year(timestamps, timeframe=None):
+    """每年的K线数量，未指定周期时按时间戳间隔的中位数推断"""
+    if timeframe is not None:
+        period_ms = timeframe_to_ms(timeframe)
+    elif len(timestamps) > 1:
+        period_ms = float(np.median(np.diff(timestamps)))
+    else:
+        return np.nan
+    return TIMEFRAME_UNIT_MS['y'] / period_ms
+
+
+class BacktestResult:
+    """
+    回测结果
+
+    各数组与输入的K线逐根对应：positions为该K线收盘时持有的仓位，returns为该K线的净收益率，
+    equity为收盘时的权益，drawdown为相对历史最高权益的回撤，funding为该K线支付的资金费(收取时为负)。
+    """
+
+    def __init__(self, timestamps, positions, returns, equity, fills, initial_capital, periods_per_year,
+                 funding=None):
+        self.timestamps = timestamps
+        self.positions = positions
+        self.returns = returns
+        self.equity = equity
+        self.fills = fills
+        self.initial_capital = initial_capital
+        self.periods_per_year = periods_per_year
+        self.funding = funding
+
+    @property
+    def pnl(self):
+        """每根K线的盈亏金额"""
+        return np.diff(self.equity, prepend=self.initial_capital)
+
+    @property
+    def drawdown(self):
+        """每根K线相对历史最高权益的回撤，取值不大于0"""
+        peak = np.maximum.accumulate(np.maximum(self.equity, self.initial_capital))
+        return self.equity / peak - 1.0
+
+    def stats(self):
+        """汇总指标
+
+        Returns:
+            dict: 总收益率、年化收益率、年化波动率、夏普比率、最大回撤、成交次数、手续费、滑点和资金费合计
+        """
+        final = self.equity[-1] if len(self.equity) else self.initial_capital
+        total_return = final / self.initial_capital - 1.0
+        years = len(self.returns) / self.periods_per_year if len(self.returns) else np.nan
+        std = self.returns.std(ddof=1) if len(self.returns) > 1 else np.nan
+        annual_volatility = std * np.sqrt(self.periods_per_year)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = self.returns.mean() / std * np.sqrt(self.periods_per_year) if std else np.nan
+            annual_return = (final / self.initial_capital) ** (1.0 / years) - 1.0 if final > 0 else -1.0
+
+        return {
+            'final_equity': float(final),
+            'total_return': float(total_return),
+            'annual_return': float(annual_return),
+            'annual_volatility': float(annual_volatility),
+            'sharpe': float(sharpe),
+            'max_drawdown': float(self.drawdown.min()) if len(self.equity) else 0.0,
+            'trades': int(len(self.fills)),
+            'fees': float(self.fills['fee'].sum()),
+            'slippage': float(self.fills['slippage'].sum()),
+            'funding': float(self.funding.sum()) if self.funding is not None else 0.0,
+        }
+
+    def to_frame(self):
+        """逐根K线的回测结果"""
+        return pd.DataFrame({
+            'timestamp': self.timestamps,
+            'position': self.positions,
+            'return': self.returns,
+            'pnl': self.pnl,
+            'equity': self.equity,
+            'drawdown': self.drawdown,
+        })
+
+
+def run_backtest(data, positions, initial_capital=None, fee_rate=None, slippage=None, execution=None,
+                 timeframe=None, funding_rates=None):
+    """对目标仓位序列做向量化回测
+
+    positions[t] 是第t根K线收盘时根据已知信息决定的目标仓位，以权益的倍数表示(1为全仓做多，
+    -1为全仓做空，0为空仓，NaN视为0)。仓位在持有期间保持为权益的固定比例。
+    成交方式为 'next_open' 时在下一根K线开盘按开盘价成交，为 'close' 时在当根K线收盘按收盘价成交；
+    买入成交价上浮、卖出成交价下浮slippage，手续费按成交金额的fee_rate收取。
+    指定funding_rates时，在K线收盘时按持有的仓位结算资金费：多头在费率为正时支付，空头收取。
+
+    Args:
+        data (pd.DataFrame | dict | OHLCVMemmap): 含 timestamp/open/close 列的K线数据
+        positions (np.ndarray): 目标仓位，与K线等长
+        initial_capital (float, optional): 初始资金，默认读取配置
+        fee_rate (float, optional): 手续费率，默认读取配置
+        slippage (float, optional): 滑点比例，默认读取配置
+        execution (str, optional): 成交方式 'next_open' 或 'close'，默认读取配置
+        timeframe (str, optional): K线周期，用于年化，默认按时间戳间隔推断
+        funding_rates (np.ndarray, optional): 与K线等长的每根K线内结算的资金费率之和，
+            由 funding_per_bar 或 load_funding_rates 对齐得到
+
+    Returns:
+        BacktestResult: 回测结果
+    """
+    config = _backtest_config()
+    initial_capital = float(config['initial_capital'] if initial_capital is None else initial_capital)
+    fee_rate = float(config['fee_rate'] if fee_rate is None else fee_rate)
+    slippage = float(config['slippage'] if slippage is None else slippage)
+    execution = execution or config['execution']
+
+    timestamps = np.asarray(data['timestamp'], dtype=np.int64)
+    close = np.asarray(data['close'], dtype=np.float64)
+    target = np.nan_to_num(np.asarray(positions, dtype=np.float64), nan=0.0)
+    if len(target) != len(close):
+        raise ValueError(f"仓位长度 {len(target)} 与K线数量 {len(close)} 不一致")
+    if funding_rates is not None:
+        funding_rates = np.nan_to_num(np.asarray(funding_rates, dtype=np.float64), nan=0.0)
+        if len(funding_rates) != len(close):
+            raise ValueError(f"资金费率长度 {len(funding_rates)} 与K线数量 {len(close)} 不一致")
+
+    n = len(close)
+    prev_close = np.empty(n)
+    if n:
+        prev_close[0] = close[0]
+        prev_close[1:] = close[:-1]
+
+    if execution == EXECUTION_NEXT_OPEN:
+        # 第t根K线开盘时成交第t-1根收盘决定的仓位：跳空部分由旧仓位承担，开盘到收盘由新仓位承担
+        open_ = np.asarray(data['open'], dtype=np.float64)
+        held = np.r_[0.0, target[:-1]] if n else target
+        before = np.r_[0.0, held[:-1]] if n else held
+        gap_factor = 1.0 + before * (open_ / prev_close - 1.0)
+        bar_factor = 1.0 + held * (close / open_ - 1.0)
+        fill_price = open_
+        # 收盘结算资金费时持有新仓位
+        exposure = held
+    elif execution == EXECUTION_CLOSE:
+        # 第t根K线收盘时按收盘价成交，新仓位从下一根K线开始承担涨跌
+        held = target
+        before = np.r_[0.0, held[:-1]] if n else held
+        gap_factor = 1.0 + before * (close / prev_close - 1.0)
+        bar_factor = np.ones(n)
+        fill_price = close
+        # 收盘成交之前结算资金费，持有的是旧仓位
+        exposure = before
+    else:
+        raise ValueError(f"不支持的成交方式: {execution}")
+
+    trade = held - before
+    cost_factor = 1.0 - np.abs(trade) * (fee_rate + slippage)
+    growth = gap_factor * cost_factor * bar_factor
+    funding = None
+    if funding_rates is not None:
+        funding_factor = 1.0 - exposure * funding_rates
+        equity = initial_capital * np.cumprod(growth * funding_factor)
+        # 资金费按结算前的权益和仓位计算
+        funding = np.r_[initial_capital, equity[:-1]] * growth * exposure * funding_rates if n else np.zeros(0)
+        growth = growth * funding_factor
+    else:
+        equity = initial_capital * np.cumprod(growth)
+
+    # 成交前的权益，用于把仓位变化换算为成交数量和金额
+    equity_before = np.r_[initial_capital, equity[:-1]] * gap_factor if n else equity
+    fills_index = np.flatnonzero(trade)
+    side = np.sign(trade[fills_index])
+    notional = np.abs(trade[fills_index]) * equity_before[fills_index]
+    price = fill_price[fills_index] * (1.0 + side * slippage)
+    fills = pd.DataFrame({
+        'timestamp': timestamps[fills_index],
+        'price': price,
+        'size': trade[fills_index],
+        'units': side * notional / price,
+        'notional': notional,
+        'fee': notional * fee_rate,
+        'slippage': notional * slippage,
+    }, columns=FILL_COLUMNS)
+
+    returns = growth - 1.0
+    return BacktestResult(timestamps, held, returns, equity, fills, initial_capital,
+                          _periods_per_year(timestamps, timeframe), funding)
+
+
+def backtest_store(symbol, timeframe, strategy, start=None, end=None, exchange_id=None, data_dir=None,
+                   storage_format=None, layout=None, funding=False, **kwargs):
+    """读取已保存的K线数据并回测策略
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h'
+        strategy (callable): 输入K线DataFrame，返回目标仓位数组
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        funding (bool): 是否读取已保存的资金费率并在回测中结算
+        **kwargs: 传给run_backtest的参数
+
+    Returns:
+        BacktestResult: 回测结果
+    """
+    data = load_ohlcv(symbol, timeframe, start, end, exchange_id, data_dir=data_dir,
+                      storage_format=storage_format, layout=layout)
+    if funding:
+        kwargs['funding_rates'] = load_funding_rates(data, symbol, timeframe, exchange_id, data_dir,
+                                                     storage_format, layout)
+    result = run_backtest(data, strategy(data), timeframe=timeframe, **kwargs)
+    stats = result.stats()
+    logger.info(f"{symbol} {timeframe} 回测完成，共 {len(data)} 条K线，总收益率 {stats['total_return']:.2%}，"
+                f"最大回撤 {stats['max_drawdown']:.2%}，成交 {stats['trades']} 次")
+    return result
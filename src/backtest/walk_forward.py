@@ -0,0 +1,289 @@
+"""滚动窗口优化模块，在训练窗口上选择参数、在随后的测试窗口上做样本外检验，窗口并行执行，特征和回测结果按内容寻址缓存"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from src.backtest.vectorized import data_config, logger, run_backtest, BacktestResult, _periods_per_year
+from src.backtest.cache import code_version, cache_key, get_result_cache
+from src.data.hashing import hash_data
+from src.backtest.sweep import SharedOHLCV, SHARED_COLUMNS, params_key
+from src.data.store import load_ohlcv
+from src.data.time_utils import timeframe_to_ms
+from src.indicator.indicators import sma
+
+# 工作进程中挂载的共享数据和流水线
+_WORKER = {}
+
+
+def _to_bars(size, period_ms, name):
+    """窗口长度换算为K线数量，字符串按K线间隔换算，如 '90d'"""
+    if isinstance(size, str):
+        size = int(round(timeframe_to_ms(size) / period_ms))
+    if size is None or size < 1:
+        raise ValueError(f"{name}窗口长度必须是正数: {size}")
+    return int(size)
+
+
+def walk_forward_windows(timestamps, train, test, step=None, anchored=False):
+    """滚动窗口划分
+
+    Args:
+        timestamps (np.ndarray): 升序的毫秒时间戳
+        train (int | str): 训练窗口长度，K线数量或时长如 '180d'
+        test (int | str): 测试窗口长度
+        step (int | str, optional): 窗口每次前进的长度，默认等于测试窗口长度
+        anchored (bool): 为True时训练窗口起点固定在数据开头，逐步扩大
+
+    Returns:
+        list: 每个窗口为 (训练起点, 训练终点, 测试起点, 测试终点) 的K线序号，左闭右开，测试起点等于训练终点；
+            只包含测试窗口完整的窗口
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    period_ms = float(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 1.0
+    train = _to_bars(train, period_ms, '训练')
+    test = _to_bars(test, period_ms, '测试')
+    step = _to_bars(step if step is not None else test, period_ms, '步进')
+
+    windows = []
+    start = 0
+    while start + train + test <= len(timestamps):
+        train_start = 0 if anchored else start
+        windows.append((train_start, start + train, start + train, start + train + test))
+        start += step
+    return windows
+
+
+def sma_features(data, params):
+    """双均线特征"""
+    return {'fast': sma(data['close'], params['fast']), 'slow': sma(data['close'], params['slow'])}
+
+
+def crossover_signal(data, features, params):
+    """快线在慢线之上做多，否则空仓"""
+    return np.where(features['fast'] > features['slow'], 1.0, 0.0)
+
+
+def _slice(data, start, end):
+    return {name: data[name][start:end] for name, _ in SHARED_COLUMNS}
+
+
+class WalkForward:
+    """
+    滚动窗口优化流水线
+
+    特征由 features(data, params) 计算，只依赖 feature_params 中列出的参数；仓位由 signal(data, features, params)
+    计算，再交给run_backtest。特征按 (数据哈希, 特征参数, 特征代码版本) 缓存，回测结果按
+    (数据哈希, 全部参数, 回测参数, 代码版本) 缓存，只修改信号参数时复用特征，重新运行时只计算发生变化的部分。
+    features和signal需要是模块级函数，以便传给子进程。
+    """
+
+    def __init__(self, signal=crossover_signal, features=sma_features, feature_params=('fast', 'slow'),
+                 objective='sharpe', cache=None, backtest_kwargs=None):
+        """初始化流水线
+
+        Args:
+            signal (callable): signal(data, features, params) -> 目标仓位数组
+            features (callable, optional): features(data, params) -> 特征，为None时不计算特征
+            feature_params (tuple): 特征依赖的参数名
+            objective (str): 训练窗口上用于选择参数的汇总指标，越大越好
+            cache (ResultCache, optional): 结果缓存，默认按配置获取
+            backtest_kwargs (dict, optional): 传给run_backtest的参数
+        """
+        self.signal = signal
+        self.features = features
+        self.feature_params = tuple(feature_params)
+        self.objective = objective
+        self.cache = cache if cache is not None else get_result_cache()
+        self.backtest_kwargs = dict(backtest_kwargs or {})
+        self.feature_version = code_version(features) if features is not None else None
+        self.version = code_version(*(f for f in (features, signal, run_backtest) if f is not None))
+
+    def compute_features(self, data, params, data_hash):
+        """计算或读取缓存的特征"""
+        if self.features is None:
+            return None
+        feature_params = {name: params[name] for name in self.feature_params if name in params}
+        key = cache_key('features', data_hash, feature_params, self.feature_version)
+        return self.cache.memoize(key, lambda: self.features(data, params))
+
+    def evaluate(self, data, params, data_hash, score_from=0, detail=False):
+        """在一段数据上回测一组参数
+
+        Args:
+            data (dict): K线数据
+            params (dict): 参数
+            data_hash (str): data的内容哈希
+            score_from (int): 从该序号开始计入回测，之前的K线只用于特征预热
+            detail (bool): 为True时返回逐根结果，否则只返回汇总指标
+
+        Returns:
+            dict | BacktestResult: 汇总指标或回测结果
+        """
+        kind = 'backtest_detail' if detail else 'backtest_stats'
+        key = cache_key(kind, data_hash, score_from, params, self.backtest_kwargs, self.version)
+
+        def compute():
+            features = self.compute_features(data, params, data_hash)
+            positions = np.asarray(self.signal(data, features, params), dtype=np.float64)
+            result = run_backtest(_slice(data, score_from, None), positions[score_from:], **self.backtest_kwargs)
+            return result if detail else result.stats()
+
+        return self.cache.memoize(key, compute)
+
+    def run_window(self, data, window, param_sets):
+        """在一个窗口上选择参数并做样本外检验
+
+        Returns:
+            tuple: (窗口汇总, 测试窗口的回测结果, 缓存命中次数, 未命中次数)
+        """
+        hits, misses = self.cache.hits, self.cache.misses
+        train_start, train_end, test_start, test_end = window
+        train = _slice(data, train_start, train_end)
+        train_hash = hash_data(train)
+
+        best_params, best_score = None, -np.inf
+        for params in param_sets:
+            score = self.evaluate(train, params, train_hash).get(self.objective, np.nan)
+            if best_params is None or (not np.isnan(score) and score > best_score):
+                best_params, best_score = params, score
+
+        # 测试窗口以训练数据作为特征预热，只统计测试部分
+        full = _slice(data, train_start, test_end)
+        result = self.evaluate(full, best_params, hash_data(full), test_start - train_start, detail=True)
+
+        timestamps = data['timestamp']
+        row = {
+            'train_start': int(timestamps[train_start]),
+            'train_end': int(timestamps[train_end - 1]),
+            'test_start': int(timestamps[test_start]),
+            'test_end': int(timestamps[test_end - 1]),
+            'params': params_key(best_params),
+            f"train_{self.objective}": float(best_score),
+        }
+        row.update({f"test_{name}": value for name, value in result.stats().items()})
+        return row, result, self.cache.hits - hits, self.cache.misses - misses
+
+
+def _init_worker(descriptor, pipeline):
+    _WORKER['data'] = SharedOHLCV.attach(descriptor)
+    _WORKER['pipeline'] = pipeline
+
+
+def _run_window(window, param_sets):
+    return _WORKER['pipeline'].run_window(_WORKER['data'], window, param_sets)
+
+
+class WalkForwardResult:
+    """
+    滚动窗口优化结果
+
+    windows为每个窗口选出的参数、训练目标值和测试窗口的汇总指标，oos为各测试窗口首尾相接的样本外回测结果。
+    """
+
+    def __init__(self, windows, oos, cache_hits, cache_misses):
+        self.windows = windows
+        self.oos = oos
+        self.cache_hits = cache_hits
+        self.cache_misses = cache_misses
+
+    def stats(self):
+        """样本外汇总指标"""
+        return self.oos.stats()
+
+
+def _stitch(results, initial_capital, timeframe):
+    """把各测试窗口的回测结果按收益率首尾相接"""
+    timestamps = np.concatenate([r.timestamps for r in results])
+    returns = np.concatenate([r.returns for r in results])
+    positions = np.concatenate([r.positions for r in results])
+    fills = pd.concat([r.fills for r in results], ignore_index=True)
+    # 每个窗口的成交金额按该窗口起点的样本外权益折算
+    equity = initial_capital * np.cumprod(1.0 + returns)
+    scale = np.repeat(np.r_[initial_capital, equity[np.cumsum([len(r.returns) for r in results])[:-1] - 1]]
+                      / np.array([r.initial_capital for r in results]), [len(r.fills) for r in results])
+    for column in ('units', 'notional', 'fee', 'slippage'):
+        fills[column] = fills[column].to_numpy() * scale
+    return BacktestResult(timestamps, positions, returns, equity, fills, initial_capital,
+                          _periods_per_year(timestamps, timeframe))
+
+
+def run_walk_forward(data, param_sets, train, test, step=None, anchored=False, pipeline=None, max_workers=None,
+                     timeframe=None):
+    """对K线数据做滚动窗口优化
+
+    Args:
+        data (pd.DataFrame | dict | OHLCVMemmap): K线数据
+        param_sets (list): 候选参数组
+        train (int | str): 训练窗口长度，K线数量或时长如 '180d'
+        test (int | str): 测试窗口长度
+        step (int | str, optional): 窗口前进长度，默认等于测试窗口长度
+        anchored (bool): 训练窗口起点是否固定在数据开头
+        pipeline (WalkForward, optional): 流水线，默认为双均线策略
+        max_workers (int, optional): 进程数，默认读取配置，未配置时为CPU核数；为1时在当前进程中执行
+        timeframe (str, optional): K线周期，用于年化
+
+    Returns:
+        WalkForwardResult: 滚动窗口优化结果
+    """
+    pipeline = pipeline or WalkForward()
+    windows = walk_forward_windows(np.asarray(data['timestamp']), train, test, step, anchored)
+    if not windows:
+        raise ValueError(f"数据只有 {len(data['timestamp'])} 根K线，不足一个训练窗口加测试窗口")
+    max_workers = max_workers or data_config.get('walk_forward', {}).get('max_workers') or os.cpu_count() or 1
+
+    if max_workers == 1 or len(windows) == 1:
+        columns = {name: np.asarray(data[name]) for name, _ in SHARED_COLUMNS}
+        outputs = [pipeline.run_window(columns, window, param_sets) for window in windows]
+    else:
+        shared = SharedOHLCV.create(data)
+        try:
+            with ProcessPoolExecutor(max_workers=min(max_workers, len(windows)), initializer=_init_worker,
+                                     initargs=(shared.descriptor, pipeline)) as executor:
+                futures = [executor.submit(_run_window, window, param_sets) for window in windows]
+                outputs = [future.result() for future in futures]
+        finally:
+            shared.unlink()
+
+    rows, results, hits, misses = zip(*outputs)
+    table = pd.DataFrame(list(rows))
+    table.insert(0, 'window', np.arange(len(table)))
+    initial_capital = results[0].initial_capital
+    result = WalkForwardResult(table, _stitch(results, initial_capital, timeframe), sum(hits), sum(misses))
+    logger.info(f"滚动窗口优化完成，共 {len(windows)} 个窗口、{len(param_sets)} 组参数，"
+                f"缓存命中 {result.cache_hits} 次、计算 {result.cache_misses} 次，"
+                f"样本外总收益率 {result.stats()['total_return']:.2%}")
+    return result
+
+
+def walk_forward_store(symbol, timeframe, param_sets, train, test, step=None, anchored=False, pipeline=None,
+                       max_workers=None, start=None, end=None, exchange_id=None, data_dir=None, storage_format=None,
+                       layout=None):
+    """读取已保存的K线做滚动窗口优化
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h'
+        param_sets (list): 候选参数组
+        train (int | str): 训练窗口长度
+        test (int | str): 测试窗口长度
+        step (int | str, optional): 窗口前进长度
+        anchored (bool): 训练窗口起点是否固定在数据开头
+        pipeline (WalkForward, optional): 流水线
+        max_workers (int, optional): 进程数
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+
+    Returns:
+        WalkForwardResult: 滚动窗口优化结果
+    """
+    data = load_ohlcv(symbol, timeframe, start, end, exchange_id, data_dir=data_dir,
+                      storage_format=storage_format, layout=layout)
+    logger.info(f"{symbol} {timeframe} 共 {len(data)} 条K线，开始滚动窗口优化")
+    return run_walk_forward(data, param_sets, train, test, step, anchored, pipeline, max_workers, timeframe)
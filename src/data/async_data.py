@@ -0,0 +1,306 @@
+"""异步数据获取模块，使用ccxt.async_support在一个事件循环中并发获取多个交易对的K线数据"""
+
+import asyncio
+
+import ccxt.async_support as ccxt_async
+
+from src.data.get_data import data_config, logger, _resolve_time_range, dedup_sort_filter
+from src.data.cache import get_ohlcv_cache
+from src.data.exchange_pool import build_exchange_config
+from src.data.rate_limiter import (
+    RetryPolicy, endpoint_weight, get_rate_limiter, is_retryable, retry_after_seconds, RATE_LIMIT_ERRORS
+)
+from src.data.scheduler import load_jobs_from_config, JOB_RUNNING, JOB_DONE, JOB_FAILED
+from src.data.store import open_store, PartitionedStore
+from src.data.symbols import get_symbol_index
+from src.data.time_utils import timeframe_to_ms, to_timestamp_ms
+
+
+def get_async_exchange(exchange_id='okx', config=None):
+    """获取异步交易所实例
+
+    实例内部的aiohttp会话在多次请求之间复用长连接，用完后需要调用 await exchange.close()。
+
+    Args:
+        exchange_id (str): 交易所ID，默认为'okx'
+        config (dict, optional): 额外的配置参数
+
+    Returns:
+        ccxt.async_support.Exchange: 异步交易所API实例
+    """
+    exchange_config = build_exchange_config(config)
+
+    # 异步客户端不使用requests风格的proxies，转换为ccxt统一的代理参数
+    proxies = exchange_config.pop('proxies', None)
+    if proxies and 'httpsProxy' not in exchange_config:
+        exchange_config['httpsProxy'] = proxies.get('https') or proxies.get('http')
+
+    try:
+        logger.info(f"初始化异步交易所API: {exchange_id}")
+        exchange_class = getattr(ccxt_async, exchange_id)
+        return exchange_class(exchange_config)
+    except Exception as e:
+        logger.error(f"初始化异步交易所API失败: {str(e)}")
+        raise
+
+
+async def fetch_ohlcv_async(exchange, symbol, timeframe='1h', since=None, limit=1000, rate_limiter=None,
+                            cache=None):
+    """异步获取K线数据
+
+    Args:
+        exchange (ccxt.async_support.Exchange): 异步交易所API实例
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        since (int, optional): 起始时间戳(毫秒)
+        limit (int): 单次请求的K线数量
+        rate_limiter (RateLimiter, optional): 频率限制器，只在实际请求交易所时占用请求许可
+        cache (OHLCVCache, optional): 请求缓存，默认按配置使用全局缓存
+
+    Returns:
+        list: K线数据列表
+    """
+    if cache is None:
+        cache = get_ohlcv_cache()
+
+    if cache is not None and since is not None:
+        ohlcv = cache.get(exchange.id, symbol, timeframe, since, limit)
+        if ohlcv is not None:
+            return ohlcv
+
+    if rate_limiter is not None:
+        await rate_limiter.acquire_async(endpoint_weight('fetch_ohlcv'))
+
+    ohlcv = await exchange.fetch_ohlcv(symbol, timeframe, since, limit)
+
+    if cache is not None and since is not None:
+        cache.put(exchange.id, symbol, timeframe, since, limit, ohlcv)
+    return ohlcv
+
+
+async def _fetch_page_async(exchange, symbol, timeframe, since, limit, rate_limiter, retry_policy):
+    """异步获取一页K线数据，可重试的错误按退避策略重试"""
+    attempt = 0
+    while True:
+        try:
+            return await fetch_ohlcv_async(exchange, symbol, timeframe, since, limit, rate_limiter)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= retry_policy.max_retries:
+                raise
+
+            delay = retry_policy.delay(attempt, retry_after_seconds(exchange, e))
+            if isinstance(e, RATE_LIMIT_ERRORS) and rate_limiter is not None:
+                rate_limiter.penalize(delay)
+            attempt += 1
+            logger.warning(f"获取 {symbol} {timeframe} 出错: {str(e)}，{delay:.1f} 秒后第 {attempt} 次重试")
+            await asyncio.sleep(delay)
+
+
+async def fetch_full_history_async(exchange, symbol, timeframe='1h', start_date=None, end_date=None,
+                                   rate_limiter=None, retry_policy=None, limit=1000, as_frame=False):
+    """异步获取完整的历史K线数据
+
+    Args:
+        exchange (ccxt.async_support.Exchange): 异步交易所API实例
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        start_date (str | int): 起始日期，格式 'YYYY-MM-DD'，也可以是毫秒时间戳
+        end_date (str | int): 结束日期，默认为当前日期
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+        limit (int): 单次请求的K线数量
+        as_frame (bool): 是否返回DataFrame
+
+    Returns:
+        list | pd.DataFrame: 完整的K线数据
+    """
+    start_timestamp, end_timestamp = _resolve_time_range(start_date, end_date)
+
+    if timeframe not in exchange.timeframes:
+        raise ValueError(f"不支持的K线周期: {timeframe}")
+
+    if retry_policy is None:
+        retry_policy = RetryPolicy()
+
+    all_ohlcv = []
+    since = start_timestamp
+    while since < end_timestamp:
+        ohlcv = await _fetch_page_async(exchange, symbol, timeframe, since, limit, rate_limiter, retry_policy)
+        if not ohlcv:
+            break
+        all_ohlcv.extend(ohlcv)
+        since = ohlcv[-1][0] + 1
+
+    return dedup_sort_filter(all_ohlcv, end_timestamp=end_timestamp, as_frame=as_frame)
+
+
+async def fetch_and_save_async(exchange, symbol, timeframe, start_date=None, end_date=None, data_dir=None,
+                               storage_format=None, layout=None, incremental=None, overlap=None,
+                               rate_limiter=None, retry_policy=None):
+    """异步获取K线数据并写入与同步路径相同的数据仓库
+
+    文件读写在线程池中执行，不阻塞事件循环。
+
+    Returns:
+        tuple: (数据路径, 获取的K线条数)
+    """
+    if incremental is None:
+        incremental = data_config.get('incremental', False)
+    if overlap is None:
+        overlap = data_config.get('incremental_overlap', 1)
+
+    store = await asyncio.to_thread(open_store, symbol, timeframe, exchange.id, data_dir, storage_format, layout)
+
+    since = None
+    if incremental:
+        last_timestamp = await asyncio.to_thread(store.last_timestamp)
+        if last_timestamp is not None:
+            since = last_timestamp - (max(overlap, 1) - 1) * timeframe_to_ms(timeframe)
+            if end_date and to_timestamp_ms(end_date) <= since:
+                return store.path, 0
+            start_date = since
+
+    data = await fetch_full_history_async(exchange, symbol, timeframe, start_date, end_date,
+                                          rate_limiter, retry_policy, as_frame=True)
+    if data.empty:
+        return store.path, 0
+
+    if since is not None:
+        path = await asyncio.to_thread(store.append, data, since)
+    elif isinstance(store, PartitionedStore):
+        path = await asyncio.to_thread(store.write, data)
+    else:
+        # 单文件布局与同步路径一样覆盖整个文件
+        def overwrite():
+            with store.writer() as writer:
+                writer.write(data)
+            return store.path
+        path = await asyncio.to_thread(overwrite)
+
+    return path, len(data)
+
+
+class AsyncIngestor:
+    """
+    异步批量下载器
+
+    在一个事件循环中运行所有任务，每个交易所只创建一个异步客户端并复用其长连接，
+    同一交易所的任务共享一个频率限制器，同时进行的任务数不超过max_concurrency。
+    """
+
+    def __init__(self, max_concurrency=None, data_dir=None, config=None, exchange_factory=None,
+                 retry_policy=None, progress_callback=None):
+        """初始化异步批量下载器
+
+        Args:
+            max_concurrency (int, optional): 同时进行的任务数，默认读取配置
+            data_dir (str, optional): 保存数据的目录
+            config (dict, optional): 交易所API配置
+            exchange_factory (callable, optional): 根据交易所ID创建异步交易所实例，默认为get_async_exchange
+            retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+            progress_callback (callable, optional): 任务状态变化时调用，参数为DownloadJob
+        """
+        async_config = data_config.get('async', {})
+        self.max_concurrency = max_concurrency or async_config.get('max_concurrency', 32)
+        self.data_dir = data_dir
+        self.config = config
+        self.exchange_factory = exchange_factory or (lambda exchange_id: get_async_exchange(exchange_id, config))
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.progress_callback = progress_callback
+        self._exchanges = {}
+        self._markets_loaded = {}
+
+    def _report(self, job):
+        if self.progress_callback is not None:
+            self.progress_callback(job)
+
+    async def _get_exchange(self, exchange_id):
+        """获取交易所实例，每个交易所只创建一次并只加载一次市场"""
+        exchange = self._exchanges.get(exchange_id)
+        if exchange is None:
+            exchange = self.exchange_factory(exchange_id)
+            self._exchanges[exchange_id] = exchange
+            self._markets_loaded[exchange_id] = asyncio.ensure_future(exchange.load_markets())
+        await self._markets_loaded[exchange_id]
+        return exchange
+
+    async def _run_job(self, job, semaphore):
+        async with semaphore:
+            job.status = JOB_RUNNING
+            job.attempts += 1
+            self._report(job)
+
+            try:
+                exchange = await self._get_exchange(job.exchange_id)
+                symbol = get_symbol_index(exchange).resolve(job.symbol)
+                if symbol is None:
+                    raise ValueError(f"交易对 {job.symbol} 在交易所 {job.exchange_id} 中不存在")
+                job.symbol = symbol
+
+                rate_limiter = get_rate_limiter(job.exchange_id, exchange.rateLimit / 1000)
+                job.file_path, job.rows = await fetch_and_save_async(
+                    exchange, job.symbol, job.timeframe, job.start_date, job.end_date, self.data_dir,
+                    incremental=job.incremental, rate_limiter=rate_limiter, retry_policy=self.retry_policy
+                )
+                job.status = JOB_DONE
+                job.progress = 1.0
+                logger.info(f"任务完成: {job.name} -> {job.file_path}")
+            except Exception as e:
+                job.status = JOB_FAILED
+                job.error = str(e)
+                logger.error(f"任务失败: {job.name}，错误: {job.error}")
+
+            self._report(job)
+            return job
+
+    async def run_async(self, jobs):
+        """在当前事件循环中执行所有任务
+
+        Args:
+            jobs (list): DownloadJob列表
+
+        Returns:
+            list: 执行后的DownloadJob列表
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            await asyncio.gather(*(self._run_job(job, semaphore) for job in jobs))
+        finally:
+            for exchange in self._exchanges.values():
+                await exchange.close()
+            self._exchanges.clear()
+            self._markets_loaded.clear()
+
+        done = sum(1 for job in jobs if job.status == JOB_DONE)
+        logger.info(f"异步批量下载结束，成功 {done} 个，失败 {len(jobs) - done} 个")
+        return jobs
+
+    def run(self, jobs):
+        """启动事件循环执行所有任务
+
+        Args:
+            jobs (list): DownloadJob列表
+
+        Returns:
+            list: 执行后的DownloadJob列表
+        """
+        return asyncio.run(self.run_async(jobs))
+
+
+def run_async_batch(jobs=None, **kwargs):
+    """异步执行批量下载
+
+    Args:
+        jobs (list, optional): DownloadJob列表，默认从配置读取
+        **kwargs: 传给AsyncIngestor的参数
+
+    Returns:
+        list: 执行后的DownloadJob列表
+    """
+    if jobs is None:
+        jobs = load_jobs_from_config()
+    return AsyncIngestor(**kwargs).run(jobs)
+
+
+if __name__ == "__main__":
+    run_async_batch(config=data_config.get("exchange_config", {}))
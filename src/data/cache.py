@@ -0,0 +1,198 @@
+"""K线请求缓存模块，将交易所返回的K线分页持久化到本地SQLite数据库"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from src.log import get_logger
+from src.manager import SystemManager, ConfigManager
+from src.data.time_utils import timeframe_to_ms
+
+# 获取系统管理器
+system_manager = SystemManager()
+
+# 读取数据配置
+data_config = ConfigManager(system_manager).read_config('data_config.json')
+
+# 获取配置好的logger
+logger = get_logger()
+
+# 默认缓存文件名
+CACHE_FILENAME = 'ohlcv_cache.sqlite'
+
+# 全局缓存实例
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+class OHLCVCache:
+    """
+    K线分页请求缓存
+
+    以 (交易所, 交易对, 周期, since, limit) 为键缓存 fetch_ohlcv 的返回结果。
+    最后一根K线之后的一根也已收盘的分页内容不会再变化，永久缓存；
+    包含未收盘K线或到达数据末尾的分页只缓存ttl秒。
+    缓存总大小超过max_bytes时按最近访问时间淘汰。
+    """
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, ttl=60):
+        """初始化缓存
+
+        Args:
+            path (str): SQLite数据库文件路径
+            max_bytes (int): 缓存数据的最大总字节数
+            ttl (float): 未完结分页的缓存时间(秒)
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " exchange TEXT NOT NULL, symbol TEXT NOT NULL, timeframe TEXT NOT NULL,"
+            " since INTEGER NOT NULL, page_limit INTEGER NOT NULL,"
+            " data BLOB NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL, last_access REAL NOT NULL,"
+            " PRIMARY KEY (exchange, symbol, timeframe, since, page_limit))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._conn.commit()
+
+    def get(self, exchange_id, symbol, timeframe, since, limit):
+        """读取缓存的分页
+
+        Returns:
+            list: 缓存的K线数据，未命中或已过期时返回None
+        """
+        key = (exchange_id, symbol, timeframe, since, limit)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, expires_at FROM pages"
+                " WHERE exchange=? AND symbol=? AND timeframe=? AND since=? AND page_limit=?", key
+            ).fetchone()
+            if row is None:
+                return None
+
+            data, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute(
+                    "DELETE FROM pages WHERE exchange=? AND symbol=? AND timeframe=? AND since=? AND page_limit=?",
+                    key
+                )
+                self._conn.commit()
+                return None
+
+            self._conn.execute(
+                "UPDATE pages SET last_access=?"
+                " WHERE exchange=? AND symbol=? AND timeframe=? AND since=? AND page_limit=?", (now,) + key
+            )
+            self._conn.commit()
+
+        return json.loads(data)
+
+    def is_complete(self, ohlcv, timeframe, now_ms=None):
+        """分页内容是否不会再变化
+
+        最后一根K线之后的一根也已收盘时，该分页已经包含了交易所能返回的全部数据。
+        """
+        if not ohlcv:
+            return False
+        if now_ms is None:
+            now_ms = int(time.time() * 1000)
+        return ohlcv[-1][0] + 2 * timeframe_to_ms(timeframe) <= now_ms
+
+    def put(self, exchange_id, symbol, timeframe, since, limit, ohlcv):
+        """缓存分页，必要时按最近访问时间淘汰旧数据
+
+        Args:
+            exchange_id (str): 交易所ID
+            symbol (str): 交易对
+            timeframe (str): K线周期
+            since (int): 起始时间戳(毫秒)
+            limit (int): 单次请求的K线数量
+            ohlcv (list): 交易所返回的K线数据
+        """
+        now = time.time()
+        expires_at = None if self.is_complete(ohlcv, timeframe, int(now * 1000)) else now + self.ttl
+        data = json.dumps(ohlcv, separators=(',', ':')).encode('utf-8')
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (exchange_id, symbol, timeframe, since, limit, data, len(data), expires_at, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """删除过期的分页，总大小仍超过上限时按最近访问时间从旧到新淘汰"""
+        self._conn.execute("DELETE FROM pages WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        rows = self._conn.execute("SELECT rowid, size FROM pages ORDER BY last_access").fetchall()
+        evicted = []
+        for rowid, size in rows:
+            if excess <= 0:
+                break
+            evicted.append((rowid,))
+            excess -= size
+
+        self._conn.executemany("DELETE FROM pages WHERE rowid=?", evicted)
+        logger.info(f"K线缓存超过 {self.max_bytes} 字节，淘汰 {len(evicted)} 个分页")
+
+    def size(self):
+        """缓存数据的总字节数"""
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages")
+            self._conn.commit()
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def get_ohlcv_cache():
+    """按配置获取全局K线请求缓存
+
+    Returns:
+        OHLCVCache: 缓存实例，配置中未启用缓存时返回None
+    """
+    global _CACHE
+
+    cache_config = data_config.get('cache', {})
+    if not cache_config.get('enabled', False):
+        return None
+
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            path = cache_config.get('path') or os.path.join(str(system_manager.DATA_PATH), 'cache', CACHE_FILENAME)
+            _CACHE = OHLCVCache(
+                path,
+                max_bytes=int(cache_config.get('max_size_mb', 512) * 1024 * 1024),
+                ttl=cache_config.get('ttl', 60)
+            )
+        return _CACHE
@@ -0,0 +1,189 @@
+"""交易所客户端池模块，在多次调用之间复用交易所实例、HTTP连接和市场信息"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+import ccxt
+
+from src.log import get_logger
+from src.manager import SystemManager, ConfigManager
+
+# 获取系统管理器
+system_manager = SystemManager()
+
+# 读取数据配置
+data_config = ConfigManager(system_manager).read_config('data_config.json')
+
+# 获取配置好的logger
+logger = get_logger()
+
+# 交易所客户端池 {(交易所ID, 配置, 线程ID): 交易所实例}
+_EXCHANGES = {}
+
+# 进程内的市场信息 {市场信息键: (加载时间, markets, currencies)}，键见 _markets_key
+_MARKETS = {}
+
+_POOL_LOCK = threading.Lock()
+
+
+def build_exchange_config(config=None):
+    """合并默认配置、全局交易所配置和传入的配置
+
+    Args:
+        config (dict, optional): 额外的配置参数
+
+    Returns:
+        dict: 创建交易所实例的配置
+    """
+    # 默认配置
+    default_config = {
+        'enableRateLimit': True,  # 启用请求频率限制
+    }
+
+    # 如果全局配置中有交易所配置，则使用它
+    if 'exchange_config' in data_config:
+        default_config.update(data_config['exchange_config'])
+
+    # 合并传入的配置
+    if config:
+        default_config.update(config)
+
+    return default_config
+
+
+def _pool_config():
+    return data_config.get('exchange_pool', {})
+
+
+def pool_enabled():
+    """配置中是否启用了交易所客户端池"""
+    return _pool_config().get('enabled', False)
+
+
+def get_pooled_exchange(exchange_id='okx', config=None, factory=None):
+    """从客户端池获取交易所实例，不存在时创建
+
+    同一交易所ID和配置在同一线程中总是得到同一个实例，复用其HTTP会话。
+    ccxt的同步客户端不是线程安全的，因此每个线程各有一个实例，市场信息在线程之间共享。
+
+    Args:
+        exchange_id (str): 交易所ID
+        config (dict, optional): 额外的配置参数
+        factory (callable, optional): 创建交易所实例的函数，参数为 (exchange_id, config)
+
+    Returns:
+        ccxt.Exchange: 交易所API实例
+    """
+    key = (exchange_id, json.dumps(config or {}, sort_keys=True, default=str), threading.get_ident())
+
+    with _POOL_LOCK:
+        exchange = _EXCHANGES.get(key)
+        if exchange is None:
+            if factory is None:
+                logger.info(f"初始化交易所API: {exchange_id}")
+                exchange = getattr(ccxt, exchange_id)(build_exchange_config(config))
+            else:
+                exchange = factory(exchange_id, config)
+            _EXCHANGES[key] = exchange
+        return exchange
+
+
+def _markets_key(exchange):
+    """市场信息的缓存键，交易所ID加上影响市场列表的配置(默认市场类型、沙盒模式、主机名)的哈希
+
+    同一交易所以不同的 defaultType 或沙盒模式创建的实例得到不同的市场列表，不能共用缓存。
+    """
+    options = getattr(exchange, 'options', None) or {}
+    relevant = {
+        'defaultType': options.get('defaultType'),
+        'sandbox': bool(getattr(exchange, 'isSandboxModeEnabled', False)),
+        'hostname': getattr(exchange, 'hostname', None),
+    }
+    digest = hashlib.sha1(json.dumps(relevant, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:12]
+    return f"{exchange.id}_{digest}"
+
+
+def _markets_cache_path(key):
+    cache_dir = _pool_config().get('markets_cache_dir') or os.path.join(str(system_manager.DATA_PATH), 'cache')
+    return os.path.join(cache_dir, f"{key}_markets.json")
+
+
+def _read_markets_cache(path, ttl):
+    """读取未过期的市场信息缓存文件"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - cached.get('saved_at', 0) > ttl:
+        return None
+    return cached
+
+
+def _write_markets_cache(path, loaded_at, markets, currencies):
+    """原子地保存市场信息缓存文件"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'saved_at': loaded_at, 'markets': markets, 'currencies': currencies}, f)
+        os.replace(temp_path, path)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"市场信息无法序列化，不写入缓存: {str(e)}")
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def ensure_markets(exchange, ttl=None, cache_path=None):
+    """保证交易所实例已加载市场信息，优先使用缓存
+
+    依次使用实例中已加载的市场、进程内缓存、未过期的磁盘缓存，都不可用时才请求交易所。
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        ttl (float, optional): 缓存有效期(秒)，默认读取配置
+        cache_path (str, optional): 磁盘缓存文件路径，默认为 DATA_PATH/cache/{市场信息键}_markets.json
+
+    Returns:
+        dict: 市场信息
+    """
+    if exchange.markets:
+        return exchange.markets
+
+    if ttl is None:
+        ttl = _pool_config().get('markets_ttl', 3600)
+    key = _markets_key(exchange)
+    if cache_path is None:
+        cache_path = _markets_cache_path(key)
+
+    with _POOL_LOCK:
+        cached = _MARKETS.get(key)
+    if cached is not None and time.time() - cached[0] <= ttl:
+        exchange.set_markets(cached[1], cached[2])
+        return exchange.markets
+
+    cached = _read_markets_cache(cache_path, ttl)
+    if cached is not None:
+        logger.info(f"从缓存加载 {exchange.id} 市场信息: {cache_path}")
+        exchange.set_markets(cached['markets'], cached.get('currencies'))
+        loaded_at = cached['saved_at']
+    else:
+        exchange.load_markets()
+        loaded_at = time.time()
+        _write_markets_cache(cache_path, loaded_at, exchange.markets, exchange.currencies)
+
+    with _POOL_LOCK:
+        _MARKETS[key] = (loaded_at, exchange.markets, exchange.currencies)
+    return exchange.markets
+
+
+def clear_pool():
+    """清空客户端池和进程内的市场信息"""
+    with _POOL_LOCK:
+        _EXCHANGES.clear()
+        _MARKETS.clear()
@@ -0,0 +1,421 @@
+"""永续合约资金费率与持仓量模块，分页获取历史数据并按K线相同的存储布局保存，用searchsorted向量化地对齐到任意周期的K线"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.data.get_data import data_config, logger, get_exchange, _resolve_time_range
+from src.data.rate_limiter import (
+    RetryPolicy, endpoint_weight, get_rate_limiter, is_retryable, retry_after_seconds, RATE_LIMIT_ERRORS
+)
+from src.data.exchange_pool import get_pooled_exchange, ensure_markets, pool_enabled
+from src.data.symbols import get_symbol_index
+from src.data.store import open_store
+from src.data.storage import BinaryStorage, ParquetStorage
+from src.data.time_utils import timeframe_to_ms
+
+# 数据集名称，在存储中代替K线周期，如 ETH-USDT-USDT_funding.csv、ETH-USDT-USDT_open_interest_1h.csv
+FUNDING_DATASET = 'funding'
+OPEN_INTEREST_DATASET = 'open_interest'
+
+# 字段及类型
+FUNDING_SCHEMA = {'timestamp': 'int64', 'funding_rate': 'float64'}
+OPEN_INTEREST_SCHEMA = {'timestamp': 'int64', 'open_interest': 'float64', 'open_interest_value': 'float64'}
+
+# 默认参数
+DEFAULT_FUNDING = {
+    'symbols': None,
+    'open_interest_timeframe': '1h',
+    'page_limit': 100,
+    'storage_format': None,
+}
+
+
+def _funding_config():
+    config = dict(DEFAULT_FUNDING)
+    config.update(data_config.get('funding', {}))
+    return config
+
+
+def _dataset_format(storage_format):
+    """资金费率和持仓量的存储格式
+
+    优先使用配置 funding.storage_format；未配置时与K线相同，K线为binary格式时改用parquet，
+    因为binary的行结构固定为OHLCV。
+    """
+    configured = _funding_config()['storage_format']
+    if configured:
+        return configured
+
+    storage_format = storage_format or data_config.get('storage_format', 'csv')
+    return ParquetStorage.name if storage_format == BinaryStorage.name else storage_format
+
+
+def open_funding_store(symbol, exchange_id=None, data_dir=None, storage_format=None, layout=None):
+    """打开资金费率数据仓库，与K线使用相同的存储布局，格式见 _dataset_format"""
+    return open_store(symbol, FUNDING_DATASET, exchange_id, data_dir, _dataset_format(storage_format), layout,
+                      FUNDING_SCHEMA)
+
+
+def open_interest_store(symbol, timeframe, exchange_id=None, data_dir=None, storage_format=None, layout=None):
+    """打开持仓量数据仓库，与K线使用相同的存储布局，格式见 _dataset_format"""
+    return open_store(symbol, f"{OPEN_INTEREST_DATASET}_{timeframe}", exchange_id, data_dir,
+                      _dataset_format(storage_format), layout, OPEN_INTEREST_SCHEMA)
+
+
+def _fetch_history_page(exchange, endpoint, fetch, since, rate_limiter, retry_policy):
+    """获取一页历史数据，可重试的错误按退避策略重试"""
+    attempt = 0
+    while True:
+        try:
+            if rate_limiter is not None:
+                rate_limiter.acquire(endpoint_weight(endpoint))
+            return fetch(since)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= retry_policy.max_retries:
+                logger.error(f"{endpoint} 请求失败: {str(e)}")
+                raise
+
+            delay = retry_policy.delay(attempt, retry_after_seconds(exchange, e))
+            if isinstance(e, RATE_LIMIT_ERRORS) and rate_limiter is not None:
+                rate_limiter.penalize(delay)
+            attempt += 1
+            logger.warning(f"{endpoint} 请求出错: {str(e)}，{delay:.1f} 秒后第 {attempt} 次重试")
+            time.sleep(delay)
+
+
+def iter_history_pages(exchange, endpoint, fetch, start_timestamp, end_timestamp, rate_limiter=None,
+                       retry_policy=None):
+    """从起始时间开始逐页获取按时间排序的历史记录，直到结束时间或没有更多数据
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        endpoint (str): 接口名，用于频率限制的权重和日志
+        fetch (callable): fetch(since) 返回从since开始的一页记录，每条记录含timestamp
+        start_timestamp (int): 起始时间戳(毫秒)
+        end_timestamp (int): 结束时间戳(毫秒)，包含该时间
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+
+    Yields:
+        list: 每页时间范围内的记录
+    """
+    if retry_policy is None:
+        retry_policy = RetryPolicy()
+
+    since = start_timestamp
+    while since <= end_timestamp:
+        page = _fetch_history_page(exchange, endpoint, fetch, since, rate_limiter, retry_policy)
+        if not page:
+            break
+
+        last_timestamp = page[-1]['timestamp']
+        if last_timestamp < since:
+            logger.warning(f"{endpoint} 返回的数据早于请求的起始时间，停止翻页")
+            break
+
+        records = [record for record in page if since <= record['timestamp'] <= end_timestamp]
+        if records:
+            yield records
+        since = last_timestamp + 1
+
+
+def funding_to_frame(records):
+    """将fetch_funding_rate_history返回的记录转换为DataFrame"""
+    df = pd.DataFrame({
+        'timestamp': [record['timestamp'] for record in records],
+        'funding_rate': [record.get('fundingRate') for record in records],
+    })
+    return df.astype(FUNDING_SCHEMA)
+
+
+def open_interest_to_frame(records):
+    """将fetch_open_interest_history返回的记录转换为DataFrame，交易所未提供的字段为NaN"""
+    df = pd.DataFrame({
+        'timestamp': [record['timestamp'] for record in records],
+        'open_interest': [record.get('openInterestAmount') for record in records],
+        'open_interest_value': [record.get('openInterestValue') for record in records],
+    })
+    return df.astype(OPEN_INTEREST_SCHEMA)
+
+
+def _collect(pages, to_frame, schema):
+    frames = [to_frame(records) for records in pages]
+    if not frames:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in schema.items()})
+    df = pd.concat(frames, ignore_index=True)
+    return df.drop_duplicates('timestamp', keep='last').sort_values('timestamp', kind='stable') \
+        .reset_index(drop=True)
+
+
+def fetch_funding_history(exchange, symbol, start_timestamp, end_timestamp, limit=None, rate_limiter=None,
+                          retry_policy=None):
+    """获取时间范围内的资金费率历史
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        symbol (str): 永续合约交易对，如 'ETH/USDT:USDT'
+        start_timestamp (int): 起始时间戳(毫秒)
+        end_timestamp (int): 结束时间戳(毫秒)
+        limit (int, optional): 单次请求的数量，默认读取配置 funding.page_limit
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+
+    Returns:
+        pd.DataFrame: timestamp/funding_rate，timestamp为结算时间
+    """
+    if not exchange.has.get('fetchFundingRateHistory'):
+        raise ValueError(f"交易所 {exchange.id} 不支持获取资金费率历史")
+
+    limit = limit or _funding_config()['page_limit']
+    pages = iter_history_pages(exchange, 'fetch_funding_rate_history',
+                               lambda since: exchange.fetch_funding_rate_history(symbol, since, limit),
+                               start_timestamp, end_timestamp, rate_limiter, retry_policy)
+    return _collect(pages, funding_to_frame, FUNDING_SCHEMA)
+
+
+def fetch_open_interest_history(exchange, symbol, timeframe, start_timestamp, end_timestamp, limit=None,
+                                rate_limiter=None, retry_policy=None):
+    """获取时间范围内的持仓量历史
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        symbol (str): 永续合约交易对，如 'ETH/USDT:USDT'
+        timeframe (str): 持仓量的统计周期，如 '1h'
+        start_timestamp (int): 起始时间戳(毫秒)
+        end_timestamp (int): 结束时间戳(毫秒)
+        limit (int, optional): 单次请求的数量，默认读取配置 funding.page_limit
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+
+    Returns:
+        pd.DataFrame: timestamp/open_interest/open_interest_value
+    """
+    if not exchange.has.get('fetchOpenInterestHistory'):
+        raise ValueError(f"交易所 {exchange.id} 不支持获取持仓量历史")
+
+    limit = limit or _funding_config()['page_limit']
+    pages = iter_history_pages(exchange, 'fetch_open_interest_history',
+                               lambda since: exchange.fetch_open_interest_history(symbol, timeframe, since, limit),
+                               start_timestamp, end_timestamp, rate_limiter, retry_policy)
+    return _collect(pages, open_interest_to_frame, OPEN_INTEREST_SCHEMA)
+
+
+def _resolve_swap(exchange, symbol_index, symbol):
+    """将交易对解析为永续合约，现货等其他市场改用同一币对以计价币种结算的永续合约，不存在时抛出ValueError"""
+    resolved = symbol_index.resolve(symbol)
+    if resolved is None:
+        raise ValueError(f"交易对 {symbol} 在交易所 {exchange.id} 中不存在")
+
+    markets = exchange.markets or {}
+    market = markets.get(resolved)
+    if market is None or market.get('swap'):
+        return resolved
+
+    swap = f"{market['base']}/{market['quote']}:{market['quote']}"
+    if not markets.get(swap, {}).get('swap'):
+        raise ValueError(f"交易对 {resolved} 不是永续合约，交易所 {exchange.id} 中也没有对应的永续合约 {swap}")
+    logger.info(f"交易对 {resolved} 不是永续合约，改用 {swap}")
+    return swap
+
+
+def _fetch_and_store(store, fetch, start_timestamp, end_timestamp, incremental):
+    """从仓库中最后一条记录之后(增量)或起始时间开始获取，并与已有数据合并"""
+    since = start_timestamp
+    if incremental:
+        last_timestamp = store.last_timestamp()
+        if last_timestamp is not None:
+            since = max(since, last_timestamp + 1)
+
+    if since > end_timestamp:
+        logger.info(f"{store.path} 已包含结束日期之前的全部数据，无需更新")
+        return store.path
+
+    df = fetch(since, end_timestamp)
+    if df.empty:
+        logger.warning(f"没有获取到新数据，{store.path} 保持不变")
+        return store.path
+
+    logger.info(f"保存 {len(df)} 条数据到: {store.path}")
+    return store.write(df)
+
+
+def fetch_and_save_funding(symbols=None, start_date=None, end_date=None, exchange_id=None, config=None,
+                           exchange=None, data_dir=None, storage_format=None, layout=None,
+                           open_interest_timeframe=None, incremental=True, retry_policy=None):
+    """批量获取多个永续合约的资金费率和持仓量历史并保存
+
+    所有交易对共享一个交易所实例和频率限制器；增量模式下只获取仓库中最后一条记录之后的数据。
+    现货等非永续合约的交易对(包括默认的配置 symbol)改用同一币对以计价币种结算的永续合约，如 'ETH/USDT' 对应
+    'ETH/USDT:USDT'。单个交易对失败时记录错误并继续下一个。
+
+    Args:
+        symbols (list, optional): 交易对列表，默认读取配置 funding.symbols，未配置时为配置的 symbol
+        start_date (str | int, optional): 起始日期，默认为30天前
+        end_date (str | int, optional): 结束日期，默认为当前时间
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        config (dict, optional): 交易所API配置
+        exchange (ccxt.Exchange, optional): 复用的交易所API实例
+        data_dir (str, optional): 数据根目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        open_interest_timeframe (str, optional): 持仓量的统计周期，默认读取配置 funding.open_interest_timeframe，
+            为空时不获取持仓量
+        incremental (bool): 是否从已保存的最后一条记录之后开始获取
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+
+    Returns:
+        dict: {交易对: {'funding': 路径, 'open_interest': 路径}}，失败的交易对为None
+    """
+    funding_config = _funding_config()
+    if symbols is None:
+        symbols = funding_config['symbols'] or [data_config.get('symbol', 'ETH/USDT:USDT')]
+
+    if exchange_id is None:
+        exchange_id = data_config.get('exchange_id', 'okx')
+
+    if open_interest_timeframe is None:
+        open_interest_timeframe = funding_config['open_interest_timeframe']
+
+    if exchange is None and pool_enabled():
+        exchange = get_pooled_exchange(exchange_id, config)
+
+    if exchange is not None:
+        ensure_markets(exchange)
+    else:
+        exchange = get_exchange(exchange_id, config)
+        exchange.load_markets()
+
+    start_timestamp, end_timestamp = _resolve_time_range(start_date, end_date)
+    rate_limiter = get_rate_limiter(exchange_id, exchange.rateLimit / 1000)
+    symbol_index = get_symbol_index(exchange)
+    store_options = {'exchange_id': exchange_id, 'data_dir': data_dir, 'storage_format': storage_format,
+                     'layout': layout}
+
+    results = {}
+    for symbol in symbols:
+        try:
+            resolved_symbol = _resolve_swap(exchange, symbol_index, symbol)
+
+            paths = {'funding': _fetch_and_store(
+                open_funding_store(resolved_symbol, **store_options),
+                lambda since, end: fetch_funding_history(exchange, resolved_symbol, since, end,
+                                                         rate_limiter=rate_limiter, retry_policy=retry_policy),
+                start_timestamp, end_timestamp, incremental)}
+
+            if open_interest_timeframe:
+                paths['open_interest'] = _fetch_and_store(
+                    open_interest_store(resolved_symbol, open_interest_timeframe, **store_options),
+                    lambda since, end: fetch_open_interest_history(
+                        exchange, resolved_symbol, open_interest_timeframe, since, end,
+                        rate_limiter=rate_limiter, retry_policy=retry_policy),
+                    start_timestamp, end_timestamp, incremental)
+            results[symbol] = paths
+        except Exception as e:
+            logger.error(f"获取 {symbol} 资金费率/持仓量失败: {str(e)}")
+            results[symbol] = None
+
+    logger.info(f"资金费率/持仓量获取完成: {sum(r is not None for r in results.values())}/{len(symbols)} 个交易对成功")
+    return results
+
+
+def asof_join(timestamps, source_timestamps, values):
+    """对每个时间戳取不晚于它的最后一条记录的值(as-of join)
+
+    Args:
+        timestamps (np.ndarray): 目标时间戳(毫秒)
+        source_timestamps (np.ndarray): 记录的时间戳(毫秒)，升序
+        values (np.ndarray): 记录的值，第一维与source_timestamps对应
+
+    Returns:
+        np.ndarray: 与timestamps对应的值，早于第一条记录的位置为NaN
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    index = np.searchsorted(np.asarray(source_timestamps, dtype=np.int64), timestamps, side='right') - 1
+    result = values[np.maximum(index, 0)] if len(values) else np.full((len(timestamps),) + values.shape[1:], np.nan)
+    result[index < 0] = np.nan
+    return result
+
+
+def funding_per_bar(timestamps, funding_timestamps, rates, timeframe):
+    """每根K线内结算的资金费率之和
+
+    K线T覆盖(T, T+F]内的结算：正好在T结算的资金费由上一根K线收盘时的持仓承担。
+
+    Args:
+        timestamps (np.ndarray): K线时间戳(毫秒)
+        funding_timestamps (np.ndarray): 结算时间戳(毫秒)，升序
+        rates (np.ndarray): 资金费率
+        timeframe (str): K线周期
+
+    Returns:
+        np.ndarray: 与K线等长的资金费率，没有结算的K线为0
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    funding_timestamps = np.asarray(funding_timestamps, dtype=np.int64)
+    cumulative = np.r_[0.0, np.cumsum(np.nan_to_num(np.asarray(rates, dtype=np.float64)))]
+    first = np.searchsorted(funding_timestamps, timestamps, side='right')
+    last = np.searchsorted(funding_timestamps, timestamps + timeframe_to_ms(timeframe), side='right')
+    return cumulative[last] - cumulative[first]
+
+
+def load_funding_rates(data, symbol, timeframe, exchange_id=None, data_dir=None, storage_format=None, layout=None):
+    """读取已保存的资金费率并对齐到K线，结果可以直接传给run_backtest的funding_rates
+
+    Args:
+        data (pd.DataFrame | dict): 含timestamp列的K线数据
+        symbol (str): 交易对，如 'ETH/USDT:USDT'
+        timeframe (str): K线周期
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据根目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+
+    Returns:
+        np.ndarray: 与K线等长的每根K线的资金费率
+    """
+    timestamps = np.asarray(data['timestamp'], dtype=np.int64)
+    if not len(timestamps):
+        return np.zeros(0)
+
+    store = open_funding_store(symbol, exchange_id, data_dir, storage_format, layout)
+    funding = store.load(int(timestamps[0]), int(timestamps[-1]) + timeframe_to_ms(timeframe))
+    if funding.empty:
+        logger.warning(f"{symbol} 在K线时间范围内没有资金费率数据，按0计算")
+    return funding_per_bar(timestamps, funding['timestamp'].to_numpy(), funding['funding_rate'].to_numpy(),
+                           timeframe)
+
+
+def load_open_interest(data, symbol, timeframe, open_interest_timeframe=None, exchange_id=None, data_dir=None,
+                       storage_format=None, layout=None):
+    """读取已保存的持仓量并对齐到K线
+
+    取每根K线收盘前最后一条持仓量记录，收盘时决策即可使用，不会用到未来数据。
+
+    Args:
+        data (pd.DataFrame | dict): 含timestamp列的K线数据
+        symbol (str): 交易对，如 'ETH/USDT:USDT'
+        timeframe (str): K线周期
+        open_interest_timeframe (str, optional): 持仓量的统计周期，默认读取配置 funding.open_interest_timeframe
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据根目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+
+    Returns:
+        pd.DataFrame: timestamp/open_interest/open_interest_value，与K线逐根对应
+    """
+    if open_interest_timeframe is None:
+        open_interest_timeframe = _funding_config()['open_interest_timeframe']
+
+    timestamps = np.asarray(data['timestamp'], dtype=np.int64)
+    store = open_interest_store(symbol, open_interest_timeframe, exchange_id, data_dir, storage_format, layout)
+    source = store.load(end=int(timestamps[-1]) + timeframe_to_ms(timeframe) - 1 if len(timestamps) else None)
+
+    close_time = timestamps + timeframe_to_ms(timeframe) - 1
+    source_timestamps = source['timestamp'].to_numpy()
+    columns = ['open_interest', 'open_interest_value']
+    joined = asof_join(close_time, source_timestamps, source[columns].to_numpy(dtype=np.float64))
+    return pd.DataFrame({'timestamp': timestamps, columns[0]: joined[:, 0], columns[1]: joined[:, 1]})
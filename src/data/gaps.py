@@ -0,0 +1,180 @@
+"""数据缺口模块，扫描已保存K线中的缺口并只补全缺失的时间窗口"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from src.data.get_data import data_config, logger, get_exchange, fetch_full_history
+from src.data.store import open_store, PartitionedStore
+from src.data.time_utils import timeframe_to_ms
+
+# 分区目录中的缺口索引文件
+GAPS_FILENAME = '_gaps.json'
+
+
+def find_gaps(timestamps, timeframe):
+    """向量化地查找时间戳序列中的缺口
+
+    Args:
+        timestamps (np.ndarray): 升序排列的毫秒时间戳
+        timeframe (str): K线周期，如 '1m', '1h'
+
+    Returns:
+        np.ndarray: 形状为(n, 2)的数组，每行为缺失K线的 [第一根时间戳, 最后一根时间戳]
+    """
+    timeframe_ms = timeframe_to_ms(timeframe)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    index = np.flatnonzero(np.diff(timestamps) > timeframe_ms)
+    return np.column_stack([timestamps[index] + timeframe_ms, timestamps[index + 1] - timeframe_ms])
+
+
+def gap_index_path(store):
+    """缺口索引文件路径，与数据保存在一起
+
+    单文件布局为 {symbol}_{timeframe}_gaps.json，分区布局为分区目录下的 _gaps.json。
+    """
+    if isinstance(store, PartitionedStore):
+        return os.path.join(store.path, GAPS_FILENAME)
+    return os.path.splitext(store.path)[0] + '_gaps.json'
+
+
+def load_gap_index(store):
+    """读取缺口索引，不存在时返回空索引
+
+    Returns:
+        dict: {'timeframe', 'first_ts', 'last_ts', 'gaps': [[起, 止, 缺失条数]], 'confirmed': [[起, 止]]}
+    """
+    path = gap_index_path(store)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return {'timeframe': store.timeframe, 'first_ts': None, 'last_ts': None, 'gaps': [], 'confirmed': []}
+
+
+def _save_gap_index(store, index):
+    """原子地保存缺口索引"""
+    path = gap_index_path(store)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=4)
+    os.replace(temp_path, path)
+
+
+def scan_gaps(symbol, timeframe, exchange_id=None, data_dir=None, storage_format=None, layout=None):
+    """扫描已保存数据中的缺口并更新缺口索引
+
+    只读取timestamp列。已确认交易所没有数据的缺口(confirmed)不再列入待补全的缺口。
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1m', '1h'
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+
+    Returns:
+        dict: 缺口索引
+    """
+    store = open_store(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    if not store.exists():
+        raise FileNotFoundError(f"数据不存在: {store.path}")
+
+    timestamps = store.load(columns=['timestamp'])['timestamp'].to_numpy()
+    gaps = find_gaps(timestamps, timeframe)
+
+    index = load_gap_index(store)
+    confirmed = {tuple(window) for window in index.get('confirmed', [])}
+    timeframe_ms = timeframe_to_ms(timeframe)
+
+    index.update({
+        'timeframe': timeframe,
+        'first_ts': int(timestamps[0]) if len(timestamps) else None,
+        'last_ts': int(timestamps[-1]) if len(timestamps) else None,
+        'gaps': [[int(start), int(end), int((end - start) // timeframe_ms + 1)]
+                 for start, end in gaps.tolist() if (start, end) not in confirmed],
+        'confirmed': sorted([list(window) for window in confirmed]),
+    })
+    _save_gap_index(store, index)
+
+    missing = sum(gap[2] for gap in index['gaps'])
+    logger.info(f"{symbol} {timeframe} 共有 {len(index['gaps'])} 个缺口，缺失 {missing} 条K线")
+    return index
+
+
+def backfill_gaps(symbol, timeframe, exchange_id=None, data_dir=None, storage_format=None, layout=None,
+                  config=None, exchange=None, fetch_options=None):
+    """只获取缺口索引中缺失的时间窗口并合并到已保存的数据
+
+    交易所在某个缺口内确实没有数据(如停机维护)时，该缺口记为已确认，之后不再重复请求。
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1m', '1h'
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        config (dict, optional): 交易所API配置
+        exchange (ccxt.Exchange, optional): 交易所API实例，默认按exchange_id创建
+        fetch_options (dict, optional): 传给fetch_full_history的额外参数
+
+    Returns:
+        dict: 补全后重新扫描得到的缺口索引
+    """
+    if exchange_id is None:
+        exchange_id = data_config.get('exchange_id', 'okx')
+
+    index = scan_gaps(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    if not index['gaps']:
+        return index
+
+    if exchange is None:
+        exchange = get_exchange(exchange_id, config)
+    fetch_options = {'config': config, **(fetch_options or {})}
+    timeframe_ms = timeframe_to_ms(timeframe)
+
+    frames = []
+    attempted = []
+    for start, end, missing in index['gaps']:
+        logger.info(f"补全缺口 {pd.to_datetime(start, unit='ms')} ~ {pd.to_datetime(end, unit='ms')}，"
+                    f"缺失 {missing} 条K线")
+        # 结束时间延长到最后一根缺失K线结束前，单根缺口的时间范围也有效
+        data = fetch_full_history(exchange, symbol, timeframe, start, end + timeframe_ms - 1,
+                                  as_frame=True, **fetch_options)
+        data = data[(data['timestamp'] >= start) & (data['timestamp'] <= end)]
+        if not data.empty:
+            frames.append(data)
+        attempted.append((start, end))
+
+    store = open_store(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    if frames:
+        store.write(pd.concat(frames, ignore_index=True))
+
+    # 请求过但交易所仍然没有返回的K线记为已确认，之后不再重复请求
+    index = scan_gaps(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    remaining = []
+    for gap in index['gaps']:
+        if any(start <= gap[0] and gap[1] <= end for start, end in attempted):
+            index['confirmed'].append(gap[:2])
+        else:
+            remaining.append(gap)
+    index['gaps'] = remaining
+    index['confirmed'].sort()
+    _save_gap_index(store, index)
+
+    logger.info(f"{symbol} {timeframe} 补全后剩余 {len(remaining)} 个缺口")
+    return index
+
+
+if __name__ == "__main__":
+    backfill_gaps(
+        data_config.get("symbol", "ETH/USDT"),
+        data_config.get("timeframe", "1h"),
+        data_config.get("exchange_id", "okx"),
+        config=data_config.get("exchange_config", {})
+    )
@@ -1,12 +1,23 @@
-"""数据获取模块，从交易所API获取历史K线数据并保存为CSV格式"""
+"""数据获取模块，从交易所API获取历史K线数据并按配置的存储格式保存"""
 
 import os
-import pandas as pd
+import numpy as np
 import ccxt
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from src.log import get_logger
 from src.manager import SystemManager, ConfigManager
+from src.data.time_utils import timeframe_to_ms, to_timestamp_ms
+from src.data.rate_limiter import (
+    RateLimiter, RetryPolicy, endpoint_weight, is_retryable, retry_after_seconds, RATE_LIMIT_ERRORS
+)
+from src.data.cache import get_ohlcv_cache
+from src.data.symbols import get_symbol_index
+from src.data.exchange_pool import build_exchange_config, get_pooled_exchange, ensure_markets, pool_enabled
+from src.data.storage import get_storage, get_storage_for_path, ohlcv_to_frame
+from src.data.store import open_store, symbol_to_filename, LAYOUT_FLAT, LAYOUT_PARTITIONED
 
 # 获取系统管理器
 system_manager = SystemManager()
@@ -53,18 +64,7 @@ def get_exchange(exchange_id='okx', config=None):
     Returns:
         ccxt.Exchange: 交易所API实例
     """
-    # 默认配置
-    default_config = {
-        'enableRateLimit': True,  # 启用请求频率限制
-    }
-
-    # 如果全局配置中有交易所配置，则使用它
-    if 'exchange_config' in data_config:
-        default_config.update(data_config['exchange_config'])
-
-    # 合并传入的配置
-    if config:
-        default_config.update(config)
+    default_config = build_exchange_config(config)
 
     try:
         # 创建交易所实例
@@ -77,7 +77,7 @@ def get_exchange(exchange_id='okx', config=None):
         raise
 
 
-def fetch_ohlcv(exchange, symbol, timeframe='1h', since=None, limit=1000):
+def fetch_ohlcv(exchange, symbol, timeframe='1h', since=None, limit=1000, rate_limiter=None, cache=None):
     """获取K线数据
     
     Args:
@@ -86,44 +86,233 @@ def fetch_ohlcv(exchange, symbol, timeframe='1h', since=None, limit=1000):
         timeframe (str): K线周期，如 '1h', '1d'
         since (int, optional): 起始时间戳(毫秒)
         limit (int): 单次请求的K线数量
+        rate_limiter (RateLimiter, optional): 频率限制器，只在实际请求交易所时占用请求许可
+        cache (OHLCVCache, optional): 请求缓存，默认按配置使用全局缓存
         
     Returns:
         list: K线数据列表
     """
+    if cache is None:
+        cache = get_ohlcv_cache()
+
+    # 未指定since时请求的是最新数据，不缓存
+    if cache is not None and since is not None:
+        ohlcv = cache.get(exchange.id, symbol, timeframe, since, limit)
+        if ohlcv is not None:
+            logger.info(f"从缓存读取 {symbol} {timeframe} K线数据 {len(ohlcv)} 条，"
+                        f"起始时间: {datetime.fromtimestamp(since / 1000)}")
+            return ohlcv
+
     try:
+        if rate_limiter is not None:
+            rate_limiter.acquire(endpoint_weight('fetch_ohlcv'))
+
         logger.info(
             f"获取 {symbol} {timeframe} K线数据，起始时间: {datetime.fromtimestamp(since / 1000) if since else 'None'}")
         # 获取K线数据
         ohlcv = exchange.fetch_ohlcv(symbol, timeframe, since, limit)
         logger.info(f"获取到 {len(ohlcv)} 条K线数据")
-        return ohlcv
     except Exception as e:
         logger.error(f"获取K线数据失败: {str(e)}")
         raise
 
+    if cache is not None and since is not None:
+        cache.put(exchange.id, symbol, timeframe, since, limit, ohlcv)
+    return ohlcv
+
+
+def _fetch_page(exchange, symbol, timeframe, since, limit, rate_limiter, retry_policy):
+    """获取一页K线数据，可重试的错误按退避策略重试，超过最大重试次数或遇到不可重试的错误时抛出"""
+    attempt = 0
+    while True:
+        try:
+            return fetch_ohlcv(exchange, symbol, timeframe, since, limit, rate_limiter=rate_limiter)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= retry_policy.max_retries:
+                raise
+
+            delay = retry_policy.delay(attempt, retry_after_seconds(exchange, e))
+            if isinstance(e, RATE_LIMIT_ERRORS) and rate_limiter is not None:
+                # 被限流时暂停所有共享该限制器的请求
+                rate_limiter.penalize(delay)
+            attempt += 1
+            logger.warning(f"获取数据出错: {str(e)}，{delay:.1f} 秒后第 {attempt} 次重试")
+            time.sleep(delay)
+
+
+def _iter_sequential_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                          rate_limiter=None, progress_callback=None, retry_policy=None):
+    """从起始时间开始逐页获取K线数据，直到结束时间或没有更多数据
+
+    Yields:
+        list: 每页的K线数据
+    """
+    since = start_timestamp
+    rows = 0
+
+    # 防止请求过于频繁，命中缓存的请求不占用请求许可
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(exchange.rateLimit / 1000)
+
+    if retry_policy is None:
+        retry_policy = RetryPolicy()
+
+    while since < end_timestamp:
+        logger.info(f"获取从 {datetime.fromtimestamp(since / 1000)} 开始的数据")
+        ohlcv = _fetch_page(exchange, symbol, timeframe, since, 1000, rate_limiter, retry_policy)
+
+        if not ohlcv or len(ohlcv) == 0:
+            logger.warning("没有获取到更多数据，可能已到达数据末尾")
+            break
+
+        # 更新since为最后一条记录的时间+1
+        since = ohlcv[-1][0] + 1
+        rows += len(ohlcv)
+
+        if progress_callback is not None:
+            progress_callback(since, start_timestamp, end_timestamp, rows)
+
+        yield ohlcv
+
+
+def _fetch_sequential(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                      rate_limiter=None, progress_callback=None, retry_policy=None):
+    """从起始时间开始逐页获取K线数据，直到结束时间或没有更多数据
 
-def fetch_full_history(exchange, symbol, timeframe='1h', start_date=None, end_date=None):
-    """获取完整的历史K线数据
-    
-    Args:
-        exchange (ccxt.Exchange): 交易所API实例
-        symbol (str): 交易对，如 'ETH/USDT'
-        timeframe (str): K线周期，如 '1h', '1d'
-        start_date (str): 起始日期，格式 'YYYY-MM-DD'
-        end_date (str): 结束日期，格式 'YYYY-MM-DD'，默认为当前日期
-        
     Returns:
-        list: 完整的K线数据列表
+        list: 按获取顺序拼接的K线数据列表
+    """
+    pages = _iter_sequential_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                                   rate_limiter, progress_callback, retry_policy)
+    return [candle for page in pages for candle in page]
+
+
+def _fetch_window(exchange, symbol, timeframe, window_start, window_end, page_size, rate_limiter,
+                  retry_policy):
+    """获取[window_start, window_end)时间窗口内的K线数据
+
+    交易所单页返回的数量可能少于page_size，此时在窗口内继续翻页直到覆盖整个窗口。
+    """
+    rows = []
+    since = window_start
+
+    while since < window_end:
+        ohlcv = _fetch_page(exchange, symbol, timeframe, since, page_size, rate_limiter, retry_policy)
+        if not ohlcv:
+            break
+
+        rows.extend(candle for candle in ohlcv if window_start <= candle[0] < window_end)
+        since = ohlcv[-1][0] + 1
+
+    return rows
+
+
+def _shard_exchange(exchange, config):
+    """分片工作线程使用的交易所实例
+
+    ccxt的同步客户端不是线程安全的，每个工作线程从客户端池取得自己的实例，
+    市场信息复用调用方实例已加载的，不再请求交易所。
     """
-    # 处理日期参数
+    worker = get_pooled_exchange(exchange.id, config)
+    if not worker.markets and exchange.markets:
+        worker.set_markets(exchange.markets, exchange.currencies)
+    return worker
+
+
+def _fetch_shard(exchange, config, symbol, timeframe, window_start, window_end, page_size, rate_limiter,
+                 retry_policy):
+    """在工作线程中用本线程的交易所实例获取一个窗口"""
+    return _fetch_window(_shard_exchange(exchange, config), symbol, timeframe, window_start, window_end,
+                         page_size, rate_limiter, retry_policy)
+
+
+def _iter_sharded_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp, max_workers, page_size,
+                        rate_limiter=None, progress_callback=None, retry_policy=None, config=None):
+    """将时间范围按页大小切分为多个窗口并发获取，按窗口顺序逐个产出
+
+    同时提交的窗口数不超过并发数的两倍，已获取但尚未被消费的数据量有上限。
+    调用方的交易所实例只提供交易所ID和市场信息，各工作线程使用客户端池中以同一配置创建的实例。
+
+    Yields:
+        list: 每个窗口的K线数据
+    """
+    window_ms = page_size * timeframe_to_ms(timeframe)
+    windows = iter([(window_start, min(window_start + window_ms, end_timestamp + 1))
+                    for window_start in range(start_timestamp, end_timestamp + 1, window_ms)])
+
+    # 未指定共享限制器时，按交易所的频率限制在所有分片之间共享一个
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(exchange.rateLimit / 1000)
+
+    if retry_policy is None:
+        retry_policy = RetryPolicy()
+
+    window_count = -(-(end_timestamp + 1 - start_timestamp) // window_ms)
+    logger.info(f"分片获取 {symbol} {timeframe}，共 {window_count} 个窗口，并发数 {max_workers}")
+
+    rows = 0
+    first_timestamp = None
+    missing = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+
+        def submit_next():
+            window = next(windows, None)
+            if window is not None:
+                future = executor.submit(_fetch_shard, exchange, config, symbol, timeframe, window[0], window[1],
+                                         page_size, rate_limiter, retry_policy)
+                pending.append((window, future))
+
+        for _ in range(max_workers * 2):
+            submit_next()
+
+        # 按窗口顺序产出并校验每个窗口的数据
+        while pending:
+            (window_start, window_end), future = pending.popleft()
+            window_rows = future.result()
+            submit_next()
+
+            if window_rows:
+                if first_timestamp is None:
+                    first_timestamp = window_rows[0][0]
+            elif first_timestamp is not None:
+                missing.append(window_start)
+
+            rows += len(window_rows)
+            if progress_callback is not None:
+                progress_callback(window_end, start_timestamp, end_timestamp, rows)
+
+            if window_rows:
+                yield window_rows
+
+    if missing:
+        logger.warning(f"{len(missing)} 个分片窗口没有数据，首个窗口起始于 "
+                       f"{datetime.fromtimestamp(missing[0] / 1000)}")
+
+
+def _fetch_sharded(exchange, symbol, timeframe, start_timestamp, end_timestamp, max_workers, page_size,
+                   rate_limiter=None, progress_callback=None, retry_policy=None, config=None):
+    """将时间范围按页大小切分为多个窗口并发获取
+
+    Returns:
+        list: 按窗口顺序拼接的K线数据列表
+    """
+    pages = _iter_sharded_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                                max_workers, page_size, rate_limiter, progress_callback, retry_policy, config)
+    return [candle for page in pages for candle in page]
+
+
+def _resolve_time_range(start_date, end_date):
+    """解析起止日期为毫秒时间戳，起始日期默认为30天前，结束日期默认为当前时间"""
     if start_date:
-        start_timestamp = int(datetime.strptime(start_date, '%Y-%m-%d').timestamp() * 1000)
+        start_timestamp = to_timestamp_ms(start_date)
     else:
         # 默认获取30天的数据
         start_timestamp = int((datetime.now() - timedelta(days=30)).timestamp() * 1000)
 
     if end_date:
-        end_timestamp = int(datetime.strptime(end_date, '%Y-%m-%d').timestamp() * 1000)
+        end_timestamp = to_timestamp_ms(end_date)
     else:
         end_timestamp = int(datetime.now().timestamp() * 1000)
 
@@ -131,92 +320,399 @@ def fetch_full_history(exchange, symbol, timeframe='1h', start_date=None, end_da
     if end_timestamp <= start_timestamp:
         raise ValueError("结束日期必须晚于起始日期")
 
+    return start_timestamp, end_timestamp
+
+
+def iter_ohlcv_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp, rate_limiter=None,
+                     progress_callback=None, max_workers=None, page_size=None, retry_policy=None, config=None):
+    """逐页获取时间范围内的K线数据，并发数大于1时按分片窗口并发获取
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        start_timestamp (int): 起始时间戳(毫秒)
+        end_timestamp (int): 结束时间戳(毫秒)
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        progress_callback (callable, optional): 每获取一页数据后调用
+        max_workers (int, optional): 分片并发数，默认读取配置
+        page_size (int, optional): 分片模式下每个窗口的K线数量，默认读取配置
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+        config (dict, optional): 创建交易所实例的额外配置，分片工作线程以此从客户端池取得各自的实例
+
+    Yields:
+        list: 按时间顺序产出的每页K线数据
+    """
+    if max_workers is None:
+        max_workers = data_config.get('shard_workers', 1)
+
+    if page_size is None:
+        page_size = data_config.get('page_size', 100)
+
+    if max_workers > 1:
+        return _iter_sharded_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                                   max_workers, page_size, rate_limiter, progress_callback, retry_policy, config)
+    return _iter_sequential_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                                  rate_limiter, progress_callback, retry_policy)
+
+
+def dedup_pages(pages):
+    """去掉按时间顺序产出的各页之间重复的K线
+
+    只保留时间戳晚于已产出的最后一条K线的数据，只需记住一个时间戳，内存占用与数据总量无关。
+
+    Args:
+        pages (iterable): 按时间顺序产出的每页K线数据
+
+    Yields:
+        list: 去重后的每页K线数据
+    """
+    last_timestamp = None
+    for page in pages:
+        if last_timestamp is not None:
+            page = [candle for candle in page if candle[0] > last_timestamp]
+        if page:
+            last_timestamp = page[-1][0]
+            yield page
+
+
+def filter_pages(pages, start_timestamp, end_timestamp):
+    """过滤时间范围[start_timestamp, end_timestamp]之外的K线，到达结束时间后停止读取后续页
+
+    Args:
+        pages (iterable): 按时间顺序产出的每页K线数据
+        start_timestamp (int): 起始时间戳(毫秒)
+        end_timestamp (int): 结束时间戳(毫秒)，包含该时间
+
+    Yields:
+        list: 过滤后的每页K线数据
+    """
+    for page in pages:
+        if page[0][0] < start_timestamp:
+            page = [candle for candle in page if candle[0] >= start_timestamp]
+            if not page:
+                continue
+
+        if page[-1][0] <= end_timestamp:
+            yield page
+            continue
+
+        page = [candle for candle in page if candle[0] <= end_timestamp]
+        if page:
+            yield page
+        break
+
+
+def chunk_frames(pages, chunk_size):
+    """将每页K线数据合并为固定行数的DataFrame分块
+
+    Args:
+        pages (iterable): 每页K线数据
+        chunk_size (int): 每个分块的行数
+
+    Yields:
+        pd.DataFrame: K线数据分块
+    """
+    buffer = []
+    for page in pages:
+        buffer.extend(page)
+        while len(buffer) >= chunk_size:
+            yield ohlcv_to_frame(buffer[:chunk_size])
+            buffer = buffer[chunk_size:]
+
+    if buffer:
+        yield ohlcv_to_frame(buffer)
+
+
+def fetch_and_stream(exchange, symbol, timeframe, start_date, end_date, store, since=None, chunk_size=None,
+                     rate_limiter=None, progress_callback=None, max_workers=None, page_size=None,
+                     retry_policy=None, config=None):
+    """流式获取K线数据并分块写入数据仓库
+
+    每页数据依次经过去重、时间过滤和分块后直接写入存储文件，
+    不在内存中保留完整的历史数据，内存占用与历史长度无关。
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        start_date (str | int): 起始日期，格式 'YYYY-MM-DD'，也可以是毫秒时间戳
+        end_date (str | int): 结束日期，默认为当前日期
+        store (FlatStore | PartitionedStore): 数据仓库
+        since (int, optional): 指定时保留仓库中早于since的数据，之后的数据由新数据替换；
+            未指定时新数据覆盖单文件存储，分区存储中与已有数据合并
+        chunk_size (int, optional): 每次写入的行数，默认读取配置
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        progress_callback (callable, optional): 每获取一页数据后调用
+        max_workers (int, optional): 分片并发数，默认读取配置
+        page_size (int, optional): 分片模式下每个窗口的K线数量，默认读取配置
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+        config (dict, optional): 创建交易所实例的额外配置，分片获取时使用
+
+    Returns:
+        str: 数据仓库路径
+    """
+    start_timestamp, end_timestamp = _resolve_time_range(start_date, end_date)
+
+    if timeframe not in exchange.timeframes:
+        raise ValueError(f"不支持的K线周期: {timeframe}")
+
+    if chunk_size is None:
+        chunk_size = data_config.get('stream_chunk_size', 10000)
+
+    pages = iter_ohlcv_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                             rate_limiter, progress_callback, max_workers, page_size, retry_policy, config)
+    frames = chunk_frames(filter_pages(dedup_pages(pages), start_timestamp, end_timestamp), chunk_size)
+
+    with store.writer(since) as writer:
+        for frame in frames:
+            writer.write(frame)
+
+    logger.info(f"共写入 {writer.rows} 条有效K线数据到: {store.path}")
+    return store.path
+
+
+def fetch_full_history(exchange, symbol, timeframe='1h', start_date=None, end_date=None,
+                       rate_limiter=None, progress_callback=None, max_workers=None, page_size=None,
+                       as_frame=False, retry_policy=None, config=None):
+    """获取完整的历史K线数据
+    
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        start_date (str | int): 起始日期，格式 'YYYY-MM-DD'，也可以是毫秒时间戳
+        end_date (str | int): 结束日期，格式 'YYYY-MM-DD'，也可以是毫秒时间戳，默认为当前日期
+        rate_limiter (RateLimiter, optional): 共享的频率限制器，指定时由它控制请求间隔
+        progress_callback (callable, optional): 每获取一页数据后调用，
+            参数为 (since, start_timestamp, end_timestamp, 已获取条数)
+        max_workers (int, optional): 分片并发数，大于1时将时间范围按页切分为窗口并发获取，默认读取配置
+        page_size (int, optional): 分片模式下每个窗口的K线数量，默认读取配置
+        as_frame (bool): 是否返回DataFrame，数据量大时可避免后续再次转换
+        retry_policy (RetryPolicy, optional): 失败重试策略，可重试的错误按指数退避重试，默认读取配置
+        config (dict, optional): 创建交易所实例的额外配置，分片获取时各工作线程以此从客户端池取得实例
+        
+    Returns:
+        list | pd.DataFrame: 完整的K线数据
+    """
+    start_timestamp, end_timestamp = _resolve_time_range(start_date, end_date)
+
     # 获取交易所的K线周期毫秒数
     timeframes = exchange.timeframes
     if timeframe not in timeframes:
         raise ValueError(f"不支持的K线周期: {timeframe}")
 
     # 获取完整历史数据
-    all_ohlcv = []
-    since = start_timestamp
+    pages = iter_ohlcv_pages(exchange, symbol, timeframe, start_timestamp, end_timestamp,
+                             rate_limiter, progress_callback, max_workers, page_size, retry_policy, config)
+    all_ohlcv = [candle for page in pages for candle in page]
 
-    while since < end_timestamp:
-        try:
-            logger.info(f"获取从 {datetime.fromtimestamp(since / 1000)} 开始的数据")
-            ohlcv = fetch_ohlcv(exchange, symbol, timeframe, since)
+    # 去重、按时间排序并过滤结束日期之后的数据
+    filtered_ohlcv = dedup_sort_filter(all_ohlcv, end_timestamp=end_timestamp, as_frame=as_frame)
 
-            if not ohlcv or len(ohlcv) == 0:
-                logger.warning("没有获取到更多数据，可能已到达数据末尾")
-                break
+    logger.info(f"共获取 {len(filtered_ohlcv)} 条有效K线数据")
+    return filtered_ohlcv
 
-            all_ohlcv.extend(ohlcv)
 
-            # 更新since为最后一条记录的时间+1
-            since = ohlcv[-1][0] + 1
+def dedup_sort_filter(ohlcv_data, start_timestamp=None, end_timestamp=None, as_frame=False):
+    """向量化地对K线数据去重、排序并过滤时间范围
 
-            # 防止请求过于频繁
-            time.sleep(exchange.rateLimit / 1000)
+    只把时间戳列转换为NumPy数组，用np.unique按时间戳排序并去重，时间戳重复时保留最先获取的K线，
+    再用二分查找截取时间范围。返回列表时复用原有的K线对象，不逐条复制。
 
-        except Exception as e:
-            logger.error(f"获取数据出错: {str(e)}")
-            time.sleep(10)  # 出错后等待一段时间再重试
+    Args:
+        ohlcv_data (list): K线数据列表
+        start_timestamp (int, optional): 起始时间戳(毫秒)，包含该时间
+        end_timestamp (int, optional): 结束时间戳(毫秒)，包含该时间
+        as_frame (bool): 是否返回DataFrame
 
-    # 去重并按时间排序
-    unique_ohlcv = []
-    timestamps = set()
+    Returns:
+        list | pd.DataFrame: 按时间升序排列且时间戳唯一的K线数据
+    """
+    if len(ohlcv_data) == 0:
+        return ohlcv_to_frame([]) if as_frame else []
 
-    for candle in all_ohlcv:
-        if candle[0] not in timestamps:
-            timestamps.add(candle[0])
-            unique_ohlcv.append(candle)
+    timestamps = np.fromiter((candle[0] for candle in ohlcv_data), dtype=np.int64, count=len(ohlcv_data))
 
-    unique_ohlcv.sort(key=lambda x: x[0])
+    # np.unique在return_index时使用稳定排序，返回每个时间戳第一次出现的位置
+    unique_timestamps, first_index = np.unique(timestamps, return_index=True)
 
-    # 过滤结束日期之后的数据
-    filtered_ohlcv = [candle for candle in unique_ohlcv if candle[0] <= end_timestamp]
+    begin = 0 if start_timestamp is None else np.searchsorted(unique_timestamps, start_timestamp, side='left')
+    end = len(unique_timestamps) if end_timestamp is None else np.searchsorted(
+        unique_timestamps, end_timestamp, side='right')
 
-    logger.info(f"共获取 {len(filtered_ohlcv)} 条有效K线数据")
-    return filtered_ohlcv
+    unique_ohlcv = [ohlcv_data[i] for i in first_index[begin:end].tolist()]
+    return ohlcv_to_frame(unique_ohlcv) if as_frame else unique_ohlcv
 
 
-def save_to_csv(ohlcv_data, symbol, timeframe, data_dir=None):
-    """将K线数据保存为CSV文件
+def get_data_file_path(symbol, timeframe, data_dir=None, storage_format='csv'):
+    """获取交易对K线数据文件的路径
     
     Args:
-        ohlcv_data (list): K线数据列表
         symbol (str): 交易对，如 'ETH/USDT'
         timeframe (str): K线周期，如 '1h', '1d'
         data_dir (str, optional): 保存数据的目录
+        storage_format (str): 存储格式，决定文件扩展名
         
     Returns:
-        str: CSV文件的路径
+        str: 数据文件的路径
     """
     # 确保数据目录存在
     data_dir = ensure_data_dir(data_dir)
 
-    # 处理符号名称，替换/为-
-    symbol_filename = symbol.replace('/', '-')
-    symbol_filename = symbol_filename.replace(':', '-')
+    # 处理符号名称，替换/和:为-
+    symbol_filename = symbol_to_filename(symbol)
 
     # 构建文件名
-    filename = f"{symbol_filename}_{timeframe}.csv"
-    file_path = os.path.join(data_dir, filename)
+    filename = f"{symbol_filename}_{timeframe}{get_storage(storage_format).extension}"
+    return os.path.join(data_dir, filename)
 
-    # 将数据转换为DataFrame
-    df = pd.DataFrame(ohlcv_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
 
-    # 添加日期时间列
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+def save_to_csv(ohlcv_data, symbol, timeframe, data_dir=None):
+    """将K线数据保存为CSV文件
+    
+    Args:
+        ohlcv_data (list | pd.DataFrame): K线数据列表
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        data_dir (str, optional): 保存数据的目录
+        
+    Returns:
+        str: CSV文件的路径
+    """
+    file_path = get_data_file_path(symbol, timeframe, data_dir)
 
     # 保存为CSV
     logger.info(f"保存数据到文件: {file_path}")
-    df.to_csv(file_path, index=False)
+    get_storage('csv').write(ohlcv_to_frame(ohlcv_data), file_path)
 
     return file_path
 
 
+def save_data(ohlcv_data, symbol, timeframe, data_dir=None, storage_format=None):
+    """按配置的存储格式保存K线数据
+    
+    Args:
+        ohlcv_data (list | pd.DataFrame): K线数据列表
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        data_dir (str, optional): 保存数据的目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        
+    Returns:
+        str: 数据文件的路径
+    """
+    if storage_format is None:
+        storage_format = data_config.get('storage_format', 'csv')
+
+    if storage_format == 'csv':
+        return save_to_csv(ohlcv_data, symbol, timeframe, data_dir)
+
+    file_path = get_data_file_path(symbol, timeframe, data_dir, storage_format)
+
+    logger.info(f"保存数据到文件: {file_path}")
+    get_storage(storage_format).write(ohlcv_to_frame(ohlcv_data), file_path)
+
+    return file_path
+
+
+def load_data(symbol, timeframe, data_dir=None, columns=None, storage_format=None):
+    """读取已保存的K线数据
+    
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        data_dir (str, optional): 保存数据的目录
+        columns (list, optional): 只读取指定的列，如 ['timestamp', 'close']
+        storage_format (str, optional): 存储格式，默认读取配置
+        
+    Returns:
+        pd.DataFrame: K线数据
+    """
+    if storage_format is None:
+        storage_format = data_config.get('storage_format', 'csv')
+
+    file_path = get_data_file_path(symbol, timeframe, data_dir, storage_format)
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"数据文件不存在: {file_path}")
+
+    return get_storage(storage_format).read(file_path, columns=columns)
+
+
+def export_to_csv(symbol, timeframe, data_dir=None, export_dir=None, storage_format=None):
+    """将列式存储的K线数据导出为CSV文件
+    
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        data_dir (str, optional): 保存数据的目录
+        export_dir (str, optional): 导出目录，默认与数据目录相同
+        storage_format (str, optional): 源数据的存储格式，默认读取配置
+        
+    Returns:
+        str: 导出的CSV文件路径
+    """
+    df = load_data(symbol, timeframe, data_dir, storage_format=storage_format)
+    return save_to_csv(df, symbol, timeframe, export_dir if export_dir is not None else data_dir)
+
+
+def read_last_timestamp(file_path):
+    """读取数据文件中最后一条K线的时间戳，CSV文件只读取文件末尾而不解析整个文件
+    
+    Args:
+        file_path (str): 数据文件路径
+        
+    Returns:
+        int: 最后一条K线的时间戳(毫秒)，文件不存在或没有数据时返回None
+    """
+    return get_storage_for_path(file_path).last_timestamp(file_path)
+
+
+def append_to_csv(ohlcv_data, file_path, since):
+    """将增量K线数据合并到已有的CSV文件
+    
+    文件中时间戳不早于since的行会被新数据替换，其余行保持不变，
+    只截断并追加文件末尾，不重写整个文件。
+    
+    Args:
+        ohlcv_data (list | pd.DataFrame): 从since开始获取的K线数据列表
+        file_path (str): 已有的CSV文件路径
+        since (int): 增量数据的起始时间戳(毫秒)
+        
+    Returns:
+        str: CSV文件的路径
+    """
+    logger.info(f"追加 {len(ohlcv_data)} 条数据到文件: {file_path}")
+    return get_storage('csv').append(ohlcv_to_frame(ohlcv_data), file_path, since)
+
+
+def _fetch_and_append(exchange, symbol, timeframe, end_date, store, last_timestamp, overlap,
+                      fetch_options, streaming=False):
+    """从已保存的最后一条K线开始增量获取数据并合并到数据仓库"""
+    # 重新获取末尾的overlap条K线，以修复最后一条尚未走完的K线
+    since = last_timestamp - (max(overlap, 1) - 1) * timeframe_to_ms(timeframe)
+
+    if end_date and to_timestamp_ms(end_date) <= since:
+        logger.info(f"{store.path} 已包含结束日期之前的全部数据，无需更新")
+        return store.path
+
+    logger.info(f"增量更新 {symbol} {timeframe}，从 {datetime.fromtimestamp(since / 1000)} 开始")
+    if streaming:
+        return fetch_and_stream(exchange, symbol, timeframe, since, end_date, store, since, **fetch_options)
+
+    ohlcv_data = fetch_full_history(exchange, symbol, timeframe, since, end_date, **fetch_options)
+
+    if not ohlcv_data:
+        logger.warning("没有获取到增量数据，文件保持不变")
+        return store.path
+
+    logger.info(f"追加 {len(ohlcv_data)} 条数据到: {store.path}")
+    return store.append(ohlcv_data, since)
+
+
 def fetch_and_save_data(symbol=None, timeframe=None, start_date=None, end_date=None,
-                        exchange_id=None, data_dir=None, config=None):
+                        exchange_id=None, data_dir=None, config=None, incremental=None, overlap=None,
+                        fetch_options=None, storage_format=None, layout=None, streaming=None, exchange=None):
     """获取并保存历史K线数据
     
     Args:
@@ -227,9 +723,16 @@ def fetch_and_save_data(symbol=None, timeframe=None, start_date=None, end_date=N
         exchange_id (str): 交易所ID
         data_dir (str, optional): 保存数据的目录
         config (dict, optional): 交易所API配置
+        incremental (bool, optional): 是否从已有文件的最后一条K线开始增量更新，默认读取配置
+        overlap (int, optional): 增量更新时重新获取的末尾K线数量，默认读取配置
+        fetch_options (dict, optional): 传给fetch_full_history的额外参数，如rate_limiter
+        storage_format (str, optional): 存储格式，如 'csv', 'parquet', 'feather'，默认读取配置
+        layout (str, optional): 存储布局，'flat' 为单文件，'partitioned' 为按月分区，默认读取配置
+        streaming (bool, optional): 是否流式获取并分块写入，不在内存中保留完整历史，默认读取配置
+        exchange (ccxt.Exchange, optional): 复用的交易所API实例，市场信息已加载时不再重新加载
         
     Returns:
-        str: 保存的CSV文件路径
+        str: 保存的数据文件路径，分区布局下为分区目录
     """
     try:
         # 使用配置文件中的默认值
@@ -241,25 +744,72 @@ def fetch_and_save_data(symbol=None, timeframe=None, start_date=None, end_date=N
             
         if exchange_id is None:
             exchange_id = data_config.get('exchange_id', 'okx')
-            
-        # 获取交易所实例
-        exchange = get_exchange(exchange_id, config)
 
-        # 加载市场
-        exchange.load_markets()
+        if incremental is None:
+            incremental = data_config.get('incremental', False)
+
+        if overlap is None:
+            overlap = data_config.get('incremental_overlap', 1)
+
+        if fetch_options is None:
+            fetch_options = {}
+
+        # 分片获取时各工作线程按同一配置从客户端池取得交易所实例
+        fetch_options = {'config': config, **fetch_options}
 
-        # 检查交易对是否存在
-        if symbol not in exchange.symbols:
+        if storage_format is None:
+            storage_format = data_config.get('storage_format', 'csv')
+
+        if layout is None:
+            layout = data_config.get('storage_layout', LAYOUT_FLAT)
+
+        if streaming is None:
+            streaming = data_config.get('streaming', False)
+            
+        if exchange is None and pool_enabled():
+            exchange = get_pooled_exchange(exchange_id, config)
+
+        if exchange is not None:
+            # 复用的交易所实例优先使用已加载或缓存的市场信息
+            ensure_markets(exchange)
+        else:
+            # 获取交易所实例
+            exchange = get_exchange(exchange_id, config)
+
+            # 加载市场
+            exchange.load_markets()
+
+        # 检查交易对是否存在，支持市场ID等别名
+        symbol_index = get_symbol_index(exchange)
+        resolved_symbol = symbol_index.resolve(symbol)
+        if resolved_symbol is None:
             logger.error(f"交易对 {symbol} 在交易所 {exchange_id} 中不存在")
-            available_symbols = exchange.symbols[:10]  # 获取前10个可用交易对
-            logger.info(f"可用交易对示例: {available_symbols}")
+            logger.info(f"相近的交易对: {symbol_index.suggest(symbol)}")
             raise ValueError(f"交易对 {symbol} 在交易所 {exchange_id} 中不存在")
+        symbol = resolved_symbol
+
+        store = open_store(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+
+        # 增量模式下，如果已有数据则只获取缺失的末尾数据
+        if incremental:
+            last_timestamp = store.last_timestamp()
+            if last_timestamp is not None:
+                return _fetch_and_append(exchange, symbol, timeframe, end_date,
+                                         store, last_timestamp, overlap, fetch_options, streaming)
+
+        # 流式模式下边获取边写入
+        if streaming:
+            return fetch_and_stream(exchange, symbol, timeframe, start_date, end_date, store, **fetch_options)
 
         # 获取完整历史数据
-        ohlcv_data = fetch_full_history(exchange, symbol, timeframe, start_date, end_date)
+        ohlcv_data = fetch_full_history(exchange, symbol, timeframe, start_date, end_date, **fetch_options)
+
+        # 分区布局只重写受影响的分区
+        if layout == LAYOUT_PARTITIONED:
+            return store.write(ohlcv_data)
 
-        # 保存为CSV
-        file_path = save_to_csv(ohlcv_data, symbol, timeframe, data_dir)
+        # 按配置的存储格式保存
+        file_path = save_data(ohlcv_data, symbol, timeframe, data_dir, storage_format)
 
         return file_path
 
@@ -0,0 +1,79 @@
+"""数据哈希模块，按K线各列的取值计算与存储格式无关的内容哈希"""
+
+import hashlib
+
+import numpy as np
+
+# 计算数据哈希时包含的列，缺少的列跳过
+HASH_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def hash_data(data, columns=HASH_COLUMNS):
+    """K线数据内容的哈希
+
+    只与各列的取值有关，同一段K线无论来自哪个文件、以何种格式保存都得到相同的哈希。
+
+    Args:
+        data (pd.DataFrame | dict | SharedOHLCV): K线数据
+        columns (tuple): 参与哈希的列
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for column in columns:
+        try:
+            values = data[column]
+        except KeyError:
+            continue
+        array = np.ascontiguousarray(np.asarray(values, dtype=np.int64 if column == 'timestamp' else np.float64))
+        digest.update(column.encode('utf-8'))
+        digest.update(array.view(np.uint8))
+    return digest.hexdigest()
+
+
+# 链式哈希每块的行数
+HASH_BLOCK_ROWS = 4096
+
+
+def _rows(data, columns, begin, end):
+    """取各列的第[begin, end)行"""
+    rows = {}
+    for column in columns:
+        try:
+            rows[column] = np.asarray(data[column])[begin:end]
+        except KeyError:
+            continue
+    return rows
+
+
+def _link(digest, data, columns):
+    """把一段数据的哈希接在已有的链式哈希之后"""
+    return hashlib.blake2b(f"{digest}:{hash_data(data, columns)}".encode('utf-8'), digest_size=16).hexdigest()
+
+
+def chain_hash(data, columns=HASH_COLUMNS, state=None, block_rows=HASH_BLOCK_ROWS):
+    """按固定行数分块的链式哈希，数据在末尾追加后可以从上次的状态继续计算
+
+    整块依次链接，最后不足一块的行接在末尾。结果只与内容有关，与分几次追加无关；传入上次返回的状态时只哈希
+    最后一个整块之后的行，追加的代价为 O(新增行数 + 一块)。
+
+    Args:
+        data (pd.DataFrame | dict): K线数据，从第0行开始的全部行
+        columns (tuple): 参与哈希的列
+        state (dict, optional): 上次返回的状态，调用方需保证状态覆盖的行没有变化
+        block_rows (int): 每块的行数
+
+    Returns:
+        tuple: (十六进制哈希值, 状态)
+    """
+    done, digest = (state['rows'], state['digest']) if state else (0, '')
+    length = len(np.asarray(data['timestamp']))
+    full = length - length % block_rows
+    for begin in range(done, full, block_rows):
+        digest = _link(digest, _rows(data, columns, begin, begin + block_rows), columns)
+
+    state = {'rows': max(full, done), 'digest': digest}
+    if full < length:
+        digest = _link(digest, _rows(data, columns, full, length), columns)
+    return digest, state
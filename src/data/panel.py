@@ -0,0 +1,192 @@
+"""面板数据模块，把多个交易对的K线按统一的时间索引对齐为 时间 × 交易对 × 字段 的稠密数组"""
+
+import numpy as np
+import pandas as pd
+
+from src.log import get_logger
+from src.data.store import load_ohlcv
+from src.data.time_utils import timeframe_to_ms
+
+# 获取配置好的logger
+logger = get_logger()
+
+# 面板默认包含的字段
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+# 缺失K线的处理方式：保留NaN，或用上一根收盘价填充价格、成交量记为0
+FILL_NONE = None
+FILL_FORWARD = 'ffill'
+
+# 前向填充时价格字段取上一根的收盘价
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+
+def forward_fill(values):
+    """沿时间轴(第0维)向量化地前向填充NaN，首个有效值之前保持NaN
+
+    Args:
+        values (np.ndarray): 形状为(T, ...)的数组
+
+    Returns:
+        np.ndarray: 填充后的新数组
+    """
+    valid = ~np.isnan(values)
+    index = np.where(valid, np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1)), 0)
+    np.maximum.accumulate(index, axis=0, out=index)
+    # 首个有效值之前的位置取第0行，仍为NaN
+    return np.take_along_axis(values, index, axis=0)
+
+
+class Panel:
+    """
+    对齐后的多交易对K线面板
+
+    所有交易对共用timestamps索引，每个字段是一个连续存放的 (时间, 交易对) 矩阵，values为 (时间, 交易对, 字段)
+    形状的视图；mask标记每个交易对在该时刻是否有真实的K线，缺失的K线按构建时的填充方式保留为NaN或前向填充，
+    可以通过mask区分。
+    """
+
+    def __init__(self, timestamps, symbols, fields, data, mask):
+        """初始化面板
+
+        Args:
+            timestamps (np.ndarray): 升序的毫秒时间戳
+            symbols (list): 交易对列表
+            fields (tuple): 字段名
+            data (np.ndarray): 形状为(字段, 时间, 交易对)的数据
+            mask (np.ndarray): 形状为(时间, 交易对)的布尔数组，真实K线为True
+        """
+        self.timestamps = timestamps
+        self.symbols = list(symbols)
+        self.fields = tuple(fields)
+        self.data = data
+        self.mask = mask
+
+    @property
+    def values(self):
+        """形状为(时间, 交易对, 字段)的视图"""
+        return self.data.transpose(1, 2, 0)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, field):
+        """某个字段的 (时间, 交易对) 矩阵"""
+        if field == 'timestamp':
+            return self.timestamps
+        if field not in self.fields:
+            raise KeyError(f"面板中没有字段: {field}")
+        return self.data[self.fields.index(field)]
+
+    def symbol_index(self, symbol):
+        return self.symbols.index(symbol)
+
+    def to_frame(self, field):
+        """某个字段的宽表，索引为时间戳，列为交易对"""
+        return pd.DataFrame(self[field], index=pd.Index(self.timestamps, name='timestamp'), columns=self.symbols)
+
+
+def build_panel(frames, fields=PANEL_FIELDS, timeframe=None, fill=FILL_NONE):
+    """把多个交易对的K线一次对齐为面板
+
+    所有交易对的时间戳拼接后只做一次去重排序和一次searchsorted(完整周期网格时直接按周期换算行号)，每个字段再用一次花式索引散布到稠密矩阵，
+    不逐个交易对合并。
+
+    Args:
+        frames (dict): {交易对: 含timestamp和各字段的K线数据}
+        fields (tuple): 面板包含的字段
+        timeframe (str, optional): 指定时时间索引为从最早到最晚的完整周期网格，缺失的K线也占一行；
+            未指定时为所有交易对时间戳的并集
+        fill (str, optional): 缺失K线的处理方式，None保留NaN，'ffill'价格用上一根收盘价填充、成交量为0
+
+    Returns:
+        Panel: 面板数据
+    """
+    if fill not in (FILL_NONE, FILL_FORWARD):
+        raise ValueError(f"不支持的缺失K线处理方式: {fill}")
+
+    symbols = list(frames)
+    fields = tuple(fields)
+    timestamps = [np.asarray(frames[symbol]['timestamp'], dtype=np.int64) for symbol in symbols]
+    lengths = np.array([len(ts) for ts in timestamps], dtype=np.int64)
+    all_timestamps = np.concatenate(timestamps) if timestamps else np.empty(0, dtype=np.int64)
+
+    if timeframe is not None and len(all_timestamps):
+        step = timeframe_to_ms(timeframe)
+        first = all_timestamps.min()
+        offset = all_timestamps - first
+        if (offset % step).any():
+            raise ValueError(f"存在未对齐到 {timeframe} 周期的时间戳")
+        index = np.arange(first, all_timestamps.max() + step, step, dtype=np.int64)
+        rows = offset // step
+    else:
+        index = np.unique(all_timestamps)
+        rows = np.searchsorted(index, all_timestamps)
+
+    # 每条K线在 (时间, 交易对) 矩阵中的平坦位置，所有字段共用
+    flat = rows * len(symbols) + np.repeat(np.arange(len(symbols)), lengths)
+    data = np.full((len(fields), len(index), len(symbols)), np.nan)
+    mask = np.zeros((len(index), len(symbols)), dtype=bool)
+    mask.reshape(-1)[flat] = True
+    for k, field in enumerate(fields):
+        if symbols:
+            data[k].reshape(-1)[flat] = np.concatenate([np.asarray(frames[symbol][field], dtype=np.float64)
+                                                        for symbol in symbols])
+
+    panel = Panel(index, symbols, fields, data, mask)
+    if fill == FILL_FORWARD:
+        _fill_missing(panel)
+    return panel
+
+
+def _fill_missing(panel):
+    """缺失K线的价格字段取上一根真实K线的收盘价，成交量记为0"""
+    if 'close' not in panel.fields:
+        raise ValueError("前向填充需要close字段")
+    missing = ~panel.mask
+    last_close = forward_fill(np.where(panel.mask, panel['close'], np.nan))
+    for field in panel.fields:
+        column = panel[field]
+        if field in PRICE_FIELDS:
+            column[missing] = last_close[missing]
+        elif field == 'volume':
+            column[missing] = 0.0
+
+
+def load_panel(symbols, timeframe, start=None, end=None, fields=PANEL_FIELDS, fill=FILL_NONE, full_index=False,
+               exchange_id=None, data_dir=None, storage_format=None, layout=None):
+    """读取多个交易对已保存的K线并对齐为面板
+
+    Args:
+        symbols (list): 交易对列表
+        timeframe (str): K线周期，如 '1h'
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        fields (tuple): 面板包含的字段
+        fill (str, optional): 缺失K线的处理方式，None或'ffill'
+        full_index (bool): 为True时时间索引为完整的周期网格，否则为所有交易对时间戳的并集
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+
+    Returns:
+        Panel: 面板数据，没有保存数据的交易对不包含在内
+    """
+    columns = ['timestamp'] + list(fields)
+    frames = {}
+    for symbol in symbols:
+        try:
+            frames[symbol] = load_ohlcv(symbol, timeframe, start, end, exchange_id, columns=columns,
+                                        data_dir=data_dir, storage_format=storage_format, layout=layout)
+        except FileNotFoundError:
+            logger.warning(f"{symbol} {timeframe} 没有已保存的数据，不包含在面板中")
+
+    panel = build_panel(frames, fields, timeframe if full_index else None, fill)
+    logger.info(f"面板共 {len(panel.symbols)} 个交易对、{len(panel)} 个时间点，"
+                f"缺失K线占比 {1 - panel.mask.mean() if panel.mask.size else 0:.2%}")
+    return panel
@@ -0,0 +1,219 @@
+"""请求频率限制模块，为同一交易所的所有请求提供共享的令牌桶和失败重试的退避策略"""
+
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+
+import ccxt
+import requests
+
+from src.manager import SystemManager, ConfigManager
+
+# 读取数据配置
+data_config = ConfigManager(SystemManager()).read_config('data_config.json')
+
+# 各交易所共享的频率限制器
+_RATE_LIMITERS = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
+# 各接口每次请求消耗的令牌数，可以在配置的 rate_limit.weights 中覆盖
+ENDPOINT_WEIGHTS = {
+    'fetch_ohlcv': 1,
+    'fetch_trades': 1,
+    'fetch_funding_rate_history': 1,
+    'fetch_open_interest_history': 1,
+    'load_markets': 5,
+}
+
+# 需要暂停所有请求的限流错误
+RATE_LIMIT_ERRORS = (ccxt.RateLimitExceeded, ccxt.DDoSProtection)
+
+
+def endpoint_weight(endpoint):
+    """获取接口每次请求消耗的令牌数
+
+    Args:
+        endpoint (str): 接口名，如 'fetch_ohlcv'
+
+    Returns:
+        float: 令牌数，未配置的接口为1
+    """
+    weights = dict(ENDPOINT_WEIGHTS)
+    weights.update(data_config.get('rate_limit', {}).get('weights', {}))
+    return weights.get(endpoint, 1)
+
+
+class RateLimiter:
+    """线程安全的令牌桶频率限制器
+
+    令牌以每interval秒一个的速度补充，最多积累capacity个，允许空闲后短时间内突发请求。
+    多个线程共享同一个限制器时共享同一份频率预算。
+    收到限流响应时可以调用penalize暂停所有使用该限制器的请求。
+    """
+
+    def __init__(self, interval, capacity=None):
+        """初始化频率限制器
+
+        Args:
+            interval (float): 补充一个令牌所需的秒数，即持续请求时的平均间隔
+            capacity (float, optional): 令牌桶容量，即允许的最大突发请求数，默认读取配置
+        """
+        if capacity is None:
+            capacity = data_config.get('rate_limit', {}).get('burst', 1)
+
+        self.interval = max(float(interval), 0.0)
+        self.capacity = max(float(capacity), 1.0)
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def _reserve(self, weight):
+        """预留令牌，返回需要等待的秒数
+
+        令牌不足时余额记为负数，后续请求依次排在其后等待。
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.interval > 0:
+                refill = (now - self._updated) / self.interval
+                self._tokens = min(self._tokens + refill, self.capacity)
+            self._updated = now
+
+            if self.interval <= 0:
+                wait = 0.0
+            else:
+                self._tokens -= weight
+                wait = max(-self._tokens * self.interval, 0.0)
+
+            return max(wait, self._blocked_until - now)
+
+    def acquire(self, weight=1):
+        """获取请求许可，必要时阻塞等待
+
+        Args:
+            weight (float): 本次请求消耗的令牌数
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self._reserve(weight)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, weight=1):
+        """获取请求许可，必要时在事件循环中等待而不阻塞线程
+
+        Args:
+            weight (float): 本次请求消耗的令牌数
+
+        Returns:
+            float: 实际等待的秒数
+        """
+        wait = self._reserve(weight)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, delay):
+        """在delay秒内暂停所有使用该限制器的请求，并清空已积累的令牌
+
+        Args:
+            delay (float): 暂停的秒数
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._blocked_until = max(self._blocked_until, now + delay)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, now)
+
+
+class RetryPolicy:
+    """失败重试策略：指数退避加随机抖动，优先遵循交易所返回的Retry-After"""
+
+    def __init__(self, max_retries=None, base_delay=None, max_delay=None):
+        """初始化重试策略
+
+        Args:
+            max_retries (int, optional): 最大重试次数，默认读取配置
+            base_delay (float, optional): 第一次重试的基础等待秒数，默认读取配置
+            max_delay (float, optional): 单次等待的最大秒数，默认读取配置
+        """
+        retry_config = data_config.get('retry', {})
+        self.max_retries = max_retries if max_retries is not None else retry_config.get('max_retries', 5)
+        self.base_delay = base_delay if base_delay is not None else retry_config.get('base_delay', 1)
+        self.max_delay = max_delay if max_delay is not None else retry_config.get('max_delay', 60)
+
+    def delay(self, attempt, retry_after=None):
+        """第attempt次重试(从0开始)前的等待秒数
+
+        有Retry-After时按其等待，否则在[0, base_delay * 2^attempt]内随机取值(full jitter)，
+        避免多个请求同时重试。
+        """
+        if retry_after is not None:
+            return min(max(retry_after, 0.0), self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+def is_retryable(error):
+    """错误是否可以重试
+
+    只有ccxt的网络错误(包括超时和限流)以及连接层的错误(OSError、requests的请求异常)可以重试；
+    交易对不存在、参数错误、鉴权失败等交易所错误和代码中的其他异常重试也不会成功。
+    """
+    return isinstance(error, (ccxt.NetworkError, OSError, requests.RequestException))
+
+
+def retry_after_seconds(exchange, error=None):
+    """从交易所最近一次响应的Retry-After头中读取需要等待的秒数
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        error (Exception, optional): 请求抛出的错误，只有限流错误才读取Retry-After
+
+    Returns:
+        float: 需要等待的秒数，没有Retry-After时返回None
+    """
+    if error is not None and not isinstance(error, RATE_LIMIT_ERRORS):
+        return None
+
+    headers = getattr(exchange, 'last_response_headers', None)
+    if not isinstance(headers, dict):
+        return None
+
+    value = next((v for k, v in headers.items() if str(k).lower() == 'retry-after'), None)
+    if value is None:
+        return None
+
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        pass
+
+    # Retry-After也可以是HTTP日期
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def get_rate_limiter(exchange_id, interval, capacity=None):
+    """获取交易所共享的频率限制器，不存在时创建
+
+    Args:
+        exchange_id (str): 交易所ID
+        interval (float): 补充一个令牌所需的秒数，仅在创建时使用
+        capacity (float, optional): 令牌桶容量，仅在创建时使用，默认读取配置
+
+    Returns:
+        RateLimiter: 频率限制器
+    """
+    with _RATE_LIMITERS_LOCK:
+        limiter = _RATE_LIMITERS.get(exchange_id)
+        if limiter is None:
+            limiter = RateLimiter(interval, capacity)
+            _RATE_LIMITERS[exchange_id] = limiter
+        return limiter
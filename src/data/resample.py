@@ -0,0 +1,173 @@
+"""K线重采样模块，由已保存的细粒度K线合成更大周期的K线"""
+
+import numpy as np
+import pandas as pd
+
+from src.log import get_logger
+from src.manager import SystemManager, ConfigManager
+from src.data.storage import ohlcv_to_frame, OHLCV_COLUMNS
+from src.data.store import open_store
+from src.data.time_utils import timeframe_to_ms, TIMEFRAME_UNIT_MS
+
+# 读取数据配置
+data_config = ConfigManager(SystemManager()).read_config('data_config.json')
+
+# 获取配置好的logger
+logger = get_logger()
+
+# 周线从周一00:00(UTC)开始，1970-01-01是周四，之后的第一个周一是1970-01-05
+WEEK_OFFSET_MS = 4 * TIMEFRAME_UNIT_MS['d']
+
+
+def bar_start(timestamps, timeframe):
+    """计算每个时间戳所属K线的起始时间
+
+    按数据规范，K线的时间戳T代表[T, T+F)时间段，所有周期都按UTC对齐，周线从周一开始。
+
+    Args:
+        timestamps (np.ndarray): 毫秒时间戳数组
+        timeframe (str): K线周期，如 '5m', '1h', '1w'
+
+    Returns:
+        np.ndarray: 每个时间戳所属K线的起始时间戳(毫秒)
+    """
+    if timeframe[-1] in ('M', 'y'):
+        raise ValueError(f"不支持按自然月或自然年重采样: {timeframe}")
+
+    timeframe_ms = timeframe_to_ms(timeframe)
+    offset = WEEK_OFFSET_MS if timeframe[-1] == 'w' else 0
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return (timestamps - offset) // timeframe_ms * timeframe_ms + offset
+
+
+def _check_timeframes(source_timeframe, target_timeframe):
+    """目标周期必须是源周期的整数倍"""
+    source_ms = timeframe_to_ms(source_timeframe)
+    target_ms = timeframe_to_ms(target_timeframe)
+    if target_ms < source_ms or target_ms % source_ms != 0:
+        raise ValueError(f"无法由 {source_timeframe} 合成 {target_timeframe}，目标周期必须是源周期的整数倍")
+    return target_ms // source_ms
+
+
+def resample_ohlcv(data, target_timeframe, source_timeframe='1m', complete_only=False):
+    """将K线数据重采样为更大的周期
+
+    开盘价取第一根、最高价取最大值、最低价取最小值、收盘价取最后一根、成交量求和，
+    使用np.ufunc.reduceat按组聚合，不逐组循环。
+
+    Args:
+        data (list | pd.DataFrame): 源周期的K线数据
+        target_timeframe (str): 目标周期，如 '1h'
+        source_timeframe (str): 源周期，如 '1m'
+        complete_only (bool): 是否去掉首尾不完整的K线，如数据起始于周期中间或最后一根尚未走完
+
+    Returns:
+        pd.DataFrame: 目标周期的K线数据
+    """
+    bars_per_target = _check_timeframes(source_timeframe, target_timeframe)
+
+    df = ohlcv_to_frame(data)
+    if df.empty:
+        return df
+
+    timestamps = df['timestamp'].to_numpy()
+    if not (np.diff(timestamps) > 0).all():
+        df = df.drop_duplicates('timestamp', keep='last').sort_values('timestamp', kind='stable')
+        timestamps = df['timestamp'].to_numpy()
+
+    starts_ts = bar_start(timestamps, target_timeframe)
+    starts = np.flatnonzero(np.r_[True, starts_ts[1:] != starts_ts[:-1]])
+    ends = np.r_[starts[1:], len(df)]
+
+    result = pd.DataFrame({
+        'timestamp': starts_ts[starts],
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends - 1],
+        'volume': np.add.reduceat(df['volume'].to_numpy(), starts),
+    }, columns=OHLCV_COLUMNS)
+
+    if complete_only:
+        # 中间缺少的源K线是交易所数据缺口，只去掉首尾不完整的K线
+        counts = ends - starts
+        keep = np.ones(len(result), dtype=bool)
+        keep[0] &= counts[0] == bars_per_target
+        keep[-1] &= counts[-1] == bars_per_target
+        result = result[keep]
+
+    return result.reset_index(drop=True)
+
+
+def resample_store(symbol, target_timeframe, source_timeframe='1m', exchange_id=None, data_dir=None,
+                   storage_format=None, layout=None, incremental=True):
+    """由已保存的源周期K线合成目标周期K线并保存
+
+    增量模式下只读取目标周期最后一根K线开始之后的源数据，重新计算并替换末尾的K线，
+    源数据追加后只更新受影响的末尾K线。非增量模式读取全部源数据重新合成，替换目标中从第一根合成K线开始的数据，
+    更早的目标K线(如源数据已被清理的部分)保留不变。
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        target_timeframe (str): 目标周期，如 '1h'
+        source_timeframe (str): 源周期，如 '1m'
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        incremental (bool): 是否只更新末尾的K线，为False时按全部源数据重新合成
+
+    Returns:
+        str: 目标周期的数据路径
+    """
+    _check_timeframes(source_timeframe, target_timeframe)
+
+    source = open_store(symbol, source_timeframe, exchange_id, data_dir, storage_format, layout)
+    target = open_store(symbol, target_timeframe, exchange_id, data_dir, storage_format, layout)
+
+    if not source.exists():
+        raise FileNotFoundError(f"源周期数据不存在: {source.path}")
+
+    since = target.last_timestamp() if incremental else None
+    source_df = source.load(start=since)
+    resampled = resample_ohlcv(source_df, target_timeframe, source_timeframe)
+
+    if resampled.empty:
+        logger.info(f"{symbol} {source_timeframe} 没有新的数据，{target_timeframe} 保持不变")
+        return target.path
+
+    if since is None:
+        logger.info(f"由 {source_timeframe} 合成 {symbol} {target_timeframe}，共 {len(resampled)} 条")
+        if target.exists():
+            # 替换源数据覆盖范围内的K线，早于源数据的已有K线保留
+            return target.append(resampled, int(resampled['timestamp'].iloc[0]))
+        return target.write(resampled)
+
+    logger.info(f"增量更新 {symbol} {target_timeframe}，重新计算 {len(resampled)} 条")
+    return target.append(resampled, since)
+
+
+def resample_timeframes(symbol, target_timeframes=None, source_timeframe=None, **kwargs):
+    """由同一份源周期数据合成多个目标周期
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        target_timeframes (list, optional): 目标周期列表，默认读取配置
+        source_timeframe (str, optional): 源周期，默认读取配置
+        **kwargs: 传给resample_store的参数
+
+    Returns:
+        dict: {目标周期: 数据路径}
+    """
+    resample_config = data_config.get('resample', {})
+    if source_timeframe is None:
+        source_timeframe = resample_config.get('source_timeframe', '1m')
+    if target_timeframes is None:
+        target_timeframes = resample_config.get('targets', [])
+
+    return {timeframe: resample_store(symbol, timeframe, source_timeframe, **kwargs)
+            for timeframe in target_timeframes if timeframe != source_timeframe}
+
+
+if __name__ == "__main__":
+    resample_timeframes(data_config.get("symbol", "ETH/USDT"), exchange_id=data_config.get("exchange_id", "okx"))
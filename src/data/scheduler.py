@@ -0,0 +1,270 @@
+"""批量下载调度模块，并发执行多个交易对/周期的K线下载任务"""
+
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from src.data.get_data import data_config, logger, fetch_and_save_data, get_exchange
+from src.data.rate_limiter import get_rate_limiter
+from src.data.exchange_pool import get_pooled_exchange, ensure_markets, pool_enabled
+from src.data.symbols import get_symbol_index
+
+# 任务状态
+JOB_PENDING = 'pending'
+JOB_RUNNING = 'running'
+JOB_DONE = 'done'
+JOB_FAILED = 'failed'
+
+
+class DownloadJob:
+    """单个K线下载任务"""
+
+    def __init__(self, symbol, timeframe, start_date=None, end_date=None, exchange_id=None, incremental=None):
+        """初始化下载任务
+
+        Args:
+            symbol (str): 交易对，如 'ETH/USDT'
+            timeframe (str): K线周期，如 '1h', '1d'
+            start_date (str | int, optional): 起始日期
+            end_date (str | int, optional): 结束日期
+            exchange_id (str, optional): 交易所ID，默认读取配置
+            incremental (bool, optional): 是否增量更新，默认读取配置
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.start_date = start_date
+        self.end_date = end_date
+        self.exchange_id = exchange_id or data_config.get('exchange_id', 'okx')
+        self.incremental = incremental
+
+        # 运行状态
+        self.status = JOB_PENDING
+        self.attempts = 0
+        self.progress = 0.0
+        self.rows = 0
+        self.file_path = None
+        self.error = None
+
+    @property
+    def name(self):
+        """任务名称"""
+        return f"{self.exchange_id}:{self.symbol}:{self.timeframe}"
+
+    def __repr__(self):
+        return f"DownloadJob({self.name}, status={self.status}, progress={self.progress:.0%})"
+
+
+def load_jobs_from_config(config=None):
+    """从数据配置中读取下载任务列表
+
+    配置中的jobs为任务列表，每个任务可以用symbols/timeframes指定多个交易对和周期，
+    会展开为所有组合；没有jobs时使用配置顶层的symbol/timeframe生成单个任务。
+
+    Args:
+        config (dict, optional): 数据配置，默认为全局数据配置
+
+    Returns:
+        list: DownloadJob列表
+    """
+    if config is None:
+        config = data_config
+
+    job_specs = config.get('jobs') or [{}]
+    jobs = []
+
+    for spec in job_specs:
+        symbols = spec.get('symbols') or [spec.get('symbol', config.get('symbol', 'ETH/USDT'))]
+        timeframes = spec.get('timeframes') or [spec.get('timeframe', config.get('timeframe', '1h'))]
+        exchange_id = spec.get('exchange_id', config.get('exchange_id', 'okx'))
+        start_date = spec.get('start_date', spec.get('start_time', config.get('start_time')))
+        end_date = spec.get('end_date', spec.get('end_time', config.get('end_time')))
+
+        for symbol in symbols:
+            for timeframe in timeframes:
+                jobs.append(DownloadJob(symbol, timeframe, start_date, end_date, exchange_id,
+                                        spec.get('incremental')))
+
+    return jobs
+
+
+def validate_jobs(jobs, config=None, factory=None):
+    """在下载前批量校验任务的交易对
+
+    每个交易所只加载一次市场信息并建立交易对索引，每个任务的校验为O(1)。
+    交易对别名(如 'ETH-USDT-SWAP')改写为统一名称，不存在的交易对直接标记为失败。
+
+    Args:
+        jobs (list): DownloadJob列表
+        config (dict, optional): 交易所API配置
+        factory (callable, optional): 创建交易所实例的函数，参数为 (exchange_id, config)
+
+    Returns:
+        list: 校验通过的DownloadJob列表
+    """
+    valid_jobs = []
+    indexes = {}
+    for job in jobs:
+        index = indexes.get(job.exchange_id)
+        if index is None:
+            exchange = get_pooled_exchange(job.exchange_id, config, factory)
+            ensure_markets(exchange)
+            index = indexes[job.exchange_id] = get_symbol_index(exchange)
+
+        symbol = index.resolve(job.symbol)
+        if symbol is None:
+            job.status = JOB_FAILED
+            job.error = f"交易对 {job.symbol} 在交易所 {job.exchange_id} 中不存在，相近的交易对: {index.suggest(job.symbol)}"
+            logger.error(f"任务校验失败: {job.name}，错误: {job.error}")
+            continue
+
+        job.symbol = symbol
+        valid_jobs.append(job)
+    return valid_jobs
+
+
+def _default_interval(exchange):
+    """交易所实例的请求间隔(秒)，由其rateLimit(毫秒)换算，配置中覆盖的rateLimit同样生效"""
+    return exchange.rateLimit / 1000
+
+
+class BatchDownloader:
+    """批量下载调度器
+
+    使用线程池并发执行下载任务，同一交易所的所有任务共享一个频率限制器，
+    启用客户端池时每个工作线程从池中复用交易所实例和已加载的市场信息，
+    失败的任务进入重试队列，在所有任务完成一轮后由同一个线程池重新执行，
+    客户端池中的实例数不随重试轮数增加。
+    """
+
+    def __init__(self, max_workers=None, max_retries=None, retry_delay=None, data_dir=None,
+                 config=None, progress_callback=None):
+        """初始化批量下载调度器
+
+        Args:
+            max_workers (int, optional): 并发线程数，默认读取配置
+            max_retries (int, optional): 单个任务的最大重试次数，默认读取配置
+            retry_delay (float, optional): 每轮重试前的等待时间(秒)，默认读取配置
+            data_dir (str, optional): 保存数据的目录
+            config (dict, optional): 交易所API配置
+            progress_callback (callable, optional): 任务状态或进度变化时调用，参数为DownloadJob
+        """
+        batch_config = data_config.get('batch', {})
+        self.max_workers = max_workers or batch_config.get('max_workers', 4)
+        self.max_retries = max_retries if max_retries is not None else batch_config.get('max_retries', 3)
+        self.retry_delay = retry_delay if retry_delay is not None else batch_config.get('retry_delay', 5)
+        self.data_dir = data_dir
+        self.config = config
+        self.progress_callback = progress_callback
+        self._lock = threading.Lock()
+        self._rate_limiters = {}
+
+    def _report(self, job):
+        """报告任务进度"""
+        if self.progress_callback is not None:
+            with self._lock:
+                self.progress_callback(job)
+
+    def _get_rate_limiter(self, exchange_id, exchange):
+        """获取交易所共享的频率限制器，首次获取时按客户端池中实例的rateLimit确定请求间隔"""
+        with self._lock:
+            limiter = self._rate_limiters.get(exchange_id)
+            if limiter is None:
+                limiter = get_rate_limiter(exchange_id, _default_interval(exchange))
+                self._rate_limiters[exchange_id] = limiter
+            return limiter
+
+    def _run_job(self, job):
+        """执行单个下载任务"""
+        job.status = JOB_RUNNING
+        job.attempts += 1
+        job.error = None
+        self._report(job)
+
+        def on_progress(since, start_timestamp, end_timestamp, rows):
+            job.progress = min((since - start_timestamp) / (end_timestamp - start_timestamp), 1.0)
+            job.rows = rows
+            self._report(job)
+
+        if pool_enabled():
+            exchange = get_pooled_exchange(job.exchange_id, self.config)
+        else:
+            exchange = get_exchange(job.exchange_id, self.config)
+        fetch_options = {
+            'rate_limiter': self._get_rate_limiter(job.exchange_id, exchange),
+            'progress_callback': on_progress,
+        }
+
+        job.file_path = fetch_and_save_data(
+            symbol=job.symbol,
+            timeframe=job.timeframe,
+            start_date=job.start_date,
+            end_date=job.end_date,
+            exchange_id=job.exchange_id,
+            data_dir=self.data_dir,
+            config=self.config,
+            incremental=job.incremental,
+            fetch_options=fetch_options,
+            exchange=exchange
+        )
+        return job
+
+    def run(self, jobs):
+        """并发执行所有下载任务
+
+        Args:
+            jobs (list): DownloadJob列表
+
+        Returns:
+            list: 执行后的DownloadJob列表，通过status查看每个任务的结果
+        """
+        queue = list(jobs)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while queue:
+                retry_queue = []
+                futures = {executor.submit(self._run_job, job): job for job in queue}
+
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        future.result()
+                        job.status = JOB_DONE
+                        job.progress = 1.0
+                        logger.info(f"任务完成: {job.name} -> {job.file_path}")
+                    except Exception as e:
+                        job.error = str(e)
+                        job.status = JOB_FAILED
+                        if job.attempts <= self.max_retries:
+                            logger.warning(f"任务失败，加入重试队列: {job.name}，第 {job.attempts} 次尝试，错误: {job.error}")
+                            retry_queue.append(job)
+                        else:
+                            logger.error(f"任务失败，已达到最大重试次数: {job.name}，错误: {job.error}")
+                    self._report(job)
+
+                queue = retry_queue
+                if queue and self.retry_delay > 0:
+                    time.sleep(self.retry_delay)
+
+        done = sum(1 for job in jobs if job.status == JOB_DONE)
+        logger.info(f"批量下载结束，成功 {done} 个，失败 {len(jobs) - done} 个")
+        return jobs
+
+
+def run_batch(jobs=None, **kwargs):
+    """执行批量下载
+
+    Args:
+        jobs (list, optional): DownloadJob列表，默认从配置读取
+        **kwargs: 传给BatchDownloader的参数
+
+    Returns:
+        list: 执行后的DownloadJob列表
+    """
+    if jobs is None:
+        jobs = load_jobs_from_config()
+    BatchDownloader(**kwargs).run(validate_jobs(jobs, kwargs.get('config')))
+    return jobs
+
+
+if __name__ == "__main__":
+    run_batch(config=data_config.get("exchange_config", {}))
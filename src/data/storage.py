@@ -0,0 +1,731 @@
+"""数据存储模块，提供CSV、列式(Parquet/Feather)与定长二进制存储后端"""
+
+import os
+import numpy as np
+import pandas as pd
+
+from src.log import get_logger
+from src.data.time_utils import to_timestamp_ms
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    pc = None
+    pq = None
+    feather = None
+
+# 获取配置好的logger
+logger = get_logger()
+
+# TOHLCV字段及类型，参见 docs/data_regulation.md
+OHLCV_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+OHLCV_DTYPES = {
+    'timestamp': 'int64',
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'volume': 'float64',
+}
+
+
+def ohlcv_to_frame(ohlcv_data, schema=None):
+    """将K线数据转换为带类型的DataFrame
+
+    Args:
+        ohlcv_data (list | pd.DataFrame): K线数据列表或DataFrame
+        schema (dict, optional): {列名: 类型}，用于资金费率等非K线的时间序列，默认为OHLCV_DTYPES
+
+    Returns:
+        pd.DataFrame: timestamp为int64、其余字段为float64的DataFrame
+    """
+    schema = schema or OHLCV_DTYPES
+    if isinstance(ohlcv_data, pd.DataFrame):
+        df = ohlcv_data[list(schema)]
+    else:
+        df = pd.DataFrame(ohlcv_data, columns=list(schema))
+    return df.astype(schema)
+
+
+def _iter_lines_reversed(f, block_size=64 * 1024):
+    """从文件末尾向前逐行读取
+
+    Yields:
+        tuple: (行起始字节偏移, 行内容bytes)，不包含换行符
+    """
+    f.seek(0, os.SEEK_END)
+    position = f.tell()
+    remainder = b''
+
+    while position > 0:
+        read_size = min(block_size, position)
+        position -= read_size
+        f.seek(position)
+        block = f.read(read_size) + remainder
+        lines = block.split(b'\n')
+        # 第一段可能是不完整的行，留到下一轮拼接
+        remainder = lines.pop(0)
+        offset = position + len(remainder) + 1
+        line_offsets = []
+        for line in lines:
+            line_offsets.append((offset, line))
+            offset += len(line) + 1
+        for item in reversed(line_offsets):
+            yield item
+
+    yield 0, remainder
+
+
+def _parse_timestamp_line(line):
+    """解析CSV行首的时间戳，表头或空行返回None"""
+    first_field = line.split(b',', 1)[0].strip()
+    if not first_field or not first_field.isdigit():
+        return None
+    return int(first_field)
+
+
+class StorageWriter:
+    """
+    分块写入器基类
+
+    作为上下文管理器使用，正常退出时提交写入的数据，异常退出时放弃未提交的数据。
+    未指定since时写入临时文件，提交时替换原文件；指定since时保留原文件中早于since的数据，
+    之后的数据由写入的分块替换。
+    """
+
+    def __init__(self, file_path, since=None):
+        self.file_path = file_path
+        self.since = since if since is not None and os.path.exists(file_path) else None
+        self.temp_path = file_path + '.tmp'
+        self.rows = 0
+
+    def write(self, df):
+        """写入一个数据分块
+
+        Args:
+            df (pd.DataFrame): 按timestamp升序排列的数据分块
+        """
+        if df.empty:
+            return
+        self._write(df)
+        self.rows += len(df)
+
+    def _write(self, df):
+        raise NotImplementedError
+
+    def close(self):
+        """提交写入的数据"""
+        raise NotImplementedError
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        if os.path.exists(self.temp_path):
+            os.remove(self.temp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class BaseStorage:
+    """
+    存储后端基类
+
+    每个数据文件保存一个交易对在一个周期下的K线数据，按timestamp升序排列。
+    """
+    # 存储格式名称
+    name = None
+    # 文件扩展名
+    extension = None
+
+    def write(self, df, file_path):
+        """将数据写入文件，覆盖已有内容
+
+        Args:
+            df (pd.DataFrame): 包含timestamp列的数据
+            file_path (str): 文件路径
+        """
+        raise NotImplementedError
+
+    def read(self, file_path, columns=None):
+        """读取文件中的数据
+
+        Args:
+            file_path (str): 文件路径
+            columns (list, optional): 只读取指定的列，默认读取全部列
+
+        Returns:
+            pd.DataFrame: 文件中的数据
+        """
+        raise NotImplementedError
+
+    def last_timestamp(self, file_path):
+        """读取文件中最后一条数据的时间戳
+
+        Args:
+            file_path (str): 文件路径
+
+        Returns:
+            int: 最后一条数据的时间戳(毫秒)，文件不存在或没有数据时返回None
+        """
+        if not os.path.exists(file_path):
+            return None
+
+        timestamps = self.read(file_path, columns=['timestamp'])['timestamp']
+        if timestamps.empty:
+            return None
+        return int(timestamps.iloc[-1])
+
+    def append(self, df, file_path, since=None):
+        """将从since开始的数据合并到文件
+
+        文件中时间戳不早于since的数据会被替换，更早的数据保持不变。
+
+        Args:
+            df (pd.DataFrame): 从since开始的新数据
+            file_path (str): 文件路径
+            since (int, optional): 新数据的起始时间戳(毫秒)，默认为新数据的第一条时间戳
+
+        Returns:
+            str: 文件路径
+        """
+        if since is None:
+            since = int(df['timestamp'].iloc[0])
+
+        if os.path.exists(file_path):
+            existing = self.read(file_path)
+            df = pd.concat([existing[existing['timestamp'] < since], df], ignore_index=True)
+
+        self.write(df, file_path)
+        return file_path
+
+    def open_writer(self, file_path, since=None):
+        """打开分块写入器，内存占用与数据总量无关
+
+        Args:
+            file_path (str): 文件路径
+            since (int, optional): 指定时保留文件中早于since的数据，之后的数据由写入的分块替换；
+                未指定时写入的数据覆盖整个文件
+
+        Returns:
+            StorageWriter: 分块写入器
+        """
+        raise NotImplementedError
+
+
+def _with_datetime(df):
+    """为CSV输出添加可读的日期时间列"""
+    df = df.copy()
+    if 'datetime' not in df.columns:
+        df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df
+
+
+class CSVStorage(BaseStorage):
+    """
+    CSV存储后端
+
+    额外保存一列可读的datetime，用于导出和人工查看。
+    """
+    name = 'csv'
+    extension = '.csv'
+
+    def write(self, df, file_path):
+        _with_datetime(df).to_csv(file_path, index=False)
+
+    def read(self, file_path, columns=None):
+        return pd.read_csv(file_path, usecols=columns)
+
+    def last_timestamp(self, file_path):
+        """只读取文件末尾，不解析整个文件"""
+        if not os.path.exists(file_path):
+            return None
+
+        with open(file_path, 'rb') as f:
+            for _, line in _iter_lines_reversed(f):
+                timestamp = _parse_timestamp_line(line)
+                if timestamp is not None:
+                    return timestamp
+
+        return None
+
+    def append(self, df, file_path, since=None):
+        """截断文件中不早于since的行后追加新数据，不重写整个文件"""
+        if since is None:
+            since = int(df['timestamp'].iloc[0])
+
+        if not os.path.exists(file_path):
+            self.write(df, file_path)
+            return file_path
+
+        _truncate_csv(file_path, since)
+        _with_datetime(df).to_csv(file_path, mode='a', header=False, index=False)
+        return file_path
+
+    def open_writer(self, file_path, since=None):
+        return _CSVWriter(file_path, since)
+
+
+def _truncate_csv(file_path, since):
+    """截断CSV文件中时间戳不早于since的行"""
+    with open(file_path, 'rb+') as f:
+        # 找到第一条时间戳不早于since的行，从该行开始截断
+        truncate_offset = None
+        for offset, line in _iter_lines_reversed(f):
+            timestamp = _parse_timestamp_line(line)
+            if timestamp is None:
+                if line.strip():
+                    # 到达表头
+                    truncate_offset = offset + len(line) + 1
+                    break
+                continue
+            if timestamp < since:
+                truncate_offset = offset + len(line) + 1
+                break
+            truncate_offset = offset
+
+        f.seek(0, os.SEEK_END)
+        truncate_offset = min(truncate_offset or 0, f.tell())
+        f.truncate(truncate_offset)
+
+        # 保证追加的数据从新的一行开始
+        if truncate_offset > 0:
+            f.seek(truncate_offset - 1)
+            if f.read(1) != b'\n':
+                f.write(b'\n')
+
+
+class _CSVWriter(StorageWriter):
+    """CSV分块写入器"""
+
+    def __init__(self, file_path, since=None):
+        super().__init__(file_path, since)
+        if self.since is not None:
+            _truncate_csv(file_path, self.since)
+            self._file = open(file_path, 'a', newline='')
+            self._header = False
+        else:
+            self._file = open(self.temp_path, 'w', newline='')
+            self._header = True
+
+    def _write(self, df):
+        _with_datetime(df).to_csv(self._file, header=self._header, index=False)
+        self._header = False
+
+    def close(self):
+        if self._header:
+            # 没有数据时只写入表头
+            self._write(ohlcv_to_frame([]))
+        self._file.close()
+        if self.since is None:
+            os.replace(self.temp_path, self.file_path)
+
+    def abort(self):
+        self._file.close()
+        super().abort()
+
+
+def _require_pyarrow(storage_format):
+    """检查列式存储所需的pyarrow是否已安装"""
+    if pq is None:
+        raise ImportError(f"使用 {storage_format} 存储格式需要安装pyarrow: pip install pyarrow")
+
+
+class _ArrowWriter(StorageWriter):
+    """列式格式分块写入器，写入临时文件，提交时替换原文件"""
+
+    def __init__(self, file_path, since=None):
+        super().__init__(file_path, since)
+        self._writer = None
+        self._schema = None
+
+        # 先以流式方式复制原文件中早于since的数据
+        if self.since is not None:
+            for batch in self._iter_existing_batches(file_path):
+                table = pa.Table.from_batches([batch])
+                table = table.filter(pc.less(table['timestamp'], self.since))
+                if table.num_rows:
+                    self._write_table(table)
+
+    def _iter_existing_batches(self, file_path):
+        raise NotImplementedError
+
+    def _open_sink(self, schema):
+        raise NotImplementedError
+
+    def _write_table(self, table):
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = self._open_sink(self._schema)
+        self._writer.write_table(table)
+
+    def _write(self, df):
+        table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+        self._write_table(table)
+
+    def close(self):
+        if self._writer is None:
+            # 没有数据时写入空表
+            self._write(ohlcv_to_frame([]))
+        self._writer.close()
+        os.replace(self.temp_path, self.file_path)
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+        super().abort()
+
+
+class _ParquetWriter(_ArrowWriter):
+    """Parquet分块写入器，每个分块写为一个行组"""
+
+    def _iter_existing_batches(self, file_path):
+        return pq.ParquetFile(file_path).iter_batches()
+
+    def _open_sink(self, schema):
+        return pq.ParquetWriter(self.temp_path, schema)
+
+
+class _FeatherWriter(_ArrowWriter):
+    """Feather(Arrow IPC)分块写入器，每个分块写为一个记录批次"""
+
+    def _iter_existing_batches(self, file_path):
+        with pa.memory_map(file_path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                yield reader.get_batch(i)
+
+    def _open_sink(self, schema):
+        return pa.ipc.new_file(self.temp_path, schema)
+
+
+class ParquetStorage(BaseStorage):
+    """Parquet列式存储后端"""
+    name = 'parquet'
+    extension = '.parquet'
+
+    def write(self, df, file_path):
+        _require_pyarrow(self.name)
+        df.to_parquet(file_path, engine='pyarrow', index=False)
+
+    def read(self, file_path, columns=None):
+        _require_pyarrow(self.name)
+        return pd.read_parquet(file_path, engine='pyarrow', columns=columns)
+
+    def last_timestamp(self, file_path):
+        """从最后一个行组的统计信息中读取，不读取数据"""
+        _require_pyarrow(self.name)
+        if not os.path.exists(file_path):
+            return None
+
+        metadata = pq.ParquetFile(file_path).metadata
+        if metadata.num_rows == 0:
+            return None
+
+        column_index = metadata.schema.names.index('timestamp')
+        row_group = metadata.row_group(metadata.num_row_groups - 1)
+        statistics = row_group.column(column_index).statistics
+        if statistics is not None and statistics.has_min_max:
+            return int(statistics.max)
+        return super().last_timestamp(file_path)
+
+    def open_writer(self, file_path, since=None):
+        _require_pyarrow(self.name)
+        return _ParquetWriter(file_path, since)
+
+
+class FeatherStorage(BaseStorage):
+    """Feather(Arrow IPC)列式存储后端"""
+    name = 'feather'
+    extension = '.feather'
+
+    def write(self, df, file_path):
+        _require_pyarrow(self.name)
+        df.reset_index(drop=True).to_feather(file_path)
+
+    def read(self, file_path, columns=None):
+        _require_pyarrow(self.name)
+        return feather.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+
+    def open_writer(self, file_path, since=None):
+        _require_pyarrow(self.name)
+        return _FeatherWriter(file_path, since)
+
+
+# 定长二进制格式的文件头：魔数、版本、文件头长度、行数、行长度，共64字节
+BINARY_MAGIC = b'CHBOHLCV'
+BINARY_VERSION = 1
+BINARY_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', '<u4'),
+    ('header_size', '<u4'),
+    ('rows', '<u8'),
+    ('row_size', '<u4'),
+    ('reserved', 'V36'),
+])
+# 每行为一个int64时间戳和五个float64字段，共48字节
+BINARY_ROW_DTYPE = np.dtype([('timestamp', '<i8')] + [(column, '<f8') for column in OHLCV_COLUMNS[1:]])
+
+
+def _read_binary_header(f):
+    """读取并校验二进制文件头
+
+    Returns:
+        int: 文件中已提交的行数
+    """
+    f.seek(0)
+    header = np.frombuffer(f.read(BINARY_HEADER_DTYPE.itemsize), dtype=BINARY_HEADER_DTYPE)
+    if len(header) != 1 or header['magic'][0] != BINARY_MAGIC:
+        raise ValueError(f"不是有效的二进制K线文件: {f.name}")
+    if header['version'][0] != BINARY_VERSION or header['row_size'][0] != BINARY_ROW_DTYPE.itemsize:
+        raise ValueError(f"不支持的二进制K线文件版本: {f.name}")
+    return int(header['rows'][0])
+
+
+def _write_binary_header(f, rows):
+    """写入二进制文件头"""
+    header = np.zeros(1, dtype=BINARY_HEADER_DTYPE)
+    header['magic'] = BINARY_MAGIC
+    header['version'] = BINARY_VERSION
+    header['header_size'] = BINARY_HEADER_DTYPE.itemsize
+    header['rows'] = rows
+    header['row_size'] = BINARY_ROW_DTYPE.itemsize
+    f.seek(0)
+    f.write(header.tobytes())
+
+
+def _frame_to_records(df):
+    """将DataFrame转换为定长二进制行"""
+    records = np.empty(len(df), dtype=BINARY_ROW_DTYPE)
+    for column in OHLCV_COLUMNS:
+        records[column] = df[column].to_numpy()
+    return records
+
+
+class OHLCVMemmap:
+    """
+    内存映射的K线数据
+
+    各字段是对文件映射页的零拷贝视图，多个进程以只读方式映射同一文件时共享操作系统页缓存。
+    """
+
+    def __init__(self, file_path, mode='r'):
+        """映射二进制K线文件
+
+        Args:
+            file_path (str): 二进制K线文件路径
+            mode (str): 映射模式，'r' 为只读，'r+' 为可写
+        """
+        with open(file_path, 'rb') as f:
+            rows = _read_binary_header(f)
+
+        self.path = file_path
+        if rows == 0:
+            self.records = np.empty(0, dtype=BINARY_ROW_DTYPE)
+        else:
+            self.records = np.memmap(file_path, dtype=BINARY_ROW_DTYPE, mode=mode,
+                                     offset=BINARY_HEADER_DTYPE.itemsize, shape=(rows,))
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, column):
+        """获取字段的零拷贝视图"""
+        return self.records[column]
+
+    @property
+    def timestamp(self):
+        return self.records['timestamp']
+
+    @property
+    def open(self):
+        return self.records['open']
+
+    @property
+    def high(self):
+        return self.records['high']
+
+    @property
+    def low(self):
+        return self.records['low']
+
+    @property
+    def close(self):
+        return self.records['close']
+
+    @property
+    def volume(self):
+        return self.records['volume']
+
+    def slice(self, start=None, end=None):
+        """按时间范围[start, end]二分查找，返回行范围的零拷贝视图，start/end可以是日期字符串或毫秒时间戳"""
+        timestamps = self.records['timestamp']
+        start = to_timestamp_ms(start) if start is not None else None
+        end = to_timestamp_ms(end) if end is not None else None
+        begin = 0 if start is None else int(np.searchsorted(timestamps, start, side='left'))
+        stop = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side='right'))
+        return self.records[begin:stop]
+
+    def to_frame(self, columns=None):
+        """复制为DataFrame"""
+        columns = columns or OHLCV_COLUMNS
+        return pd.DataFrame({column: np.array(self.records[column]) for column in columns})
+
+
+def open_memmap(file_path, mode='r'):
+    """以内存映射方式打开二进制K线文件
+
+    Args:
+        file_path (str): 二进制K线文件路径
+        mode (str): 映射模式，'r' 为只读，'r+' 为可写
+
+    Returns:
+        OHLCVMemmap: 内存映射的K线数据
+    """
+    return OHLCVMemmap(file_path, mode)
+
+
+class _BinaryWriter(StorageWriter):
+    """定长二进制分块写入器"""
+
+    def __init__(self, file_path, since=None):
+        super().__init__(file_path, since)
+        if self.since is not None:
+            self._base_rows = int(np.searchsorted(open_memmap(file_path).timestamp, self.since, side='left'))
+            self._file = open(file_path, 'rb+')
+            _read_binary_header(self._file)
+            self._file.truncate(BINARY_HEADER_DTYPE.itemsize + self._base_rows * BINARY_ROW_DTYPE.itemsize)
+        else:
+            self._base_rows = 0
+            self._file = open(self.temp_path, 'wb')
+            _write_binary_header(self._file, 0)
+
+    def _write(self, df):
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(_frame_to_records(df).tobytes())
+
+    def close(self):
+        self._file.flush()
+        # 数据写入后再更新文件头中的行数
+        _write_binary_header(self._file, self._base_rows + self.rows)
+        self._file.close()
+        if self.since is None:
+            os.replace(self.temp_path, self.file_path)
+
+    def abort(self):
+        if self.since is not None:
+            # 原文件已截断，文件头需要与保留的行数一致
+            _write_binary_header(self._file, self._base_rows)
+        self._file.close()
+        super().abort()
+
+
+class BinaryStorage(BaseStorage):
+    """
+    定长二进制存储后端
+
+    64字节文件头之后按行连续存放int64时间戳和五个float64字段，
+    可以直接用np.memmap映射，追加时只写入文件末尾。
+    """
+    name = 'binary'
+    extension = '.ohlcv'
+
+    def write(self, df, file_path):
+        records = _frame_to_records(df)
+        temp_path = file_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            _write_binary_header(f, len(records))
+            f.write(records.tobytes())
+        os.replace(temp_path, file_path)
+
+    def read(self, file_path, columns=None):
+        return open_memmap(file_path).to_frame(columns)
+
+    def last_timestamp(self, file_path):
+        """只读取文件头和最后一行"""
+        if not os.path.exists(file_path):
+            return None
+
+        with open(file_path, 'rb') as f:
+            rows = _read_binary_header(f)
+            if rows == 0:
+                return None
+            f.seek(BINARY_HEADER_DTYPE.itemsize + (rows - 1) * BINARY_ROW_DTYPE.itemsize)
+            last_row = np.frombuffer(f.read(BINARY_ROW_DTYPE.itemsize), dtype=BINARY_ROW_DTYPE)
+        return int(last_row['timestamp'][0])
+
+    def append(self, df, file_path, since=None):
+        """二分查找since所在的行，从该行开始覆盖写入新数据，不重写之前的数据"""
+        if since is None:
+            since = int(df['timestamp'].iloc[0])
+
+        if not os.path.exists(file_path):
+            self.write(df, file_path)
+            return file_path
+
+        keep_rows = int(np.searchsorted(open_memmap(file_path).timestamp, since, side='left'))
+        records = _frame_to_records(df[df['timestamp'] >= since])
+
+        with open(file_path, 'rb+') as f:
+            _read_binary_header(f)
+            offset = BINARY_HEADER_DTYPE.itemsize + keep_rows * BINARY_ROW_DTYPE.itemsize
+            f.seek(offset)
+            f.write(records.tobytes())
+            f.truncate(offset + records.nbytes)
+            f.flush()
+            # 数据写入后再更新文件头中的行数
+            _write_binary_header(f, keep_rows + len(records))
+
+        return file_path
+
+    def open_writer(self, file_path, since=None):
+        return _BinaryWriter(file_path, since)
+
+
+# 已注册的存储后端
+STORAGE_BACKENDS = {
+    CSVStorage.name: CSVStorage,
+    ParquetStorage.name: ParquetStorage,
+    FeatherStorage.name: FeatherStorage,
+    BinaryStorage.name: BinaryStorage,
+}
+
+
+def get_storage(storage_format='csv'):
+    """获取存储后端
+
+    Args:
+        storage_format (str): 存储格式，如 'csv', 'parquet', 'feather'
+
+    Returns:
+        BaseStorage: 存储后端实例
+    """
+    if storage_format not in STORAGE_BACKENDS:
+        raise ValueError(f"不支持的存储格式: {storage_format}，可选: {list(STORAGE_BACKENDS)}")
+    return STORAGE_BACKENDS[storage_format]()
+
+
+def get_storage_for_path(file_path):
+    """根据文件扩展名获取存储后端
+
+    Args:
+        file_path (str): 文件路径
+
+    Returns:
+        BaseStorage: 存储后端实例
+    """
+    extension = os.path.splitext(file_path)[1]
+    for storage_class in STORAGE_BACKENDS.values():
+        if storage_class.extension == extension:
+            return storage_class()
+    raise ValueError(f"无法识别的数据文件格式: {file_path}")
@@ -0,0 +1,475 @@
+"""K线数据仓库模块，提供单文件与按月分区两种存储布局及按时间范围读取的接口"""
+
+import os
+import json
+import numpy as np
+import pandas as pd
+
+from src.log import get_logger
+from src.manager import SystemManager, ConfigManager
+from src.data.storage import get_storage, ohlcv_to_frame, open_memmap, BinaryStorage, OHLCV_COLUMNS
+from src.data.time_utils import to_timestamp_ms
+
+# 获取系统管理器
+system_manager = SystemManager()
+
+# 读取数据配置
+data_config = ConfigManager(system_manager).read_config('data_config.json')
+
+# 获取配置好的logger
+logger = get_logger()
+
+# 存储布局
+LAYOUT_FLAT = 'flat'
+LAYOUT_PARTITIONED = 'partitioned'
+
+# 分区目录中的元数据索引文件
+INDEX_FILENAME = '_index.json'
+
+
+def symbol_to_filename(symbol):
+    """将交易对转换为可用于文件名的形式，如 'ETH/USDT:USDT' -> 'ETH-USDT-USDT'"""
+    return symbol.replace('/', '-').replace(':', '-')
+
+
+def _filter_range(df, start, end, columns):
+    """按时间范围过滤数据，并只保留指定的列"""
+    if start is not None:
+        df = df[df['timestamp'] >= start]
+    if end is not None:
+        df = df[df['timestamp'] <= end]
+    if columns is not None:
+        df = df[columns]
+    return df.reset_index(drop=True)
+
+
+def _check_schema(storage, schema):
+    """binary格式的行结构固定为OHLCV，不能保存其他字段"""
+    if schema is not None and isinstance(storage, BinaryStorage) and list(schema) != OHLCV_COLUMNS:
+        raise ValueError(f"binary存储格式只能保存K线数据，字段为: {list(schema)}")
+    return schema
+
+
+def _read_columns(columns):
+    """读取时需要的列，按时间过滤总是需要timestamp列"""
+    if columns is None or 'timestamp' in columns:
+        return columns
+    return ['timestamp'] + list(columns)
+
+
+class FlatStore:
+    """
+    单文件存储
+
+    一个交易对在一个周期下的所有数据保存在 DATA_PATH/{symbol}_{timeframe}.{ext} 中。
+    """
+
+    def __init__(self, symbol, timeframe, data_dir=None, storage_format=None, schema=None):
+        """初始化单文件存储
+
+        Args:
+            symbol (str): 交易对，如 'ETH/USDT'
+            timeframe (str): K线周期，如 '1h', '1d'
+            data_dir (str, optional): 数据目录，默认为系统数据目录
+            storage_format (str, optional): 存储格式，默认读取配置
+            schema (dict, optional): {列名: 类型}，保存资金费率等非K线的时间序列时指定，默认为OHLCV
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.data_dir = str(data_dir if data_dir is not None else system_manager.DATA_PATH)
+        self.storage = get_storage(storage_format or data_config.get('storage_format', 'csv'))
+        self.schema = _check_schema(self.storage, schema)
+        self.path = os.path.join(self.data_dir,
+                                 f"{symbol_to_filename(symbol)}_{timeframe}{self.storage.extension}")
+
+    def exists(self):
+        """数据文件是否存在"""
+        return os.path.exists(self.path)
+
+    def last_timestamp(self):
+        """最后一条数据的时间戳(毫秒)，没有数据时返回None"""
+        return self.storage.last_timestamp(self.path)
+
+    def write(self, data):
+        """写入数据并与已有数据合并，时间戳相同时以新数据为准
+
+        Args:
+            data (list | pd.DataFrame): K线数据
+        """
+        df = ohlcv_to_frame(data, self.schema)
+        if self.exists():
+            existing = self.storage.read(self.path, columns=list(df.columns))
+            df = pd.concat([existing, df], ignore_index=True)
+            df = df.drop_duplicates('timestamp', keep='last').sort_values('timestamp', kind='stable')
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.storage.write(df.reset_index(drop=True), self.path)
+        return self.path
+
+    def append(self, data, since=None):
+        """合并从since开始的数据，已有数据中时间戳不早于since的部分被替换
+
+        Args:
+            data (list | pd.DataFrame): 从since开始的K线数据
+            since (int, optional): 新数据的起始时间戳(毫秒)
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        return self.storage.append(ohlcv_to_frame(data, self.schema), self.path, since)
+
+    def writer(self, since=None):
+        """打开分块写入器
+
+        Args:
+            since (int, optional): 指定时保留已有数据中早于since的部分，之后的数据由写入的分块替换；
+                未指定时写入的数据覆盖整个文件
+
+        Returns:
+            StorageWriter: 分块写入器
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        return self.storage.open_writer(self.path, since)
+
+    def load(self, start=None, end=None, columns=None):
+        """读取时间范围[start, end]内的数据
+
+        Args:
+            start (int | str, optional): 起始时间
+            end (int | str, optional): 结束时间
+            columns (list, optional): 只读取指定的列
+
+        Returns:
+            pd.DataFrame: K线数据
+        """
+        if not self.exists():
+            raise FileNotFoundError(f"数据文件不存在: {self.path}")
+
+        if isinstance(self.storage, BinaryStorage):
+            # 内存映射后二分查找时间范围，只复制范围内的行
+            records = self.memmap().slice(start, end)
+            return pd.DataFrame({column: np.array(records[column]) for column in columns or OHLCV_COLUMNS})
+
+        start = to_timestamp_ms(start) if start is not None else None
+        end = to_timestamp_ms(end) if end is not None else None
+        df = self.storage.read(self.path, columns=_read_columns(columns))
+        return _filter_range(df, start, end, columns)
+
+    def memmap(self):
+        """以只读内存映射方式打开数据文件，仅支持binary存储格式
+
+        Returns:
+            OHLCVMemmap: 各字段为零拷贝视图的K线数据
+        """
+        if not isinstance(self.storage, BinaryStorage):
+            raise ValueError(f"内存映射只支持binary存储格式，当前为: {self.storage.name}")
+        if not self.exists():
+            raise FileNotFoundError(f"数据文件不存在: {self.path}")
+        return open_memmap(self.path)
+
+
+class PartitionedStore:
+    """
+    按月分区存储
+
+    数据按 DATA_PATH/{exchange}/{symbol}/{timeframe}/{YYYY-MM}.{ext} 分区保存，
+    目录下的 _index.json 记录每个分区的最小/最大时间戳和行数。
+    读取时只打开与时间范围有重叠的分区，写入时只重写受影响的分区。
+    """
+
+    def __init__(self, symbol, timeframe, exchange_id=None, data_dir=None, storage_format=None, schema=None):
+        """初始化分区存储
+
+        Args:
+            symbol (str): 交易对，如 'ETH/USDT'
+            timeframe (str): K线周期，如 '1h', '1d'
+            exchange_id (str, optional): 交易所ID，默认读取配置
+            data_dir (str, optional): 数据根目录，默认为系统数据目录
+            storage_format (str, optional): 分区文件的存储格式，默认读取配置
+            schema (dict, optional): {列名: 类型}，保存资金费率等非K线的时间序列时指定，默认为OHLCV
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.exchange_id = exchange_id or data_config.get('exchange_id', 'okx')
+        root = str(data_dir if data_dir is not None else system_manager.DATA_PATH)
+        self.path = os.path.join(root, self.exchange_id, symbol_to_filename(symbol), timeframe)
+        self.index_path = os.path.join(self.path, INDEX_FILENAME)
+        self._index = None
+
+        # 已有分区沿用创建时的存储格式
+        index = self.index
+        self.storage = get_storage(index.get('format') or storage_format
+                                   or data_config.get('storage_format', 'csv'))
+        self.schema = _check_schema(self.storage, schema)
+
+    @property
+    def index(self):
+        """分区元数据索引"""
+        if self._index is None:
+            if os.path.exists(self.index_path):
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self._index = json.load(f)
+            else:
+                self._index = {'format': None, 'partitions': {}}
+        return self._index
+
+    @property
+    def partitions(self):
+        """按时间排序的分区信息字典 {分区名: {'min_ts', 'max_ts', 'rows'}}"""
+        return self.index['partitions']
+
+    def _save_index(self):
+        """原子地保存分区索引"""
+        self._index['format'] = self.storage.name
+        self._index['partitions'] = dict(sorted(self._index['partitions'].items()))
+        temp_path = self.index_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._index, f, indent=4)
+        os.replace(temp_path, self.index_path)
+
+    def _partition_path(self, key):
+        return os.path.join(self.path, f"{key}{self.storage.extension}")
+
+    def exists(self):
+        """是否已有数据"""
+        return bool(self.partitions)
+
+    def first_timestamp(self):
+        """第一条数据的时间戳(毫秒)，没有数据时返回None"""
+        if not self.partitions:
+            return None
+        return min(info['min_ts'] for info in self.partitions.values())
+
+    def last_timestamp(self):
+        """最后一条数据的时间戳(毫秒)，只读取索引，没有数据时返回None"""
+        if not self.partitions:
+            return None
+        return max(info['max_ts'] for info in self.partitions.values())
+
+    def _overlapping_partitions(self, start=None, end=None):
+        """与时间范围[start, end]有重叠的分区名列表"""
+        return [key for key, info in self.partitions.items()
+                if (start is None or info['max_ts'] >= start) and (end is None or info['min_ts'] <= end)]
+
+    @staticmethod
+    def _split_by_month(df):
+        """按UTC月份拆分数据
+
+        Returns:
+            dict: {分区名 'YYYY-MM': 该月的数据}
+        """
+        months = df['timestamp'].to_numpy().astype('datetime64[ms]').astype('datetime64[M]')
+        keys, starts = np.unique(months, return_index=True)
+        bounds = list(starts[1:]) + [len(df)]
+        return {str(key): df.iloc[begin:stop] for key, begin, stop in zip(keys, starts, bounds)}
+
+    def _write_partition(self, key, df):
+        """写入单个分区并更新索引，数据为空时删除分区"""
+        partition_path = self._partition_path(key)
+        if df.empty:
+            if os.path.exists(partition_path):
+                os.remove(partition_path)
+            self.partitions.pop(key, None)
+            return
+
+        df = df.reset_index(drop=True)
+        self.storage.write(df, partition_path)
+        self.partitions[key] = {
+            'min_ts': int(df['timestamp'].iloc[0]),
+            'max_ts': int(df['timestamp'].iloc[-1]),
+            'rows': len(df),
+        }
+
+    def _read_partition(self, key, columns=None):
+        return self.storage.read(self._partition_path(key), columns=columns)
+
+    def write(self, data):
+        """写入数据并与已有数据合并，时间戳相同时以新数据为准，只重写受影响的分区
+
+        Args:
+            data (list | pd.DataFrame): K线数据
+
+        Returns:
+            str: 分区目录
+        """
+        df = ohlcv_to_frame(data, self.schema).sort_values('timestamp', kind='stable')
+        if df.empty:
+            return self.path
+
+        os.makedirs(self.path, exist_ok=True)
+        for key, part in self._split_by_month(df).items():
+            if key in self.partitions:
+                existing = self._read_partition(key)
+                part = pd.concat([existing, part], ignore_index=True)
+                part = part.drop_duplicates('timestamp', keep='last').sort_values('timestamp', kind='stable')
+            self._write_partition(key, part)
+
+        self._save_index()
+        return self.path
+
+    def append(self, data, since=None):
+        """合并从since开始的数据，已有数据中时间戳不早于since的部分被替换
+
+        Args:
+            data (list | pd.DataFrame): 从since开始的K线数据
+            since (int, optional): 新数据的起始时间戳(毫秒)，默认为新数据的第一条时间戳
+
+        Returns:
+            str: 分区目录
+        """
+        df = ohlcv_to_frame(data, self.schema).sort_values('timestamp', kind='stable')
+        if since is None:
+            if df.empty:
+                return self.path
+            since = int(df['timestamp'].iloc[0])
+
+        os.makedirs(self.path, exist_ok=True)
+        new_parts = self._split_by_month(df[df['timestamp'] >= since])
+        affected = set(new_parts) | set(self._overlapping_partitions(start=since))
+
+        for key in sorted(affected):
+            parts = []
+            if key in self.partitions:
+                existing = self._read_partition(key)
+                parts.append(existing[existing['timestamp'] < since])
+            if key in new_parts:
+                parts.append(new_parts[key])
+            self._write_partition(key, pd.concat(parts, ignore_index=True))
+
+        self._save_index()
+        return self.path
+
+    def writer(self, since=None):
+        """打开分块写入器，每个分块只重写其所在的分区
+
+        Args:
+            since (int, optional): 指定时已有数据中不早于since的部分由写入的分块替换；
+                未指定时写入的数据与已有数据合并
+
+        Returns:
+            PartitionedWriter: 分块写入器
+        """
+        return PartitionedWriter(self, since)
+
+    def load(self, start=None, end=None, columns=None):
+        """读取时间范围[start, end]内的数据，只打开与范围重叠的分区
+
+        Args:
+            start (int | str, optional): 起始时间
+            end (int | str, optional): 结束时间
+            columns (list, optional): 只读取指定的列
+
+        Returns:
+            pd.DataFrame: K线数据
+        """
+        start = to_timestamp_ms(start) if start is not None else None
+        end = to_timestamp_ms(end) if end is not None else None
+
+        keys = self._overlapping_partitions(start, end)
+        if not keys:
+            return pd.DataFrame(columns=columns or ohlcv_to_frame([], self.schema).columns)
+
+        read_columns = _read_columns(columns)
+        frames = [self._read_partition(key, columns=read_columns) for key in keys]
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return _filter_range(df, start, end, columns)
+
+
+class PartitionedWriter:
+    """
+    分区存储的分块写入器
+
+    指定since时第一个分块替换已有数据中不早于since的部分，之后的分块与已有数据合并，
+    内存占用不超过一个分块加一个分区。
+    """
+
+    def __init__(self, store, since=None):
+        self.store = store
+        self.since = since
+        self.rows = 0
+
+    def write(self, df):
+        """写入一个按timestamp升序排列的数据分块"""
+        if df.empty:
+            return
+        if self.since is not None:
+            self.store.append(df, self.since)
+            self.since = None
+        else:
+            self.store.write(df)
+        self.rows += len(df)
+
+    def close(self):
+        """提交写入，每个分块写入后即已提交"""
+
+    def abort(self):
+        """放弃写入，已写入的分块保持不变"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+def open_store(symbol, timeframe, exchange_id=None, data_dir=None, storage_format=None, layout=None, schema=None):
+    """按配置的存储布局打开K线数据仓库
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据根目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局 'flat' 或 'partitioned'，默认读取配置
+        schema (dict, optional): {列名: 类型}，保存资金费率等非K线的时间序列时指定，默认为OHLCV
+
+    Returns:
+        FlatStore | PartitionedStore: 数据仓库
+    """
+    if layout is None:
+        layout = data_config.get('storage_layout', LAYOUT_FLAT)
+
+    if layout == LAYOUT_FLAT:
+        return FlatStore(symbol, timeframe, data_dir, storage_format, schema)
+    if layout == LAYOUT_PARTITIONED:
+        return PartitionedStore(symbol, timeframe, exchange_id, data_dir, storage_format, schema)
+    raise ValueError(f"不支持的存储布局: {layout}")
+
+
+def load_ohlcv(symbol, timeframe, start=None, end=None, exchange_id=None, columns=None, data_dir=None,
+               storage_format=None, layout=None):
+    """读取时间范围[start, end]内的K线数据
+
+    分区布局下只打开与时间范围有重叠的分区。
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        start (int | str, optional): 起始时间，毫秒时间戳或 'YYYY-MM-DD[ HH:MM:SS]'
+        end (int | str, optional): 结束时间，毫秒时间戳或 'YYYY-MM-DD[ HH:MM:SS]'
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        columns (list, optional): 只读取指定的列
+        data_dir (str, optional): 数据根目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+
+    Returns:
+        pd.DataFrame: K线数据
+    """
+    store = open_store(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    return store.load(start, end, columns)
+
+
+def load_ohlcv_memmap(symbol, timeframe, data_dir=None):
+    """以只读内存映射方式加载binary格式的K线数据
+
+    多个进程映射同一文件时共享操作系统页缓存，不会各自复制一份数据。
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h', '1d'
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+
+    Returns:
+        OHLCVMemmap: 各字段为零拷贝视图的K线数据
+    """
+    return FlatStore(symbol, timeframe, data_dir, BinaryStorage.name).memmap()
@@ -0,0 +1,153 @@
+"""交易对索引模块，提供交易对的哈希查找、别名解析和模糊搜索"""
+
+import re
+import bisect
+import difflib
+import weakref
+
+# 规范化时去掉的分隔符
+_SEPARATORS = re.compile(r'[/:\-_\s]')
+
+# 按交易所实例缓存的交易对索引
+_INDEXES = weakref.WeakKeyDictionary()
+
+
+def normalize_symbol(name):
+    """将交易对名称规范化为别名键，如 'eth-usdt-swap' -> 'ETHUSDTSWAP'"""
+    return _SEPARATORS.sub('', str(name)).upper()
+
+
+class SymbolIndex:
+    """
+    交易对索引
+
+    统一交易对名称用集合做O(1)查找；交易所的市场ID(如 'ETH-USDT-SWAP')、去掉分隔符的写法
+    和数据文件名的写法(如 'ETH-USDT-USDT')作为别名指向统一名称(如 'ETH/USDT:USDT')；
+    规范化后的名称排序保存，用二分查找做前缀搜索。
+    """
+
+    def __init__(self, markets=None, symbols=None):
+        """初始化交易对索引
+
+        Args:
+            markets (dict, optional): ccxt的市场信息 {统一名称: market}，用于收集市场ID别名
+            symbols (list, optional): 统一交易对名称列表，没有市场信息时使用
+        """
+        if markets:
+            symbols = list(markets)
+        self.symbols = list(symbols or [])
+        self._symbols = set(self.symbols)
+        self._aliases = {}
+
+        # 统一名称的规范化形式优先，市场ID的别名不覆盖已有的别名
+        for symbol in self.symbols:
+            self._aliases.setdefault(normalize_symbol(symbol), symbol)
+        for symbol, market in (markets or {}).items():
+            if isinstance(market, dict) and market.get('id'):
+                self._aliases.setdefault(normalize_symbol(market['id']), symbol)
+
+        self._keys = sorted(self._aliases)
+
+        # 构建索引所用的数据，用于判断交易所的市场信息是否已更新
+        self.source = None
+
+    def __contains__(self, name):
+        return self.resolve(name) is not None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def resolve(self, name):
+        """将交易对名称或别名解析为统一名称
+
+        Args:
+            name (str): 交易对名称，如 'ETH/USDT:USDT'、'ETH-USDT-SWAP'、'ethusdt'
+
+        Returns:
+            str: 统一交易对名称，不存在时返回None
+        """
+        if name in self._symbols:
+            return name
+        return self._aliases.get(normalize_symbol(name))
+
+    def search(self, prefix, limit=10):
+        """按前缀搜索交易对
+
+        Args:
+            prefix (str): 名称前缀，忽略大小写和分隔符
+            limit (int): 最多返回的数量
+
+        Returns:
+            list: 匹配的统一交易对名称
+        """
+        key = normalize_symbol(prefix)
+        results = []
+        for i in range(bisect.bisect_left(self._keys, key), len(self._keys)):
+            if not self._keys[i].startswith(key) or len(results) >= limit:
+                break
+            symbol = self._aliases[self._keys[i]]
+            if symbol not in results:
+                results.append(symbol)
+        return results
+
+    def suggest(self, name, limit=10):
+        """为不存在的交易对给出相近的候选
+
+        先按前缀搜索，没有结果时逐步缩短前缀，最后按相似度匹配。
+
+        Args:
+            name (str): 交易对名称
+            limit (int): 最多返回的数量
+
+        Returns:
+            list: 候选的统一交易对名称
+        """
+        key = normalize_symbol(name)
+        for length in range(len(key), 2, -1):
+            results = self.search(key[:length], limit)
+            if results:
+                return results
+
+        matches = difflib.get_close_matches(key, self._keys, n=limit, cutoff=0.5)
+        return list(dict.fromkeys(self._aliases[match] for match in matches))
+
+    def validate(self, names):
+        """批量校验交易对，每个名称O(1)
+
+        Args:
+            names (iterable): 交易对名称列表
+
+        Returns:
+            tuple: ({原名称: 统一名称}, [不存在的名称])
+        """
+        resolved = {}
+        missing = []
+        for name in names:
+            symbol = self.resolve(name)
+            if symbol is None:
+                missing.append(name)
+            else:
+                resolved[name] = symbol
+        return resolved, missing
+
+
+def get_symbol_index(exchange):
+    """获取交易所实例的交易对索引，市场信息不变时复用
+
+    Args:
+        exchange (ccxt.Exchange): 已加载市场信息的交易所API实例
+
+    Returns:
+        SymbolIndex: 交易对索引
+    """
+    markets = getattr(exchange, 'markets', None)
+    if not isinstance(markets, dict):
+        markets = None
+    source = markets if markets else exchange.symbols
+
+    index = _INDEXES.get(exchange)
+    if index is None or index.source is not source:
+        index = SymbolIndex(markets, exchange.symbols)
+        index.source = source
+        _INDEXES[exchange] = index
+    return index
@@ -0,0 +1,65 @@
+"""时间工具模块，提供K线周期与时间戳之间的换算"""
+
+import numbers
+from datetime import datetime
+
+# K线周期单位对应的毫秒数，与ccxt的parse_timeframe保持一致
+TIMEFRAME_UNIT_MS = {
+    's': 1000,
+    'm': 60 * 1000,
+    'h': 60 * 60 * 1000,
+    'd': 24 * 60 * 60 * 1000,
+    'w': 7 * 24 * 60 * 60 * 1000,
+    'M': 30 * 24 * 60 * 60 * 1000,
+    'y': 365 * 24 * 60 * 60 * 1000,
+}
+
+# 支持解析的日期格式
+DATE_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d')
+
+
+def timeframe_to_ms(timeframe):
+    """将K线周期转换为毫秒数
+
+    Args:
+        timeframe (str): K线周期，如 '1m', '1h', '1d'
+
+    Returns:
+        int: 该周期对应的毫秒数
+    """
+    if not timeframe or len(timeframe) < 2:
+        raise ValueError(f"不支持的K线周期: {timeframe}")
+
+    amount, unit = timeframe[:-1], timeframe[-1]
+    if unit not in TIMEFRAME_UNIT_MS or not amount.isdigit():
+        raise ValueError(f"不支持的K线周期: {timeframe}")
+
+    return int(amount) * TIMEFRAME_UNIT_MS[unit]
+
+
+def to_timestamp_ms(value):
+    """将日期转换为毫秒时间戳
+
+    Args:
+        value (str | int | float | datetime): 日期字符串（'YYYY-MM-DD' 或 'YYYY-MM-DD HH:MM:SS'）、
+            毫秒时间戳或datetime对象
+
+    Returns:
+        int: 毫秒时间戳
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"无法解析的日期: {value}")
+
+    if isinstance(value, numbers.Real):
+        return int(value)
+
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+
+    for date_format in DATE_FORMATS:
+        try:
+            return int(datetime.strptime(value, date_format).timestamp() * 1000)
+        except ValueError:
+            continue
+
+    raise ValueError(f"无法解析的日期: {value}")
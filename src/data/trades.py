@@ -0,0 +1,451 @@
+"""逐笔成交数据模块，分页获取成交记录并整理为紧凑的数组分块，一次遍历同时聚合时间、成交量、成交额和笔数K线"""
+
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from src.data.get_data import data_config, logger, get_exchange, _resolve_time_range
+from src.data.rate_limiter import (
+    RateLimiter, RetryPolicy, endpoint_weight, is_retryable, retry_after_seconds, RATE_LIMIT_ERRORS
+)
+from src.data.exchange_pool import get_pooled_exchange, ensure_markets, pool_enabled
+from src.data.symbols import get_symbol_index
+from src.data.resample import bar_start
+
+# 成交记录的紧凑表示，每笔25字节，side为1(主动买)、-1(主动卖)或0(未知)
+TRADE_DTYPE = np.dtype([('timestamp', 'i8'), ('price', 'f8'), ('amount', 'f8'), ('side', 'i1')])
+
+# 成交方向
+SIDES = {'buy': 1, 'sell': -1}
+
+# 聚合K线的列，前6列与K线数据一致；dollar为成交额，end_timestamp为最后一笔成交的时间
+BAR_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume',
+               'dollar', 'trades', 'buy_volume', 'end_timestamp']
+BAR_DTYPES = {column: np.int64 if column in ('timestamp', 'trades', 'end_timestamp') else np.float64
+              for column in BAR_COLUMNS}
+
+# 默认聚合的K线
+DEFAULT_BARS = ['1m']
+
+
+def trades_to_array(trades):
+    """将ccxt返回的成交记录转换为结构化数组
+
+    Args:
+        trades (list): fetch_trades返回的成交记录
+
+    Returns:
+        np.ndarray: TRADE_DTYPE结构化数组
+    """
+    array = np.empty(len(trades), dtype=TRADE_DTYPE)
+    array['timestamp'] = [trade['timestamp'] for trade in trades]
+    array['price'] = [trade['price'] for trade in trades]
+    array['amount'] = [trade['amount'] for trade in trades]
+    array['side'] = [SIDES.get(trade.get('side'), 0) for trade in trades]
+    return array
+
+
+def fetch_trades(exchange, symbol, since=None, limit=1000, rate_limiter=None):
+    """获取一页成交记录
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        symbol (str): 交易对，如 'ETH/USDT'
+        since (int, optional): 起始时间戳(毫秒)
+        limit (int): 单次请求的成交数量
+        rate_limiter (RateLimiter, optional): 频率限制器
+
+    Returns:
+        list: 成交记录列表
+    """
+    try:
+        if rate_limiter is not None:
+            rate_limiter.acquire(endpoint_weight('fetch_trades'))
+
+        logger.info(f"获取 {symbol} 成交记录，起始时间: {datetime.fromtimestamp(since / 1000) if since else 'None'}")
+        trades = exchange.fetch_trades(symbol, since, limit)
+        logger.info(f"获取到 {len(trades)} 条成交记录")
+    except Exception as e:
+        logger.error(f"获取成交记录失败: {str(e)}")
+        raise
+    return trades
+
+
+def _fetch_trades_page(exchange, symbol, since, limit, rate_limiter, retry_policy):
+    """获取一页成交记录，可重试的错误按退避策略重试"""
+    attempt = 0
+    while True:
+        try:
+            return fetch_trades(exchange, symbol, since, limit, rate_limiter=rate_limiter)
+        except Exception as e:
+            if not is_retryable(e) or attempt >= retry_policy.max_retries:
+                raise
+
+            delay = retry_policy.delay(attempt, retry_after_seconds(exchange, e))
+            if isinstance(e, RATE_LIMIT_ERRORS) and rate_limiter is not None:
+                rate_limiter.penalize(delay)
+            attempt += 1
+            logger.warning(f"获取成交记录出错: {str(e)}，{delay:.1f} 秒后第 {attempt} 次重试")
+            time.sleep(delay)
+
+
+def _trade_key(trade):
+    return trade.get('id') or (trade['timestamp'], trade['price'], trade['amount'], trade.get('side'))
+
+
+def iter_trade_pages(exchange, symbol, start_timestamp, end_timestamp, limit=None, rate_limiter=None,
+                     progress_callback=None, retry_policy=None):
+    """逐页获取时间范围[start_timestamp, end_timestamp]内的成交记录
+
+    同一毫秒内可能有多笔成交，下一页从上一页最后一笔的时间戳开始请求，并按成交ID去掉已产出的成交，
+    因此一页的末尾落在同一毫秒中间时不会丢失数据。只需记住最后一毫秒内的成交ID，内存占用与数据总量无关。
+
+    Args:
+        exchange (ccxt.Exchange): 交易所API实例
+        symbol (str): 交易对，如 'ETH/USDT'
+        start_timestamp (int): 起始时间戳(毫秒)
+        end_timestamp (int): 结束时间戳(毫秒)，包含该时间
+        limit (int, optional): 单次请求的成交数量，默认读取配置 trades.page_limit
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        progress_callback (callable, optional): 每获取一页数据后调用
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+
+    Yields:
+        np.ndarray: 每页新的成交记录，TRADE_DTYPE结构化数组
+    """
+    if limit is None:
+        limit = data_config.get('trades', {}).get('page_limit', 1000)
+
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(exchange.rateLimit / 1000)
+
+    if retry_policy is None:
+        retry_policy = RetryPolicy()
+
+    since = start_timestamp
+    seen = set()
+    rows = 0
+
+    while since <= end_timestamp:
+        page = _fetch_trades_page(exchange, symbol, since, limit, rate_limiter, retry_policy)
+        if not page:
+            logger.warning("没有获取到更多成交记录，可能已到达数据末尾")
+            break
+
+        fresh = [trade for trade in page
+                 if since <= trade['timestamp'] <= end_timestamp
+                 and (trade['timestamp'] > since or _trade_key(trade) not in seen)]
+
+        last_timestamp = page[-1]['timestamp']
+        if last_timestamp < since:
+            logger.warning(f"交易所返回的成交早于请求的起始时间，停止翻页: {datetime.fromtimestamp(since / 1000)}")
+            break
+
+        if last_timestamp == since and not fresh:
+            if len(page) < limit:
+                # 不满一页且都已产出过，已到达数据末尾
+                break
+            # 同一毫秒内的成交多于一页，无法继续翻页，跳到下一毫秒
+            logger.warning(f"{datetime.fromtimestamp(since / 1000)} 的成交多于 {limit} 条，可能有遗漏")
+            since += 1
+            seen = set()
+            continue
+
+        if last_timestamp != since:
+            seen = set()
+        seen.update(_trade_key(trade) for trade in page if trade['timestamp'] == last_timestamp)
+        since = last_timestamp
+        rows += len(fresh)
+
+        if progress_callback is not None:
+            progress_callback(since, start_timestamp, end_timestamp, rows)
+
+        if fresh:
+            yield trades_to_array(fresh)
+
+        if last_timestamp > end_timestamp:
+            break
+
+
+def chunk_trades(pages, chunk_size):
+    """将每页成交记录合并为固定行数的数组分块
+
+    Args:
+        pages (iterable): 每页成交记录的结构化数组
+        chunk_size (int): 每个分块的成交数量
+
+    Yields:
+        np.ndarray: 成交记录分块
+    """
+    buffer = []
+    buffered = 0
+    for page in pages:
+        buffer.append(page)
+        buffered += len(page)
+        if buffered >= chunk_size:
+            merged = np.concatenate(buffer)
+            for start in range(0, len(merged) - chunk_size + 1, chunk_size):
+                yield merged[start:start + chunk_size]
+            rest = merged[len(merged) - len(merged) % chunk_size:]
+            buffer, buffered = [rest], len(rest)
+
+    if buffered:
+        yield np.concatenate(buffer)
+
+
+class BarAggregator:
+    """
+    逐块将成交聚合为K线的基类
+
+    子类给出每笔成交所属K线的编号(单调不减)。每个分块内用reduceat一次算出所有K线，
+    分块末尾尚未结束的K线保留下来与下一个分块合并，因此结果与分块方式无关，内存中只保存已完成的K线。
+    """
+
+    def __init__(self):
+        self._partial = None
+        self._bars = []
+
+    def _bar_ids(self, chunk):
+        raise NotImplementedError
+
+    def _bar_timestamps(self, ids, first_timestamps):
+        """K线的时间戳，默认为第一笔成交的时间"""
+        return first_timestamps
+
+    def update(self, chunk):
+        """输入一个成交记录分块
+
+        Args:
+            chunk (np.ndarray): 按时间排序的TRADE_DTYPE结构化数组
+        """
+        if not len(chunk):
+            return
+
+        ids = self._bar_ids(chunk)
+        timestamps, price, amount = chunk['timestamp'], chunk['price'], chunk['amount']
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        ends = np.r_[starts[1:], len(chunk)] - 1
+
+        bars = {
+            'id': ids[starts],
+            'timestamp': self._bar_timestamps(ids[starts], timestamps[starts]),
+            'open': price[starts],
+            'high': np.maximum.reduceat(price, starts),
+            'low': np.minimum.reduceat(price, starts),
+            'close': price[ends],
+            'volume': np.add.reduceat(amount, starts),
+            'dollar': np.add.reduceat(price * amount, starts),
+            'trades': ends - starts + 1,
+            'buy_volume': np.add.reduceat(np.where(chunk['side'] > 0, amount, 0.0), starts),
+            'end_timestamp': timestamps[ends],
+        }
+
+        partial = self._partial
+        if partial is not None and partial['id'][0] == bars['id'][0]:
+            for column in ('timestamp', 'open'):
+                bars[column][0] = partial[column][0]
+            bars['high'][0] = max(bars['high'][0], partial['high'][0])
+            bars['low'][0] = min(bars['low'][0], partial['low'][0])
+            for column in ('volume', 'dollar', 'trades', 'buy_volume'):
+                bars[column][0] += partial[column][0]
+        elif partial is not None:
+            self._bars.append(partial)
+
+        self._bars.append({column: values[:-1] for column, values in bars.items()})
+        self._partial = {column: values[-1:] for column, values in bars.items()}
+
+    def flush(self):
+        """结束输入，最后一根K线作为已完成的K线"""
+        if self._partial is not None:
+            self._bars.append(self._partial)
+            self._partial = None
+
+    def pop_bars(self):
+        """取出并清空已完成的K线，用于边聚合边写入
+
+        Returns:
+            pd.DataFrame: 已完成的K线，列为BAR_COLUMNS
+        """
+        bars = [part for part in self._bars if len(part['id'])]
+        self._bars = []
+        if not bars:
+            return pd.DataFrame({column: np.empty(0, dtype=BAR_DTYPES[column]) for column in BAR_COLUMNS})
+        return pd.DataFrame({column: np.concatenate([part[column] for part in bars]) for column in BAR_COLUMNS})
+
+
+class TimeBars(BarAggregator):
+    """按固定时间周期聚合，K线时间戳按数据规范与UTC对齐，没有成交的周期不产生K线"""
+
+    def __init__(self, timeframe):
+        super().__init__()
+        self.timeframe = timeframe
+
+    def _bar_ids(self, chunk):
+        return bar_start(chunk['timestamp'], self.timeframe)
+
+    def _bar_timestamps(self, ids, first_timestamps):
+        return ids
+
+
+class _ThresholdBars(BarAggregator):
+    """
+    累计量达到阈值时结束一根K线
+
+    第k根K线包含此前累计量落在[k * threshold, (k + 1) * threshold)内的成交，
+    越过阈值的那笔成交留在当前K线，超出的部分计入下一根K线的累计量，各K线的平均累计量等于阈值。
+    """
+
+    def __init__(self, threshold):
+        super().__init__()
+        if threshold <= 0:
+            raise ValueError(f"阈值必须大于0: {threshold}")
+        self.threshold = threshold
+        self._total = 0.0
+
+    def _measure(self, chunk):
+        raise NotImplementedError
+
+    def _bar_ids(self, chunk):
+        cumulative = self._total + np.cumsum(self._measure(chunk))
+        before = np.r_[self._total, cumulative[:-1]]
+        self._total = float(cumulative[-1])
+        return np.floor(before / self.threshold).astype(np.int64)
+
+
+class VolumeBars(_ThresholdBars):
+    """每根K线的成交量(基础货币)约为threshold"""
+
+    def _measure(self, chunk):
+        return chunk['amount']
+
+
+class DollarBars(_ThresholdBars):
+    """每根K线的成交额(计价货币)约为threshold"""
+
+    def _measure(self, chunk):
+        return chunk['price'] * chunk['amount']
+
+
+class TickBars(BarAggregator):
+    """每根K线包含count笔成交"""
+
+    def __init__(self, count):
+        super().__init__()
+        if int(count) <= 0:
+            raise ValueError(f"成交笔数必须大于0: {count}")
+        self.count = int(count)
+        self._seen = 0
+
+    def _bar_ids(self, chunk):
+        ids = (self._seen + np.arange(len(chunk), dtype=np.int64)) // self.count
+        self._seen += len(chunk)
+        return ids
+
+
+# K线类型前缀到聚合器的映射
+BAR_TYPES = {'volume': VolumeBars, 'dollar': DollarBars, 'tick': TickBars}
+
+
+def make_aggregator(spec):
+    """由K线描述创建聚合器
+
+    Args:
+        spec (str): 时间K线为周期，如 '1m'；其他为 '{类型}:{阈值}'，如 'volume:100'、'dollar:1e6'、'tick:500'
+
+    Returns:
+        BarAggregator: 聚合器
+    """
+    if ':' not in spec:
+        return TimeBars(spec)
+
+    kind, value = spec.split(':', 1)
+    if kind not in BAR_TYPES:
+        raise ValueError(f"不支持的K线类型: {kind}")
+    return BAR_TYPES[kind](float(value))
+
+
+def aggregate_trades(chunks, bars=None):
+    """一次遍历成交记录，同时聚合多种K线
+
+    Args:
+        chunks (iterable): 按时间排序的成交记录分块
+        bars (list | dict, optional): K线描述列表，或 {名称: BarAggregator}，默认读取配置 trades.bars
+
+    Returns:
+        dict: {名称: pd.DataFrame}，每种K线一个DataFrame，最后一根K线可能尚未结束
+    """
+    if bars is None:
+        bars = data_config.get('trades', {}).get('bars', DEFAULT_BARS)
+    if not isinstance(bars, dict):
+        bars = {spec: make_aggregator(spec) for spec in bars}
+
+    frames = {name: [] for name in bars}
+    for chunk in chunks:
+        for name, aggregator in bars.items():
+            aggregator.update(chunk)
+            frame = aggregator.pop_bars()
+            if len(frame):
+                frames[name].append(frame)
+
+    result = {}
+    for name, aggregator in bars.items():
+        aggregator.flush()
+        frames[name].append(aggregator.pop_bars())
+        result[name] = pd.concat(frames[name], ignore_index=True)
+    return result
+
+
+def fetch_trade_bars(symbol=None, start_date=None, end_date=None, bars=None, exchange_id=None, config=None,
+                     exchange=None, chunk_size=None, limit=None, rate_limiter=None, progress_callback=None,
+                     retry_policy=None):
+    """获取时间范围内的成交记录并聚合为K线，成交记录按分块处理，不在内存中保留完整的成交历史
+
+    Args:
+        symbol (str, optional): 交易对，默认读取配置
+        start_date (str | int, optional): 起始日期，默认为30天前
+        end_date (str | int, optional): 结束日期，默认为当前时间
+        bars (list | dict, optional): K线描述列表，或 {名称: BarAggregator}，默认读取配置 trades.bars
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        config (dict, optional): 交易所API配置
+        exchange (ccxt.Exchange, optional): 复用的交易所API实例
+        chunk_size (int, optional): 每个分块的成交数量，默认读取配置 trades.chunk_size
+        limit (int, optional): 单次请求的成交数量，默认读取配置 trades.page_limit
+        rate_limiter (RateLimiter, optional): 共享的频率限制器
+        progress_callback (callable, optional): 每获取一页数据后调用
+        retry_policy (RetryPolicy, optional): 失败重试策略，默认读取配置
+
+    Returns:
+        dict: {名称: pd.DataFrame}，列为BAR_COLUMNS
+    """
+    if symbol is None:
+        symbol = data_config.get('symbol', 'ETH/USDT')
+
+    if exchange_id is None:
+        exchange_id = data_config.get('exchange_id', 'okx')
+
+    if chunk_size is None:
+        chunk_size = data_config.get('trades', {}).get('chunk_size', 100000)
+
+    if exchange is None and pool_enabled():
+        exchange = get_pooled_exchange(exchange_id, config)
+
+    if exchange is not None:
+        ensure_markets(exchange)
+    else:
+        exchange = get_exchange(exchange_id, config)
+        exchange.load_markets()
+
+    resolved_symbol = get_symbol_index(exchange).resolve(symbol)
+    if resolved_symbol is None:
+        raise ValueError(f"交易对 {symbol} 在交易所 {exchange_id} 中不存在")
+
+    start_timestamp, end_timestamp = _resolve_time_range(start_date, end_date)
+    pages = iter_trade_pages(exchange, resolved_symbol, start_timestamp, end_timestamp, limit, rate_limiter,
+                             progress_callback, retry_policy)
+    result = aggregate_trades(chunk_trades(pages, chunk_size), bars)
+
+    logger.info(f"{resolved_symbol} 成交记录聚合完成: " +
+                "，".join(f"{name} {len(frame)} 根" for name, frame in result.items()))
+    return result
@@ -0,0 +1,5 @@
+"""
+技术指标模块
+
+由K线数据计算向量化的技术指标
+"""
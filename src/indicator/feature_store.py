@@ -0,0 +1,280 @@
+"""特征库模块，把计算好的指标列以列式格式保存在数据目录中，随K线数据的版本自动失效，追加数据时只计算新增的K线"""
+
+import os
+import json
+import time
+
+import pandas as pd
+
+from src.indicator.indicators import data_config, logger, IndicatorBatch, _suffix
+from src.indicator.streaming import StreamingFeatures, normalize_indicators
+from src.data.hashing import chain_hash
+from src.data.storage import get_storage
+from src.data.store import open_store, symbol_to_filename, PartitionedStore
+from src.data.time_utils import timeframe_to_ms, to_timestamp_ms
+from src.manager import SystemManager
+
+# 特征库在数据目录下的子目录
+FEATURES_DIRNAME = 'features'
+
+# 指标只依赖这些列，数据版本的哈希也只包含这些列
+SOURCE_HASH_COLUMNS = ('timestamp', 'high', 'low', 'close')
+
+# 特征的刷新方式
+STATUS_FRESH = 'fresh'
+STATUS_EXTENDED = 'extended'
+STATUS_COMPUTED = 'computed'
+
+
+def _source_fingerprint(store):
+    """K线数据文件的大小和修改时间，数据被追加或修复后随之改变
+
+    分区布局每次写入都会重写分区索引，使用索引文件的信息。
+    """
+    path = store.index_path if isinstance(store, PartitionedStore) else store.path
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class FeatureStore:
+    """
+    一个交易对在一个周期下的特征库
+
+    每个 (指标, 参数) 保存为一个列式文件和一个元数据文件，元数据记录数据版本号、K线文件的指纹和最后一根K线的时间、
+    已计算的行数、这些行的内容哈希和流式指标状态。读取时K线文件没有变化、且没有新走完的K线就直接读文件；
+    K线被追加时，已计算部分的哈希不变，由保存的流式状态只计算新增的K线；已计算部分被修复(哈希改变)时整体重新计算。
+    只使用已走完的K线。
+
+    为了发现修复，K线文件变化后每次都要对已计算的全部行重新计算一次哈希，代价与历史长度成正比(多个指标共用一次)；
+    链式哈希的状态只省去追加后再对全部数据计算新哈希的那一遍，指标计算本身只处理新增的K线。
+    """
+
+    def __init__(self, symbol, timeframe, exchange_id=None, data_dir=None, storage_format=None, layout=None,
+                 feature_format=None):
+        """初始化特征库
+
+        Args:
+            symbol (str): 交易对，如 'ETH/USDT'
+            timeframe (str): K线周期，如 '1h'
+            exchange_id (str, optional): 交易所ID，默认读取配置
+            data_dir (str, optional): 数据目录，默认为系统数据目录
+            storage_format (str, optional): K线的存储格式，默认读取配置
+            layout (str, optional): K线的存储布局，默认读取配置
+            feature_format (str, optional): 特征文件格式，默认读取配置 feature_store.format
+        """
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.source = open_store(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+        self.storage = get_storage(feature_format or data_config.get('feature_store', {}).get('format', 'parquet'))
+
+        root = os.path.join(str(data_dir if data_dir is not None else SystemManager().DATA_PATH), FEATURES_DIRNAME)
+        if isinstance(self.source, PartitionedStore):
+            self.directory = os.path.join(root, self.source.exchange_id, symbol_to_filename(symbol), timeframe)
+        else:
+            self.directory = os.path.join(root, f"{symbol_to_filename(symbol)}_{timeframe}")
+
+    def _paths(self, name, params):
+        base = os.path.join(self.directory, f"{name}_{_suffix(params)}")
+        return base + self.storage.extension, base + '.json'
+
+    @staticmethod
+    def _read_meta(path):
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_meta(path, meta):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, path)
+
+    def version(self, name, params):
+        """某个特征的数据版本号，每次因K线变化而更新后加1，尚未计算时为0"""
+        meta = self._read_meta(self._paths(name, list(params))[1])
+        return meta['data_version'] if meta else 0
+
+    def refresh(self, indicators=None, now=None):
+        """保证特征与当前的K线数据一致
+
+        Args:
+            indicators (dict, optional): {指标名: [参数, ...]}，默认读取配置
+            now (int, optional): 当前时间戳(毫秒)，默认为系统时间
+
+        Returns:
+            dict: {'{指标名}_{参数}': 'fresh' | 'extended' | 'computed'}
+        """
+        fingerprint = _source_fingerprint(self.source)
+        if fingerprint is None:
+            raise FileNotFoundError(f"数据不存在: {self.source.path}")
+        cutoff = (now if now is not None else int(time.time() * 1000)) - timeframe_to_ms(self.timeframe)
+
+        statuses = {}
+        stale = []
+        for name, param_list in normalize_indicators(indicators).items():
+            for params in param_list:
+                file_path, meta_path = self._paths(name, params)
+                meta = self._read_meta(meta_path)
+                key = f"{name}_{_suffix(params)}"
+                if self._is_fresh(meta, fingerprint, cutoff) and os.path.exists(file_path):
+                    statuses[key] = STATUS_FRESH
+                else:
+                    stale.append((key, name, params, meta))
+        if not stale:
+            return statuses
+
+        data = self.source.load(end=cutoff)
+        if data.empty:
+            raise ValueError(f"{self.symbol} {self.timeframe} 没有已走完的K线")
+        os.makedirs(self.directory, exist_ok=True)
+        source = {'fingerprint': fingerprint, 'source_last_timestamp': self.source.last_timestamp()}
+
+        prefix_hashes = {}
+        recompute = []
+        for key, name, params, meta in stale:
+            if meta is not None and self._is_append(data, meta, prefix_hashes):
+                if meta['fingerprint'] == fingerprint and meta['rows'] == len(data) \
+                        and os.path.exists(self._paths(name, params)[0]):
+                    # 文件没有变化，下一根K线之前有缺失，没有新走完的K线
+                    statuses[key] = STATUS_FRESH
+                else:
+                    self._extend(data, name, params, meta, source)
+                    statuses[key] = STATUS_EXTENDED
+            else:
+                recompute.append((key, name, params, meta))
+
+        if recompute:
+            self._compute(data, recompute, source, prefix_hashes)
+            statuses.update({key: STATUS_COMPUTED for key, _, _, _ in recompute})
+
+        logger.info(f"{self.symbol} {self.timeframe} 特征库更新: "
+                    f"{sum(s == STATUS_EXTENDED for s in statuses.values())} 个追加，"
+                    f"{len(recompute)} 个重新计算，{sum(s == STATUS_FRESH for s in statuses.values())} 个无需更新")
+        return statuses
+
+    def _is_fresh(self, meta, fingerprint, cutoff):
+        """K线文件没有变化，且文件中上次未走完的K线到cutoff时仍未走完"""
+        if meta is None or meta['fingerprint'] != fingerprint:
+            return False
+        if meta.get('source_last_timestamp') == meta['last_timestamp']:
+            return True
+        # 上次计算之后的下一根K线最早在 last_timestamp + 周期，此时之前走完的K线都已计算
+        return meta['last_timestamp'] + timeframe_to_ms(self.timeframe) > cutoff
+
+    def _prefix_hash(self, data, rows, prefix_hashes):
+        """前rows行的链式哈希和状态，多个指标共用"""
+        if rows not in prefix_hashes:
+            prefix_hashes[rows] = chain_hash(data.iloc[:rows], SOURCE_HASH_COLUMNS)
+        return prefix_hashes[rows]
+
+    def _is_append(self, data, meta, prefix_hashes):
+        """已计算的K线是否原样保留在当前数据的开头，对这些行从头重新计算哈希"""
+        rows = meta['rows']
+        if rows > len(data) or int(data['timestamp'].iloc[rows - 1]) != meta['last_timestamp']:
+            return False
+        return self._prefix_hash(data, rows, prefix_hashes)[0] == meta['source_hash']
+
+    def _extend(self, data, name, params, meta, source):
+        """由保存的流式状态只计算新增的K线，数据哈希从保存的链式哈希状态接着计算"""
+        file_path, meta_path = self._paths(name, params)
+        rows = meta['rows']
+        features = StreamingFeatures.from_state(meta['state'])
+        if rows < len(data):
+            tail = features.update_candles(data.iloc[rows:])
+            self.storage.append(tail, file_path, int(tail['timestamp'].iloc[0]))
+
+        source_hash, hash_state = chain_hash(data, SOURCE_HASH_COLUMNS, meta.get('hash_state'))
+        meta.update(source)
+        meta.update({
+            'data_version': meta['data_version'] + 1,
+            'rows': len(data),
+            'last_timestamp': int(data['timestamp'].iloc[-1]),
+            'source_hash': source_hash,
+            'hash_state': hash_state,
+            'state': features.to_state(),
+        })
+        self._write_meta(meta_path, meta)
+
+    def _compute(self, data, items, source, prefix_hashes):
+        """对全部历史批量计算，多个指标共享中间结果，并由历史预热流式状态"""
+        spec = {}
+        for _, name, params, _ in items:
+            spec.setdefault(name, []).append(params)
+        result = IndicatorBatch(data).compute(spec)
+        source_hash, hash_state = self._prefix_hash(data, len(data), prefix_hashes)
+
+        for _, name, params, meta in items:
+            features = StreamingFeatures({name: [params]})
+            features.warmup(data)
+            file_path, meta_path = self._paths(name, params)
+            self.storage.write(result[features.columns].reset_index(drop=True), file_path)
+            self._write_meta(meta_path, {
+                'indicator': name,
+                'params': params,
+                'columns': features.columns[1:],
+                'data_version': (meta['data_version'] if meta else 0) + 1,
+                **source,
+                'rows': len(data),
+                'last_timestamp': int(data['timestamp'].iloc[-1]),
+                'source_hash': source_hash,
+                'hash_state': hash_state,
+                'state': features.to_state(),
+            })
+
+    def load(self, indicators=None, start=None, end=None, now=None):
+        """读取特征，必要时先更新
+
+        Args:
+            indicators (dict, optional): {指标名: [参数, ...]}，默认读取配置
+            start (int | str, optional): 起始时间
+            end (int | str, optional): 结束时间
+            now (int, optional): 当前时间戳(毫秒)，默认为系统时间
+
+        Returns:
+            pd.DataFrame: timestamp列和各特征列
+        """
+        indicators = normalize_indicators(indicators)
+        self.refresh(indicators, now)
+
+        columns = {}
+        for name, param_list in indicators.items():
+            for params in param_list:
+                frame = self.storage.read(self._paths(name, params)[0])
+                if 'timestamp' not in columns:
+                    columns['timestamp'] = frame['timestamp'].to_numpy()
+                columns.update({column: frame[column].to_numpy() for column in frame.columns if column != 'timestamp'})
+
+        result = pd.DataFrame(columns)
+        if start is not None:
+            result = result[result['timestamp'] >= to_timestamp_ms(start)]
+        if end is not None:
+            result = result[result['timestamp'] <= to_timestamp_ms(end)]
+        return result.reset_index(drop=True)
+
+
+def load_features(symbol, timeframe, indicators=None, start=None, end=None, exchange_id=None, data_dir=None,
+                  storage_format=None, layout=None, now=None):
+    """从特征库读取指标，K线没有变化时只读文件，不做计算
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h'
+        indicators (dict, optional): {指标名: [参数, ...]}，默认读取配置
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): K线的存储格式，默认读取配置
+        layout (str, optional): K线的存储布局，默认读取配置
+        now (int, optional): 当前时间戳(毫秒)，默认为系统时间
+
+    Returns:
+        pd.DataFrame: timestamp列和各特征列
+    """
+    store = FeatureStore(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    return store.load(indicators, start, end, now)
@@ -0,0 +1,489 @@
+"""技术指标模块，直接在K线的NumPy列数组上向量化计算SMA/EMA/RSI/ATR/布林带/MACD/波动率"""
+
+import numpy as np
+import pandas as pd
+
+from src.log import get_logger
+from src.manager import SystemManager, ConfigManager
+from src.data.store import load_ohlcv
+
+# 读取数据配置
+data_config = ConfigManager(SystemManager()).read_config('data_config.json')
+
+# 获取配置好的logger
+logger = get_logger()
+
+# 默认计算的指标及参数
+DEFAULT_INDICATORS = {
+    'sma': [20],
+    'ema': [20],
+    'rsi': [14],
+    'atr': [14],
+    'bollinger': [[20, 2]],
+    'macd': [[12, 26, 9]],
+    'volatility': [20],
+}
+
+# 支持的指标名称
+INDICATOR_NAMES = ('sma', 'ema', 'rsi', 'atr', 'bollinger', 'macd', 'volatility', 'donchian')
+
+
+def _as_array(values):
+    """转换为float64数组，已是float64时不复制(如内存映射的字段视图)"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def _check_window(window):
+    if int(window) != window or window < 1:
+        raise ValueError(f"窗口长度必须是正整数: {window}")
+    return int(window)
+
+
+def _ewm(values, alpha=None, span=None, min_periods=0):
+    """递推式指数加权平均 y[t] = (1-alpha)*y[t-1] + alpha*x[t]，以首个有效值为初始值"""
+    return pd.Series(values).ewm(alpha=alpha, span=span, adjust=False, min_periods=min_periods).mean().to_numpy()
+
+
+class RollingMoments:
+    """
+    滑动窗口的均值和方差
+
+    按窗口长度把序列分块，每块以块首的值为基准计算块内偏差的前缀和，任意窗口最多跨两块，
+    窗口和由两段前缀和的差分得到，整体O(n)且没有逐根循环。偏差只在相邻两块内累加，
+    不会像全序列前缀和那样随长度累积舍入误差。同一窗口长度的中间结果会缓存，供均值和方差共用。
+    """
+
+    def __init__(self, values):
+        """初始化滑动窗口统计
+
+        Args:
+            values (np.ndarray): 输入序列，不能包含NaN
+        """
+        self.values = _as_array(values)
+        self.n = len(self.values)
+        self._sums = {}
+
+    def _window_sums(self, window):
+        """计算以每根为结尾的窗口内偏差和、偏差平方和以及基准值
+
+        Returns:
+            tuple: (偏差和, 偏差平方和, 基准值)，均为长度 n-window+1 的数组
+        """
+        if window in self._sums:
+            return self._sums[window]
+
+        n = self.n
+        rows = n - window + 1
+        blocks = -(-n // window)
+        anchors = np.repeat(self.values[::window], window)[:n]
+        deviation = np.zeros(blocks * window)
+        deviation[:n] = self.values - anchors
+
+        # 块内的累计和，以及每根所在块的块内总和
+        local = deviation.reshape(blocks, window)
+        prefix = np.cumsum(local, axis=1)
+        prefix_sq = np.cumsum(local * local, axis=1)
+        totals = np.repeat(prefix[:, -1], window)[:rows]
+        totals_sq = np.repeat(prefix_sq[:, -1], window)[:rows]
+        prefix, prefix_sq = prefix.ravel()[:n], prefix_sq.ravel()[:n]
+
+        # 窗口 [start, end] 中 end 所在块的部分为块内前缀和，start 所在块的尾段为块内总和减去start之前的前缀和，
+        # 窗口恰好是一整块时尾段为0
+        offset = np.tile(np.arange(window), blocks)[:rows]
+        cross = offset > 0
+        head = np.where(cross, totals - np.r_[0.0, prefix[:rows - 1]], 0.0)
+        head_sq = np.where(cross, totals_sq - np.r_[0.0, prefix_sq[:rows - 1]], 0.0)
+
+        # 尾段换算到 end 所在块的基准
+        shift = anchors[:rows] - anchors[window - 1:]
+        count = np.where(cross, window - offset, 0)
+        total = prefix[window - 1:] + head + count * shift
+        total_sq = prefix_sq[window - 1:] + head_sq + 2 * shift * head + count * shift * shift
+
+        self._sums[window] = (total, total_sq, anchors[window - 1:])
+        return self._sums[window]
+
+    def mean(self, window):
+        """滑动均值"""
+        window = _check_window(window)
+        result = np.full(self.n, np.nan)
+        if window <= self.n:
+            total, _, anchor = self._window_sums(window)
+            result[window - 1:] = anchor + total / window
+        return result
+
+    def var(self, window, ddof=0):
+        """滑动方差
+
+        Args:
+            window (int): 窗口长度
+            ddof (int): 自由度修正，0为总体方差，1为样本方差
+
+        Returns:
+            np.ndarray: 滑动方差，前window-1个为NaN
+        """
+        window = _check_window(window)
+        if window <= ddof:
+            raise ValueError(f"窗口长度 {window} 必须大于自由度修正 {ddof}")
+        result = np.full(self.n, np.nan)
+        if window <= self.n:
+            total, total_sq, _ = self._window_sums(window)
+            # 舍入误差可能产生极小的负数
+            result[window - 1:] = np.maximum((total_sq - total * total / window) / (window - ddof), 0.0)
+        return result
+
+    def std(self, window, ddof=0):
+        """滑动标准差"""
+        return np.sqrt(self.var(window, ddof))
+
+
+def sma(values, window):
+    """简单移动平均
+
+    Args:
+        values (np.ndarray): 输入序列，如收盘价
+        window (int): 窗口长度
+
+    Returns:
+        np.ndarray: 与输入等长，前window-1个为NaN
+    """
+    return RollingMoments(values).mean(window)
+
+
+def rolling_std(values, window, ddof=0):
+    """滑动标准差
+
+    Args:
+        values (np.ndarray): 输入序列
+        window (int): 窗口长度
+        ddof (int): 自由度修正
+
+    Returns:
+        np.ndarray: 与输入等长，前window-1个为NaN
+    """
+    return RollingMoments(values).std(window, ddof)
+
+
+def ema(values, span):
+    """指数移动平均，alpha = 2/(span+1)，以首个值为初始值
+
+    Args:
+        values (np.ndarray): 输入序列
+        span (int): 周期
+
+    Returns:
+        np.ndarray: 与输入等长，前span-1个为NaN
+    """
+    span = _check_window(span)
+    return _ewm(_as_array(values), span=span, min_periods=span)
+
+
+def _gains_losses(close):
+    delta = np.diff(_as_array(close))
+    return np.maximum(delta, 0.0), np.maximum(-delta, 0.0)
+
+
+def _rsi_from(gains, losses, window):
+    """由涨跌幅序列计算RSI，结果的首位补NaN与收盘价对齐"""
+    window = _check_window(window)
+    avg_gain = _ewm(gains, alpha=1.0 / window, min_periods=window)
+    avg_loss = _ewm(losses, alpha=1.0 / window, min_periods=window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    # 窗口内没有下跌时RSI为100
+    rsi = np.where((avg_loss == 0) & ~np.isnan(avg_gain), 100.0, rsi)
+    return np.r_[np.nan, rsi]
+
+
+def rsi(close, window=14):
+    """相对强弱指数，涨跌幅使用Wilder平滑(alpha = 1/window)
+
+    Args:
+        close (np.ndarray): 收盘价
+        window (int): 周期
+
+    Returns:
+        np.ndarray: 与输入等长，取值0~100，前window个为NaN
+    """
+    if len(close) < 2:
+        return np.full(len(close), np.nan)
+    gains, losses = _gains_losses(close)
+    return _rsi_from(gains, losses, window)
+
+
+def true_range(high, low, close):
+    """真实波幅 max(high-low, |high-前收盘|, |low-前收盘|)，第一根为high-low"""
+    high, low, close = _as_array(high), _as_array(low), _as_array(close)
+    tr = high - low
+    if len(tr) > 1:
+        prev_close = close[:-1]
+        tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - prev_close), np.abs(low[1:] - prev_close)))
+    return tr
+
+
+def atr(high, low, close, window=14):
+    """平均真实波幅，使用Wilder平滑(alpha = 1/window)
+
+    Args:
+        high (np.ndarray): 最高价
+        low (np.ndarray): 最低价
+        close (np.ndarray): 收盘价
+        window (int): 周期
+
+    Returns:
+        np.ndarray: 与输入等长，前window-1个为NaN
+    """
+    window = _check_window(window)
+    return _ewm(true_range(high, low, close), alpha=1.0 / window, min_periods=window)
+
+
+def bollinger(close, window=20, num_std=2.0):
+    """布林带
+
+    Args:
+        close (np.ndarray): 收盘价
+        window (int): 窗口长度
+        num_std (float): 上下轨与中轨相距的标准差倍数
+
+    Returns:
+        tuple: (中轨, 上轨, 下轨)
+    """
+    moments = RollingMoments(close)
+    mid = moments.mean(window)
+    width = num_std * moments.std(window)
+    return mid, mid + width, mid - width
+
+
+def _macd_from(fast_ema, slow_ema, slow, signal):
+    """由快慢EMA计算MACD，信号线从MACD线有效的第一根开始平滑"""
+    line = fast_ema - slow_ema
+    line[:slow - 1] = np.nan
+    signal_line = _ewm(line, span=signal, min_periods=signal)
+    return line, signal_line, line - signal_line
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    """MACD指标
+
+    Args:
+        close (np.ndarray): 收盘价
+        fast (int): 快线周期
+        slow (int): 慢线周期
+        signal (int): 信号线周期
+
+    Returns:
+        tuple: (MACD线, 信号线, 柱状图)
+    """
+    fast, slow, signal = _check_window(fast), _check_window(slow), _check_window(signal)
+    close = _as_array(close)
+    return _macd_from(_ewm(close, span=fast), _ewm(close, span=slow), slow, signal)
+
+
+def log_returns(close):
+    """对数收益率，首位为NaN"""
+    close = _as_array(close)
+    return np.r_[np.nan, np.diff(np.log(close))] if len(close) else close.copy()
+
+
+def volatility(close, window=20, periods_per_year=None):
+    """滚动波动率，即对数收益率的滑动样本标准差
+
+    Args:
+        close (np.ndarray): 收盘价
+        window (int): 窗口长度
+        periods_per_year (float, optional): 每年的K线数量，指定时返回年化波动率
+
+    Returns:
+        np.ndarray: 与输入等长，前window个为NaN
+    """
+    returns = log_returns(close)
+    result = np.full(len(returns), np.nan)
+    if len(returns) > 1:
+        result[1:] = RollingMoments(returns[1:]).std(window, ddof=1)
+    if periods_per_year:
+        result *= np.sqrt(periods_per_year)
+    return result
+
+
+def donchian(high, low, window=20):
+    """唐奇安通道，即窗口内的最高价和最低价
+
+    Args:
+        high (np.ndarray): 最高价
+        low (np.ndarray): 最低价
+        window (int): 窗口长度
+
+    Returns:
+        tuple: (上轨, 下轨)，前window-1个为NaN
+    """
+    window = _check_window(window)
+    upper = pd.Series(_as_array(high)).rolling(window).max().to_numpy()
+    lower = pd.Series(_as_array(low)).rolling(window).min().to_numpy()
+    return upper, lower
+
+
+def _params(value):
+    """将指标参数统一为元组，如 20 -> (20,)、[20, 2] -> (20, 2)"""
+    return tuple(value) if isinstance(value, (list, tuple)) else (value,)
+
+
+def _suffix(params):
+    return '_'.join(f"{param:g}" if isinstance(param, float) else str(param) for param in params)
+
+
+class IndicatorBatch:
+    """
+    批量指标计算
+
+    同一组K线上计算多组参数时共享中间结果：收盘价和对数收益率各用一个按块分段的RollingMoments，
+    同一窗口长度的块内偏差和只计算一次，SMA和布林带共用；各周期的EMA、涨跌幅和真实波幅也只计算一次，
+    每个参数组合只需O(n)的差分或平滑。
+    """
+
+    def __init__(self, data):
+        """初始化批量指标计算
+
+        Args:
+            data (pd.DataFrame | dict | OHLCVMemmap): 含 open/high/low/close/volume 列的K线数据，
+                各列按名称取出为NumPy数组
+        """
+        self.data = data
+        self._columns = {}
+        self._moments = None
+        self._ema = {}
+        self._gains_losses = None
+        self._true_range = None
+        self._return_moments = None
+
+    def column(self, name):
+        """按名称取出float64列数组"""
+        if name not in self._columns:
+            self._columns[name] = _as_array(self.data[name])
+        return self._columns[name]
+
+    @property
+    def close(self):
+        return self.column('close')
+
+    @property
+    def length(self):
+        return len(self.close)
+
+    def _close_moments(self):
+        if self._moments is None:
+            self._moments = RollingMoments(self.close)
+        return self._moments
+
+    def _close_ema(self, span):
+        """收盘价的EMA(未屏蔽预热期)，按周期缓存供EMA和MACD共用"""
+        if span not in self._ema:
+            self._ema[span] = _ewm(self.close, span=span)
+        return self._ema[span]
+
+    def sma(self, window):
+        return {f"sma_{window}": self._close_moments().mean(window)}
+
+    def ema(self, span):
+        span = _check_window(span)
+        values = self._close_ema(span).copy()
+        values[:span - 1] = np.nan
+        return {f"ema_{span}": values}
+
+    def rsi(self, window):
+        if self.length < 2:
+            return {f"rsi_{window}": np.full(self.length, np.nan)}
+        if self._gains_losses is None:
+            self._gains_losses = _gains_losses(self.close)
+        return {f"rsi_{window}": _rsi_from(*self._gains_losses, window)}
+
+    def atr(self, window):
+        window = _check_window(window)
+        if self._true_range is None:
+            self._true_range = true_range(self.column('high'), self.column('low'), self.close)
+        return {f"atr_{window}": _ewm(self._true_range, alpha=1.0 / window, min_periods=window)}
+
+    def bollinger(self, window, num_std=2.0):
+        moments = self._close_moments()
+        mid = moments.mean(window)
+        width = num_std * moments.std(window)
+        suffix = _suffix((window, num_std))
+        return {f"bb_mid_{suffix}": mid, f"bb_upper_{suffix}": mid + width, f"bb_lower_{suffix}": mid - width}
+
+    def macd(self, fast, slow, signal):
+        fast, slow, signal = _check_window(fast), _check_window(slow), _check_window(signal)
+        line, signal_line, hist = _macd_from(self._close_ema(fast), self._close_ema(slow), slow, signal)
+        suffix = _suffix((fast, slow, signal))
+        return {f"macd_{suffix}": line, f"macd_signal_{suffix}": signal_line, f"macd_hist_{suffix}": hist}
+
+    def volatility(self, window, periods_per_year=None):
+        result = np.full(self.length, np.nan)
+        if self.length > 1:
+            if self._return_moments is None:
+                self._return_moments = RollingMoments(np.diff(np.log(self.close)))
+            result[1:] = self._return_moments.std(window, ddof=1)
+        if periods_per_year:
+            result *= np.sqrt(periods_per_year)
+        suffix = _suffix((window,) if periods_per_year is None else (window, periods_per_year))
+        return {f"volatility_{suffix}": result}
+
+    def donchian(self, window):
+        upper, lower = donchian(self.column('high'), self.column('low'), window)
+        return {f"donchian_upper_{window}": upper, f"donchian_lower_{window}": lower}
+
+    def compute(self, indicators=None):
+        """计算多个指标的多组参数
+
+        Args:
+            indicators (dict, optional): {指标名: [参数, ...]}，参数为单个数值或参数列表，
+                如 {'sma': [5, 20], 'bollinger': [[20, 2]], 'macd': [[12, 26, 9]]}，默认读取配置
+
+        Returns:
+            pd.DataFrame: 每个指标参数组合一列，有timestamp列时一并保留
+        """
+        if indicators is None:
+            indicators = data_config.get('indicators', DEFAULT_INDICATORS)
+
+        columns = {}
+        if isinstance(self.data, pd.DataFrame) and 'timestamp' in self.data.columns:
+            columns['timestamp'] = self.data['timestamp'].to_numpy()
+
+        for name, param_list in indicators.items():
+            method = getattr(self, name, None) if name in INDICATOR_NAMES else None
+            if method is None:
+                raise ValueError(f"不支持的指标: {name}")
+            for params in param_list:
+                columns.update(method(*_params(params)))
+
+        return pd.DataFrame(columns)
+
+
+def compute_indicators(data, indicators=None):
+    """在K线数据上批量计算指标
+
+    Args:
+        data (pd.DataFrame | dict | OHLCVMemmap): K线数据
+        indicators (dict, optional): {指标名: [参数, ...]}，默认读取配置
+
+    Returns:
+        pd.DataFrame: 指标数据
+    """
+    return IndicatorBatch(data).compute(indicators)
+
+
+def compute_store_indicators(symbol, timeframe, indicators=None, start=None, end=None, **kwargs):
+    """读取已保存的K线数据并批量计算指标
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h'
+        indicators (dict, optional): {指标名: [参数, ...]}，默认读取配置
+        start (int | str, optional): 起始时间
+        end (int | str, optional): 结束时间
+        **kwargs: 传给load_ohlcv的参数，如 exchange_id、data_dir、storage_format、layout
+
+    Returns:
+        pd.DataFrame: 指标数据
+    """
+    data = load_ohlcv(symbol, timeframe, start, end, columns=['timestamp', 'high', 'low', 'close'], **kwargs)
+    logger.info(f"计算 {symbol} {timeframe} 的技术指标，共 {len(data)} 条K线")
+    return compute_indicators(data, indicators)
@@ -0,0 +1,656 @@
+"""流式指标模块，新K线到达时以O(1)的代价更新指标，状态可以保存在数据旁边并在下次运行时恢复"""
+
+import os
+import json
+import math
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from src.data.store import open_store, PartitionedStore
+from src.data.time_utils import timeframe_to_ms
+from src.indicator.indicators import (
+    data_config, logger, DEFAULT_INDICATORS, INDICATOR_NAMES, IndicatorBatch, true_range, _as_array,
+    _check_window, _ewm, _params, _suffix
+)
+
+# 分区目录中的指标状态文件
+STATE_FILENAME = '_indicators.json'
+
+NAN = float('nan')
+
+
+def _to_json(value):
+    """NaN保存为None，保证状态文件是标准JSON"""
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def _from_json(value):
+    return NAN if value is None else value
+
+
+class RollingWindow:
+    """
+    滑动窗口的和与方差
+
+    用Welford算法在窗口满时同时移入新值、移出旧值，每次更新O(1)。
+    每更新window次按窗口内的值重新求和，消除长期累积的舍入误差，均摊仍为O(1)。
+    """
+
+    def __init__(self, window, ddof=0):
+        """初始化滑动窗口
+
+        Args:
+            window (int): 窗口长度
+            ddof (int): 方差的自由度修正
+        """
+        self.window = _check_window(window)
+        if self.window <= ddof:
+            raise ValueError(f"窗口长度 {window} 必须大于自由度修正 {ddof}")
+        self.ddof = ddof
+        self.values = deque(maxlen=self.window)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self._updates = 0
+
+    @property
+    def full(self):
+        return len(self.values) == self.window
+
+    def push(self, value):
+        """移入一个新值，窗口已满时同时移出最早的值"""
+        if self.full:
+            old = self.values[0]
+            self.values.append(value)
+            old_mean = self.mean
+            self.mean += (value - old) / self.window
+            self.m2 += (value - old) * (value - self.mean + old - old_mean)
+        else:
+            self.values.append(value)
+            delta = value - self.mean
+            self.mean += delta / len(self.values)
+            self.m2 += delta * (value - self.mean)
+
+        self._updates += 1
+        if self._updates >= self.window:
+            self._refresh()
+
+    def _refresh(self):
+        """按窗口内的值重新计算均值和平方和"""
+        values = np.fromiter(self.values, dtype=np.float64, count=len(self.values))
+        self.mean = float(values.mean()) if len(values) else 0.0
+        self.m2 = float(((values - self.mean) ** 2).sum()) if len(values) else 0.0
+        self._updates = 0
+
+    def var(self):
+        """窗口未满时返回NaN"""
+        if not self.full:
+            return NAN
+        return max(self.m2, 0.0) / (self.window - self.ddof)
+
+    def std(self):
+        return math.sqrt(self.var())
+
+    def extend(self, values):
+        """用历史数据的末尾填充窗口"""
+        self.values.clear()
+        self.values.extend(float(value) for value in values[-self.window:])
+        self._refresh()
+
+    def to_state(self):
+        return list(self.values)
+
+    def load_state(self, values):
+        self.extend(values)
+
+
+class RollingExtreme:
+    """
+    滑动窗口的最大值或最小值
+
+    单调队列中保存可能成为极值的 (序号, 值)，每个值最多进出队列一次，每次更新均摊O(1)。
+    """
+
+    def __init__(self, window, mode='max'):
+        """初始化滑动极值
+
+        Args:
+            window (int): 窗口长度
+            mode (str): 'max' 或 'min'
+        """
+        if mode not in ('max', 'min'):
+            raise ValueError(f"不支持的极值类型: {mode}")
+        self.window = _check_window(window)
+        self.mode = mode
+        self.queue = deque()
+        self.count = 0
+
+    def _dominated(self, old, new):
+        return old <= new if self.mode == 'max' else old >= new
+
+    def push(self, value):
+        """移入一个新值，返回窗口内的极值，窗口未满时返回NaN"""
+        while self.queue and self._dominated(self.queue[-1][1], value):
+            self.queue.pop()
+        self.queue.append((self.count, value))
+        self.count += 1
+        while self.queue[0][0] <= self.count - 1 - self.window:
+            self.queue.popleft()
+        return self.value()
+
+    def value(self):
+        return self.queue[0][1] if self.count >= self.window else NAN
+
+    def extend(self, values):
+        """用历史数据的末尾填充窗口，count保留历史总数"""
+        tail = values[-self.window:]
+        self.queue.clear()
+        self.count = len(values) - len(tail)
+        for value in tail:
+            self.push(float(value))
+
+    def to_state(self):
+        return {'count': self.count, 'queue': [list(item) for item in self.queue]}
+
+    def load_state(self, state):
+        self.count = state['count']
+        self.queue = deque((index, value) for index, value in state['queue'])
+
+
+class StreamingIndicator:
+    """
+    流式指标基类
+
+    子类按相同的参数和列名实现与批量计算一致的结果，提供逐根更新、由历史数组预热以及状态的保存和恢复。
+    """
+
+    name = None
+
+    def __init__(self, *params):
+        self.params = params
+
+    @property
+    def columns(self):
+        """输出的列名，与IndicatorBatch一致"""
+        return [f"{self.name}_{_suffix(self.params)}"]
+
+    def update(self, high, low, close):
+        """输入一根新K线，返回各列的新值"""
+        raise NotImplementedError
+
+    def warmup(self, high, low, close):
+        """由历史数组向量化地计算状态，结果与逐根更新全部历史相同"""
+        raise NotImplementedError
+
+    def to_state(self):
+        raise NotImplementedError
+
+    def load_state(self, state):
+        raise NotImplementedError
+
+
+class _EMA:
+    """递推式指数加权平均的状态，与pandas ewm(adjust=False)一致"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.value = NAN
+        self.count = 0
+
+    def push(self, value):
+        self.value = value if self.count == 0 else self.value + self.alpha * (value - self.value)
+        self.count += 1
+        return self.value
+
+    def warmup(self, values):
+        if len(values):
+            self.value = float(_ewm(values, alpha=self.alpha)[-1])
+        self.count = len(values)
+
+    def to_state(self):
+        return [_to_json(self.value), self.count]
+
+    def load_state(self, state):
+        self.value, self.count = _from_json(state[0]), state[1]
+
+
+class StreamingSMA(StreamingIndicator):
+    name = 'sma'
+
+    def __init__(self, window):
+        super().__init__(_check_window(window))
+        self.rolling = RollingWindow(window)
+
+    def update(self, high, low, close):
+        self.rolling.push(close)
+        return (self.rolling.mean if self.rolling.full else NAN,)
+
+    def warmup(self, high, low, close):
+        self.rolling.extend(close)
+
+    def to_state(self):
+        return self.rolling.to_state()
+
+    def load_state(self, state):
+        self.rolling.load_state(state)
+
+
+class StreamingEMA(StreamingIndicator):
+    name = 'ema'
+
+    def __init__(self, span):
+        super().__init__(_check_window(span))
+        self.ema = _EMA(2.0 / (self.params[0] + 1))
+
+    def update(self, high, low, close):
+        value = self.ema.push(close)
+        return (value if self.ema.count >= self.params[0] else NAN,)
+
+    def warmup(self, high, low, close):
+        self.ema.warmup(close)
+
+    def to_state(self):
+        return self.ema.to_state()
+
+    def load_state(self, state):
+        self.ema.load_state(state)
+
+
+class StreamingRSI(StreamingIndicator):
+    name = 'rsi'
+
+    def __init__(self, window):
+        super().__init__(_check_window(window))
+        self.gain = _EMA(1.0 / self.params[0])
+        self.loss = _EMA(1.0 / self.params[0])
+        self.prev_close = NAN
+
+    def update(self, high, low, close):
+        prev_close, self.prev_close = self.prev_close, close
+        if math.isnan(prev_close):
+            return (NAN,)
+
+        delta = close - prev_close
+        avg_gain = self.gain.push(max(delta, 0.0))
+        avg_loss = self.loss.push(max(-delta, 0.0))
+        if self.gain.count < self.params[0]:
+            return (NAN,)
+        if avg_loss == 0:
+            return (100.0,)
+        return (100.0 - 100.0 / (1.0 + avg_gain / avg_loss),)
+
+    def warmup(self, high, low, close):
+        delta = np.diff(close)
+        self.gain.warmup(np.maximum(delta, 0.0))
+        self.loss.warmup(np.maximum(-delta, 0.0))
+        self.prev_close = float(close[-1]) if len(close) else NAN
+
+    def to_state(self):
+        return {'gain': self.gain.to_state(), 'loss': self.loss.to_state(), 'prev_close': _to_json(self.prev_close)}
+
+    def load_state(self, state):
+        self.gain.load_state(state['gain'])
+        self.loss.load_state(state['loss'])
+        self.prev_close = _from_json(state['prev_close'])
+
+
+class StreamingATR(StreamingIndicator):
+    name = 'atr'
+
+    def __init__(self, window):
+        super().__init__(_check_window(window))
+        self.ema = _EMA(1.0 / self.params[0])
+        self.prev_close = NAN
+
+    def update(self, high, low, close):
+        tr = high - low
+        if not math.isnan(self.prev_close):
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.prev_close = close
+        value = self.ema.push(tr)
+        return (value if self.ema.count >= self.params[0] else NAN,)
+
+    def warmup(self, high, low, close):
+        self.ema.warmup(true_range(high, low, close))
+        self.prev_close = float(close[-1]) if len(close) else NAN
+
+    def to_state(self):
+        return {'ema': self.ema.to_state(), 'prev_close': _to_json(self.prev_close)}
+
+    def load_state(self, state):
+        self.ema.load_state(state['ema'])
+        self.prev_close = _from_json(state['prev_close'])
+
+
+class StreamingBollinger(StreamingIndicator):
+    name = 'bollinger'
+
+    def __init__(self, window, num_std=2.0):
+        super().__init__(_check_window(window), num_std)
+        self.rolling = RollingWindow(window)
+
+    @property
+    def columns(self):
+        suffix = _suffix(self.params)
+        return [f"bb_mid_{suffix}", f"bb_upper_{suffix}", f"bb_lower_{suffix}"]
+
+    def update(self, high, low, close):
+        self.rolling.push(close)
+        if not self.rolling.full:
+            return NAN, NAN, NAN
+        mid = self.rolling.mean
+        width = self.params[1] * self.rolling.std()
+        return mid, mid + width, mid - width
+
+    def warmup(self, high, low, close):
+        self.rolling.extend(close)
+
+    def to_state(self):
+        return self.rolling.to_state()
+
+    def load_state(self, state):
+        self.rolling.load_state(state)
+
+
+class StreamingMACD(StreamingIndicator):
+    name = 'macd'
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        super().__init__(_check_window(fast), _check_window(slow), _check_window(signal))
+        self.fast = _EMA(2.0 / (self.params[0] + 1))
+        self.slow = _EMA(2.0 / (self.params[1] + 1))
+        self.signal = _EMA(2.0 / (self.params[2] + 1))
+
+    @property
+    def columns(self):
+        suffix = _suffix(self.params)
+        return [f"macd_{suffix}", f"macd_signal_{suffix}", f"macd_hist_{suffix}"]
+
+    def update(self, high, low, close):
+        line = self.fast.push(close) - self.slow.push(close)
+        if self.slow.count < self.params[1]:
+            return NAN, NAN, NAN
+
+        # 信号线从MACD线有效的第一根开始平滑
+        signal = self.signal.push(line)
+        if self.signal.count < self.params[2]:
+            return line, NAN, NAN
+        return line, signal, line - signal
+
+    def warmup(self, high, low, close):
+        self.fast.warmup(close)
+        self.slow.warmup(close)
+        if len(close) >= self.params[1]:
+            line = _ewm(close, span=self.params[0]) - _ewm(close, span=self.params[1])
+            self.signal.warmup(line[self.params[1] - 1:])
+
+    def to_state(self):
+        return {'fast': self.fast.to_state(), 'slow': self.slow.to_state(), 'signal': self.signal.to_state()}
+
+    def load_state(self, state):
+        self.fast.load_state(state['fast'])
+        self.slow.load_state(state['slow'])
+        self.signal.load_state(state['signal'])
+
+
+class StreamingVolatility(StreamingIndicator):
+    name = 'volatility'
+
+    def __init__(self, window, periods_per_year=None):
+        params = (_check_window(window),) if periods_per_year is None else (_check_window(window), periods_per_year)
+        super().__init__(*params)
+        self.rolling = RollingWindow(window, ddof=1)
+        self.scale = math.sqrt(periods_per_year) if periods_per_year else 1.0
+        self.prev_close = NAN
+
+    def update(self, high, low, close):
+        prev_close, self.prev_close = self.prev_close, close
+        if math.isnan(prev_close):
+            return (NAN,)
+        self.rolling.push(math.log(close / prev_close))
+        return (self.rolling.std() * self.scale,)
+
+    def warmup(self, high, low, close):
+        self.rolling.extend(np.diff(np.log(close)))
+        self.prev_close = float(close[-1]) if len(close) else NAN
+
+    def to_state(self):
+        return {'returns': self.rolling.to_state(), 'prev_close': _to_json(self.prev_close)}
+
+    def load_state(self, state):
+        self.rolling.load_state(state['returns'])
+        self.prev_close = _from_json(state['prev_close'])
+
+
+class StreamingDonchian(StreamingIndicator):
+    name = 'donchian'
+
+    def __init__(self, window):
+        super().__init__(_check_window(window))
+        self.upper = RollingExtreme(window, 'max')
+        self.lower = RollingExtreme(window, 'min')
+
+    @property
+    def columns(self):
+        return [f"donchian_upper_{self.params[0]}", f"donchian_lower_{self.params[0]}"]
+
+    def update(self, high, low, close):
+        return self.upper.push(high), self.lower.push(low)
+
+    def warmup(self, high, low, close):
+        self.upper.extend(high)
+        self.lower.extend(low)
+
+    def to_state(self):
+        return {'upper': self.upper.to_state(), 'lower': self.lower.to_state()}
+
+    def load_state(self, state):
+        self.upper.load_state(state['upper'])
+        self.lower.load_state(state['lower'])
+
+
+# 指标名称到流式实现的映射
+STREAMING_INDICATORS = {cls.name: cls for cls in (
+    StreamingSMA, StreamingEMA, StreamingRSI, StreamingATR, StreamingBollinger, StreamingMACD,
+    StreamingVolatility, StreamingDonchian
+)}
+
+
+def normalize_indicators(indicators=None):
+    """将指标配置统一为 {指标名: [[参数, ...], ...]}，便于保存和比较"""
+    if indicators is None:
+        indicators = data_config.get('indicators', DEFAULT_INDICATORS)
+    normalized = {}
+    for name, param_list in indicators.items():
+        if name not in INDICATOR_NAMES:
+            raise ValueError(f"不支持的指标: {name}")
+        normalized[name] = [list(_params(params)) for params in param_list]
+    return normalized
+
+
+class StreamingFeatures:
+    """
+    一组流式指标
+
+    与批量计算使用相同的指标配置和列名。只接受已走完的K线，时间戳不大于已处理的最后一根时忽略，
+    因此增量获取时重叠的K线不会被重复计入。
+    """
+
+    def __init__(self, indicators=None, timeframe=None):
+        """初始化流式指标
+
+        Args:
+            indicators (dict, optional): {指标名: [参数, ...]}，默认读取配置
+            timeframe (str, optional): K线周期，用于判断K线是否已走完
+        """
+        self.indicators_config = normalize_indicators(indicators)
+        self.timeframe = timeframe
+        self.last_timestamp = None
+        self.indicators = [STREAMING_INDICATORS[name](*params)
+                           for name, param_list in self.indicators_config.items() for params in param_list]
+
+    @property
+    def columns(self):
+        return ['timestamp'] + [column for indicator in self.indicators for column in indicator.columns]
+
+    def warmup(self, data):
+        """由历史K线向量化地初始化所有指标
+
+        Args:
+            data (pd.DataFrame | dict): 含 timestamp/high/low/close 列的历史K线
+        """
+        high, low, close = (_as_array(data[column]) for column in ('high', 'low', 'close'))
+        for indicator in self.indicators:
+            indicator.warmup(high, low, close)
+        self.last_timestamp = int(np.asarray(data['timestamp'])[-1]) if len(close) else None
+
+    def update(self, candle):
+        """输入一根已走完的K线
+
+        Args:
+            candle (list): [timestamp, open, high, low, close, volume]，即fetch_ohlcv返回的一行
+
+        Returns:
+            list: 与columns对应的一行指标值，已处理过的K线返回None
+        """
+        timestamp = int(candle[0])
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return None
+
+        high, low, close = float(candle[2]), float(candle[3]), float(candle[4])
+        row = [timestamp]
+        for indicator in self.indicators:
+            row.extend(indicator.update(high, low, close))
+        self.last_timestamp = timestamp
+        return row
+
+    def update_candles(self, ohlcv, now=None):
+        """输入fetch_ohlcv返回的K线，只处理新的、已走完的K线
+
+        Args:
+            ohlcv (list | pd.DataFrame): K线数据
+            now (int, optional): 当前时间戳(毫秒)，默认为系统时间
+
+        Returns:
+            pd.DataFrame: 新K线的指标数据
+        """
+        if isinstance(ohlcv, pd.DataFrame):
+            ohlcv = ohlcv[['timestamp', 'open', 'high', 'low', 'close', 'volume']].itertuples(index=False)
+
+        if self.timeframe is not None:
+            cutoff = (now if now is not None else int(time.time() * 1000)) - timeframe_to_ms(self.timeframe)
+        else:
+            cutoff = None
+
+        rows = []
+        for candle in ohlcv:
+            if cutoff is not None and candle[0] > cutoff:
+                break
+            row = self.update(candle)
+            if row is not None:
+                rows.append(row)
+        return pd.DataFrame(rows, columns=self.columns)
+
+    def to_state(self):
+        """导出可以保存为JSON的状态"""
+        return {
+            'indicators': self.indicators_config,
+            'timeframe': self.timeframe,
+            'last_timestamp': self.last_timestamp,
+            'states': [indicator.to_state() for indicator in self.indicators],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """由to_state导出的状态恢复"""
+        features = cls(state['indicators'], state.get('timeframe'))
+        features.last_timestamp = state['last_timestamp']
+        for indicator, indicator_state in zip(features.indicators, state['states']):
+            indicator.load_state(indicator_state)
+        return features
+
+
+def indicator_state_path(store):
+    """指标状态文件路径，与数据保存在一起
+
+    单文件布局为 {symbol}_{timeframe}_indicators.json，分区布局为分区目录下的 _indicators.json。
+    """
+    if isinstance(store, PartitionedStore):
+        return os.path.join(store.path, STATE_FILENAME)
+    return os.path.splitext(store.path)[0] + '_indicators.json'
+
+
+def load_indicator_state(store, indicators=None):
+    """读取保存的指标状态，不存在或指标配置不同时返回None
+
+    Returns:
+        StreamingFeatures | None: 恢复的流式指标
+    """
+    path = indicator_state_path(store)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        state = json.load(f)
+    if state.get('indicators') != normalize_indicators(indicators) or state.get('timeframe') != store.timeframe:
+        logger.info(f"指标配置已变化，重新计算: {path}")
+        return None
+    return StreamingFeatures.from_state(state)
+
+
+def save_indicator_state(store, features):
+    """原子地保存指标状态"""
+    path = indicator_state_path(store)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(features.to_state(), f)
+    os.replace(temp_path, path)
+    return path
+
+
+def update_store_indicators(symbol, timeframe, indicators=None, exchange_id=None, data_dir=None,
+                            storage_format=None, layout=None, now=None):
+    """按保存的状态增量更新指标
+
+    有状态时只读取状态之后新增的K线并逐根更新；没有状态或指标配置变化时，对全部历史批量计算一次并由历史预热状态。
+    两种情况都只处理已走完的K线，更新后保存状态。
+
+    读取新增K线的代价取决于存储：分区布局只打开最后的分区，单文件的binary格式通过内存映射二分查找只复制新增的行，
+    两者都与历史长度无关；单文件的csv/parquet/feather格式每次仍需解析整个文件再按时间过滤，
+    需要频繁增量更新时应使用分区布局或binary格式。
+
+    Args:
+        symbol (str): 交易对，如 'ETH/USDT'
+        timeframe (str): K线周期，如 '1h'
+        indicators (dict, optional): {指标名: [参数, ...]}，默认读取配置
+        exchange_id (str, optional): 交易所ID，默认读取配置
+        data_dir (str, optional): 数据目录，默认为系统数据目录
+        storage_format (str, optional): 存储格式，默认读取配置
+        layout (str, optional): 存储布局，默认读取配置
+        now (int, optional): 当前时间戳(毫秒)，默认为系统时间
+
+    Returns:
+        pd.DataFrame: 本次新计算的指标数据
+    """
+    store = open_store(symbol, timeframe, exchange_id, data_dir, storage_format, layout)
+    if not store.exists():
+        raise FileNotFoundError(f"数据不存在: {store.path}")
+
+    cutoff = (now if now is not None else int(time.time() * 1000)) - timeframe_to_ms(timeframe)
+    features = load_indicator_state(store, indicators)
+
+    if features is None:
+        data = store.load(end=cutoff, columns=['timestamp', 'high', 'low', 'close'])
+        features = StreamingFeatures(indicators, timeframe)
+        features.warmup(data)
+        result = IndicatorBatch(data).compute(features.indicators_config)
+        logger.info(f"由 {len(data)} 条历史K线初始化 {symbol} {timeframe} 的指标状态")
+    else:
+        start = features.last_timestamp + 1 if features.last_timestamp is not None else None
+        data = store.load(start=start, end=cutoff)
+        result = features.update_candles(data, now)
+        logger.info(f"增量更新 {symbol} {timeframe} 的指标，新增 {len(result)} 条")
+
+    save_indicator_state(store, features)
+    return result
@@ -0,0 +1,3 @@
+"""
+回测模块测试包
+"""
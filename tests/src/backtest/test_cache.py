@@ -0,0 +1,73 @@
+"""
+测试回测结果缓存模块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.backtest.cache import ResultCache, code_version, cache_key
+
+
+def first_version(x):
+    return x + 1
+
+
+def second_version(x):
+    return x + 2
+
+
+class TestResultCache:
+    """测试结果缓存"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(self.temp_dir.name)
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_code_version_and_key(self):
+        """测试代码版本和缓存键随内容变化"""
+        assert code_version(first_version) == code_version(first_version)
+        assert code_version(first_version) != code_version(second_version)
+
+        first_version.version = 'v2'
+        try:
+            assert code_version(first_version) != code_version(second_version)
+        finally:
+            del first_version.version
+
+        assert cache_key('a', {'x': 1, 'y': 2}) == cache_key('a', {'y': 2, 'x': 1})
+        assert cache_key('a', {'x': 1}) != cache_key('b', {'x': 1})
+
+    def test_memoize(self):
+        """测试命中时不重新计算，损坏的缓存文件会重新计算"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {'value': np.arange(3)}
+
+        key = cache_key('test', 1)
+        first = self.cache.memoize(key, compute)
+        second = self.cache.memoize(key, compute)
+        np.testing.assert_array_equal(first['value'], second['value'])
+        assert len(calls) == 1
+        assert key in self.cache
+        assert (self.cache.hits, self.cache.misses) == (1, 1)
+
+        with open(self.cache._path(key), 'wb') as f:
+            f.write(b'broken')
+        self.cache.memoize(key, compute)
+        assert len(calls) == 2
+
+        self.cache.clear()
+        assert key not in self.cache
+        assert self.cache.get(key) is None
@@ -0,0 +1,239 @@
+"""
+测试事件驱动回测模块
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.backtest.event import (
+    EventEngine, Strategy, Order, Fill, Position, run_event_backtest, iter_chunks, iter_store_chunks,
+    ORDER_LIMIT, ORDER_STOP, ORDER_FILLED, ORDER_CANCELLED, ORDER_PENDING
+)
+from src.backtest.vectorized import run_backtest
+from src.data.store import open_store
+
+HOUR = 3600000
+
+
+def _make_bars(opens, highs, lows, closes):
+    count = len(closes)
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(count, dtype=np.int64) * HOUR,
+        'open': opens,
+        'high': highs,
+        'low': lows,
+        'close': closes,
+        'volume': np.ones(count),
+    })
+
+
+def _make_random(count=500, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 10, count))
+    open_ = np.r_[close[0], close[:-1]]
+    return _make_bars(open_, np.maximum(open_, close) + 5, np.minimum(open_, close) - 5, close)
+
+
+class ScriptedStrategy(Strategy):
+    """在指定的K线序号执行回调"""
+
+    def __init__(self, actions):
+        self.actions = actions
+        self.bar = -1
+        self.fills = []
+
+    def on_bar(self, timestamp, open_, high, low, close, volume):
+        self.bar += 1
+        action = self.actions.get(self.bar)
+        if action is not None:
+            action(self.engine, close)
+
+    def on_fill(self, fill):
+        self.fills.append(fill)
+
+
+class TargetStrategy(Strategy):
+    """按预先给定的目标数量调仓"""
+
+    def __init__(self, targets):
+        self.targets = iter(targets)
+
+    def on_bar(self, timestamp, open_, high, low, close, volume):
+        self.engine.order_target(next(self.targets))
+
+
+class TestEventBacktest:
+    """测试事件驱动回测"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_slots_records(self):
+        """测试订单、成交和持仓使用 __slots__"""
+        for record in (Order(1, 1.0), Fill(1, 0, 100.0, 1.0, 0.0, 0.0), Position()):
+            assert not hasattr(record, '__dict__')
+
+    def test_position_pnl(self):
+        """测试持仓均价和已实现盈亏"""
+        position = Position()
+        position.apply(2.0, 100.0)
+        position.apply(2.0, 110.0)
+        assert position.avg_price == pytest.approx(105.0)
+
+        position.apply(-3.0, 120.0)
+        assert position.size == pytest.approx(1.0)
+        assert position.realized_pnl == pytest.approx(45.0)
+
+        # 反向开仓
+        position.apply(-3.0, 100.0)
+        assert position.size == pytest.approx(-2.0)
+        assert position.avg_price == pytest.approx(100.0)
+        assert position.realized_pnl == pytest.approx(40.0)
+
+    def test_market_order_fills_next_open(self):
+        """测试市价单在下一根K线开盘成交，并计入滑点和手续费"""
+        bars = _make_bars([100, 101, 102], [101, 103, 104], [99, 100, 101], [100, 102, 103])
+        strategy = ScriptedStrategy({0: lambda engine, close: engine.buy(2.0)})
+        result = EventEngine(strategy, 1000, fee_rate=0.001, slippage=0.01).run(bars)
+
+        fill = strategy.fills[0]
+        assert fill.timestamp == bars['timestamp'].iloc[1]
+        assert fill.price == pytest.approx(101 * 1.01)
+        assert fill.fee == pytest.approx(2 * 101 * 1.01 * 0.001)
+
+        cash = 1000 - 2 * fill.price - fill.fee
+        np.testing.assert_allclose(result.equity, [1000, cash + 2 * 102, cash + 2 * 103])
+        np.testing.assert_allclose(result.positions, [0, 2, 2])
+        assert result.stats()['trades'] == 1
+
+    def test_limit_and_stop_orders(self):
+        """测试限价单、止损单的触发价格和跳空成交"""
+        bars = _make_bars([100, 100, 95, 90], [101, 100, 96, 91], [99, 97, 94, 85], [100, 98, 95, 88])
+
+        def place(engine, close):
+            engine.buy(1.0, ORDER_LIMIT, 98.0)
+            engine.sell(1.0, ORDER_STOP, 93.0)
+
+        strategy = ScriptedStrategy({0: place})
+        EventEngine(strategy, 1000, fee_rate=0.0, slippage=0.0).run(bars)
+
+        limit_fill, stop_fill = strategy.fills
+        assert limit_fill.price == pytest.approx(98.0)
+        assert limit_fill.timestamp == bars['timestamp'].iloc[1]
+        # 跳空低开到90，止损按开盘价成交
+        assert stop_fill.price == pytest.approx(90.0)
+        assert stop_fill.timestamp == bars['timestamp'].iloc[3]
+
+    def test_trailing_stop_and_cancel(self):
+        """测试挂单期间修改止损价和撤单"""
+        bars = _make_bars([100, 105, 110, 108, 100], [105, 110, 112, 109, 101],
+                          [99, 104, 108, 100, 95], [105, 110, 109, 101, 96])
+        state = {}
+
+        def enter(engine, close):
+            engine.buy(1.0)
+            state['stop'] = engine.sell(1.0, ORDER_STOP, close - 10)
+            state['limit'] = engine.buy(1.0, ORDER_LIMIT, 50.0)
+
+        def trail(engine, close):
+            state['stop'].price = close - 3
+            engine.cancel(state['limit'])
+
+        strategy = ScriptedStrategy({0: enter, 1: trail})
+        engine = EventEngine(strategy, 1000, fee_rate=0.0, slippage=0.0)
+        result = engine.run(bars)
+
+        assert state['stop'].status == ORDER_FILLED
+        assert state['limit'].status == ORDER_CANCELLED
+        assert strategy.fills[-1].price == pytest.approx(107.0)
+        assert strategy.fills[-1].timestamp == bars['timestamp'].iloc[3]
+        assert result.positions[-1] == 0
+        assert engine.position.realized_pnl == pytest.approx(2.0)
+
+    def test_orders_from_fill_callback(self):
+        """测试成交回调中下的订单从下一根K线开始撮合"""
+        bars = _make_bars([100, 100, 100], [110, 110, 110], [90, 90, 90], [100, 100, 100])
+
+        class ProtectiveStop(Strategy):
+            def on_bar(self, timestamp, open_, high, low, close, volume):
+                if timestamp == bars['timestamp'].iloc[0]:
+                    self.engine.buy(1.0)
+
+            def on_fill(self, fill):
+                if fill.size > 0:
+                    self.stop = self.engine.sell(1.0, ORDER_STOP, 95.0)
+
+        strategy = ProtectiveStop()
+        engine = EventEngine(strategy, 1000, fee_rate=0.0, slippage=0.0)
+        engine.run(bars)
+
+        assert strategy.stop.status == ORDER_FILLED
+        assert strategy.stop.filled_at == bars['timestamp'].iloc[2]
+
+    def test_matches_vectorized_for_fixed_units(self):
+        """测试按数量调仓时逐根权益与手工计算一致"""
+        bars = _make_random()
+        targets = np.random.default_rng(1).choice([-1.0, 0.0, 1.0], len(bars))
+        result = EventEngine(TargetStrategy(targets), 10000, fee_rate=0.0, slippage=0.0).run(bars, '1h')
+
+        held = np.r_[0.0, targets[:-1]]
+        opens, closes = bars['open'].to_numpy(), bars['close'].to_numpy()
+        trade = held - np.r_[0.0, held[:-1]]
+        cash = 10000 - np.cumsum(trade * opens)
+        np.testing.assert_allclose(result.positions, held)
+        np.testing.assert_allclose(result.equity, cash + held * closes)
+
+        # 不交易时与向量化回测的权益一致
+        flat = EventEngine(TargetStrategy(np.zeros(len(bars))), 10000).run(bars)
+        np.testing.assert_allclose(flat.equity, run_backtest(bars, np.zeros(len(bars)), 10000).equity)
+
+    def test_chunks_and_invalid_orders(self):
+        """测试分块回放与一次回放结果相同，以及非法订单"""
+        bars = _make_random(250)
+        targets = np.random.default_rng(2).choice([0.0, 1.0], len(bars))
+        whole = EventEngine(TargetStrategy(targets), 10000).run(bars)
+        chunked = EventEngine(TargetStrategy(targets), 10000).run(iter_chunks(bars, 64))
+        np.testing.assert_allclose(whole.equity, chunked.equity)
+
+        engine = EventEngine(TargetStrategy([]), 10000)
+        with pytest.raises(ValueError):
+            engine.submit(0)
+        with pytest.raises(ValueError):
+            engine.submit(1.0, ORDER_STOP)
+        with pytest.raises(ValueError):
+            engine.submit(1.0, 'iceberg', 100.0)
+        assert engine.buy(1.0).status == ORDER_PENDING
+
+    @pytest.mark.parametrize("storage_format", ["csv", "binary"])
+    def test_run_event_backtest(self, storage_format):
+        """测试按块回放已保存的数据"""
+        bars = _make_random(300)
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': storage_format, 'layout': 'flat'}
+        open_store('ETH/USDT', '1h', **kwargs).write(bars)
+        targets = np.random.default_rng(3).choice([0.0, 1.0], len(bars))
+
+        result = run_event_backtest('ETH/USDT', '1h', TargetStrategy(targets), chunk_size=100,
+                                    initial_capital=10000, **kwargs)
+        expected = EventEngine(TargetStrategy(targets), 10000).run(bars)
+        np.testing.assert_allclose(result.equity, expected.equity)
+        assert list(result.timestamps) == list(bars['timestamp'])
+
+        # 日期字符串的时间范围与毫秒时间戳等价
+        timestamps = bars['timestamp'].to_numpy()
+        start, end = (datetime.fromtimestamp(timestamps[i] / 1000).strftime('%Y-%m-%d %H:%M:%S') for i in (50, 249))
+        chunks = list(iter_store_chunks('ETH/USDT', '1h', start, end, chunk_size=64, **kwargs))
+        replayed = np.concatenate([np.asarray(chunk['timestamp']) for chunk in chunks])
+        np.testing.assert_array_equal(replayed, timestamps[50:250])
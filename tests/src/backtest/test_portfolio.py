@@ -0,0 +1,169 @@
+"""
+测试组合回测模块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.backtest.portfolio import (
+    cross_sectional_weights, run_portfolio_backtest, backtest_portfolio, PORTFOLIO_FILL_COLUMNS
+)
+from src.backtest.vectorized import run_backtest
+from src.data.panel import build_panel
+from src.data.store import open_store
+
+HOUR = 3600000
+
+
+def _make_ohlcv(count=300, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 10, count))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 2, count)
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(count, dtype=np.int64) * HOUR,
+        'open': open_,
+        'high': np.maximum(open_, close) + 1,
+        'low': np.minimum(open_, close) - 1,
+        'close': close,
+        'volume': 1.0,
+    })
+
+
+def _make_prices(closes):
+    """按给定收盘价生成开盘价等于收盘价的K线"""
+    closes = np.asarray(closes, dtype=np.float64)
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(len(closes), dtype=np.int64) * HOUR,
+        'open': closes,
+        'high': closes,
+        'low': closes,
+        'close': closes,
+        'volume': 1.0,
+    })
+
+
+class TestPortfolioBacktest:
+    """测试组合回测"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_cross_sectional_weights(self):
+        """测试截面权重的总敞口、多空对冲和NaN处理"""
+        scores = np.array([[1.0, 2.0, 3.0, np.nan], [4.0, np.nan, 2.0, 1.0], [np.nan] * 4])
+
+        ranked = cross_sectional_weights(scores, 'rank')
+        np.testing.assert_allclose(ranked[0], [-0.5, 0.0, 0.5, 0.0])
+        np.testing.assert_allclose(ranked[1], [0.5, 0.0, 0.0, -0.5])
+        np.testing.assert_allclose(ranked[2], 0.0)
+
+        zscore = cross_sectional_weights(scores, 'zscore', gross=2.0)
+        np.testing.assert_allclose(np.abs(zscore[:2]).sum(axis=1), 2.0)
+        np.testing.assert_allclose(zscore[:2].sum(axis=1), 0.0, atol=1e-12)
+
+        equal = cross_sectional_weights(scores, 'equal', long_short=False)
+        np.testing.assert_allclose(equal[0], [1 / 3, 1 / 3, 1 / 3, 0.0])
+        long_only = cross_sectional_weights(scores, 'rank', long_short=False)
+        assert (long_only >= 0).all()
+        with pytest.raises(ValueError):
+            cross_sectional_weights(scores, 'equal')
+
+    @pytest.mark.parametrize("execution", ["next_open", "close"])
+    def test_single_asset_matches_vectorized(self, execution):
+        """测试单个交易对全仓或空仓时与向量化回测一致"""
+        df = _make_ohlcv()
+        positions = np.random.default_rng(1).choice([0.0, 1.0], len(df))
+        result = run_portfolio_backtest(build_panel({'ETH/USDT': df}), positions[:, None], 1, 10000, 0.001, 0.0005,
+                                        execution)
+        expected = run_backtest(df, positions, 10000, 0.001, 0.0005, execution)
+
+        np.testing.assert_allclose(result.equity, expected.equity, rtol=1e-12)
+        np.testing.assert_allclose(result.positions, expected.positions)
+        assert result.stats()['trades'] == expected.stats()['trades']
+        assert result.stats()['fees'] == pytest.approx(expected.stats()['fees'])
+
+    def test_drift_and_rebalance(self):
+        """测试权重随价格漂移，调仓换手按漂移后的权重计算"""
+        panel = build_panel({'A': _make_prices([100, 200, 200, 200]), 'B': _make_prices([100, 100, 100, 100])})
+        result = run_portfolio_backtest(panel, np.full((4, 2), 0.5), rebalance_every=2, initial_capital=10000,
+                                        fee_rate=0.01, slippage=0.0, execution='close')
+
+        np.testing.assert_allclose(result.equity, [9900, 14850, 14800.5, 14800.5])
+        np.testing.assert_allclose(result.weights[1], [2 / 3, 1 / 3])
+        np.testing.assert_allclose(result.weights[2], [0.5, 0.5])
+
+        fills = result.fills
+        assert list(fills.columns) == PORTFOLIO_FILL_COLUMNS
+        assert list(fills['symbol']) == ['A', 'B', 'A', 'B']
+        np.testing.assert_allclose(fills['notional'], [5000, 5000, 2475, 2475])
+        np.testing.assert_allclose(fills['size'], [0.5, 0.5, -1 / 6, 1 / 6])
+
+    def test_missing_bar_is_not_traded(self):
+        """测试没有真实K线的交易对在调仓时不交易，保持漂移后的权重"""
+        prices = _make_prices([100, 100, 100, 100]).drop(index=2)
+        panel = build_panel({'A': _make_prices([100, 200, 200, 200]), 'B': prices}, fill='ffill')
+        result = run_portfolio_backtest(panel, np.full((4, 2), 0.5), rebalance_every=2, initial_capital=10000,
+                                        fee_rate=0.01, slippage=0.0, execution='close')
+
+        np.testing.assert_allclose(result.weights[2] * result.equity[2],
+                                   [0.5 * 14850 * (1 - 0.01 / 6), 14850 / 3])
+        assert list(result.fills['symbol']) == ['A', 'B', 'A']
+        assert result.equity[2] == pytest.approx(14850 * (1 - 0.01 / 6))
+
+    def test_delisted_symbol_long_history(self):
+        """测试交易对在历史中途下架后持仓数量不变，之后不再成交"""
+        count, delisted_at = 8000, 1000
+        data = {f'S{i}': _make_ohlcv(count, seed=i) for i in range(20)}
+        data['S0'] = data['S0'].iloc[:delisted_at]
+        panel = build_panel(data, fill='ffill')
+        result = run_portfolio_backtest(panel, np.full((count, 20), 0.05), initial_capital=10000,
+                                        fee_rate=0.001, slippage=0.0, execution='close')
+
+        last_close = data['S0']['close'].iloc[-1]
+        units = result.weights[delisted_at - 1, 0] * result.equity[delisted_at - 1] / last_close
+        np.testing.assert_allclose(result.weights[delisted_at:, 0] * result.equity[delisted_at:], units * last_close,
+                                   rtol=1e-9)
+        fills = result.fills
+        assert (fills.loc[fills['symbol'] == 'S0', 'timestamp'] < panel.timestamps[delisted_at]).all()
+        assert (fills['timestamp'] == panel.timestamps[-1]).sum() == 19
+
+    def test_invalid_arguments(self):
+        """测试非法参数"""
+        panel = build_panel({'A': _make_prices([100, 101, 102])})
+        with pytest.raises(ValueError):
+            run_portfolio_backtest(panel, np.ones((3, 2)))
+        with pytest.raises(ValueError):
+            run_portfolio_backtest(panel, np.ones((3, 1)), rebalance_every=0)
+        with pytest.raises(ValueError):
+            run_portfolio_backtest(panel, np.ones((3, 1)), execution='vwap')
+
+    def test_backtest_portfolio(self):
+        """测试读取已保存的多个交易对回测"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'flat'}
+        frames = {'BTC/USDT': _make_ohlcv(seed=1), 'ETH/USDT': _make_ohlcv(seed=2).iloc[50:]}
+        for symbol, df in frames.items():
+            open_store(symbol, '1h', **kwargs).write(df)
+
+        def momentum(panel):
+            close = panel['close']
+            change = close / np.vstack([np.full((24, close.shape[1]), np.nan), close[:-24]]) - 1
+            return cross_sectional_weights(np.where(panel.mask, change, np.nan), 'rank')
+
+        result = backtest_portfolio(list(frames), '1h', momentum, rebalance_every=24, **kwargs)
+        assert result.symbols == list(frames)
+        assert len(result.equity) == 300
+        assert result.stats()['trades'] > 0
+        # 调仓时总敞口为1，之后随价格漂移
+        assert result.weights_frame().abs().sum(axis=1).iloc[-1] == pytest.approx(1.0, abs=0.1)
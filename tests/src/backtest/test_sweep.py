@@ -0,0 +1,143 @@
+"""
+测试参数扫描模块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.backtest.sweep import (
+    SharedOHLCV, SweepRunner, ResultsTable, grid_params, random_params, params_key, sma_crossover, run_sweep
+)
+from src.data.store import open_store
+
+HOUR = 3600000
+
+
+def _make_ohlcv(count=600, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 10, count))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(count, dtype=np.int64) * HOUR,
+        'open': open_,
+        'high': np.maximum(open_, close) + 5,
+        'low': np.minimum(open_, close) - 5,
+        'close': close,
+        'volume': np.ones(count),
+    })
+
+
+def fragile_crossover(data, params):
+    """慢线周期为0时抛出异常的评估函数"""
+    if params['slow'] == 0:
+        raise ValueError("慢线周期不能为0")
+    return sma_crossover(data, params)
+
+
+class TestSweep:
+    """测试参数扫描"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.results_path = os.path.join(self.temp_dir.name, 'sweeps', 'results.csv')
+        self.df = _make_ohlcv()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_param_generators(self):
+        """测试网格参数和随机参数"""
+        grid = grid_params({'fast': [5, 10], 'slow': [50, 100, 200]})
+        assert len(grid) == 6
+        assert grid[0] == {'fast': 5, 'slow': 50}
+
+        sampled = random_params({'fast': (5, 20), 'slow': [50, 100], 'fee_rate': (0.0, 0.001)}, 50, seed=1)
+        assert sampled == random_params({'fast': (5, 20), 'slow': [50, 100], 'fee_rate': (0.0, 0.001)}, 50, seed=1)
+        assert all(isinstance(p['fast'], int) and 5 <= p['fast'] <= 20 for p in sampled)
+        assert {p['slow'] for p in sampled} <= {50, 100}
+        assert all(0.0 <= p['fee_rate'] <= 0.001 for p in sampled)
+        assert params_key({'b': 1, 'a': 2}) == params_key({'a': 2, 'b': 1})
+
+    def test_shared_ohlcv(self):
+        """测试共享内存中的数据与原数据一致，挂载方只读"""
+        shared = SharedOHLCV.create(self.df)
+        try:
+            attached = SharedOHLCV.attach(shared.descriptor)
+            assert len(attached) == len(self.df)
+            for column in ('timestamp', 'open', 'high', 'low', 'close', 'volume'):
+                np.testing.assert_array_equal(attached[column], self.df[column].to_numpy())
+            with pytest.raises(ValueError):
+                attached['close'][0] = 0.0
+            attached.close()
+        finally:
+            shared.unlink()
+
+    def test_parallel_matches_direct(self):
+        """测试多进程扫描结果与直接评估一致"""
+        param_sets = grid_params({'fast': [5, 10], 'slow': [30, 60]})
+        progress = []
+        results = SweepRunner(sma_crossover, self.results_path, max_workers=2).run(
+            self.df, param_sets, lambda done, total: progress.append((done, total)))
+
+        assert len(results) == len(param_sets)
+        assert progress[-1] == (4, 4)
+        results = results.set_index('params')
+        for params in param_sets:
+            expected = sma_crossover(self.df, params)
+            row = results.loc[params_key(params)]
+            assert row['sharpe'] == pytest.approx(expected['sharpe'])
+            assert row['trades'] == expected['trades']
+
+    def test_resume(self):
+        """测试中断后只评估未完成的参数组"""
+        param_sets = grid_params({'fast': [5, 10, 20], 'slow': [60]})
+        table = ResultsTable(self.results_path)
+        table.append(param_sets[0], sma_crossover(self.df, param_sets[0]))
+        table.close()
+
+        progress = []
+        results = SweepRunner(sma_crossover, self.results_path, max_workers=2).run(
+            self.df, param_sets, lambda done, total: progress.append(done))
+        assert progress == [2, 3]
+        assert len(results) == 3
+        assert sorted(results['fast']) == [5, 10, 20]
+
+        # 全部完成后不再启动进程池
+        progress = []
+        SweepRunner(sma_crossover, self.results_path, max_workers=2).run(
+            self.df, param_sets, lambda done, total: progress.append(done))
+        assert progress == []
+
+    def test_errors_are_recorded_and_retried(self):
+        """测试评估失败的参数组写入错误信息，重新运行时再次评估"""
+        param_sets = [{'fast': 5, 'slow': 0}, {'fast': 5, 'slow': 30}]
+        results = SweepRunner(fragile_crossover, self.results_path, max_workers=2).run(self.df, param_sets)
+
+        failed = results.set_index('params').loc[params_key(param_sets[0])]
+        assert '慢线周期不能为0' in failed['error']
+        assert np.isnan(failed['sharpe'])
+        assert ResultsTable(self.results_path).done == {params_key(param_sets[1])}
+
+        progress = []
+        SweepRunner(fragile_crossover, self.results_path, max_workers=2).run(
+            self.df, param_sets, lambda done, total: progress.append(done))
+        assert progress == [2]
+
+    def test_run_sweep(self):
+        """测试读取已保存的数据扫描参数"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'binary', 'layout': 'flat'}
+        open_store('ETH/USDT', '1h', **kwargs).write(self.df)
+
+        results = run_sweep('ETH/USDT', '1h', [{'fast': 5, 'slow': 30}], results_path=self.results_path,
+                            max_workers=1, **kwargs)
+        expected = sma_crossover(self.df, {'fast': 5, 'slow': 30})
+        assert results['final_equity'].iloc[0] == pytest.approx(expected['final_equity'])
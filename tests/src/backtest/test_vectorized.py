@@ -0,0 +1,184 @@
+"""
+测试向量化回测模块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.backtest.vectorized import run_backtest, backtest_store, FILL_COLUMNS
+from src.data.store import open_store
+from src.data.funding import open_funding_store
+
+HOUR = 3600000
+
+
+def _make_ohlcv(count=500, seed=0):
+    """生成随机K线，开盘价与前收盘价之间有跳空"""
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 10, count))
+    open_ = np.r_[close[0], close[:-1]] + rng.normal(0, 2, count)
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(count, dtype=np.int64) * HOUR,
+        'open': open_,
+        'high': np.maximum(open_, close) + 1,
+        'low': np.minimum(open_, close) - 1,
+        'close': close,
+        'volume': 1.0,
+    })
+
+
+def _loop_backtest(df, positions, capital, fee_rate, slippage):
+    """逐根K线模拟下一根开盘成交的参考实现"""
+    opens, closes = df['open'].to_numpy(), df['close'].to_numpy()
+    equity = []
+    held = 0.0
+    for t in range(len(df)):
+        if t > 0:
+            capital *= 1 + held * (opens[t] / closes[t - 1] - 1)
+            new = positions[t - 1]
+            capital *= 1 - abs(new - held) * (fee_rate + slippage)
+            held = new
+        capital *= 1 + held * (closes[t] / opens[t] - 1)
+        equity.append(capital)
+    return np.array(equity)
+
+
+class TestVectorizedBacktest:
+    """测试向量化回测"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.df = _make_ohlcv()
+        rng = np.random.default_rng(1)
+        self.positions = rng.choice([-1.0, 0.0, 0.5, 1.0], len(self.df))
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_matches_loop(self):
+        """测试与逐根K线模拟的结果一致"""
+        result = run_backtest(self.df, self.positions, 10000, 0.001, 0.0005, 'next_open')
+        expected = _loop_backtest(self.df, self.positions, 10000, 0.001, 0.0005)
+        np.testing.assert_allclose(result.equity, expected, rtol=1e-10)
+        np.testing.assert_allclose(result.pnl.sum(), expected[-1] - 10000)
+
+    def test_no_lookahead(self):
+        """测试收盘决定的仓位不会享受当根K线的涨跌"""
+        df = self.df.iloc[:3].copy()
+        df['open'] = [100.0, 100.0, 110.0]
+        df['close'] = [100.0, 110.0, 121.0]
+
+        result = run_backtest(df, [0.0, 1.0, 1.0], 1000, 0.0, 0.0, 'next_open')
+        np.testing.assert_allclose(result.equity, [1000.0, 1000.0, 1100.0])
+        np.testing.assert_allclose(result.positions, [0.0, 0.0, 1.0])
+
+        result = run_backtest(df, [0.0, 1.0, 1.0], 1000, 0.0, 0.0, 'close')
+        np.testing.assert_allclose(result.equity, [1000.0, 1000.0, 1100.0])
+
+    def test_fills_fees_and_slippage(self):
+        """测试成交记录、手续费和滑点"""
+        df = self.df.iloc[:4].copy()
+        df['open'] = [100.0, 100.0, 100.0, 100.0]
+        df['close'] = [100.0, 100.0, 100.0, 100.0]
+
+        result = run_backtest(df, [1.0, 1.0, -1.0, -1.0], 1000, 0.001, 0.002, 'next_open')
+        fills = result.fills
+
+        assert list(fills.columns) == FILL_COLUMNS
+        assert list(fills['size']) == [1.0, -2.0]
+        assert fills['price'].tolist() == pytest.approx([100.2, 99.8])
+        assert fills['notional'].iloc[0] == pytest.approx(1000.0)
+        assert fills['fee'].iloc[0] == pytest.approx(1.0)
+        assert fills['slippage'].iloc[0] == pytest.approx(2.0)
+        assert fills['units'].iloc[0] == pytest.approx(1000.0 / 100.2)
+        assert fills['units'].iloc[1] < 0
+
+        # 价格不变时，权益只因费用减少
+        equity_after_first = 1000 * (1 - 0.003)
+        assert result.equity[1] == pytest.approx(equity_after_first)
+        assert result.equity[-1] == pytest.approx(equity_after_first * (1 - 2 * 0.003))
+        assert result.stats()['fees'] == pytest.approx(fills['fee'].sum())
+
+    def test_drawdown_and_stats(self):
+        """测试回撤和汇总指标"""
+        result = run_backtest(self.df, np.ones(len(self.df)), 10000, 0.0, 0.0, 'close', timeframe='1h')
+        peak = np.maximum.accumulate(np.r_[10000, result.equity])[1:]
+        np.testing.assert_allclose(result.drawdown, result.equity / peak - 1)
+
+        stats = result.stats()
+        assert stats['max_drawdown'] == pytest.approx(result.drawdown.min())
+        assert stats['trades'] == 1
+        assert stats['final_equity'] == pytest.approx(result.equity[-1])
+        assert result.periods_per_year == pytest.approx(365 * 24)
+
+        frame = result.to_frame()
+        assert list(frame.columns) == ['timestamp', 'position', 'return', 'pnl', 'equity', 'drawdown']
+
+    def test_invalid_arguments(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            run_backtest(self.df, self.positions[:-1])
+        with pytest.raises(ValueError):
+            run_backtest(self.df, self.positions, execution='vwap')
+
+    def test_backtest_store(self):
+        """测试读取已保存的数据回测"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'flat'}
+        open_store('ETH/USDT', '1h', **kwargs).write(self.df)
+
+        result = backtest_store('ETH/USDT', '1h', lambda data: np.sign(data['close'] - data['open']),
+                                fee_rate=0.0, slippage=0.0, **kwargs)
+        expected = run_backtest(self.df, np.sign(self.df['close'] - self.df['open']), fee_rate=0.0, slippage=0.0)
+        np.testing.assert_allclose(result.equity, expected.equity)
+
+    def test_funding(self):
+        """测试按持有的仓位结算资金费，并读取已保存的资金费率"""
+        rates = np.zeros(len(self.df))
+        rates[7::8] = 0.0001
+        positions = np.ones(len(self.df))
+        positions[100:200] = -1.0
+
+        base = run_backtest(self.df, positions, fee_rate=0.0, slippage=0.0)
+        funded = run_backtest(self.df, positions, fee_rate=0.0, slippage=0.0, funding_rates=rates)
+
+        # 逐根复利：每根K线的增长因子多乘 (1 - 仓位 * 费率)
+        growth = (1 + base.returns) * (1 - base.positions * rates)
+        np.testing.assert_allclose(funded.equity, 10000 * np.cumprod(growth))
+        np.testing.assert_allclose(funded.funding[rates == 0], 0.0)
+        # 费率为正时多头支付、空头收取
+        assert funded.funding[151] < 0 < funded.funding[7]
+        assert funded.stats()['funding'] == pytest.approx(funded.funding.sum())
+        assert base.stats()['funding'] == 0.0
+
+        # 按收盘价成交时收盘结算的是旧仓位
+        close_base = run_backtest(self.df, positions, fee_rate=0.0, slippage=0.0, execution='close')
+        close_fill = run_backtest(self.df, positions, fee_rate=0.0, slippage=0.0, execution='close',
+                                  funding_rates=rates)
+        growth = (1 + close_base.returns) * (1 - np.r_[0.0, positions[:-1]] * rates)
+        np.testing.assert_allclose(close_fill.equity, 10000 * np.cumprod(growth))
+        with pytest.raises(ValueError):
+            run_backtest(self.df, positions, funding_rates=rates[:-1])
+
+        # binary格式的K线搭配以parquet保存的资金费率
+        expected = run_backtest(self.df, np.where(np.arange(len(self.df)) >= 100, -1.0, 1.0), fee_rate=0.0,
+                                slippage=0.0, funding_rates=rates)
+        funding_times = self.df['timestamp'].to_numpy()[::8] + 8 * HOUR
+        for storage_format in ('csv', 'binary'):
+            kwargs = {'data_dir': os.path.join(self.temp_dir.name, storage_format), 'storage_format': storage_format,
+                      'layout': 'flat'}
+            open_store('ETH/USDT:USDT', '1h', **kwargs).write(self.df)
+            open_funding_store('ETH/USDT:USDT', **kwargs).write(
+                pd.DataFrame({'timestamp': funding_times, 'funding_rate': 0.0001}))
+            result = backtest_store('ETH/USDT:USDT', '1h',
+                                    lambda data: np.where(np.arange(len(data)) >= 100, -1.0, 1.0),
+                                    fee_rate=0.0, slippage=0.0, funding=True, **kwargs)
+            np.testing.assert_allclose(result.equity, expected.equity)
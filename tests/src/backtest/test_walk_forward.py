@@ -0,0 +1,140 @@
+"""
+测试滚动窗口优化模块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.backtest.walk_forward import (
+    WalkForward, walk_forward_windows, run_walk_forward, walk_forward_store, sma_features
+)
+from src.backtest.cache import ResultCache
+from src.backtest.sweep import grid_params, params_key
+from src.backtest.vectorized import run_backtest
+from src.data.store import open_store
+
+HOUR = 3600000
+
+
+def _make_ohlcv(count=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 10, count))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(count, dtype=np.int64) * HOUR,
+        'open': open_,
+        'high': np.maximum(open_, close) + 1,
+        'low': np.minimum(open_, close) - 1,
+        'close': close,
+        'volume': 1.0,
+    })
+
+
+def band_signal(data, features, params):
+    """快线高出慢线一定比例才做多"""
+    return np.where(features['fast'] > features['slow'] * (1 + params['band']), 1.0, 0.0)
+
+
+class TestWalkForward:
+    """测试滚动窗口优化"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = ResultCache(os.path.join(self.temp_dir.name, 'cache'))
+        self.df = _make_ohlcv()
+        self.param_sets = grid_params({'fast': [5, 10], 'slow': [30, 60]})
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_windows(self):
+        """测试滚动、扩展和按时长划分窗口"""
+        timestamps = self.df['timestamp'].to_numpy()[:100]
+        assert walk_forward_windows(timestamps, 50, 20) == [(0, 50, 50, 70), (20, 70, 70, 90)]
+        assert walk_forward_windows(timestamps, 50, 20, step=10, anchored=True)[-1] == (0, 80, 80, 100)
+        assert walk_forward_windows(timestamps, '2d', '12h') == walk_forward_windows(timestamps, 48, 12)
+        assert walk_forward_windows(timestamps, 90, 20) == []
+        with pytest.raises(ValueError):
+            walk_forward_windows(timestamps, 0, 10)
+
+    def test_matches_direct_evaluation(self):
+        """测试每个窗口选出训练集上最优的参数，样本外结果与直接回测一致"""
+        pipeline = WalkForward(cache=self.cache, backtest_kwargs={'fee_rate': 0.001, 'slippage': 0.0})
+        result = run_walk_forward(self.df, self.param_sets, 600, 300, pipeline=pipeline, max_workers=1)
+        assert len(result.windows) == 4
+
+        for window, (train_start, train_end, test_start, test_end) in zip(
+                result.windows.itertuples(), walk_forward_windows(self.df['timestamp'], 600, 300)):
+            train = self.df.iloc[train_start:train_end]
+            scores = {}
+            for params in self.param_sets:
+                features = sma_features(train, params)
+                positions = np.where(features['fast'] > features['slow'], 1.0, 0.0)
+                stats = run_backtest(train, positions, fee_rate=0.001, slippage=0.0).stats()
+                scores[params_key(params)] = stats['sharpe']
+            assert window.params == max(scores, key=scores.get)
+            assert window.train_sharpe == pytest.approx(max(scores.values()))
+            assert window.test_start == self.df['timestamp'].iloc[test_start]
+
+        # 样本外收益首尾相接，长度等于所有测试窗口之和
+        assert len(result.oos.returns) == 4 * 300
+        np.testing.assert_allclose(result.oos.equity[-1], 10000 * np.prod(1 + result.oos.returns))
+        assert result.stats()['trades'] == result.windows['test_trades'].sum()
+
+    def test_rerun_uses_cache(self):
+        """测试重新运行只计算发生变化的部分"""
+        pipeline = WalkForward(cache=self.cache)
+        first = run_walk_forward(self.df, self.param_sets, 600, 300, pipeline=pipeline, max_workers=1)
+        assert first.cache_hits == 0
+
+        second = run_walk_forward(self.df, self.param_sets, 600, 300, pipeline=pipeline, max_workers=1)
+        assert second.cache_misses == 0
+        pd.testing.assert_frame_equal(first.windows, second.windows)
+
+        # 增加一组参数，每个窗口只多计算一次特征和一次训练回测
+        extra = self.param_sets + [{'fast': 20, 'slow': 60}]
+        third = run_walk_forward(self.df, extra, 600, 300, pipeline=pipeline, max_workers=1)
+        assert third.cache_misses == 4 * 2
+
+    def test_signal_params_reuse_features(self):
+        """测试只修改信号参数时复用已缓存的特征"""
+        pipeline = WalkForward(signal=band_signal, cache=self.cache)
+        run_walk_forward(self.df, [{'fast': 5, 'slow': 30, 'band': 0.0}], 600, 300, pipeline=pipeline,
+                         max_workers=1)
+        result = run_walk_forward(self.df, [{'fast': 5, 'slow': 30, 'band': 0.01}], 600, 300, pipeline=pipeline,
+                                  max_workers=1)
+        # 每个窗口的训练回测和样本外回测需要重新计算，特征全部命中
+        assert result.cache_misses == 4 * 2
+        assert result.cache_hits == 4 * 2
+
+    def test_parallel_matches_serial(self):
+        """测试多进程执行窗口的结果与单进程一致"""
+        serial = run_walk_forward(self.df, self.param_sets, 600, 300, pipeline=WalkForward(cache=self.cache),
+                                  max_workers=1)
+        other_cache = ResultCache(os.path.join(self.temp_dir.name, 'other'))
+        parallel = run_walk_forward(self.df, self.param_sets, 600, 300, pipeline=WalkForward(cache=other_cache),
+                                    max_workers=2)
+        pd.testing.assert_frame_equal(serial.windows, parallel.windows)
+        np.testing.assert_allclose(serial.oos.equity, parallel.oos.equity)
+        assert parallel.cache_misses == serial.cache_misses
+
+    def test_walk_forward_store(self):
+        """测试读取已保存的数据做滚动窗口优化"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'flat'}
+        open_store('ETH/USDT', '1h', **kwargs).write(self.df)
+        result = walk_forward_store('ETH/USDT', '1h', self.param_sets, '25d', '12d',
+                                    pipeline=WalkForward(cache=self.cache), max_workers=1, **kwargs)
+        assert len(result.windows) == 4
+        assert result.oos.periods_per_year == pytest.approx(365 * 24)
+
+        with pytest.raises(ValueError):
+            run_walk_forward(self.df.iloc[:100], self.param_sets, 600, 300, pipeline=WalkForward(cache=self.cache))
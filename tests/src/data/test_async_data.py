@@ -0,0 +1,113 @@
+"""
+测试异步数据获取模块
+"""
+import os
+import sys
+import asyncio
+import tempfile
+
+import ccxt
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.async_data import AsyncIngestor, fetch_full_history_async, get_async_exchange
+from src.data.rate_limiter import RetryPolicy
+from src.data.scheduler import DownloadJob, JOB_DONE, JOB_FAILED
+from src.data.store import open_store
+from src.data.storage import OHLCV_COLUMNS
+
+HOUR = 3600000
+START = 1625097600000
+
+
+class StubAsyncExchange:
+    """模拟ccxt.async_support交易所，记录并发请求数"""
+
+    def __init__(self, exchange_id, candles, page_size=4, failures=0):
+        self.id = exchange_id
+        self.rateLimit = 0
+        self.timeframes = {'1h': '1H'}
+        self.symbols = list(candles)
+        self.candles = candles
+        self.page_size = page_size
+        self.failures = failures
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.load_markets_calls = 0
+        self.closed = False
+
+    async def load_markets(self):
+        self.load_markets_calls += 1
+        await asyncio.sleep(0)
+
+    async def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if self.failures > 0:
+                self.failures -= 1
+                raise ccxt.RequestTimeout("timeout")
+            page = [candle for candle in self.candles[symbol] if candle[0] >= since]
+            return [list(candle) for candle in page[:min(limit, self.page_size)]]
+        finally:
+            self.in_flight -= 1
+
+    async def close(self):
+        self.closed = True
+
+
+class TestAsyncData:
+    """测试异步数据获取"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.candles = {
+            f"C{i}/USDT": [[START + j * HOUR, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, float(j)] for j in range(10)]
+            for i in range(6)
+        }
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_get_async_exchange(self):
+        """测试创建异步交易所实例并转换代理配置"""
+        exchange = get_async_exchange('okx', {'proxies': {'https': 'http://127.0.0.1:1/'}})
+        try:
+            assert exchange.httpsProxy == 'http://127.0.0.1:1/'
+            assert exchange.enableRateLimit
+        finally:
+            asyncio.run(exchange.close())
+
+    def test_fetch_full_history_async(self):
+        """测试异步翻页获取并在临时错误后重试"""
+        exchange = StubAsyncExchange("stub_history", self.candles, failures=1)
+        result = asyncio.run(fetch_full_history_async(
+            exchange, "C0/USDT", "1h", START, START + 8 * HOUR,
+            retry_policy=RetryPolicy(max_retries=2, base_delay=0)))
+        assert result == self.candles["C0/USDT"][:9]
+
+    def test_ingestor(self):
+        """测试共享交易所实例、限制并发数并写入与同步路径相同的存储"""
+        exchange = StubAsyncExchange("stub_ingest", self.candles)
+        jobs = [DownloadJob(symbol, "1h", START, START + 9 * HOUR, "stub_ingest") for symbol in self.candles]
+        jobs.append(DownloadJob("MISSING/USDT", "1h", START, START + 9 * HOUR, "stub_ingest"))
+
+        ingestor = AsyncIngestor(max_concurrency=3, data_dir=self.temp_dir.name,
+                                 exchange_factory=lambda exchange_id: exchange)
+        ingestor.run(jobs)
+
+        assert [job.status for job in jobs] == [JOB_DONE] * 6 + [JOB_FAILED]
+        assert exchange.load_markets_calls == 1
+        assert exchange.closed
+        assert 1 < exchange.max_in_flight <= 3
+
+        for job in jobs[:-1]:
+            stored = open_store(job.symbol, "1h", "stub_ingest", self.temp_dir.name).load()
+            assert stored[OHLCV_COLUMNS].values.tolist() == self.candles[job.symbol]
+            assert job.file_path == open_store(job.symbol, "1h", "stub_ingest", self.temp_dir.name).path
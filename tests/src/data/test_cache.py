@@ -0,0 +1,88 @@
+"""
+测试K线请求缓存模块
+"""
+import os
+import sys
+import time
+import tempfile
+from unittest import mock
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.cache import OHLCVCache
+from src.data.get_data import fetch_ohlcv
+
+HOUR = 3600000
+
+
+class TestOHLCVCache:
+    """测试K线请求缓存"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = OHLCVCache(os.path.join(self.temp_dir.name, "cache", "ohlcv.sqlite"), ttl=60)
+        self.closed_page = [[1625097600000 + i * HOUR, 1.0, 2.0, 0.5, 1.5, 10.0] for i in range(3)]
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def _forming_page(self):
+        """包含未收盘K线的分页"""
+        now = int(time.time() * 1000)
+        return [[now - now % HOUR, 1.0, 2.0, 0.5, 1.5, 10.0]]
+
+    def test_closed_page_cached_permanently(self):
+        """测试已完结的分页永久缓存"""
+        self.cache.put("okx", "ETH/USDT", "1h", 1625097600000, 100, self.closed_page)
+
+        with mock.patch('src.data.cache.time.time', return_value=time.time() + 10 ** 8):
+            assert self.cache.get("okx", "ETH/USDT", "1h", 1625097600000, 100) == self.closed_page
+
+        # 键的任何部分不同都不命中
+        assert self.cache.get("okx", "ETH/USDT", "1h", 1625097600000, 1000) is None
+        assert self.cache.get("binance", "ETH/USDT", "1h", 1625097600000, 100) is None
+
+    def test_forming_page_expires(self):
+        """测试包含未收盘K线的分页在ttl后过期"""
+        page = self._forming_page()
+        self.cache.put("okx", "ETH/USDT", "1h", page[0][0], 100, page)
+        assert self.cache.get("okx", "ETH/USDT", "1h", page[0][0], 100) == page
+
+        with mock.patch('src.data.cache.time.time', return_value=time.time() + 61):
+            assert self.cache.get("okx", "ETH/USDT", "1h", page[0][0], 100) is None
+        assert len(self.cache) == 0
+
+    def test_lru_eviction(self):
+        """测试超过大小上限时淘汰最久未访问的分页"""
+        self.cache.put("okx", "ETH/USDT", "1h", 0, 100, self.closed_page)
+        page_size = self.cache.size()
+        self.cache.max_bytes = page_size * 2
+
+        self.cache.put("okx", "ETH/USDT", "1h", 1, 100, self.closed_page)
+        # 访问第一个分页，使第二个分页成为最久未访问的
+        assert self.cache.get("okx", "ETH/USDT", "1h", 0, 100) is not None
+        self.cache.put("okx", "ETH/USDT", "1h", 2, 100, self.closed_page)
+
+        assert len(self.cache) == 2
+        assert self.cache.get("okx", "ETH/USDT", "1h", 1, 100) is None
+        assert self.cache.get("okx", "ETH/USDT", "1h", 0, 100) is not None
+
+    def test_fetch_ohlcv_uses_cache(self):
+        """测试重复请求已缓存的分页不访问交易所"""
+        exchange = mock.MagicMock()
+        exchange.id = "okx"
+        exchange.fetch_ohlcv.return_value = self.closed_page
+        limiter = mock.MagicMock()
+
+        for _ in range(3):
+            result = fetch_ohlcv(exchange, "ETH/USDT", "1h", 1625097600000, 100,
+                                 rate_limiter=limiter, cache=self.cache)
+            assert result == self.closed_page
+
+        exchange.fetch_ohlcv.assert_called_once_with("ETH/USDT", "1h", 1625097600000, 100)
+        # 命中缓存的请求不占用频率限制
+        limiter.acquire.assert_called_once()
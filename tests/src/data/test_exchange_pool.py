@@ -0,0 +1,123 @@
+"""
+测试交易所客户端池模块
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+from unittest import mock
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.exchange_pool import get_pooled_exchange, ensure_markets, clear_pool
+
+
+class FakeExchange:
+    """模拟交易所，记录加载市场的次数"""
+
+    def __init__(self, exchange_id, config=None):
+        self.id = exchange_id
+        self.config = config
+        self.markets = None
+        self.currencies = None
+        self.load_markets_calls = 0
+
+    def load_markets(self):
+        self.load_markets_calls += 1
+        self.set_markets({'ETH/USDT': {'id': 'ETH-USDT', 'symbol': 'ETH/USDT'}}, {'ETH': {'code': 'ETH'}})
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = dict(markets)
+        self.currencies = currencies
+
+
+class TestExchangePool:
+    """测试交易所客户端池"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        clear_pool()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.temp_dir.name, "fake_markets.json")
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        clear_pool()
+        self.temp_dir.cleanup()
+
+    def test_get_pooled_exchange(self):
+        """测试相同交易所和配置在同一线程中复用实例"""
+        first = get_pooled_exchange("fake", {"timeout": 1}, factory=FakeExchange)
+        assert get_pooled_exchange("fake", {"timeout": 1}, factory=FakeExchange) is first
+        assert get_pooled_exchange("fake", {"timeout": 2}, factory=FakeExchange) is not first
+
+        # 每个线程各有一个实例
+        other = []
+        thread = threading.Thread(target=lambda: other.append(get_pooled_exchange("fake", {"timeout": 1},
+                                                                                  factory=FakeExchange)))
+        thread.start()
+        thread.join()
+        assert other[0] is not first
+
+    def test_ensure_markets_cached(self):
+        """测试市场信息只从交易所加载一次"""
+        first = FakeExchange("fake")
+        ensure_markets(first, ttl=60, cache_path=self.cache_path)
+        assert first.load_markets_calls == 1
+        assert os.path.exists(self.cache_path)
+
+        # 已加载的实例不再加载
+        ensure_markets(first, ttl=60, cache_path=self.cache_path)
+        assert first.load_markets_calls == 1
+
+        # 新实例使用进程内缓存
+        second = FakeExchange("fake")
+        ensure_markets(second, ttl=60, cache_path=self.cache_path)
+        assert second.load_markets_calls == 0
+        assert 'ETH/USDT' in second.markets
+
+        # 新进程使用磁盘缓存
+        clear_pool()
+        third = FakeExchange("fake")
+        ensure_markets(third, ttl=60, cache_path=self.cache_path)
+        assert third.load_markets_calls == 0
+        assert third.currencies == {'ETH': {'code': 'ETH'}}
+
+    def test_markets_keyed_by_options(self):
+        """测试不同默认市场类型或沙盒模式的实例不共用市场信息"""
+        spot = FakeExchange("fake")
+        spot.options = {'defaultType': 'spot'}
+        ensure_markets(spot, ttl=60, cache_path=self.cache_path)
+
+        swap = FakeExchange("fake")
+        swap.options = {'defaultType': 'swap'}
+        ensure_markets(swap, ttl=60, cache_path=os.path.join(self.temp_dir.name, "swap_markets.json"))
+        assert swap.load_markets_calls == 1
+
+        sandbox = FakeExchange("fake")
+        sandbox.options = {'defaultType': 'spot'}
+        sandbox.isSandboxModeEnabled = True
+        ensure_markets(sandbox, ttl=60, cache_path=os.path.join(self.temp_dir.name, "sandbox_markets.json"))
+        assert sandbox.load_markets_calls == 1
+
+        same = FakeExchange("fake")
+        same.options = {'defaultType': 'spot'}
+        ensure_markets(same, ttl=60, cache_path=self.cache_path)
+        assert same.load_markets_calls == 0
+
+    def test_ensure_markets_expired(self):
+        """测试缓存过期后重新加载"""
+        ensure_markets(FakeExchange("fake"), ttl=60, cache_path=self.cache_path)
+        clear_pool()
+
+        exchange = FakeExchange("fake")
+        with mock.patch('src.data.exchange_pool.time.time', return_value=time.time() + 61):
+            ensure_markets(exchange, ttl=60, cache_path=self.cache_path)
+        assert exchange.load_markets_calls == 1
+
+        with open(self.cache_path) as f:
+            assert json.load(f)['saved_at'] > time.time()
@@ -0,0 +1,156 @@
+"""
+测试资金费率与持仓量模块
+"""
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.funding import (
+    fetch_and_save_funding, open_funding_store, open_interest_store, asof_join, funding_per_bar,
+    load_funding_rates, load_open_interest, FUNDING_DATASET, FUNDING_SCHEMA
+)
+from src.data.store import open_store
+
+HOUR = 3600000
+START = 1625097600000  # 2021-07-01 00:00:00 UTC
+
+
+def _mock_exchange(funding, open_interest, page_size=10):
+    def fake_funding(symbol, since, limit):
+        return [dict(record) for record in funding if record['timestamp'] >= since][:min(limit, page_size)]
+
+    def fake_open_interest(symbol, timeframe, since, limit):
+        return [dict(record) for record in open_interest if record['timestamp'] >= since][:min(limit, page_size)]
+
+    exchange = mock.MagicMock()
+    exchange.id = 'okx'
+    exchange.markets = {
+        'ETH/USDT:USDT': {'base': 'ETH', 'quote': 'USDT', 'swap': True},
+        'BTC/USDT:USDT': {'base': 'BTC', 'quote': 'USDT', 'swap': True},
+        'ETH/USDT': {'base': 'ETH', 'quote': 'USDT', 'swap': False},
+        'LTC/USDT': {'base': 'LTC', 'quote': 'USDT', 'swap': False},
+    }
+    exchange.symbols = list(exchange.markets)
+    exchange.rateLimit = 0
+    exchange.fetch_funding_rate_history.side_effect = fake_funding
+    exchange.fetch_open_interest_history.side_effect = fake_open_interest
+    return exchange
+
+
+class TestFunding:
+    """测试资金费率与持仓量的获取、保存和对齐"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.funding = [{'timestamp': START + i * 8 * HOUR, 'fundingRate': 0.0001 * (i % 3 - 1)}
+                        for i in range(45)]
+        self.open_interest = [{'timestamp': START + i * HOUR, 'openInterestAmount': 1000.0 + i,
+                               'openInterestValue': None} for i in range(24 * 15)]
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    @mock.patch('src.data.funding.pool_enabled', return_value=False)
+    @mock.patch('ccxt.okx')
+    def test_fetch_and_save(self, mock_okx, mock_pool):
+        """测试批量分页获取、按相同的存储布局保存和增量更新"""
+        exchange = _mock_exchange(self.funding, self.open_interest)
+        mock_okx.return_value = exchange
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'partitioned'}
+        end = START + 10 * 24 * HOUR
+
+        results = fetch_and_save_funding(['ETH/USDT:USDT', 'ethusdtusdt', 'XRP/USDT:USDT'], START, end,
+                                         exchange_id='okx', **kwargs)
+        assert results['XRP/USDT:USDT'] is None
+        assert results['ETH/USDT:USDT']['funding'].endswith(os.path.join('ETH-USDT-USDT', 'funding'))
+
+        saved = open_funding_store('ETH/USDT:USDT', 'okx', **kwargs).load()
+        expected = [record for record in self.funding if record['timestamp'] <= end]
+        assert saved['timestamp'].tolist() == [record['timestamp'] for record in expected]
+        np.testing.assert_allclose(saved['funding_rate'], [record['fundingRate'] for record in expected])
+
+        interest = open_interest_store('ETH/USDT:USDT', '1h', 'okx', **kwargs).load()
+        assert len(interest) == 24 * 10 + 1
+        assert interest['open_interest_value'].isna().all()
+
+        # 增量更新只请求已保存的最后一条之后的数据
+        exchange.fetch_funding_rate_history.reset_mock()
+        fetch_and_save_funding(['ETH/USDT:USDT'], START, START + 15 * 24 * HOUR, exchange_id='okx',
+                               open_interest_timeframe='', **kwargs)
+        assert exchange.fetch_funding_rate_history.call_args_list[0].args[1] == end + 1
+        assert len(open_funding_store('ETH/USDT:USDT', 'okx', **kwargs).load()) == len(self.funding)
+
+    @mock.patch('src.data.funding.pool_enabled', return_value=False)
+    @mock.patch('ccxt.okx')
+    def test_default_symbol_is_swap(self, mock_okx, mock_pool):
+        """测试默认的现货交易对改用对应的永续合约，没有永续合约时失败"""
+        mock_okx.return_value = _mock_exchange(self.funding, self.open_interest)
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'flat',
+                  'exchange_id': 'okx', 'open_interest_timeframe': ''}
+        end = START + 2 * 24 * HOUR
+
+        with mock.patch('src.data.funding.data_config', {'symbol': 'ETH/USDT'}):
+            results = fetch_and_save_funding(None, START, end, **kwargs)
+        assert results['ETH/USDT']['funding'] == open_funding_store('ETH/USDT:USDT', data_dir=self.temp_dir.name,
+                                                                    storage_format='csv', layout='flat').path
+        assert fetch_and_save_funding(['LTC/USDT'], START, end, **kwargs)['LTC/USDT'] is None
+
+    def test_asof_join_and_funding_per_bar(self):
+        """测试as-of对齐和按K线汇总资金费率与逐条查找的结果一致"""
+        rng = np.random.default_rng(0)
+        source = np.sort(rng.choice(np.arange(START, START + 100 * HOUR, 60000), 50, replace=False))
+        values = rng.normal(size=50)
+        bars = START + np.arange(-2, 100, dtype=np.int64) * HOUR
+
+        joined = asof_join(bars, source, values)
+        expected = pd.merge_asof(pd.DataFrame({'timestamp': bars}),
+                                 pd.DataFrame({'timestamp': source, 'value': values}), on='timestamp')
+        np.testing.assert_allclose(joined, expected['value'], equal_nan=True)
+
+        per_bar = funding_per_bar(bars, source, values, '1h')
+        loop = [values[(source > t) & (source <= t + HOUR)].sum() for t in bars]
+        np.testing.assert_allclose(per_bar, loop, atol=1e-12)
+        assert np.isnan(asof_join(bars, source[:0], values[:0])).all()
+
+    def test_load_aligned(self):
+        """测试读取已保存的数据并对齐到K线，持仓量不使用K线收盘之后的记录"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'flat'}
+        bars = pd.DataFrame({'timestamp': START + np.arange(48, dtype=np.int64) * 4 * HOUR})
+        open_funding_store('ETH/USDT:USDT', **kwargs).write(
+            pd.DataFrame({'timestamp': [r['timestamp'] for r in self.funding],
+                          'funding_rate': [r['fundingRate'] for r in self.funding]}))
+        open_interest_store('ETH/USDT:USDT', '1h', **kwargs).write(
+            pd.DataFrame({'timestamp': [r['timestamp'] for r in self.open_interest],
+                          'open_interest': [r['openInterestAmount'] for r in self.open_interest],
+                          'open_interest_value': np.nan}))
+
+        rates = load_funding_rates(bars, 'ETH/USDT:USDT', '4h', **kwargs)
+        # 结算时间为8小时整点，落在每两根4小时K线中的第二根
+        assert (rates[0::2] == 0).all()
+        np.testing.assert_allclose(rates[1::2], [r['fundingRate'] for r in self.funding[1:25]])
+
+        interest = load_open_interest(bars, 'ETH/USDT:USDT', '4h', '1h', **kwargs)
+        # 4小时K线收盘前最后一条小时持仓量是第 4k+3 条
+        np.testing.assert_allclose(interest['open_interest'], 1000.0 + np.arange(48) * 4 + 3)
+
+    def test_binary_falls_back_to_parquet(self):
+        """测试binary格式只能保存K线，K线为binary时资金费率和持仓量改用parquet保存"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'binary', 'layout': 'flat'}
+        with pytest.raises(ValueError):
+            open_store('ETH/USDT:USDT', FUNDING_DATASET, schema=FUNDING_SCHEMA, **kwargs)
+        open_store('ETH/USDT:USDT', '1h', **kwargs)
+
+        assert open_funding_store('ETH/USDT:USDT', **kwargs).path.endswith('.parquet')
+        assert open_interest_store('ETH/USDT:USDT', '1h', **kwargs).path.endswith('.parquet')
+        with mock.patch('src.data.funding.data_config', {'funding': {'storage_format': 'feather'}}):
+            assert open_funding_store('ETH/USDT:USDT', **kwargs).path.endswith('.feather')
@@ -0,0 +1,97 @@
+"""
+测试数据缺口模块
+"""
+import os
+import sys
+import json
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.gaps import find_gaps, scan_gaps, backfill_gaps, gap_index_path
+from src.data.store import open_store
+
+HOUR = 3600000
+START = 1625097600000
+
+
+class TestGaps:
+    """测试缺口扫描与补全"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.candles = [[START + i * HOUR, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0] for i in range(100)]
+        # 缺少第10根、第20~24根和第50~59根
+        missing = {10} | set(range(20, 25)) | set(range(50, 60))
+        self.stored = [candle for i, candle in enumerate(self.candles) if i not in missing]
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def _kwargs(self, layout):
+        return dict(exchange_id='okx', data_dir=self.temp_dir.name, storage_format='csv', layout=layout)
+
+    def test_find_gaps(self):
+        """测试向量化查找缺口"""
+        gaps = find_gaps([candle[0] for candle in self.stored], '1h')
+        assert gaps.tolist() == [
+            [START + 10 * HOUR, START + 10 * HOUR],
+            [START + 20 * HOUR, START + 24 * HOUR],
+            [START + 50 * HOUR, START + 59 * HOUR],
+        ]
+        assert find_gaps(np.array([START]), '1h').shape == (0, 2)
+
+    @pytest.mark.parametrize('layout', ['flat', 'partitioned'])
+    def test_scan_gaps(self, layout):
+        """测试缺口索引保存在数据旁边"""
+        open_store("ETH/USDT", "1h", **self._kwargs(layout)).write(self.stored)
+        index = scan_gaps("ETH/USDT", "1h", **self._kwargs(layout))
+
+        assert [gap[2] for gap in index['gaps']] == [1, 5, 10]
+        assert index['last_ts'] == self.candles[-1][0]
+
+        path = gap_index_path(open_store("ETH/USDT", "1h", **self._kwargs(layout)))
+        if layout == 'flat':
+            assert path == os.path.join(self.temp_dir.name, "ETH-USDT_1h_gaps.json")
+        with open(path) as f:
+            assert json.load(f)['gaps'] == index['gaps']
+
+    @pytest.mark.parametrize('layout', ['flat', 'partitioned'])
+    def test_backfill_gaps(self, layout):
+        """测试只请求缺失的时间窗口"""
+        open_store("ETH/USDT", "1h", **self._kwargs(layout)).write(self.stored)
+
+        # 交易所在第55~59根也没有数据
+        available = [candle for i, candle in enumerate(self.candles) if not 55 <= i < 60]
+
+        def fake_fetch_ohlcv(symbol, timeframe, since, limit):
+            return [list(candle) for candle in available if candle[0] >= since][:limit]
+
+        exchange = mock.MagicMock()
+        exchange.timeframes = {'1h': '1H'}
+        exchange.rateLimit = 0
+        exchange.fetch_ohlcv.side_effect = fake_fetch_ohlcv
+
+        index = backfill_gaps("ETH/USDT", "1h", exchange=exchange, **self._kwargs(layout))
+
+        # 每个缺口一次请求，而不是重新下载全部数据
+        assert [call.args[2] for call in exchange.fetch_ohlcv.call_args_list] == [
+            START + 10 * HOUR, START + 20 * HOUR, START + 50 * HOUR
+        ]
+        assert index['gaps'] == []
+        assert index['confirmed'] == [[START + 55 * HOUR, START + 59 * HOUR]]
+
+        stored = open_store("ETH/USDT", "1h", **self._kwargs(layout)).load()
+        assert stored['timestamp'].tolist() == [candle[0] for candle in available]
+
+        # 已确认的缺口不再请求
+        exchange.fetch_ohlcv.reset_mock()
+        backfill_gaps("ETH/USDT", "1h", exchange=exchange, **self._kwargs(layout))
+        exchange.fetch_ohlcv.assert_not_called()
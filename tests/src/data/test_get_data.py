@@ -16,8 +16,11 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../.
 # 导入被测试模块
 from src.data.get_data import (
     ensure_data_dir, get_exchange, fetch_ohlcv, fetch_full_history,
-    save_to_csv, fetch_and_save_data
+    save_to_csv, fetch_and_save_data, get_data_file_path, read_last_timestamp,
+    append_to_csv, save_data, load_data, export_to_csv, dedup_pages, filter_pages, chunk_frames,
+    dedup_sort_filter
 )
+from src.data.exchange_pool import clear_pool
 
 from src.manager.config_manager import ConfigManager
 
@@ -38,7 +41,6 @@ class TestGetData:
             },
             'options': {'defaultType': 'swap'}
         }
-        ConfigManager().
 
         # 模拟K线数据
         self.mock_ohlcv_data = [
@@ -51,6 +53,7 @@ class TestGetData:
         """每个测试方法后的清理"""
         # 清理临时目录
         self.temp_dir.cleanup()
+        clear_pool()
 
     def test_ensure_data_dir(self):
         """测试确保数据目录存在"""
@@ -138,6 +141,43 @@ class TestGetData:
         assert result == self.mock_ohlcv_data
         assert mock_fetch_ohlcv.call_count == 4
     
+    @mock.patch('ccxt.okx')
+    def test_fetch_full_history_sharded(self, mock_okx):
+        """测试分片并发获取的结果与逐页获取一致，各工作线程使用各自的交易所实例"""
+        hour = 3600000
+        start = int(datetime(2021, 7, 1).timestamp() * 1000)
+        candles = [[start + i * hour, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0 * i] for i in range(50)]
+
+        def fake_fetch_ohlcv(symbol, timeframe, since, limit):
+            # 模拟交易所单页最多返回4条
+            page = [candle for candle in candles if candle[0] >= since][:min(limit, 4)]
+            return [list(candle) for candle in page]
+
+        clients = []
+
+        def make_exchange(config):
+            client = mock.MagicMock()
+            client.id = 'okx'
+            client.timeframes = {'1h': '1H'}
+            client.rateLimit = 0
+            client.fetch_ohlcv.side_effect = fake_fetch_ohlcv
+            clients.append(client)
+            return client
+
+        mock_okx.side_effect = make_exchange
+        exchange = get_exchange()
+
+        end = start + 40 * hour
+        result = fetch_full_history(exchange, "BTC/USDT", "1h", start, end, max_workers=4, page_size=10)
+
+        assert result == candles[:41]
+        # 调用方的实例不发请求，工作线程各自从客户端池取得实例，不超过并发数
+        workers = clients[1:]
+        assert exchange.fetch_ohlcv.call_count == 0
+        assert 1 <= len(workers) <= 4
+        # 前4个窗口各10条，单页4条，各需要3页；最后一个窗口只有1条，需要1页
+        assert sum(client.fetch_ohlcv.call_count for client in workers) == 4 * 3 + 1
+
     def test_save_to_csv(self):
         """测试将K线数据保存为CSV文件"""
         # 测试保存数据
@@ -195,9 +235,152 @@ class TestGetData:
         # 验证结果
         assert result == expected_file_path
         mock_exchange.load_markets.assert_called_once()
-        mock_fetch_full_history.assert_called_once_with(mock_exchange, symbol, timeframe, start_date, end_date)
+        mock_fetch_full_history.assert_called_once_with(mock_exchange, symbol, timeframe, start_date, end_date,
+                                                         config=self.test_config)
         mock_save_to_csv.assert_called_once_with(self.mock_ohlcv_data, symbol, timeframe, self.temp_dir.name)
     
+    def test_read_last_timestamp(self):
+        """测试读取CSV文件最后一条K线的时间戳"""
+        file_path = save_to_csv(self.mock_ohlcv_data, "BTC/USDT", "1h", self.temp_dir.name)
+        assert read_last_timestamp(file_path) == self.mock_ohlcv_data[-1][0]
+
+        # 文件不存在
+        assert read_last_timestamp(os.path.join(self.temp_dir.name, "missing.csv")) is None
+
+        # 只有表头
+        empty_path = save_to_csv([], "ETH/USDT", "1h", self.temp_dir.name)
+        assert read_last_timestamp(empty_path) is None
+
+    def test_append_to_csv(self):
+        """测试增量数据合并后与完整保存的结果一致"""
+        # 最后一条K线尚未走完，增量数据中修正了它的收盘价
+        stored = self.mock_ohlcv_data[:2] + [[1625104800000, 35700.0, 35800.0, 35500.0, 35750.0, 50.0]]
+        file_path = save_to_csv(stored, "BTC/USDT", "1h", self.temp_dir.name)
+
+        new_data = self.mock_ohlcv_data[2:] + [[1625108400000, 35900.0, 36100.0, 35800.0, 36000.0, 80.0]]
+        append_to_csv(new_data, file_path, new_data[0][0])
+
+        full_dir = os.path.join(self.temp_dir.name, "full")
+        full_path = save_to_csv(self.mock_ohlcv_data + new_data[1:], "BTC/USDT", "1h", full_dir)
+
+        with open(file_path) as f, open(full_path) as g:
+            assert f.read() == g.read()
+
+    @mock.patch('src.data.get_data.fetch_full_history')
+    @mock.patch('ccxt.okx')
+    def test_fetch_and_save_data_incremental(self, mock_okx, mock_fetch_full_history):
+        """测试增量模式只获取缺失的末尾数据"""
+        mock_exchange = mock.MagicMock()
+        mock_exchange.symbols = ["BTC/USDT"]
+        mock_okx.return_value = mock_exchange
+
+        file_path = save_to_csv(self.mock_ohlcv_data[:2], "BTC/USDT", "1h", self.temp_dir.name)
+        mock_fetch_full_history.return_value = self.mock_ohlcv_data[1:]
+
+        result = fetch_and_save_data(
+            symbol="BTC/USDT",
+            timeframe="1h",
+            start_date="2021-07-01",
+            data_dir=self.temp_dir.name,
+            incremental=True,
+            overlap=1
+        )
+
+        # 从文件最后一条K线开始获取
+        assert result == file_path
+        mock_fetch_full_history.assert_called_once_with(
+            mock_exchange, "BTC/USDT", "1h", self.mock_ohlcv_data[1][0], None, config=None)
+
+        df = pd.read_csv(file_path)
+        assert df['timestamp'].tolist() == [candle[0] for candle in self.mock_ohlcv_data]
+
+    def test_dedup_sort_filter(self):
+        """测试向量化去重、排序与时间过滤"""
+        first, second, third = self.mock_ohlcv_data
+        duplicate = [second[0], 0.0, 0.0, 0.0, 0.0, 0.0]
+        ohlcv = [third, first, second, duplicate, first]
+
+        # 时间戳重复时保留最先获取的K线
+        assert dedup_sort_filter(ohlcv) == self.mock_ohlcv_data
+        assert dedup_sort_filter(ohlcv, end_timestamp=second[0]) == [first, second]
+        assert dedup_sort_filter(ohlcv, start_timestamp=second[0]) == [second, third]
+        assert dedup_sort_filter([]) == []
+
+        df = dedup_sort_filter(ohlcv, end_timestamp=second[0], as_frame=True)
+        assert str(df['timestamp'].dtype) == 'int64'
+        assert df.values.tolist() == [first, second]
+
+    def test_stream_pipeline(self):
+        """测试流式管道的去重、时间过滤与分块"""
+        pages = [self.mock_ohlcv_data[:2], self.mock_ohlcv_data[1:], self.mock_ohlcv_data[2:]]
+        assert list(dedup_pages(iter(pages))) == [self.mock_ohlcv_data[:2], self.mock_ohlcv_data[2:]]
+
+        start_timestamp = self.mock_ohlcv_data[1][0]
+        end_timestamp = self.mock_ohlcv_data[1][0]
+        pages = iter([self.mock_ohlcv_data[:1], self.mock_ohlcv_data])
+        assert list(filter_pages(pages, start_timestamp, end_timestamp)) == [self.mock_ohlcv_data[1:2]]
+
+        frames = list(chunk_frames(iter([self.mock_ohlcv_data[:1], self.mock_ohlcv_data[1:]]), 2))
+        assert [len(frame) for frame in frames] == [2, 1]
+        assert frames[1]['timestamp'].tolist() == [self.mock_ohlcv_data[2][0]]
+
+    @mock.patch('ccxt.okx')
+    def test_fetch_and_save_data_streaming(self, mock_okx):
+        """测试流式模式与一次性获取保存的结果一致"""
+        hour = 3600000
+        start = int(datetime(2021, 7, 1).timestamp() * 1000)
+        candles = [[start + i * hour, 1.0 + i, 2.0 + i, 0.5 + i, 1.5 + i, 10.0 * i] for i in range(30)]
+
+        def fake_fetch_ohlcv(symbol, timeframe, since, limit):
+            # 每页与上一页重叠一条
+            page = [candle for candle in candles if candle[0] >= since - hour][:5]
+            return [list(candle) for candle in page]
+
+        mock_exchange = mock.MagicMock()
+        mock_exchange.symbols = ["BTC/USDT"]
+        mock_exchange.timeframes = {'1h': '1H'}
+        mock_exchange.rateLimit = 0
+        mock_exchange.fetch_ohlcv.side_effect = fake_fetch_ohlcv
+        mock_okx.return_value = mock_exchange
+
+        end = start + 20 * hour
+        file_path = fetch_and_save_data(symbol="BTC/USDT", timeframe="1h", start_date=start, end_date=end,
+                                        data_dir=self.temp_dir.name, storage_format='csv', layout='flat',
+                                        streaming=True, fetch_options={'chunk_size': 4})
+
+        assert file_path == os.path.join(self.temp_dir.name, "BTC-USDT_1h.csv")
+        df = pd.read_csv(file_path)
+        assert df[['timestamp', 'open', 'high', 'low', 'close', 'volume']].values.tolist() == candles[:21]
+
+        # 增量流式更新只替换末尾数据
+        file_path = fetch_and_save_data(symbol="BTC/USDT", timeframe="1h", end_date=start + 25 * hour,
+                                        data_dir=self.temp_dir.name, storage_format='csv', layout='flat',
+                                        incremental=True, streaming=True)
+        df = pd.read_csv(file_path)
+        assert df['timestamp'].tolist() == [candle[0] for candle in candles[:26]]
+
+    def test_get_data_file_path(self):
+        """测试数据文件路径"""
+        file_path = get_data_file_path("ETH/USDT:USDT", "1h", self.temp_dir.name)
+        assert file_path == os.path.join(self.temp_dir.name, "ETH-USDT-USDT_1h.csv")
+
+    def test_save_and_load_data_parquet(self):
+        """测试列式存储的保存、列投影读取与CSV导出"""
+        pytest.importorskip('pyarrow')
+        file_path = save_data(self.mock_ohlcv_data, "BTC/USDT", "1h", self.temp_dir.name, 'parquet')
+        assert file_path.endswith("BTC-USDT_1h.parquet")
+
+        df = load_data("BTC/USDT", "1h", self.temp_dir.name, columns=['timestamp', 'close'],
+                       storage_format='parquet')
+        assert list(df.columns) == ['timestamp', 'close']
+        assert str(df['timestamp'].dtype) == 'int64'
+        assert df['close'].tolist() == [candle[4] for candle in self.mock_ohlcv_data]
+
+        csv_path = export_to_csv("BTC/USDT", "1h", self.temp_dir.name, storage_format='parquet')
+        df = pd.read_csv(csv_path)
+        assert list(df.columns) == ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'datetime']
+        assert len(df) == 3
+
     @mock.patch('ccxt.okx')
     def test_fetch_and_save_data_symbol_not_found(self, mock_okx):
         """测试获取并保存数据时交易对不存在的情况"""
@@ -0,0 +1,64 @@
+"""
+测试数据哈希模块
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.hashing import hash_data, chain_hash
+
+
+def _make_ohlcv(count=100):
+    close = np.linspace(100, 200, count)
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(count, dtype=np.int64) * 3600000,
+        'open': close, 'high': close + 1, 'low': close - 1, 'close': close, 'volume': 1.0,
+    })
+
+
+class TestHashing:
+    """测试数据哈希"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.df = _make_ohlcv()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.df = None
+
+    def test_hash_data(self):
+        """测试数据哈希只与内容有关"""
+        df = self.df
+        as_dict = {column: df[column].to_numpy() for column in df.columns}
+        assert hash_data(df) == hash_data(as_dict)
+        assert hash_data(df.iloc[:50]) != hash_data(df)
+
+        changed = df.copy()
+        changed.loc[10, 'close'] += 1e-9
+        assert hash_data(changed) != hash_data(df)
+
+    def test_chain_hash(self):
+        """测试链式哈希从状态继续计算与从头计算一致，只与内容有关"""
+        df = self.df
+        whole, state = chain_hash(df, block_rows=16)
+        assert state['rows'] == 96
+
+        # 分几次追加，每次从上次的状态继续
+        state = None
+        for end in (10, 40, 41, 100):
+            digest, state = chain_hash(df.iloc[:end], state=state, block_rows=16)
+            assert digest == chain_hash(df.iloc[:end], block_rows=16)[0]
+        assert digest == whole
+
+        # 从状态继续时不再读取状态覆盖的行
+        stale = df.copy()
+        stale.loc[5, 'close'] += 1
+        assert chain_hash(stale, state=chain_hash(df.iloc[:50], block_rows=16)[1], block_rows=16)[0] == whole
+        assert chain_hash(stale, block_rows=16)[0] != whole
+        assert chain_hash(df.iloc[:99], block_rows=16)[0] != whole
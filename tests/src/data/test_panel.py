@@ -0,0 +1,101 @@
+"""
+测试面板数据模块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.panel import build_panel, load_panel, forward_fill
+from src.data.store import open_store
+
+HOUR = 3600000
+
+
+def _make_ohlcv(hours, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, len(hours)))
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.asarray(hours, dtype=np.int64) * HOUR,
+        'open': close - 0.5,
+        'high': close + 1,
+        'low': close - 1,
+        'close': close,
+        'volume': rng.uniform(1, 10, len(hours)),
+    })
+
+
+class TestPanel:
+    """测试面板数据"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # BTC完整，ETH缺少第3、4根，SOL从第5根开始上市
+        self.frames = {
+            'BTC/USDT': _make_ohlcv(range(10), seed=1),
+            'ETH/USDT': _make_ohlcv([0, 1, 2, 5, 6, 7, 8, 9], seed=2),
+            'SOL/USDT': _make_ohlcv(range(5, 10), seed=3),
+        }
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_build_panel_matches_merge(self):
+        """测试对齐结果与按时间戳外连接的结果一致"""
+        panel = build_panel(self.frames)
+        assert panel.shape == (10, 3, 5)
+        assert panel.symbols == list(self.frames)
+
+        for field in ('open', 'close', 'volume'):
+            expected = pd.concat({symbol: df.set_index('timestamp')[field] for symbol, df in self.frames.items()},
+                                 axis=1).sort_index()
+            pd.testing.assert_frame_equal(panel.to_frame(field), expected, check_names=False)
+            np.testing.assert_array_equal(panel.values[:, :, panel.fields.index(field)], panel[field])
+
+        assert panel.mask.sum(axis=0).tolist() == [10, 8, 5]
+        assert np.isnan(panel['close'][3, 1])
+
+    def test_forward_fill_missing(self):
+        """测试缺失K线的价格取上一根收盘价，成交量为0，上市前保持NaN"""
+        panel = build_panel(self.frames, fill='ffill')
+        eth_close = self.frames['ETH/USDT']['close'].to_numpy()
+        for field in ('open', 'high', 'low', 'close'):
+            assert panel[field][3, 1] == eth_close[2]
+            assert panel[field][4, 1] == eth_close[2]
+        assert panel['volume'][3, 1] == 0.0
+        assert np.isnan(panel['close'][:5, 2]).all()
+        assert not panel.mask[3, 1]
+
+        values = np.array([[np.nan, 1.0], [2.0, np.nan], [np.nan, np.nan]])
+        np.testing.assert_array_equal(forward_fill(values), [[np.nan, 1.0], [2.0, 1.0], [2.0, 1.0]])
+
+    def test_full_index(self):
+        """测试完整周期网格包含所有交易对都缺失的时刻"""
+        frames = {'BTC/USDT': _make_ohlcv([0, 1, 4]), 'ETH/USDT': _make_ohlcv([1, 4])}
+        panel = build_panel(frames, timeframe='1h')
+        assert len(panel) == 5
+        assert not panel.mask[2:4].any()
+        assert panel['close'][4, 1] == frames['ETH/USDT']['close'].iloc[1]
+
+        frames['ETH/USDT'].loc[0, 'timestamp'] += 1
+        with pytest.raises(ValueError):
+            build_panel(frames, timeframe='1h')
+
+    def test_load_panel(self):
+        """测试读取已保存的数据，没有数据的交易对被跳过"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'flat'}
+        for symbol, df in self.frames.items():
+            open_store(symbol, '1h', **kwargs).write(df)
+
+        panel = load_panel(['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'DOGE/USDT'], '1h', fields=('close',), **kwargs)
+        assert panel.symbols == ['BTC/USDT', 'ETH/USDT', 'SOL/USDT']
+        assert panel.fields == ('close',)
+        np.testing.assert_allclose(panel['close'][:, 0], self.frames['BTC/USDT']['close'])
@@ -0,0 +1,124 @@
+"""
+测试请求频率限制模块
+"""
+import os
+import sys
+import time
+import asyncio
+from unittest import mock
+
+import ccxt
+import requests
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.rate_limiter import (
+    RateLimiter, RetryPolicy, endpoint_weight, is_retryable, retry_after_seconds
+)
+from src.data.get_data import fetch_full_history
+
+
+class TestRateLimiter:
+    """测试令牌桶频率限制器"""
+
+    def test_burst(self):
+        """测试令牌桶容量内的请求不等待，超出后按间隔等待"""
+        limiter = RateLimiter(0.05, capacity=3)
+        waits = [limiter.acquire() for _ in range(4)]
+        assert waits[:3] == [0.0, 0.0, 0.0]
+        assert waits[3] > 0.03
+
+    def test_weight(self):
+        """测试权重大的请求消耗更多令牌"""
+        limiter = RateLimiter(0.05, capacity=2)
+        assert limiter.acquire(weight=2) == 0.0
+        assert limiter.acquire() > 0.03
+        assert endpoint_weight('load_markets') > endpoint_weight('fetch_ohlcv')
+        assert endpoint_weight('unknown') == 1
+
+    def test_penalize(self):
+        """测试限流后暂停所有请求"""
+        limiter = RateLimiter(0.01, capacity=5)
+        limiter.penalize(0.1)
+        start = time.monotonic()
+        limiter.acquire()
+        assert time.monotonic() - start >= 0.09
+
+    def test_acquire_async(self):
+        """测试异步获取请求许可"""
+        limiter = RateLimiter(0.05, capacity=1)
+
+        async def run():
+            return [await limiter.acquire_async() for _ in range(2)]
+
+        waits = asyncio.run(run())
+        assert waits[0] == 0.0 and waits[1] > 0.03
+
+
+class TestRetry:
+    """测试失败重试策略"""
+
+    def test_delay(self):
+        """测试指数退避与Retry-After"""
+        policy = RetryPolicy(max_retries=3, base_delay=1, max_delay=10)
+        for attempt in range(6):
+            assert 0 <= policy.delay(attempt) <= min(10, 2 ** attempt)
+        assert policy.delay(0, retry_after=3) == 3
+        assert policy.delay(0, retry_after=100) == 10
+
+    def test_is_retryable(self):
+        """测试区分可重试与永久错误"""
+        assert is_retryable(ccxt.RequestTimeout("timeout"))
+        assert is_retryable(ccxt.RateLimitExceeded("429"))
+        assert not is_retryable(ccxt.BadSymbol("bad symbol"))
+        assert not is_retryable(ccxt.AuthenticationError("auth"))
+        assert is_retryable(ConnectionResetError("reset"))
+        assert is_retryable(requests.ConnectionError("connection"))
+        assert not is_retryable(KeyError("timestamp"))
+        assert not is_retryable(TypeError("bad argument"))
+
+    def test_retry_after_seconds(self):
+        """测试读取Retry-After响应头"""
+        exchange = mock.MagicMock()
+        exchange.last_response_headers = {'retry-after': '7'}
+        assert retry_after_seconds(exchange, ccxt.RateLimitExceeded("429")) == 7
+        assert retry_after_seconds(exchange, ccxt.RequestTimeout("timeout")) is None
+
+        exchange.last_response_headers = {}
+        assert retry_after_seconds(exchange, ccxt.RateLimitExceeded("429")) is None
+
+    @mock.patch('src.data.get_data.time')
+    def test_fetch_retries_transient_errors(self, mock_time):
+        """测试临时错误按退避重试，永久错误立即抛出"""
+        exchange = mock.MagicMock()
+        exchange.timeframes = {'1h': '1H'}
+        exchange.rateLimit = 0
+        mock_sleep = mock_time.sleep
+        exchange.last_response_headers = {'Retry-After': '0.2'}
+        candle = [1625097600000, 1.0, 2.0, 0.5, 1.5, 10.0]
+        exchange.fetch_ohlcv.side_effect = [ccxt.RateLimitExceeded("429"), ccxt.RequestTimeout("timeout"),
+                                            [candle], []]
+
+        result = fetch_full_history(exchange, "BTC/USDT", "1h", candle[0], candle[0] + 3600000,
+                                    retry_policy=RetryPolicy(max_retries=3, base_delay=0.5, max_delay=60))
+        assert result == [candle]
+        assert mock_sleep.call_count == 2
+        # 限流时遵循Retry-After
+        assert mock_sleep.call_args_list[0].args[0] == 0.2
+
+        # 永久错误不重试
+        exchange.fetch_ohlcv.side_effect = ccxt.BadSymbol("bad symbol")
+        mock_sleep.reset_mock()
+        with pytest.raises(ccxt.BadSymbol):
+            fetch_full_history(exchange, "BTC/USDT", "1h", candle[0], candle[0] + 3600000,
+                               retry_policy=RetryPolicy(max_retries=3))
+        mock_sleep.assert_not_called()
+
+        # 超过最大重试次数后抛出
+        exchange.fetch_ohlcv.side_effect = ccxt.RequestTimeout("timeout")
+        with pytest.raises(ccxt.RequestTimeout):
+            fetch_full_history(exchange, "BTC/USDT", "1h", candle[0], candle[0] + 3600000,
+                               retry_policy=RetryPolicy(max_retries=2, base_delay=0))
+        assert exchange.fetch_ohlcv.call_count == 4 + 1 + 3
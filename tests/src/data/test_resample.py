@@ -0,0 +1,135 @@
+"""
+测试K线重采样模块
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.resample import bar_start, resample_ohlcv, resample_store, resample_timeframes
+from src.data.store import open_store
+from src.data.storage import OHLCV_COLUMNS
+
+MINUTE = 60000
+
+
+def _utc_ms(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _make_minutes(start, count, seed=0):
+    """生成随机的1分钟K线"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, count))
+    open_ = np.r_[100, close[:-1]]
+    spread = rng.uniform(0, 1, count)
+    return pd.DataFrame({
+        'timestamp': start + np.arange(count, dtype=np.int64) * MINUTE,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 10, count),
+    })
+
+
+def _reference(df, rule):
+    """用pandas.resample计算的参考结果"""
+    indexed = df.set_index(pd.to_datetime(df['timestamp'], unit='ms'))
+    result = indexed.resample(rule, label='left', closed='left', origin='epoch').agg({
+        'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'
+    }).dropna()
+    result.insert(0, 'timestamp', result.index.as_unit('ms').asi8)
+    return result.reset_index(drop=True)
+
+
+class TestResample:
+    """测试K线重采样"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # 从周三 2021-06-02 00:00 开始的10天1分钟线
+        self.minutes = _make_minutes(_utc_ms(2021, 6, 2), 10 * 1440)
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    @pytest.mark.parametrize('timeframe, rule', [('5m', '5min'), ('15m', '15min'), ('1h', '1h'),
+                                                 ('4h', '4h'), ('1d', '24h')])
+    def test_matches_pandas(self, timeframe, rule):
+        """测试聚合结果与pandas.resample一致"""
+        result = resample_ohlcv(self.minutes, timeframe, '1m')
+        expected = _reference(self.minutes, rule)
+        assert result['timestamp'].tolist() == expected['timestamp'].tolist()
+        np.testing.assert_allclose(result[OHLCV_COLUMNS[1:]].to_numpy(), expected[OHLCV_COLUMNS[1:]].to_numpy())
+
+    def test_week_starts_on_monday(self):
+        """测试周线从周一开始"""
+        result = resample_ohlcv(self.minutes, '1w', '1m')
+        assert result['timestamp'].tolist() == [_utc_ms(2021, 5, 31), _utc_ms(2021, 6, 7)]
+        assert result['volume'].iloc[0] == pytest.approx(self.minutes['volume'].iloc[:5 * 1440].sum())
+        assert bar_start([_utc_ms(2021, 6, 6, 23, 59)], '1w')[0] == _utc_ms(2021, 5, 31)
+
+    def test_complete_only(self):
+        """测试去掉首尾不完整的K线"""
+        partial = self.minutes.iloc[30:-10]
+        result = resample_ohlcv(partial, '1h', '1m', complete_only=True)
+        assert result['timestamp'].iloc[0] == _utc_ms(2021, 6, 2, 1)
+        assert result['timestamp'].iloc[-1] == _utc_ms(2021, 6, 11, 22)
+
+    def test_invalid_timeframe(self):
+        """测试目标周期不是源周期的整数倍"""
+        with pytest.raises(ValueError):
+            resample_ohlcv(self.minutes, '5m', '15m')
+        with pytest.raises(ValueError):
+            resample_ohlcv(self.minutes, '7m', '5m')
+        with pytest.raises(ValueError):
+            resample_ohlcv(self.minutes, '1M', '1m')
+
+    @pytest.mark.parametrize('layout', ['flat', 'partitioned'])
+    def test_incremental_matches_full(self, layout):
+        """测试追加源数据后增量更新与全量重建一致"""
+        kwargs = dict(exchange_id='okx', data_dir=self.temp_dir.name, storage_format='csv', layout=layout)
+        source = open_store("ETH/USDT", "1m", **kwargs)
+
+        # 先写入到某个小时中间的数据，最后一根小时线未走完
+        source.write(self.minutes.iloc[:5000])
+        resample_timeframes("ETH/USDT", ['1m', '1h', '1d'], '1m', **kwargs)
+
+        source.append(self.minutes.iloc[4990:], since=int(self.minutes['timestamp'].iloc[4990]))
+        paths = resample_timeframes("ETH/USDT", ['1h', '1d'], '1m', **kwargs)
+        assert set(paths) == {'1h', '1d'}
+
+        for timeframe in ['1h', '1d']:
+            stored = open_store("ETH/USDT", timeframe, **kwargs).load()
+            expected = resample_ohlcv(self.minutes, timeframe, '1m')
+            assert stored['timestamp'].tolist() == expected['timestamp'].tolist()
+            np.testing.assert_allclose(stored[OHLCV_COLUMNS[1:]].to_numpy(),
+                                       expected[OHLCV_COLUMNS[1:]].to_numpy())
+
+        with pytest.raises(FileNotFoundError):
+            resample_store("BTC/USDT", '1h', '1m', **kwargs)
+
+    def test_full_rebuild_keeps_older_rows(self):
+        """测试全量重建替换源数据覆盖范围内的K线，早于源数据的目标K线保留"""
+        kwargs = dict(exchange_id='okx', data_dir=self.temp_dir.name, storage_format='csv', layout='flat')
+        expected = resample_ohlcv(self.minutes, '1h', '1m')
+        older = expected.iloc[:3].copy()
+        older['timestamp'] -= 3 * 3600000
+        target = open_store("ETH/USDT", "1h", **kwargs)
+        target.write(pd.concat([older, expected.assign(close=expected['close'] + 1)], ignore_index=True))
+        open_store("ETH/USDT", "1m", **kwargs).write(self.minutes)
+
+        resample_store("ETH/USDT", '1h', '1m', incremental=False, **kwargs)
+        stored = target.load()
+        assert stored['timestamp'].tolist() == older['timestamp'].tolist() + expected['timestamp'].tolist()
+        np.testing.assert_allclose(stored['close'].iloc[3:], expected['close'])
@@ -0,0 +1,162 @@
+"""
+测试批量下载调度模块
+"""
+import os
+import sys
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.scheduler import (
+    DownloadJob, BatchDownloader, load_jobs_from_config, JOB_DONE, JOB_FAILED
+)
+from src.data.rate_limiter import RateLimiter, get_rate_limiter
+from src.data import exchange_pool
+
+
+class TestScheduler:
+    """测试批量下载调度"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+        exchange_pool.clear_pool()
+
+    def test_load_jobs_from_config(self):
+        """测试从配置展开任务列表"""
+        config = {
+            "exchange_id": "okx",
+            "symbol": "ETH/USDT",
+            "timeframe": "1h",
+            "start_time": "2021-07-01 00:00:00",
+            "jobs": [
+                {"symbols": ["BTC/USDT", "ETH/USDT"], "timeframes": ["1m", "1h"]},
+                {"symbol": "SOL/USDT", "exchange_id": "binance", "start_date": "2022-01-01"},
+            ]
+        }
+
+        jobs = load_jobs_from_config(config)
+
+        assert [job.name for job in jobs] == [
+            "okx:BTC/USDT:1m", "okx:BTC/USDT:1h", "okx:ETH/USDT:1m", "okx:ETH/USDT:1h",
+            "binance:SOL/USDT:1h",
+        ]
+        assert jobs[0].start_date == "2021-07-01 00:00:00"
+        assert jobs[-1].start_date == "2022-01-01"
+
+        # 没有jobs时使用顶层配置
+        jobs = load_jobs_from_config({"symbol": "ETH/USDT", "timeframe": "4h"})
+        assert len(jobs) == 1
+        assert jobs[0].symbol == "ETH/USDT"
+        assert jobs[0].timeframe == "4h"
+
+    @mock.patch('src.data.scheduler._default_interval', return_value=0)
+    @mock.patch('src.data.scheduler.fetch_and_save_data')
+    def test_run_with_retry(self, mock_fetch_and_save_data, mock_interval):
+        """测试并发执行任务并重试失败的任务"""
+        calls = {}
+
+        def fake_fetch_and_save_data(symbol, timeframe, fetch_options, **kwargs):
+            calls[symbol] = calls.get(symbol, 0) + 1
+            fetch_options['progress_callback'](50, 0, 100, 10)
+            if symbol == "BTC/USDT" and calls[symbol] == 1:
+                raise RuntimeError("网络错误")
+            if symbol == "BAD/USDT":
+                raise ValueError("交易对不存在")
+            return f"{symbol}_{timeframe}.csv"
+
+        mock_fetch_and_save_data.side_effect = fake_fetch_and_save_data
+
+        jobs = [
+            DownloadJob("BTC/USDT", "1h", exchange_id="okx"),
+            DownloadJob("ETH/USDT", "1h", exchange_id="okx"),
+            DownloadJob("BAD/USDT", "1h", exchange_id="okx"),
+        ]
+        reported = []
+        downloader = BatchDownloader(max_workers=2, max_retries=1, retry_delay=0,
+                                     data_dir=self.temp_dir.name, progress_callback=reported.append)
+        downloader.run(jobs)
+
+        assert jobs[0].status == JOB_DONE
+        assert jobs[0].attempts == 2
+        assert jobs[0].file_path == "BTC/USDT_1h.csv"
+        assert jobs[1].status == JOB_DONE
+        assert jobs[1].attempts == 1
+        assert jobs[2].status == JOB_FAILED
+        assert jobs[2].attempts == 2
+        assert "交易对不存在" in jobs[2].error
+        assert reported
+
+        # 同一交易所的任务共享同一个频率限制器
+        limiters = {id(call.kwargs['fetch_options']['rate_limiter'])
+                    for call in mock_fetch_and_save_data.call_args_list}
+        assert len(limiters) == 1
+
+    @mock.patch('src.data.scheduler.pool_enabled', return_value=True)
+    @mock.patch('src.data.scheduler.get_rate_limiter')
+    @mock.patch('src.data.scheduler.get_pooled_exchange')
+    @mock.patch('src.data.scheduler.fetch_and_save_data', return_value='ETH-USDT_1h.csv')
+    def test_interval_from_pooled_exchange(self, mock_fetch_and_save_data, mock_pool, mock_get_rate_limiter,
+                                           mock_pool_enabled):
+        """测试请求间隔取自客户端池中的实例，不另外创建交易所实例"""
+        mock_pool.return_value = mock.MagicMock(rateLimit=250)
+        downloader = BatchDownloader(max_workers=1, max_retries=0, data_dir=self.temp_dir.name,
+                                     config={'rateLimit': 250})
+        downloader.run([DownloadJob("ETH/USDT", "1h", exchange_id="okx")])
+
+        mock_pool.assert_called_with('okx', {'rateLimit': 250})
+        mock_get_rate_limiter.assert_called_once_with('okx', 0.25)
+        assert mock_fetch_and_save_data.call_args.kwargs['exchange'] is mock_pool.return_value
+
+    @mock.patch('src.data.scheduler.pool_enabled', return_value=False)
+    @mock.patch('src.data.scheduler.get_pooled_exchange')
+    @mock.patch('src.data.scheduler.get_exchange')
+    @mock.patch('src.data.scheduler.fetch_and_save_data', return_value='ETH-USDT_1h.csv')
+    def test_pool_disabled(self, mock_fetch_and_save_data, mock_get_exchange, mock_pool, mock_pool_enabled):
+        """测试未启用客户端池时每个任务单独创建交易所实例"""
+        mock_get_exchange.return_value = mock.MagicMock(rateLimit=100)
+        downloader = BatchDownloader(max_workers=1, max_retries=0, data_dir=self.temp_dir.name)
+        downloader.run([DownloadJob("ETH/USDT", "1h", exchange_id="okx")])
+
+        mock_pool.assert_not_called()
+        mock_get_exchange.assert_called_once_with('okx', None)
+        assert mock_fetch_and_save_data.call_args.kwargs['exchange'] is mock_get_exchange.return_value
+
+    @mock.patch('src.data.scheduler.pool_enabled', return_value=True)
+    @mock.patch('src.data.scheduler._default_interval', return_value=0)
+    @mock.patch('src.data.scheduler.fetch_and_save_data', side_effect=RuntimeError("网络错误"))
+    def test_retry_rounds_reuse_pool(self, mock_fetch_and_save_data, mock_interval, mock_pool_enabled):
+        """测试多轮重试使用同一个线程池，客户端池中的实例数不超过并发数"""
+        jobs = [DownloadJob(symbol, "1h", exchange_id="okx") for symbol in ("BTC/USDT", "ETH/USDT", "SOL/USDT")]
+        downloader = BatchDownloader(max_workers=2, max_retries=3, retry_delay=0, data_dir=self.temp_dir.name)
+        with mock.patch('src.data.scheduler.ThreadPoolExecutor', wraps=ThreadPoolExecutor) as executor:
+            downloader.run(jobs)
+
+        executor.assert_called_once_with(max_workers=2)
+        assert all(job.attempts == 4 for job in jobs)
+        assert len(exchange_pool._EXCHANGES) <= 2
+
+
+class TestRateLimiter:
+    """测试频率限制器"""
+
+    def test_acquire_interval(self):
+        """测试请求之间保持最小间隔"""
+        limiter = RateLimiter(0.05, capacity=1)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        assert time.monotonic() - start >= 0.1
+
+    def test_get_rate_limiter_shared(self):
+        """测试同一交易所共享频率限制器"""
+        assert get_rate_limiter("test_exchange", 0.1) is get_rate_limiter("test_exchange", 1)
+        assert get_rate_limiter("test_exchange", 0.1) is not get_rate_limiter("other_exchange", 0.1)
@@ -0,0 +1,182 @@
+"""
+测试数据存储模块
+"""
+import os
+import sys
+import tempfile
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import numpy as np
+
+from src.data.storage import (
+    get_storage, get_storage_for_path, ohlcv_to_frame, CSVStorage, ParquetStorage, FeatherStorage,
+    BinaryStorage, OHLCV_COLUMNS, open_memmap, BINARY_HEADER_DTYPE, BINARY_ROW_DTYPE
+)
+
+# 列式存储需要pyarrow
+COLUMNAR_FORMATS = ['parquet', 'feather']
+try:
+    import pyarrow
+except ImportError:
+    COLUMNAR_FORMATS = []
+
+
+class TestStorage:
+    """测试存储后端"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        hour = 3600000
+        self.ohlcv_data = [
+            [1625097600000 + i * hour, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0 + i]
+            for i in range(10)
+        ]
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def _path(self, storage):
+        return os.path.join(self.temp_dir.name, f"test{storage.extension}")
+
+    def test_ohlcv_to_frame(self):
+        """测试K线数据转换为带类型的DataFrame"""
+        df = ohlcv_to_frame([[1625097600000, 1, 2, 0, 1, 5]])
+        assert list(df.columns) == OHLCV_COLUMNS
+        assert str(df['timestamp'].dtype) == 'int64'
+        assert all(str(df[column].dtype) == 'float64' for column in OHLCV_COLUMNS[1:])
+
+    @pytest.mark.parametrize('storage_format', ['csv', 'binary'] + COLUMNAR_FORMATS)
+    def test_write_and_read(self, storage_format):
+        """测试写入与读取"""
+        storage = get_storage(storage_format)
+        file_path = self._path(storage)
+        storage.write(ohlcv_to_frame(self.ohlcv_data), file_path)
+
+        df = storage.read(file_path)
+        assert df[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data
+
+        # 列投影
+        df = storage.read(file_path, columns=['timestamp', 'close'])
+        assert list(df.columns) == ['timestamp', 'close']
+        assert df['close'].tolist() == [candle[4] for candle in self.ohlcv_data]
+
+        assert storage.last_timestamp(file_path) == self.ohlcv_data[-1][0]
+        assert storage.last_timestamp(os.path.join(self.temp_dir.name, "missing")) is None
+
+    @pytest.mark.parametrize('storage_format', ['csv', 'binary'] + COLUMNAR_FORMATS)
+    def test_append(self, storage_format):
+        """测试增量合并替换since之后的数据"""
+        storage = get_storage(storage_format)
+        file_path = self._path(storage)
+        storage.write(ohlcv_to_frame(self.ohlcv_data[:6]), file_path)
+
+        # 修正第6条K线并追加后续数据
+        new_data = [list(candle) for candle in self.ohlcv_data[5:]]
+        storage.append(ohlcv_to_frame(new_data), file_path, since=new_data[0][0])
+
+        df = storage.read(file_path)
+        assert df[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data
+
+    @pytest.mark.parametrize('storage_format', ['csv', 'binary'] + COLUMNAR_FORMATS)
+    def test_open_writer(self, storage_format):
+        """测试分块写入与一次性写入的结果一致"""
+        storage = get_storage(storage_format)
+        file_path = self._path(storage)
+        storage.write(ohlcv_to_frame(self.ohlcv_data[:3]), file_path)
+
+        # 未指定since时覆盖整个文件
+        with storage.open_writer(file_path) as writer:
+            for begin in range(0, 10, 4):
+                writer.write(ohlcv_to_frame(self.ohlcv_data[begin:begin + 4]))
+        assert writer.rows == 10
+        assert storage.read(file_path)[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data
+        assert not os.path.exists(file_path + '.tmp')
+
+        # 指定since时保留之前的数据
+        with storage.open_writer(file_path, since=self.ohlcv_data[6][0]) as writer:
+            writer.write(ohlcv_to_frame(self.ohlcv_data[6:8]))
+        assert storage.read(file_path)[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data[:8]
+        assert storage.last_timestamp(file_path) == self.ohlcv_data[7][0]
+
+    @pytest.mark.parametrize('storage_format', ['csv', 'binary'] + COLUMNAR_FORMATS)
+    def test_open_writer_abort(self, storage_format):
+        """测试写入出错时原文件保持不变"""
+        storage = get_storage(storage_format)
+        file_path = self._path(storage)
+        storage.write(ohlcv_to_frame(self.ohlcv_data), file_path)
+
+        with pytest.raises(RuntimeError):
+            with storage.open_writer(file_path) as writer:
+                writer.write(ohlcv_to_frame(self.ohlcv_data[:2]))
+                raise RuntimeError("网络错误")
+
+        assert storage.read(file_path)[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data
+        assert not os.path.exists(file_path + '.tmp')
+
+    def test_get_storage(self):
+        """测试获取存储后端"""
+        assert isinstance(get_storage('csv'), CSVStorage)
+        assert isinstance(get_storage('parquet'), ParquetStorage)
+        assert isinstance(get_storage('feather'), FeatherStorage)
+        assert isinstance(get_storage('binary'), BinaryStorage)
+        assert isinstance(get_storage_for_path('a/b_1h.parquet'), ParquetStorage)
+
+        with pytest.raises(ValueError):
+            get_storage('xlsx')
+        with pytest.raises(ValueError):
+            get_storage_for_path('a/b_1h.xlsx')
+
+
+class TestBinaryMemmap:
+    """测试定长二进制格式的内存映射读取"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.temp_dir.name, "test.ohlcv")
+        minute = 60000
+        self.ohlcv_data = [
+            [1625097600000 + i * minute, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0 + i]
+            for i in range(100)
+        ]
+        get_storage('binary').write(ohlcv_to_frame(self.ohlcv_data), self.file_path)
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_layout(self):
+        """测试文件头和定长行的布局"""
+        assert BINARY_HEADER_DTYPE.itemsize == 64
+        assert BINARY_ROW_DTYPE.itemsize == 48
+        assert os.path.getsize(self.file_path) == 64 + 48 * len(self.ohlcv_data)
+
+    def test_zero_copy_views(self):
+        """测试字段为映射文件的零拷贝视图"""
+        data = open_memmap(self.file_path)
+
+        assert len(data) == 100
+        assert isinstance(data.records, np.memmap)
+        assert np.shares_memory(data.close, data.records)
+        assert data.timestamp.dtype == np.int64
+        assert data.close.tolist() == [candle[4] for candle in self.ohlcv_data]
+        assert data['volume'][-1] == self.ohlcv_data[-1][5]
+
+        # 按时间范围二分查找
+        rows = data.slice(self.ohlcv_data[10][0], self.ohlcv_data[19][0])
+        assert np.shares_memory(rows, data.records)
+        assert rows['timestamp'].tolist() == [candle[0] for candle in self.ohlcv_data[10:20]]
+
+    def test_invalid_file(self):
+        """测试非二进制K线文件"""
+        invalid_path = os.path.join(self.temp_dir.name, "invalid.ohlcv")
+        with open(invalid_path, 'wb') as f:
+            f.write(b'\0' * 64)
+
+        with pytest.raises(ValueError):
+            open_memmap(invalid_path)
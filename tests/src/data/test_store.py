@@ -0,0 +1,142 @@
+"""
+测试K线数据仓库模块
+"""
+import os
+import sys
+import json
+import tempfile
+from datetime import datetime, timezone
+from unittest import mock
+
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.store import (
+    FlatStore, PartitionedStore, open_store, load_ohlcv, INDEX_FILENAME
+)
+from src.data.storage import OHLCV_COLUMNS, ohlcv_to_frame
+
+DAY = 24 * 3600000
+
+
+def _utc_ms(*args):
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+class TestStore:
+    """测试数据仓库"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        # 2021-06-01 至 2021-08-31 的日线，跨越3个月
+        start = _utc_ms(2021, 6, 1)
+        self.ohlcv_data = [
+            [start + i * DAY, 100.0 + i, 101.0 + i, 99.0 + i, 100.5 + i, 10.0 + i]
+            for i in range(92)
+        ]
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_partitioned_write_and_index(self):
+        """测试按月分区写入和元数据索引"""
+        store = PartitionedStore("ETH/USDT:USDT", "1d", "okx", self.temp_dir.name, 'csv')
+        path = store.write(self.ohlcv_data)
+
+        assert path == os.path.join(self.temp_dir.name, "okx", "ETH-USDT-USDT", "1d")
+        assert sorted(os.listdir(path)) == ["2021-06.csv", "2021-07.csv", "2021-08.csv", INDEX_FILENAME]
+
+        with open(os.path.join(path, INDEX_FILENAME)) as f:
+            index = json.load(f)
+        assert index['format'] == 'csv'
+        assert index['partitions']['2021-07'] == {
+            'min_ts': _utc_ms(2021, 7, 1), 'max_ts': _utc_ms(2021, 7, 31), 'rows': 31
+        }
+
+        # 重新打开时从索引读取
+        store = PartitionedStore("ETH/USDT:USDT", "1d", "okx", self.temp_dir.name)
+        assert store.first_timestamp() == self.ohlcv_data[0][0]
+        assert store.last_timestamp() == self.ohlcv_data[-1][0]
+
+    def test_partitioned_load_range(self):
+        """测试按时间范围读取只打开重叠的分区"""
+        store = PartitionedStore("ETH/USDT", "1d", "okx", self.temp_dir.name, 'csv')
+        store.write(self.ohlcv_data)
+
+        with mock.patch.object(store, '_read_partition', wraps=store._read_partition) as read_partition:
+            df = store.load(_utc_ms(2021, 7, 10), _utc_ms(2021, 7, 16), columns=['close'])
+
+        read_partition.assert_called_once_with('2021-07', columns=['timestamp', 'close'])
+        assert list(df.columns) == ['close']
+        assert df['close'].tolist() == [candle[4] for candle in self.ohlcv_data[39:46]]
+
+        df = store.load()
+        assert df[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data
+
+    def test_partitioned_write_touches_affected_partitions(self):
+        """测试写入只重写受影响的分区"""
+        store = PartitionedStore("ETH/USDT", "1d", "okx", self.temp_dir.name, 'csv')
+        store.write(self.ohlcv_data[:70])
+
+        with mock.patch.object(store, '_write_partition', wraps=store._write_partition) as write_partition:
+            store.write(self.ohlcv_data[60:])
+
+        assert [call.args[0] for call in write_partition.call_args_list] == ['2021-07', '2021-08']
+        assert store.load()[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data
+
+    def test_partitioned_append(self):
+        """测试增量合并替换since之后的数据"""
+        store = PartitionedStore("ETH/USDT", "1d", "okx", self.temp_dir.name, 'csv')
+        stale = [list(candle) for candle in self.ohlcv_data]
+        stale[-1][4] = 0.0
+        store.write(stale)
+
+        store.append(self.ohlcv_data[-1:], since=self.ohlcv_data[-1][0])
+        assert store.load()[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data
+
+        # since之后已有但新数据中没有的分区会被删除
+        store.append(self.ohlcv_data[20:25], since=self.ohlcv_data[20][0])
+        assert list(store.partitions) == ['2021-06']
+        assert store.load()[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data[:25]
+
+    def test_partitioned_writer(self):
+        """测试分区存储分块写入"""
+        store = PartitionedStore("ETH/USDT", "1d", "okx", self.temp_dir.name, 'csv')
+        stale = [list(candle) for candle in self.ohlcv_data]
+        stale[40][4] = 0.0
+        store.write(stale)
+
+        since = self.ohlcv_data[40][0]
+        with store.writer(since) as writer:
+            for begin in range(40, 70, 10):
+                writer.write(ohlcv_to_frame(self.ohlcv_data[begin:begin + 10]))
+
+        assert writer.rows == 30
+        assert list(store.partitions) == ['2021-06', '2021-07', '2021-08']
+        assert store.load()[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data[:70]
+
+    def test_flat_store(self):
+        """测试单文件存储按时间范围读取"""
+        store = FlatStore("ETH/USDT", "1d", self.temp_dir.name, 'csv')
+        store.write(self.ohlcv_data[:50])
+        store.write(self.ohlcv_data[40:])
+
+        assert store.path == os.path.join(self.temp_dir.name, "ETH-USDT_1d.csv")
+        assert store.last_timestamp() == self.ohlcv_data[-1][0]
+        df = store.load(self.ohlcv_data[10][0], self.ohlcv_data[19][0])
+        assert df[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data[10:20]
+
+    def test_load_ohlcv(self):
+        """测试按存储布局读取"""
+        open_store("ETH/USDT", "1d", "okx", self.temp_dir.name, 'csv', 'partitioned').write(self.ohlcv_data)
+
+        df = load_ohlcv("ETH/USDT", "1d", start=_utc_ms(2021, 8, 1, 12), exchange_id="okx",
+                        data_dir=self.temp_dir.name, layout='partitioned')
+        assert df[OHLCV_COLUMNS].values.tolist() == self.ohlcv_data[62:]
+
+        with pytest.raises(ValueError):
+            open_store("ETH/USDT", "1d", layout='unknown')
@@ -0,0 +1,111 @@
+"""
+测试交易对索引模块
+"""
+import os
+import sys
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.symbols import normalize_symbol, SymbolIndex, get_symbol_index
+from src.data.scheduler import DownloadJob, validate_jobs, JOB_FAILED
+from src.data.exchange_pool import clear_pool
+
+
+MARKETS = {
+    'ETH/USDT': {'id': 'ETH-USDT', 'symbol': 'ETH/USDT'},
+    'ETH/USDT:USDT': {'id': 'ETH-USDT-SWAP', 'symbol': 'ETH/USDT:USDT'},
+    'ETH/BTC': {'id': 'ETH-BTC', 'symbol': 'ETH/BTC'},
+    'BTC/USDT': {'id': 'BTC-USDT', 'symbol': 'BTC/USDT'},
+    'SOL/USDT': {'id': 'SOL-USDT', 'symbol': 'SOL/USDT'},
+}
+
+
+class FakeExchange:
+    """模拟已加载市场信息的交易所"""
+
+    def __init__(self, exchange_id='fake', config=None):
+        self.id = exchange_id
+        self.markets = dict(MARKETS)
+        self.symbols = list(MARKETS)
+        self.currencies = {}
+
+    def load_markets(self):
+        return self.markets
+
+
+class TestSymbolIndex:
+    """测试交易对索引"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        clear_pool()
+        self.index = SymbolIndex(MARKETS)
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        clear_pool()
+
+    def test_normalize_symbol(self):
+        """测试规范化去掉分隔符并转为大写"""
+        assert normalize_symbol('eth-usdt-swap') == 'ETHUSDTSWAP'
+        assert normalize_symbol('ETH/USDT:USDT') == 'ETHUSDTUSDT'
+
+    def test_resolve_aliases(self):
+        """测试统一名称、市场ID和文件名写法都能解析"""
+        assert self.index.resolve('ETH/USDT') == 'ETH/USDT'
+        assert self.index.resolve('ETH-USDT-SWAP') == 'ETH/USDT:USDT'
+        assert self.index.resolve('eth-usdt') == 'ETH/USDT'
+        assert self.index.resolve('ETH-USDT-USDT') == 'ETH/USDT:USDT'
+        assert self.index.resolve('DOGE/USDT') is None
+        assert 'btcusdt' in self.index
+        assert len(self.index) == len(MARKETS)
+
+    def test_search_prefix(self):
+        """测试前缀搜索"""
+        assert set(self.index.search('ETH')) == {'ETH/USDT', 'ETH/USDT:USDT', 'ETH/BTC'}
+        assert self.index.search('eth/usdt', limit=1) == ['ETH/USDT']
+        assert self.index.search('XRP') == []
+
+    def test_suggest(self):
+        """测试为不存在的交易对给出候选"""
+        assert self.index.suggest('SOL/USDC') == ['SOL/USDT']
+        assert 'BTC/USDT' in self.index.suggest('BTX/USDT')
+
+    def test_validate(self):
+        """测试批量校验"""
+        resolved, missing = self.index.validate(['ETH-USDT-SWAP', 'BTC/USDT', 'DOGE/USDT'])
+        assert resolved == {'ETH-USDT-SWAP': 'ETH/USDT:USDT', 'BTC/USDT': 'BTC/USDT'}
+        assert missing == ['DOGE/USDT']
+
+    def test_get_symbol_index_cached(self):
+        """测试市场信息不变时复用索引，更新后重建"""
+        exchange = FakeExchange()
+        index = get_symbol_index(exchange)
+        assert get_symbol_index(exchange) is index
+
+        exchange.markets = {'XRP/USDT': {'id': 'XRP-USDT', 'symbol': 'XRP/USDT'}}
+        exchange.symbols = ['XRP/USDT']
+        rebuilt = get_symbol_index(exchange)
+        assert rebuilt is not index
+        assert rebuilt.resolve('XRP-USDT') == 'XRP/USDT'
+
+    def test_get_symbol_index_without_markets(self):
+        """测试没有市场信息时使用交易对列表"""
+        exchange = FakeExchange()
+        exchange.markets = None
+        exchange.symbols = ['ETH/USDT']
+        assert get_symbol_index(exchange).resolve('ethusdt') == 'ETH/USDT'
+
+    def test_validate_jobs(self):
+        """测试批量任务校验改写别名并标记不存在的交易对"""
+        jobs = [
+            DownloadJob('ETH-USDT-SWAP', '1h', exchange_id='fake'),
+            DownloadJob('DOGE/USDT', '1h', exchange_id='fake'),
+        ]
+        valid = validate_jobs(jobs, factory=FakeExchange)
+
+        assert valid == [jobs[0]]
+        assert jobs[0].symbol == 'ETH/USDT:USDT'
+        assert jobs[1].status == JOB_FAILED
+        assert 'DOGE/USDT' in jobs[1].error
@@ -0,0 +1,40 @@
+"""
+测试时间工具模块
+"""
+import os
+import sys
+import pytest
+from datetime import datetime
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.time_utils import timeframe_to_ms, to_timestamp_ms
+
+
+class TestTimeUtils:
+    """测试时间工具模块"""
+
+    def test_timeframe_to_ms(self):
+        """测试K线周期转换为毫秒"""
+        assert timeframe_to_ms('1m') == 60 * 1000
+        assert timeframe_to_ms('15m') == 15 * 60 * 1000
+        assert timeframe_to_ms('4h') == 4 * 60 * 60 * 1000
+        assert timeframe_to_ms('1d') == 24 * 60 * 60 * 1000
+        assert timeframe_to_ms('1w') == 7 * 24 * 60 * 60 * 1000
+
+        with pytest.raises(ValueError):
+            timeframe_to_ms('1x')
+        with pytest.raises(ValueError):
+            timeframe_to_ms('h')
+
+    def test_to_timestamp_ms(self):
+        """测试日期转换为毫秒时间戳"""
+        expected = int(datetime(2021, 7, 1).timestamp() * 1000)
+        assert to_timestamp_ms('2021-07-01') == expected
+        assert to_timestamp_ms('2021-07-01 00:00:00') == expected
+        assert to_timestamp_ms(datetime(2021, 7, 1)) == expected
+        assert to_timestamp_ms(expected) == expected
+
+        with pytest.raises(ValueError):
+            to_timestamp_ms('2021/07/01')
@@ -0,0 +1,142 @@
+"""
+测试逐笔成交数据模块
+"""
+import os
+import sys
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.data.trades import (
+    TRADE_DTYPE, trades_to_array, iter_trade_pages, chunk_trades, aggregate_trades, fetch_trade_bars,
+    TimeBars, VolumeBars, DollarBars, TickBars, make_aggregator
+)
+
+START = 1625097600000  # 2021-07-01 00:00:00 UTC
+
+
+def _make_trades(count=1000, seed=0):
+    """生成随机成交记录，部分成交在同一毫秒内"""
+    rng = np.random.default_rng(seed)
+    timestamps = START + np.cumsum(rng.integers(0, 2000, count))
+    price = 2000 + np.cumsum(rng.normal(0, 1, count))
+    amount = rng.integers(1, 10, count).astype(float)
+    sides = rng.choice(['buy', 'sell'], count)
+    return [{'id': str(i), 'timestamp': int(t), 'price': float(p), 'amount': float(a), 'side': s}
+            for i, (t, p, a, s) in enumerate(zip(timestamps, price, amount, sides))]
+
+
+def _mock_exchange(trades, page_size):
+    def fake_fetch_trades(symbol, since, limit):
+        return [dict(trade) for trade in trades if trade['timestamp'] >= since][:min(limit, page_size)]
+
+    exchange = mock.MagicMock()
+    exchange.symbols = ['ETH/USDT']
+    exchange.rateLimit = 0
+    exchange.fetch_trades.side_effect = fake_fetch_trades
+    return exchange
+
+
+class TestTrades:
+    """测试成交记录获取与K线聚合"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.trades = _make_trades()
+        self.array = trades_to_array(self.trades)
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.trades = None
+
+    def test_pagination(self):
+        """测试分页在同一毫秒中间断开时不丢失也不重复成交"""
+        trades = [{'id': str(i), 'timestamp': START + i // 2, 'price': 1.0, 'amount': 1.0, 'side': 'buy'}
+                  for i in range(40)]
+        exchange = _mock_exchange(trades, page_size=3)
+        pages = list(iter_trade_pages(exchange, 'ETH/USDT', START, START + 8, limit=3))
+        result = np.concatenate(pages)
+        assert result.dtype == TRADE_DTYPE
+        np.testing.assert_array_equal(result['timestamp'], [trade['timestamp'] for trade in trades[:18]])
+
+        # 数据末尾的最后一页只有已产出的成交时直接结束，不误报遗漏
+        with mock.patch('src.data.trades.logger') as mock_logger:
+            result = np.concatenate(list(iter_trade_pages(exchange, 'ETH/USDT', START, START + 100, limit=3)))
+        assert len(result) == len(trades)
+        mock_logger.warning.assert_not_called()
+
+        # 同一毫秒内的成交多于一页时跳到下一毫秒，不会死循环
+        trades = [dict(trade, timestamp=START + i // 4) for i, trade in enumerate(trades)]
+        exchange = _mock_exchange(trades, page_size=2)
+        result = np.concatenate(list(iter_trade_pages(exchange, 'ETH/USDT', START, START + 2, limit=2)))
+        assert np.all(np.diff(result['timestamp']) >= 0)
+
+    def test_chunk_trades(self):
+        """测试按固定行数分块"""
+        pages = [self.array[i:i + 7] for i in range(0, len(self.array), 7)]
+        chunks = list(chunk_trades(pages, 100))
+        assert [len(chunk) for chunk in chunks] == [100] * 10
+        np.testing.assert_array_equal(np.concatenate(chunks), self.array)
+
+    def test_time_bars(self):
+        """测试时间K线与pandas按周期分组的结果一致，且与分块方式无关"""
+        df = pd.DataFrame(self.array)
+        df['dollar'] = df['price'] * df['amount']
+        df['bar'] = df['timestamp'] // 60000 * 60000
+        expected = df.groupby('bar').agg(open=('price', 'first'), high=('price', 'max'), low=('price', 'min'),
+                                         close=('price', 'last'), volume=('amount', 'sum'),
+                                         dollar=('dollar', 'sum'), trades=('price', 'size'))
+
+        whole = aggregate_trades([self.array], ['1m'])['1m']
+        chunked = aggregate_trades(chunk_trades([self.array], 37), {'1m': TimeBars('1m')})['1m']
+        pd.testing.assert_frame_equal(whole, chunked)
+
+        np.testing.assert_array_equal(whole['timestamp'], expected.index)
+        for column in ('open', 'high', 'low', 'close', 'volume', 'trades'):
+            np.testing.assert_allclose(whole[column], expected[column])
+        np.testing.assert_allclose(whole['dollar'], expected['dollar'], rtol=1e-12)
+        assert whole['buy_volume'].sum() == df.loc[df['side'] > 0, 'amount'].sum()
+
+    def test_threshold_bars(self):
+        """测试成交量、成交额和笔数K线"""
+        specs = ['volume:100', 'dollar:500000', 'tick:64']
+        whole = aggregate_trades([self.array], specs)
+        chunked = aggregate_trades(chunk_trades([self.array], 51), specs)
+        for spec in specs:
+            pd.testing.assert_frame_equal(whole[spec], chunked[spec])
+            assert whole[spec]['trades'].sum() == len(self.array)
+
+        ticks = whole['tick:64']
+        assert (ticks['trades'].iloc[:-1] == 64).all()
+        assert ticks['timestamp'].iloc[1] == self.array['timestamp'][64]
+
+        # 第k根K线之前的累计成交量落在[100k, 100(k+1))内
+        volume = whole['volume:100']
+        before = np.cumsum(volume['volume']) - volume['volume']
+        np.testing.assert_array_equal(before // 100, np.arange(len(volume)))
+        assert volume['volume'].mean() == pytest.approx(100, rel=0.1)
+
+        assert isinstance(make_aggregator('dollar:1e6'), DollarBars)
+        assert isinstance(make_aggregator('volume:5'), VolumeBars)
+        assert isinstance(make_aggregator('tick:10'), TickBars)
+        with pytest.raises(ValueError):
+            make_aggregator('range:10')
+        with pytest.raises(ValueError):
+            VolumeBars(0)
+
+    @mock.patch('src.data.trades.pool_enabled', return_value=False)
+    @mock.patch('ccxt.okx')
+    def test_fetch_trade_bars(self, mock_okx, mock_pool):
+        """测试获取成交记录并一次遍历聚合多种K线"""
+        mock_okx.return_value = _mock_exchange(self.trades, page_size=50)
+        end = self.trades[-1]['timestamp']
+        result = fetch_trade_bars('ETH/USDT', START, end, ['1m', 'tick:100'], exchange_id='okx', chunk_size=128)
+
+        expected = aggregate_trades([self.array], ['1m', 'tick:100'])
+        for name in expected:
+            pd.testing.assert_frame_equal(result[name], expected[name])
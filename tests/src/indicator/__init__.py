@@ -0,0 +1,3 @@
+"""
+技术指标模块测试包
+"""
@@ -0,0 +1,150 @@
+"""
+测试特征库模块
+"""
+import os
+import sys
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.indicator.indicators import compute_indicators
+from src.indicator.feature_store import FeatureStore, load_features, SOURCE_HASH_COLUMNS
+from src.data.hashing import chain_hash
+from src.data.store import open_store
+
+HOUR = 3600000
+
+INDICATORS = {
+    'sma': [5, 20],
+    'rsi': [14],
+    'bollinger': [[20, 2]],
+    'macd': [[12, 26, 9]],
+}
+
+
+def _make_ohlcv(count=300, start=1609459200000, seed=0):
+    """生成随机K线"""
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 5, count))
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        'timestamp': start + np.arange(count, dtype=np.int64) * HOUR,
+        'open': open_,
+        'high': np.maximum(open_, close) + 1,
+        'low': np.minimum(open_, close) - 1,
+        'close': close,
+        'volume': rng.uniform(1, 10, count),
+    })
+
+
+def _assert_matches_batch(features, data):
+    expected = compute_indicators(data, INDICATORS)[list(features.columns)]
+    np.testing.assert_allclose(features.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                               rtol=1e-9, atol=1e-8, equal_nan=True)
+
+
+class TestFeatureStore:
+    """测试特征库"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.kwargs = {'data_dir': self.temp_dir.name, 'storage_format': 'csv', 'layout': 'flat'}
+        self.df = _make_ohlcv()
+        self.store = open_store('ETH/USDT', '1h', **self.kwargs)
+        # 最后一根K线视为未走完
+        self.now = int(self.df['timestamp'].iloc[-1]) + HOUR // 2
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def _features(self):
+        return FeatureStore('ETH/USDT', '1h', feature_format='parquet', **self.kwargs)
+
+    def test_load_and_reuse(self):
+        """测试首次读取计算并保存，K线不变时只读文件"""
+        self.store.write(self.df)
+        first = self._features().load(INDICATORS, now=self.now)
+        assert len(first) == len(self.df) - 1
+        _assert_matches_batch(first, self.df.iloc[:-1])
+
+        with mock.patch('src.indicator.feature_store.IndicatorBatch') as batch:
+            statuses = self._features().refresh(INDICATORS, now=self.now)
+            second = self._features().load(INDICATORS, now=self.now)
+        batch.assert_not_called()
+        assert set(statuses.values()) == {'fresh'}
+        pd.testing.assert_frame_equal(first, second)
+
+        start = int(self.df['timestamp'].iloc[100])
+        ranged = self._features().load({'sma': [5]}, start=start, now=self.now)
+        assert list(ranged.columns) == ['timestamp', 'sma_5']
+        assert ranged['timestamp'].iloc[0] == start
+
+        # 文件不变但最后一根K线已走完时追加这根K线
+        features = self._features()
+        assert set(features.refresh(INDICATORS, now=self.now + HOUR).values()) == {'extended'}
+        assert features.version('sma', [5]) == 2
+        assert set(features.refresh(INDICATORS, now=self.now + 2 * HOUR).values()) == {'fresh'}
+        _assert_matches_batch(features.load(INDICATORS, now=self.now + 2 * HOUR), self.df)
+
+    def test_append_extends_tail(self):
+        """测试追加K线后只计算新增部分，结果与全量计算一致"""
+        self.store.write(self.df.iloc[:200])
+        now = int(self.df['timestamp'].iloc[199]) + HOUR // 2
+        features = self._features()
+        features.load(INDICATORS, now=now)
+        assert features.version('sma', [5]) == 1
+
+        self.store.append(self.df.iloc[199:], since=int(self.df['timestamp'].iloc[199]))
+        with mock.patch('src.indicator.feature_store.IndicatorBatch') as batch:
+            statuses = features.refresh(INDICATORS, now=self.now)
+        batch.assert_not_called()
+        assert set(statuses.values()) == {'extended'}
+        assert features.version('sma', [5]) == 2
+        # 接着保存的状态计算的哈希与对全部已走完K线从头计算的一致
+        meta = features._read_meta(features._paths('sma', [5])[1])
+        closed = self.store.load(end=int(self.df['timestamp'].iloc[-2]))
+        assert meta['source_hash'] == chain_hash(closed, SOURCE_HASH_COLUMNS)[0]
+
+        result = features.load(INDICATORS, now=self.now)
+        assert len(result) == len(self.df) - 1
+        _assert_matches_batch(result, self.df.iloc[:-1])
+
+    def test_repair_recomputes(self):
+        """测试已计算的K线被修复后整体重新计算"""
+        self.store.write(self.df)
+        features = self._features()
+        features.load(INDICATORS, now=self.now)
+
+        repaired = self.df.copy()
+        repaired.loc[50, 'close'] += 10
+        self.store.write(repaired)
+        statuses = features.refresh(INDICATORS, now=self.now)
+        assert set(statuses.values()) == {'computed'}
+        assert features.version('rsi', [14]) == 2
+        _assert_matches_batch(features.load(INDICATORS, now=self.now), repaired.iloc[:-1])
+
+        # 只修改成交量不影响指标，只更新版本
+        repaired.loc[60, 'volume'] += 1
+        self.store.write(repaired)
+        assert set(features.refresh(INDICATORS, now=self.now).values()) == {'extended'}
+
+    def test_new_indicator_and_missing_data(self):
+        """测试新增指标只计算该指标，数据不存在时报错"""
+        self.store.write(self.df)
+        self._features().load({'sma': [5]}, now=self.now)
+        statuses = self._features().refresh({'sma': [5, 20]}, now=self.now)
+        assert statuses == {'sma_5': 'fresh', 'sma_20': 'computed'}
+
+        result = load_features('ETH/USDT', '1h', {'sma': [5, 20]}, now=self.now, **self.kwargs)
+        assert list(result.columns) == ['timestamp', 'sma_5', 'sma_20']
+
+        with pytest.raises(FileNotFoundError):
+            FeatureStore('BTC/USDT', '1h', **self.kwargs).load({'sma': [5]}, now=self.now)
@@ -0,0 +1,172 @@
+"""
+测试技术指标模块
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.indicator.indicators import (
+    sma, ema, rsi, atr, bollinger, macd, volatility, rolling_std, true_range,
+    IndicatorBatch, compute_indicators, compute_store_indicators
+)
+from src.data.store import open_store
+
+
+def _make_ohlcv(count=600, seed=0):
+    """生成随机K线"""
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 5, count))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = rng.uniform(0, 3, count)
+    return pd.DataFrame({
+        'timestamp': 1609459200000 + np.arange(count, dtype=np.int64) * 3600000,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 10, count),
+    })
+
+
+def _assert_close(actual, expected):
+    np.testing.assert_allclose(np.asarray(actual, dtype=float), np.asarray(expected, dtype=float),
+                               rtol=1e-9, atol=1e-8, equal_nan=True)
+
+
+class TestIndicators:
+    """测试技术指标与pandas参考实现一致"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.df = _make_ohlcv()
+        self.close = self.df['close'].to_numpy()
+        self.series = self.df['close']
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_sma_and_std(self):
+        """测试滑动均值和标准差"""
+        for window in (1, 5, 20, 200):
+            _assert_close(sma(self.close, window), self.series.rolling(window).mean())
+            _assert_close(rolling_std(self.close, window), self.series.rolling(window).std(ddof=0))
+
+        # 窗口长于数据时全部为NaN
+        assert np.isnan(sma(self.close[:3], 5)).all()
+
+    def test_ema(self):
+        """测试指数移动平均"""
+        expected = self.series.ewm(span=12, adjust=False, min_periods=12).mean()
+        _assert_close(ema(self.close, 12), expected)
+
+    def test_rsi(self):
+        """测试RSI"""
+        delta = self.series.diff()
+        avg_gain = delta.clip(lower=0).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        avg_loss = (-delta.clip(upper=0)).ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        expected = 100 - 100 / (1 + avg_gain / avg_loss)
+        result = rsi(self.close, 14)
+
+        _assert_close(result, expected)
+        assert np.isnan(result[:14]).all()
+        assert rsi(np.arange(1.0, 30.0), 14)[-1] == 100.0
+
+    def test_atr(self):
+        """测试真实波幅和ATR"""
+        prev_close = self.df['close'].shift()
+        expected_tr = pd.concat([
+            self.df['high'] - self.df['low'],
+            (self.df['high'] - prev_close).abs(),
+            (self.df['low'] - prev_close).abs(),
+        ], axis=1).max(axis=1)
+        tr = true_range(self.df['high'], self.df['low'], self.df['close'])
+        _assert_close(tr, expected_tr)
+
+        expected = expected_tr.ewm(alpha=1 / 14, adjust=False, min_periods=14).mean()
+        _assert_close(atr(self.df['high'], self.df['low'], self.df['close'], 14), expected)
+
+    def test_bollinger(self):
+        """测试布林带"""
+        mid, upper, lower = bollinger(self.close, 20, 2)
+        std = self.series.rolling(20).std(ddof=0)
+        _assert_close(mid, self.series.rolling(20).mean())
+        _assert_close(upper, self.series.rolling(20).mean() + 2 * std)
+        _assert_close(lower, self.series.rolling(20).mean() - 2 * std)
+
+    def test_macd(self):
+        """测试MACD"""
+        line, signal, hist = macd(self.close, 12, 26, 9)
+        expected_line = (self.series.ewm(span=12, adjust=False).mean()
+                         - self.series.ewm(span=26, adjust=False).mean())
+        expected_line[:25] = np.nan
+        expected_signal = expected_line.ewm(span=9, adjust=False, min_periods=9).mean()
+
+        _assert_close(line, expected_line)
+        _assert_close(signal, expected_signal)
+        _assert_close(hist, expected_line - expected_signal)
+        assert np.isnan(signal[:33]).all() and not np.isnan(signal[33])
+
+    def test_volatility(self):
+        """测试滚动波动率"""
+        expected = np.log(self.series).diff().rolling(20).std()
+        _assert_close(volatility(self.close, 20), expected)
+        _assert_close(volatility(self.close, 20, periods_per_year=8760), expected * np.sqrt(8760))
+
+    def test_invalid_window(self):
+        """测试非法窗口长度"""
+        with pytest.raises(ValueError):
+            sma(self.close, 0)
+        with pytest.raises(ValueError):
+            ema(self.close, 2.5)
+
+    def test_batch_matches_single(self):
+        """测试批量计算与单独计算一致"""
+        result = compute_indicators(self.df, {
+            'sma': [5, 20],
+            'ema': [12, 26],
+            'bollinger': [[20, 2], [20, 2.5]],
+            'macd': [[12, 26, 9]],
+            'rsi': [14],
+            'atr': [14],
+            'volatility': [20],
+        })
+
+        assert list(result['timestamp']) == list(self.df['timestamp'])
+        _assert_close(result['sma_5'], sma(self.close, 5))
+        _assert_close(result['ema_26'], ema(self.close, 26))
+        _assert_close(result['bb_upper_20_2.5'], bollinger(self.close, 20, 2.5)[1])
+        _assert_close(result['macd_hist_12_26_9'], macd(self.close)[2])
+        _assert_close(result['rsi_14'], rsi(self.close))
+        _assert_close(result['atr_14'], atr(self.df['high'], self.df['low'], self.close))
+        _assert_close(result['volatility_20'], volatility(self.close, 20))
+
+    def test_batch_default_and_dict_input(self):
+        """测试默认指标配置和以数组字典作为输入"""
+        columns = {name: self.df[name].to_numpy() for name in ('high', 'low', 'close')}
+        result = IndicatorBatch(columns).compute()
+        assert 'timestamp' not in result.columns
+        assert 'rsi_14' in result.columns and 'macd_12_26_9' in result.columns
+        assert len(result) == len(self.df)
+
+    def test_batch_unknown_indicator(self):
+        """测试不支持的指标"""
+        with pytest.raises(ValueError):
+            compute_indicators(self.df, {'compute': [1]})
+
+    def test_compute_store_indicators(self):
+        """测试读取已保存的数据计算指标"""
+        store = open_store('ETH/USDT', '1h', data_dir=self.temp_dir.name, storage_format='csv', layout='flat')
+        store.write(self.df)
+
+        result = compute_store_indicators('ETH/USDT', '1h', {'sma': [10]}, data_dir=self.temp_dir.name,
+                                          storage_format='csv', layout='flat')
+        _assert_close(result['sma_10'], sma(self.close, 10))
@@ -0,0 +1,155 @@
+"""
+测试流式指标模块
+"""
+import os
+import sys
+import json
+import tempfile
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# 添加项目根目录到路径，以便导入模块
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from src.indicator.indicators import compute_indicators
+from src.indicator.streaming import (
+    RollingWindow, RollingExtreme, StreamingFeatures, indicator_state_path, update_store_indicators
+)
+from src.data.store import open_store, FlatStore
+from src.data.storage import BinaryStorage
+
+HOUR = 3600000
+
+INDICATORS = {
+    'sma': [5, 20],
+    'ema': [12],
+    'rsi': [14],
+    'atr': [14],
+    'bollinger': [[20, 2]],
+    'macd': [[12, 26, 9]],
+    'volatility': [20],
+    'donchian': [10],
+}
+
+
+def _make_ohlcv(count=300, start=1609459200000, seed=0):
+    """生成随机K线"""
+    rng = np.random.default_rng(seed)
+    close = 3000 + np.cumsum(rng.normal(0, 5, count))
+    open_ = np.r_[close[0], close[:-1]]
+    spread = rng.uniform(0, 3, count)
+    return pd.DataFrame({
+        'timestamp': start + np.arange(count, dtype=np.int64) * HOUR,
+        'open': open_,
+        'high': np.maximum(open_, close) + spread,
+        'low': np.minimum(open_, close) - spread,
+        'close': close,
+        'volume': rng.uniform(1, 10, count),
+    })
+
+
+def _assert_frame_close(actual, expected):
+    assert list(actual.columns) == list(expected.columns)
+    np.testing.assert_allclose(actual.to_numpy(dtype=float), expected.to_numpy(dtype=float),
+                               rtol=1e-9, atol=1e-8, equal_nan=True)
+
+
+class TestStreamingIndicators:
+    """测试流式指标与批量计算一致"""
+
+    def setup_method(self):
+        """每个测试方法前的设置"""
+        self.df = _make_ohlcv()
+        self.expected = compute_indicators(self.df, INDICATORS)
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        """每个测试方法后的清理"""
+        self.temp_dir.cleanup()
+
+    def test_rolling_window(self):
+        """测试滑动窗口的均值和方差"""
+        values = np.random.default_rng(1).normal(100, 3, 50)
+        rolling = RollingWindow(7, ddof=1)
+        for i, value in enumerate(values):
+            rolling.push(value)
+            if i >= 6:
+                assert rolling.mean == pytest.approx(values[i - 6:i + 1].mean())
+                assert rolling.var() == pytest.approx(values[i - 6:i + 1].var(ddof=1))
+
+        with pytest.raises(ValueError):
+            RollingWindow(1, ddof=1)
+
+    def test_rolling_extreme(self):
+        """测试单调队列的滑动极值"""
+        values = np.random.default_rng(2).normal(0, 1, 100)
+        maximum, minimum = RollingExtreme(5, 'max'), RollingExtreme(5, 'min')
+        for i, value in enumerate(values):
+            high, low = maximum.push(value), minimum.push(value)
+            if i < 4:
+                assert np.isnan(high) and np.isnan(low)
+            else:
+                assert high == values[i - 4:i + 1].max()
+                assert low == values[i - 4:i + 1].min()
+
+    def test_update_matches_batch(self):
+        """测试逐根更新全部历史与批量计算一致"""
+        features = StreamingFeatures(INDICATORS)
+        result = features.update_candles(self.df.values.tolist())
+        _assert_frame_close(result, self.expected)
+
+    def test_warmup_and_restore(self):
+        """测试由历史预热、保存并恢复状态后继续更新"""
+        features = StreamingFeatures(INDICATORS)
+        features.warmup(self.df.iloc[:200])
+        restored = StreamingFeatures.from_state(json.loads(json.dumps(features.to_state())))
+
+        # 重叠的K线不会被重复计入
+        result = restored.update_candles(self.df.iloc[199:].values.tolist())
+        _assert_frame_close(result, self.expected.iloc[200:].reset_index(drop=True))
+        assert restored.last_timestamp == int(self.df['timestamp'].iloc[-1])
+
+    def test_skip_incomplete_candle(self):
+        """测试未走完的K线不计入状态"""
+        features = StreamingFeatures(INDICATORS, timeframe='1h')
+        last_timestamp = int(self.df['timestamp'].iloc[-1])
+        result = features.update_candles(self.df, now=last_timestamp + HOUR // 2)
+
+        assert len(result) == len(self.df) - 1
+        assert features.last_timestamp == last_timestamp - HOUR
+
+    def test_unknown_indicator(self):
+        """测试不支持的指标"""
+        with pytest.raises(ValueError):
+            StreamingFeatures({'unknown': [1]})
+
+    @pytest.mark.parametrize("storage_format", ["csv", "binary"])
+    def test_update_store_indicators(self, storage_format):
+        """测试按保存的状态增量更新已保存数据的指标，binary格式只复制新增的行"""
+        kwargs = {'data_dir': self.temp_dir.name, 'storage_format': storage_format, 'layout': 'flat'}
+        store = open_store('ETH/USDT', '1h', **kwargs)
+        store.write(self.df.iloc[:250])
+        now = int(self.df['timestamp'].iloc[-1]) + HOUR
+
+        first = update_store_indicators('ETH/USDT', '1h', INDICATORS, now=now, **kwargs)
+        _assert_frame_close(first, self.expected.iloc[:250])
+        assert os.path.exists(indicator_state_path(store))
+
+        store.append(self.df.iloc[250:], int(self.df['timestamp'].iloc[250]))
+        load = FlatStore.load
+        with mock.patch.object(FlatStore, 'load', autospec=True, side_effect=load) as mock_load, \
+                mock.patch.object(BinaryStorage, 'read', side_effect=AssertionError('读取了整个文件')):
+            second = update_store_indicators('ETH/USDT', '1h', INDICATORS, now=now, **kwargs)
+        _assert_frame_close(second, self.expected.iloc[250:].reset_index(drop=True))
+
+        # 只读取状态之后新增的K线
+        assert mock_load.call_args.kwargs['start'] == int(self.df['timestamp'].iloc[249]) + 1
+
+        # 指标配置变化时重新由全部历史计算
+        third = update_store_indicators('ETH/USDT', '1h', {'sma': [5]}, now=now, **kwargs)
+        assert len(third) == len(self.df)
+        assert list(third.columns) == ['timestamp', 'sma_5']
+